@@ -3,9 +3,14 @@ from __future__ import division
 from ..utilcol import randomName
 from ..dataoperation import matchData
 from .analysispoint import AnalysisPoint
+from .resultstore import ResultStore
+from .spatialindex import SpatialIndex
+from .postprocess.matrixparser import readHeader, readRows, matrixInfo, \
+    ILLUMINANCEWEIGHTS
 
 import os
-from itertools import izip
+from array import array
+from itertools import izip, islice
 
 
 # TODO(mostapha): Implement sources from windowGroups
@@ -14,15 +19,30 @@ class AnalysisGrid(object):
 
     Attributes:
         analysisPoints: A collection of analysis points.
+
+    Location and direction of the points are stored in a flat array of doubles with
+    6 values (x, y, z, dx, dy, dz) for each point and AnalysisPoints are only
+    created once they are requested by indexing or iterating the grid. The values
+    for all the analysis points are stored in a single ResultStore and each
+    AnalysisPoint is a view to a row of the store.
+
+    Slicing a grid returns an AnalysisGridView which shares the points and the
+    values with the grid. Duplicates share the values with the original grid until
+    one of them is changed.
     """
 
-    __slots__ = ('_analysisPoints', '_name', '_sources')
+    __slots__ = ('_geometry', '_analysisPoints', '_name', '_store')
+
+    # Radiance string format for a point. Same as AnalysisPoint.toRadString
+    POINTFORMAT = '%.3f %.3f %.3f %.3f %.3f %.3f'
 
     # TODO(mostapha): Add sources.
     def __init__(self, analysisPoints, name=None, windowGroups=None):
         """Initialize a AnalysisPointGroup.
 
-        analysisPoints: A collection of AnalysisPoints.
+        analysisPoints: A collection of AnalysisPoints. Points which are already
+            bound to a ResultStore (e.g. points of another grid) are copied with
+            their values and the other store is not changed.
         name: A unique name for this AnalysisGrid.
         windowGroups: A collection of windowGroups which contribute to this grid.
             This input is only meaningful in studies such as daylight coefficient
@@ -30,16 +50,62 @@ class AnalysisGrid(object):
             calculated separately (default: None).
         """
         self.name = name
-        # name of sources and their state. It's only meaningful in multi-phase daylight
-        # analysis. In analysis for a single time it will be {None: [None]}
-        self._sources = {}
 
         if windowGroups:
             raise NotImplementedError('windowGroups are not implemented.')
 
-        for ap in analysisPoints:
+        # create a result store for all the points and bind the points to it
+        analysisPoints = list(analysisPoints)
+        self._store = ResultStore(len(analysisPoints))
+        self._geometry = array('d')
+        for count, ap in enumerate(analysisPoints):
             assert isinstance(ap, AnalysisPoint), '{} is not an AnalysisPoint.'
-        self._analysisPoints = analysisPoints
+            if ap._store is not None:
+                # the point is a view to another store. Copy the values to this
+                # store and use a new point to keep the other store unchanged.
+                if ap.hasValues:
+                    self._store.copyPoint(ap._store, ap._index, count)
+                logic = ap.logic
+                ap = AnalysisPoint(ap._loc, ap._dir)
+                ap.logic = logic
+                analysisPoints[count] = ap
+            ap._store = self._store
+            ap._index = count
+            self._geometry.extend(ap.location)
+            self._geometry.extend(ap.direction)
+
+        # analysis points which are created by their index
+        self._analysisPoints = dict(enumerate(analysisPoints))
+
+    @classmethod
+    def fromGeometry(cls, geometry, name=None, store=None):
+        """Create an analysis grid from a flat array of points and vectors.
+
+        Args:
+            geometry: An array('d') with 6 values (x, y, z, dx, dy, dz) for each
+                point. The array will be used without copying.
+            name: A unique name for this AnalysisGrid.
+            store: An optional ResultStore for values of the points.
+        """
+        if not isinstance(geometry, array) or geometry.typecode != 'd':
+            geometry = array('d', geometry)
+        if len(geometry) % 6 != 0:
+            raise ValueError(
+                'Length of geometry [{}] should be a multiple of 6.'
+                .format(len(geometry)))
+
+        pointCount = len(geometry) // 6
+        ag = cls((), name)
+        ag._geometry = geometry
+        ag._analysisPoints = {}
+        if store is not None:
+            assert store.pointCount == pointCount, \
+                'Number of points in store [{}] must be {}.' \
+                .format(store.pointCount, pointCount)
+            ag._store = store
+        else:
+            ag._store = ResultStore(pointCount)
+        return ag
 
     @classmethod
     def fromPointsAndVectors(cls, points, vectors=None, name=None, windowGroups=None):
@@ -50,10 +116,22 @@ class AnalysisGrid(object):
             vectors: An optional list of (x, y, z) for direction of test points.
                 If not provided a (0, 0, 1) vector will be assigned.
         """
+        if windowGroups:
+            raise NotImplementedError('windowGroups are not implemented.')
+
         vectors = vectors or ()
         points, vectors = matchData(points, vectors, (0, 0, 1))
-        aps = tuple(AnalysisPoint(pt, v) for pt, v in izip(points, vectors))
-        return cls(aps, name, windowGroups)
+        geometry = array('d')
+        try:
+            for pt, v in izip(points, vectors):
+                geometry.extend((float(pt[0]), float(pt[1]), float(pt[2]),
+                                 float(v[0]), float(v[1]), float(v[2])))
+        except (TypeError, ValueError, IndexError):
+            raise TypeError(
+                'Failed to convert {} and {} to a point and a vector.\n'
+                'Each point and vector should have 3 values.'.format(pt, v))
+
+        return cls.fromGeometry(geometry, name)
 
     @classmethod
     def fromFile(cls, filePath):
@@ -63,11 +141,25 @@ class AnalysisGrid(object):
             filePath: Full path to points file
         """
         assert os.path.isfile(filePath), IOError("Can't find {}.".format(filePath))
-        ap = AnalysisPoint  # load analysis point locally for better performance
+        geometry = array('d')
         with open(filePath, 'rb') as inf:
-            points = tuple(ap.fromrawValues(*l.split()) for l in inf)
-
-        return cls(points)
+            for lineNumber, line in enumerate(inf, 1):
+                values = line.split()
+                if not values:
+                    # empty lines
+                    continue
+                if len(values) != 6:
+                    raise ValueError(
+                        'Line {} of {} has {} values. Each line should have 6 values '
+                        '(x, y, z, dx, dy, dz).'.format(lineNumber, filePath,
+                                                        len(values)))
+                try:
+                    geometry.extend(float(v) for v in values)
+                except ValueError as e:
+                    raise ValueError('Failed to load line {} of {}:\n{}'.format(
+                        lineNumber, filePath, e))
+
+        return cls.fromGeometry(geometry)
 
     @property
     def isAnalysisGrid(self):
@@ -83,36 +175,43 @@ class AnalysisGrid(object):
     def name(self, n):
         self._name = n or randomName()
 
+    @property
+    def geometry(self):
+        """Points and vectors as a flat array with 6 values for each point."""
+        self._updateGeometry()
+        return self._geometry
+
     @property
     def points(self):
         """A generator of points as x, y, z."""
-        return (ap.location for ap in self._analysisPoints)
+        geo = self.geometry
+        return (tuple(geo[i:i + 3]) for i in xrange(0, len(geo), 6))
 
     @property
     def vectors(self):
         """Get generator of vectors as x, y , z."""
-        return (ap.direction for ap in self._analysisPoints)
+        geo = self.geometry
+        return (tuple(geo[i + 3:i + 6]) for i in xrange(0, len(geo), 6))
 
     @property
     def analysisPoints(self):
         """Return a list of analysis points."""
-        return self._analysisPoints
+        return tuple(self)
+
+    @property
+    def store(self):
+        """ResultStore for values of this analysis grid."""
+        return self._store
 
     @property
     def sources(self):
         """Get sorted list fo sources."""
-        if self._sources == {}:
-            return self.analysisPoints[0].sources
-        else:
-            srcs = range(len(self._sources))
-            for name, d in self._sources.iteritems():
-                srcs[d['id']] = name
-                return srcs
+        return self._store.sources
 
     @property
     def hasValues(self):
         """Check if this analysis grid has result values."""
-        return self.analysisPoints[0].hasValues
+        return self._store.hasValues
 
     @property
     def hasDirectValues(self):
@@ -120,28 +219,38 @@ class AnalysisGrid(object):
 
         In some cases and based on the recipe only total values are available.
         """
-        return self.analysisPoints[0].hasDirectValues
+        return self._store.hasDirectValues
 
     @property
     def hoys(self):
         """Return hours of the year for results if any."""
-        return self.analysisPoints[0].hoys
+        return self._store.hoys
 
     @property
     def isResultsPointInTime(self):
         """Return True if the grid has the results only for an hour."""
         return len(self.hoys) == 1
 
-    def setValues(self, hoys, values, source=None, state=None, isDirect=False):
+    def setValues(self, hoys, values, source=None, state=None, isDirect=False,
+                  startPoint=0):
+        """Set values for the points for several hours of the year.
 
-        pass
-        # assign the values to points
-        for count, hourlyValues in enumerate(values):
-            self.analysisPoints[count].setValues(
-                hourlyValues, hoys, source, state, isDirect)
+        Args:
+            hoys: List of hours of the year that corresponds to input values.
+            values: A list of hourly values for each analysis point or a points x
+                hours numpy array.
+            source: Name of the source of light. Only needed in case of multiple
+                sources / window groups (default: None).
+            state: State of the source if any (default: None).
+            isDirect: Set to True if the value is direct contribution of sunlight.
+            startPoint: Index of the point for the first list of values
+                (default: 0).
+        """
+        self._store.setBlockValues(startPoint, values, tuple(hoys), source, state,
+                                   isDirect)
 
     def setValuesFromFile(self, filePath, hoys=None, source=None, state=None,
-                          startLine=None, isDirect=False, header=True):
+                          startLine=None, isDirect=False, header=True, weights=None):
         """Load values for test points from a file.
 
         Args:
@@ -150,45 +259,43 @@ class AnalysisGrid(object):
                 default will be range(0, len(results)).
             source: Name of the source.
             state: Name of the state.
-            startLine: Number of start lines after the header from 0 (default: 0).
+            startLine: Number of rows to skip after the header (default: 0).
             isDirect: A Boolean to declare if the results is direct illuminance
                 (default: False).
             header: A Boolean to declare if the file has header (default: True).
+            weights: Optional weights to convert RGB values to a single value. By
+                default RGB values (NCOMP=3) are converted to illuminance.
         """
+        st = startLine or 0
         with open(filePath, 'rb') as inf:
+            info = {}
             if header:
                 # read the header
-                for i in xrange(7):
-                    if startLine == 0 and i == 2:
-                        pointsCount = int(inf.next().split('=')[-1])
-                        assert len(self._analysisPoints) == pointsCount, \
-                            "Length of points [%d] doesn't match length " \
-                            "of the results [%d]." \
-                            .format(len(self._analysisPoints), pointsCount)
-                    elif startLine == 0 and i == 3:
-                        hoursCount = int(inf.next().split('=')[-1])
-                        if hoys:
-                            assert hoursCount == len(hoys), \
-                                "Number of hours [%d] doesn't match length " \
-                                "of the results [%d]." \
-                                .format(len(hoys), hoursCount)
-                        else:
-                            hoys = xrange(0, hoursCount)
+                info = readHeader(inf)
+                pointsCount, hoursCount, ncomp, _ = matrixInfo(info)
+                if ncomp == 3 and not weights:
+                    weights = ILLUMINANCEWEIGHTS
+                if st == 0 and pointsCount is not None:
+                    assert len(self) == pointsCount, \
+                        "Length of points [{}] doesn't match length " \
+                        "of the results [{}].".format(len(self), pointsCount)
+                if hoursCount is not None:
+                    if hoys:
+                        assert hoursCount == len(hoys), \
+                            "Number of hours [{}] doesn't match length " \
+                            "of the results [{}].".format(len(hoys), hoursCount)
                     else:
-                        inf.next()
+                        hoys = xrange(0, hoursCount)
 
-            st = startLine or 0
-            for i in xrange(st):
-                inf.next()
-
-            end = len(self._analysisPoints)
-            values = (tuple(int(float(r)) for r in inf.next().split())
-                      for count in xrange(end))
+            values = islice(readRows(inf, info, weights, st), len(self))
 
             # assign the values to points
+            hoys = tuple(hoys) if hoys else None
+            store = self._store
             for count, hourlyValues in enumerate(values):
-                self.analysisPoints[count].setValues(
-                    hourlyValues, hoys, source, state, isDirect)
+                if hoys is None:
+                    hoys = tuple(xrange(len(hourlyValues)))
+                store.setValues(count, hourlyValues, hoys, source, state, isDirect)
 
     def setCoupledValuesFromFile(self, totalFilePath, directFilePath, source=None,
                                  state=None):
@@ -215,11 +322,18 @@ class AnalysisGrid(object):
         if not self.hasValues:
             raise ValueError('No values are assigned to this analysis grid.')
 
-        res = ([], [], [], [], [])
-
         DAThreshhold = DAThreshhold or 300.0
         UDIMinMax = UDIMinMax or (100, 2000)
         hours = self.hoys
+
+        am = self._metricsEngine()
+        if am:
+            total, _ = am.combinedValues(self._store, blindsStateIds)
+            occupancy = am.occupancyMask(hours, occSchedule)
+            return tuple(r.tolist() for r in
+                         am.annualMetrics(total, occupancy, DAThreshhold, UDIMinMax))
+
+        res = ([], [], [], [], [])
         occSchedule = occSchedule or set(hours)
         blindsStateIds = blindsStateIds or [[0] * len(self.sources)] * len(hours)
 
@@ -237,14 +351,35 @@ class AnalysisGrid(object):
                                 occSchedule=None, targetArea=None):
         """Calculate Spatial Daylight Autonomy (sDA).
 
+        An hour meets the target if more than targetArea percent of the points are
+        above DAThreshhold.
+
         Args:
+            DAThreshhold: Threshhold for daylight autonomy in lux (default: 300).
+            blindsStateIds: List of state ids for all the sources for input hoys. If you
+                want a source to be removed set the state to -1.
+            occSchedule: An annual occupancy schedule.
             targetArea: Minimum target area percentage for this grid (default: 55)
+
+        Returns:
+            Fraction of occupied hours that meet the target, Problematic hours
         """
         if not self.hasValues:
             raise ValueError('No values are assigned to this analysis grid.')
 
         DAThreshhold = DAThreshhold or 300.0
+        targetArea = targetArea or 55
         hours = self.hoys
+
+        am = self._metricsEngine()
+        if am:
+            total, _ = am.combinedValues(self._store, blindsStateIds)
+            occupancy = am.occupancyMask(hours, occSchedule)
+            sda, passed = am.spatialDaylightAutonomy(
+                total, occupancy, DAThreshhold, targetArea)
+            problematicHours = [hours[i] for i in (occupancy & ~passed).nonzero()[0]]
+            return sda, problematicHours
+
         occSchedule = occSchedule or set(hours)
         blindsStateIds = blindsStateIds or [[0] * len(self.sources)] * len(hours)
 
@@ -256,23 +391,27 @@ class AnalysisGrid(object):
 
         # iterate through the results
         # find minimum number of points to meet the targetArea
-        targetArea = targetArea * len(self.analysisPoints) / 100 or \
-            0.55 * len(self.analysisPoints)
+        targetArea = targetArea * len(self.analysisPoints) / 100
         # change target area to an integer to enhance the performance in the loop
         target = int(targetArea) if int(targetArea) != targetArea \
             else int(targetArea - 1)
         metHours = 0
+        occHours = 0
         problematicHours = []
         for hr, hrv in izip(hours, izip(*hourlyResults)):
             if hr not in occSchedule:
                 continue
+            occHours += 1
             count = sum(1 if res[0] > DAThreshhold else 0 for res in hrv)
             if count > target:
                 metHours += 1
             else:
                 problematicHours.append(hr)
 
-        return metHours / len(hours), problematicHours
+        if occHours == 0:
+            raise ValueError('There is 0 hours available in the schedule.')
+
+        return metHours / occHours, problematicHours
 
     def annualSolarExposure(self, threshhold=None, blindsStateIds=None,
                             occSchedule=None, targetHours=None, targetArea=None):
@@ -300,15 +439,28 @@ class AnalysisGrid(object):
         if not self.hasDirectValues:
             raise ValueError('Direct values are not loaded to calculate ASE.')
 
-        res = ([], [], [])
         threshhold = threshhold or 1000
         targetHours = targetHours or 250
         targetArea = targetArea or 10
         hours = self.hoys
+        am = self._metricsEngine()
+        if am:
+            _, direct = am.combinedValues(self._store, blindsStateIds)
+            occupancy = am.occupancyMask(hours, occSchedule)
+            success, percentage, failed, _ = am.annualSolarExposure(
+                direct, occupancy, threshhold, targetHours, targetArea)
+            failedIds = failed.nonzero()[0]
+            exposed = am.exposedHours(direct, failedIds, occupancy, threshhold)
+            problematicPoints = [self[i] for i in failedIds]
+            problematicHours = [[hours[h] for h in e.nonzero()[0]] for e in exposed]
+            return bool(success), percentage, problematicPoints, problematicHours
+
+        ap = self.analysisPoints  # create a local copy of points for better performance
+        res = ([], [], [])
         occSchedule = occSchedule or set(hours)
         blindsStateIds = blindsStateIds or [[0] * len(self.sources)] * len(hours)
 
-        for sensor in self.analysisPoints:
+        for sensor in ap:
             for c, r in enumerate(sensor.annualSolarExposure(threshhold,
                                                              blindsStateIds,
                                                              occSchedule,
@@ -317,7 +469,6 @@ class AnalysisGrid(object):
                 res[c].append(r)
 
         # calculate ASE for the grid
-        ap = self.analysisPoints  # create a local copy of points for better performance
         problematicPointCount = 0
         problematicPoints = []
         problematicHours = []
@@ -333,16 +484,140 @@ class AnalysisGrid(object):
             100 * problematicPointCount / len(ap), problematicPoints, \
             problematicHours
 
+    def blindsState(self, hoys=None, blindsStateIds=None, logic=None, shared=False,
+                    targetArea=100):
+        """Calculate blinds state for all the points based on a control logic.
+
+        Args:
+            hoys: List of hours of year. If None default is self.hoys.
+            blindsStateIds: List of blind combinations. Each combination has a state
+                id or a state name for each source. If not provided the longest
+                combination of states from sources (window groups) will be used.
+            logic: A function which takes arrays of total and direct values and
+                returns True where the blinds should be moved to the next
+                combination (e.g. postprocess.blindcontrol.illuminanceThreshold).
+                The logic should also work for single values if numpy is not
+                available (default: total > 2000).
+            shared: Set to True to use the same combination for all the points in
+                each hour (default: False).
+            targetArea: Minimum percentage of points which should not meet the logic
+                for shared control (default: 100).
+
+        Returns:
+            Blind combinations, index of the combination, illuminance values, direct
+            values and success for each point and hour. success is 0 for the first
+            combination, 1 if blinds are moved and -1 if the logic is met for all
+            the combinations.
+        """
+        if not self.hasValues:
+            raise ValueError('No values are assigned to this analysis grid.')
+
+        hoys = hoys or self.hoys
+        combIds = self._store.stateCombinationIds(blindsStateIds)
+
+        try:
+            from .postprocess import blindcontrol as bc
+        except ImportError:
+            # numpy is not available. Calculate the states for each point.
+            if shared:
+                raise NotImplementedError(
+                    'Shared blinds control is only available with numpy.')
+            res = ([], [], [], [])
+            for ap in self:
+                pointLogic = ap.logic
+                if logic:
+                    ap.logic = lambda ill, illDir, *args: logic(ill, illDir)
+                try:
+                    for c, r in enumerate(ap.blindsState(hoys, combIds)[1:]):
+                        res[c].append(r)
+                finally:
+                    ap.logic = pointLogic
+            return (combIds,) + res
+
+        total, direct = bc.combinationValues(self._store, combIds, hoys)
+        return (combIds,) + bc.blindsState(total, direct, logic, shared, targetArea)
+
+    def superposition(self, hoys=None):
+        """Prepare the contributions of sources to evaluate many blind schedules.
+
+        Values for a schedule are calculated with a gather-and-sum over the
+        contributions of all the states instead of walking the values of each
+        point. This method requires numpy.
+
+        Args:
+            hoys: List of hours of year. If None default is self.hoys.
+
+        Returns:
+            A Superposition. Use Superposition.values(schedule) to get total and
+            direct values for all the points for a schedule.
+        """
+        if not self.hasValues:
+            raise ValueError('No values are assigned to this analysis grid.')
+
+        from .postprocess.superposition import Superposition
+        return Superposition(self._store, hoys)
+
+    @staticmethod
+    def _metricsEngine():
+        """Get the vectorized metrics module or None if numpy is not available."""
+        try:
+            from .postprocess import annualmetrics
+        except ImportError:
+            # numpy is not available (e.g. IronPython). Use the python implementation.
+            return None
+        else:
+            return annualmetrics
+
+    def view(self, pointIds, name=None):
+        """Get a view to a subset of points in this analysis grid.
+
+        The view shares the analysis points and the values with this grid and
+        can be used as an AnalysisGrid to calculate the metrics for a sub-area.
+
+        Args:
+            pointIds: Index of points in this analysis grid.
+            name: A name for the view (default: a random name).
+        """
+        return AnalysisGridView(self, pointIds, name)
+
+    def spatialIndex(self, cellSize=None):
+        """Create a spatial index for region queries and nearest point lookups.
+
+        Args:
+            cellSize: Size of bins for the index (default: about 4 points in each
+                bin).
+        """
+        return SpatialIndex(self, cellSize)
+
     def duplicate(self):
         """Duplicate AnalysisGrid."""
-        aps = tuple(ap.duplicate() for ap in self._analysisPoints)
-        dup = AnalysisGrid(aps, self._name)
-        dup._sources = self.sources
-        return dup
+        return AnalysisGrid.fromGeometry(
+            array('d', self.geometry), self._name, self._store.duplicate())
 
     def toRadString(self):
         """Return analysis points group as a Radiance string."""
-        return "\n".join((ap.toRadString() for ap in self._analysisPoints))
+        geo = self.geometry
+        return ('\n'.join((self.POINTFORMAT,) * (len(geo) // 6))) % tuple(geo)
+
+    def writeToFile(self, filePath):
+        """Write analysis points to a pts file.
+
+        Args:
+            filePath: Full path to points file.
+
+        Returns:
+            Full path to points file.
+        """
+        geo = self.geometry
+        # write the points in chunks to keep the size of the strings small
+        step = 6 * 10000
+        with open(filePath, 'wb') as outf:
+            for st in xrange(0, len(geo), step):
+                chunk = geo[st:st + step]
+                outf.write(('\n'.join((self.POINTFORMAT,) * (len(chunk) // 6)))
+                           % tuple(chunk))
+                outf.write('\n')
+        return filePath
 
     def ToString(self):
         """Overwrite ToString .NET method."""
@@ -351,41 +626,57 @@ class AnalysisGrid(object):
     def __add__(self, other):
         """Add two analysis grids and create a new one.
 
-        This method won't duplicate the analysis points.
+        The new grid has its own store and a new set of analysis points which are
+        bound to the new store.
         """
         assert isinstance(other, AnalysisGrid), \
             TypeError('Expected an AnalysisGrid not {}.'.format(type(other)))
 
-        assert self.hoys == other.hoys, \
-            ValueError('Two analysis grid must have the same hoys.')
-
-        if not self.hasValues:
-            sources = self._sources.update(other._sources)
-        else:
-            assert self._sources == other._sources, \
-                ValueError(
-                    'Two analysis grid with values must have the same windowGroups.'
-                )
-            sources = self._sources
-
-        points = self.analysisPoints + other.analysisPoints
+        store = ResultStore.concatenate((self._store, other._store))
+        geometry = self.geometry + other.geometry
         name = '{}+{}'.format(self.name, other.name)
-        addition = AnalysisGrid(points, name)
-        addition._sources = sources
 
-        return addition
+        return AnalysisGrid.fromGeometry(geometry, name, store)
+
+    def _point(self, index):
+        """Get an analysis point and create it if it is not created yet."""
+        ap = self._analysisPoints.get(index)
+        if ap is None:
+            st = index * 6
+            ap = AnalysisPoint.fromrawValues(*self._geometry[st:st + 6])
+            ap._store = self._store
+            ap._index = index
+            self._analysisPoints[index] = ap
+        return ap
+
+    def _updateGeometry(self):
+        """Update geometry array from the analysis points which are created."""
+        geo = self._geometry
+        for count, ap in self._analysisPoints.iteritems():
+            st = count * 6
+            geo[st:st + 3] = array('d', ap.location)
+            geo[st + 3:st + 6] = array('d', ap.direction)
 
     def __len__(self):
         """Number of points in this group."""
-        return len(self._analysisPoints)
+        return len(self._geometry) // 6
 
     def __getitem__(self, index):
-        """Get value for an index."""
-        return self._analysisPoints[index]
+        """Get value for an index.
+
+        A slice returns an AnalysisGridView to the points of the slice.
+        """
+        if isinstance(index, slice):
+            return self.view(xrange(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('AnalysisGrid index out of range: {}'.format(index))
+        return self._point(index)
 
     def __iter__(self):
         """Iterate points."""
-        return iter(self._analysisPoints)
+        return (self._point(i) for i in xrange(len(self)))
 
     def __str__(self):
         """String repr."""
@@ -403,5 +694,70 @@ class AnalysisGrid(object):
     def __repr__(self):
         """Return analysis points and directions."""
         return 'AnalysisGrid::{}::#{}::{}'.format(
-            self._name, len(self._analysisPoints), self._sign
+            self._name, len(self), self._sign
+        )
+
+
+class AnalysisGridView(AnalysisGrid):
+    """A view to a subset of points of an AnalysisGrid.
+
+    Analysis points and values are shared with the base grid and are not copied.
+    Changing the values or the points in the view will change the base grid.
+
+    Attributes:
+        analysisGrid: Base AnalysisGrid.
+        pointIds: Index of points of this view in the base grid.
+    """
+
+    __slots__ = ('_base', '_pointIds')
+
+    def __init__(self, analysisGrid, pointIds, name=None):
+        """Create a view to a subset of points in an analysis grid."""
+        if isinstance(analysisGrid, AnalysisGridView):
+            # map to the base grid to avoid nested views
+            pointIds = tuple(analysisGrid._pointIds[i] for i in pointIds)
+            analysisGrid = analysisGrid._base
+        self.name = name
+        self._base = analysisGrid
+        self._store = analysisGrid.store.view(pointIds)
+        self._pointIds = self._store.pointIds
+        self._analysisPoints = {}
+        self._geometry = None
+
+    @property
+    def analysisGrid(self):
+        """Base analysis grid."""
+        return self._base
+
+    @property
+    def pointIds(self):
+        """Index of points of this view in the base grid."""
+        return self._pointIds
+
+    @property
+    def geometry(self):
+        """Points and vectors as a flat array with 6 values for each point."""
+        geo = self._base.geometry
+        res = array('d')
+        for i in self._pointIds:
+            res.extend(geo[i * 6:i * 6 + 6])
+        return res
+
+    def _point(self, index):
+        """Get an analysis point from the base grid."""
+        return self._base._point(self._pointIds[index])
+
+    def duplicate(self):
+        """Duplicate the view as a new AnalysisGrid with a copy of the values."""
+        return AnalysisGrid.fromGeometry(self.geometry, self._name,
+                                         self._store.duplicate())
+
+    def __len__(self):
+        """Number of points in this view."""
+        return len(self._pointIds)
+
+    def __repr__(self):
+        """Return analysis grid view representation."""
+        return 'AnalysisGridView::{}::#{}::{}'.format(
+            self._name, len(self._pointIds), self._sign
         )
@@ -1,9 +1,8 @@
 """Honeybee PointGroup and TestPointGroup."""
 from __future__ import division
 from ..vectormath.euclid import Point3, Vector3
-from collections import defaultdict
+from .resultstore import ResultStore
 from itertools import izip
-import types
 import copy
 
 
@@ -16,27 +15,24 @@ class AnalysisPoint(object):
 
     This class is developed to enable honeybee for running daylight control
     studies with dynamic shadings without going back to several files.
+
+    An analysis point doesn't keep the values itself. Values are stored in a
+    ResultStore which is shared between all the points of an AnalysisGrid and the
+    point is a view to its row in the store.
     """
 
-    __slots__ = ('_loc', '_dir', '_sources', '_values', '_isDirectLoaded', 'logic')
+    __slots__ = ('_loc', '_dir', '_store', '_index', 'logic')
 
     def __init__(self, location, direction):
         """Create an analysis point."""
         self.location = location
         self.direction = direction
 
-        # name of sources and their state. It's only meaningful in multi-phase daylight
-        # analysis. In analysis for a single time it will be {None: [None]}
-        # It is set inside _createDataStructure method on setting values.
-        self._sources = {}
-
-        # an empty list for values
-        # for each source there will be a new list
-        # inside each source list there will be a dictionary for each state
-        # in each dictionary the key is the hoy and the values are a list which
-        # is [total, direct]. If the value is not available it will be None
-        self._values = []
-        self._isDirectLoaded = False
+        # result store and the index of this point in the store. A standalone
+        # point creates its own store once the values are set. Once the point is
+        # added to an AnalysisGrid the store will be replaced by the grid store.
+        self._store = None
+        self._index = 0
         self.logic = self._logic
 
     @classmethod
@@ -75,13 +71,26 @@ class AnalysisPoint(object):
                 'Failed to convert {} to direction.\n'
                 'location should be a list or a tuple with 3 values.'.format(direction))
 
+    @property
+    def store(self):
+        """ResultStore for this point.
+
+        A new store will be created for standalone points.
+        """
+        if self._store is None:
+            self._store = ResultStore(1)
+            self._index = 0
+        return self._store
+
+    @property
+    def _sources(self):
+        """Sources and states dictionary from the store."""
+        return self.store._sources
+
     @property
     def sources(self):
         """Get sorted list fo sources."""
-        srcs = range(len(self._sources))
-        for name, d in self._sources.iteritems():
-            srcs[d['id']] = name
-        return srcs
+        return self.store.sources
 
     @property
     def details(self):
@@ -113,7 +122,7 @@ class AnalysisPoint(object):
     @property
     def hasValues(self):
         """Check if this point has results values."""
-        return len(self._values) != 0
+        return self._store is not None and self._store.hasValues
 
     @property
     def hasDirectValues(self):
@@ -121,7 +130,7 @@ class AnalysisPoint(object):
 
         In some cases and based on the recipe only total values are available.
         """
-        return self._isDirectLoaded
+        return self._store is not None and self._store.hasDirectValues
 
     @property
     def hoys(self):
@@ -129,7 +138,7 @@ class AnalysisPoint(object):
         if not self.hasValues:
             return []
         else:
-            return sorted(self._values[0][0].keys())
+            return self._store.hoys
 
     @staticmethod
     def _logic(*args, **kwargs):
@@ -142,69 +151,21 @@ class AnalysisPoint(object):
 
     def sourceId(self, source):
         """Get source id if available."""
-        # find the id for source and state
-        try:
-            return self._sources[source]['id']
-        except KeyError:
-            raise ValueError('Invalid source input: {}'.format(source))
+        return self.store.sourceId(source)
 
     def blindStateId(self, source, state):
         """Get state id if available."""
-        try:
-            return int(state)
-        except ValueError:
-            pass
-
-        try:
-            return self._sources[source]['state'].index(state)
-        except ValueError:
-            raise ValueError('Invalid state input: {}'.format(state))
+        return self.store.blindStateId(source, state)
 
     @property
     def states(self):
         """Get list of states names for each source."""
-        return tuple(s[1]['state'] for s in self._sources.iteritems())
+        return self.store.states
 
     @property
     def longestStateIds(self):
         """Get longest combination between blind states as blindsStateIds."""
-        states = tuple(len(s[1]['state']) - 1 for s in self._sources.iteritems())
-
-        return tuple(tuple(min(s, i) for s in states)
-                     for i in range(max(states) + 1))
-
-    def _createDataStructure(self, source, state):
-        """Create place holders for sources and states if needed.
-
-        Returns:
-            source id and state id as a tuple.
-        """
-        def double():
-            return [None, None]
-
-        currentSources = self._sources.keys()
-        if source not in currentSources:
-            self._sources[source] = {
-                'id': len(currentSources),
-                'state': []
-            }
-
-            # append a new list to values for the new source
-            self._values.append([])
-
-        # find the id for source and state
-        sid = self._sources[source]['id']
-
-        if state not in self._sources[source]['state']:
-            # add sources
-            self._sources[source]['state'].append(state)
-            # append a new dictionary for this state
-            self._values[sid].append(defaultdict(double))
-
-        # find the state id
-        stateid = self._sources[source]['state'].index(state)
-
-        return sid, stateid
+        return self.store.longestStateIds
 
     def setValue(self, value, hoy, source=None, state=None, isDirect=False):
         """Set value for a specific hour of the year.
@@ -217,11 +178,7 @@ class AnalysisPoint(object):
             state: State of the source if any (default: None).
             isDirect: Set to True if the value is direct contribution of sunlight.
         """
-        sid, stateid = self._createDataStructure(source, state)
-        if isDirect:
-            self._isDirectLoaded = True
-        ind = 1 if isDirect else 0
-        self._values[sid][stateid][hoy][ind] = value
+        self.store.setValues(self._index, (value,), (hoy,), source, state, isDirect)
 
     def setValues(self, values, hoys, source=None, state=None, isDirect=False):
         """Set values for several hours of the year.
@@ -234,22 +191,13 @@ class AnalysisPoint(object):
             state: State of the source if any (default: None).
             isDirect: Set to True if the value is direct contribution of sunlight.
         """
-        if not (isinstance(values, types.GeneratorType) or
-                isinstance(hoys, types.GeneratorType)):
-
+        if hasattr(values, '__len__') and hasattr(hoys, '__len__'):
             assert len(values) == len(hoys), \
                 ValueError(
                     'Length of values [%d] is not equal to length of hoys [%d].'
                     % (len(values), len(hoys)))
 
-        sid, stateid = self._createDataStructure(source, state)
-
-        if isDirect:
-            self._isDirectLoaded = True
-
-        ind = 1 if isDirect else 0
-        for hoy, value in izip(hoys, values):
-            self._values[sid][stateid][hoy][ind] = value
+        self.store.setValues(self._index, values, hoys, source, state, isDirect)
 
     def setCoupledValue(self, value, hoy, source=None, state=None):
         """Set both total and direct values for a specific hour of the year.
@@ -261,20 +209,7 @@ class AnalysisPoint(object):
                 sources / window groups (default: None).
             state: State of the source if any (default: None).
         """
-        sid, stateid = self._createDataStructure(source, state)
-
-        try:
-            self._values[sid][stateid][hoy] = value[0], value[1]
-        except TypeError:
-            raise ValueError(
-                "Wrong input: {}. Input values must be of length of 2.".format(value)
-            )
-        except IndexError:
-            raise ValueError(
-                "Wrong input: {}. Input values must be of length of 2.".format(value)
-            )
-        else:
-            self._isDirectLoaded = True
+        self.store.setCoupledValues(self._index, (value,), (hoy,), source, state)
 
     def setCoupledValues(self, values, hoys, source=None, state=None):
         """Set total and direct values for several hours of the year.
@@ -286,54 +221,21 @@ class AnalysisPoint(object):
                 sources / window groups (default: None).
             state: State of the source if any (default: None).
         """
-        if not (isinstance(values, types.GeneratorType) or
-                isinstance(hoys, types.GeneratorType)):
-
+        if hasattr(values, '__len__') and hasattr(hoys, '__len__'):
             assert len(values) == len(hoys), \
                 ValueError(
                     'Length of values [%d] is not equal to length of hoys [%d].'
                     % (len(values), len(hoys)))
 
-        sid, stateid = self._createDataStructure(source, state)
-
-        for hoy, value in izip(hoys, values):
-            try:
-                self._values[sid][stateid][hoy] = value[0], value[1]
-            except TypeError:
-                raise ValueError(
-                    "Wrong input: {}. Input values must be of length of 2.".format(value)
-                )
-            except IndexError:
-                raise ValueError(
-                    "Wrong input: {}. Input values must be of length of 2.".format(value)
-                )
-        self._isDirectLoaded = True
+        self.store.setCoupledValues(self._index, values, hoys, source, state)
 
     def value(self, hoy, source=None, state=None):
         """Get total value for an hour of the year."""
-        # find the id for source and state
-        sid = self.sourceId(source)
-        # find the state id
-        stateid = self.blindStateId(source, state)
-
-        try:
-            return self._values[sid][stateid][hoy][0]
-        except KeyError:
-            raise ValueError('Invalid hoy input: {}'.format(hoy))
+        return self.values((hoy,), source, state)[0]
 
     def directValue(self, hoy, source=None, state=None):
         """Get direct value for an hour of the year."""
-        # find the id for source and state
-        sid = self.sourceId(source)
-        # find the state id
-        stateid = self.blindStateId(source, state)
-
-        try:
-            return self._values[sid][stateid][hoy][1]
-        except KeyError:
-            raise ValueError('Invalid hoy input: {}'.format(hoy))
-        else:
-            self._isDirectLoaded = True
+        return self.directValues((hoy,), source, state)[0]
 
     def values(self, hoys, source=None, state=None):
         """Get illuminance values for several hours of the year."""
@@ -342,10 +244,7 @@ class AnalysisPoint(object):
         # find the state id
         stateid = self.blindStateId(source, state)
 
-        try:
-            return tuple(self._values[sid][stateid][hoy][0] for hoy in hoys)
-        except KeyError as e:
-            raise ValueError('Invalid hoy input: {}'.format(e))
+        return self.store.values(self._index, hoys, sid, stateid, 0)
 
     def directValues(self, hoys, source=None, state=None):
         """Get direct illuminance values for several hours of the year."""
@@ -354,22 +253,11 @@ class AnalysisPoint(object):
         # find the state id
         stateid = self.blindStateId(source, state)
 
-        try:
-            return tuple(self._values[sid][stateid][hoy][1] for hoy in hoys)
-        except KeyError as e:
-            raise ValueError('Invalid hoy input: {}'.format(e))
+        return self.store.values(self._index, hoys, sid, stateid, 1)
 
     def coupledValue(self, hoy, source=None, state=None):
         """Get total and direct values for an hoy."""
-        # find the id for source and state
-        sid = self.sourceId(source)
-        # find the state id
-        stateid = self.blindStateId(source, state)
-
-        try:
-            return self._values[sid][stateid][hoy]
-        except KeyError:
-            raise ValueError('Invalid hoy input: {}'.format(hoy))
+        return self.coupledValues((hoy,), source, state)[0]
 
     def coupledValues(self, hoys, source=None, state=None):
         """Get total and direct values for several hours of year."""
@@ -378,22 +266,11 @@ class AnalysisPoint(object):
         # find the state id
         stateid = self.blindStateId(source, state)
 
-        try:
-            return tuple(self._values[sid][stateid][hoy] for hoy in hoys)
-        except KeyError as e:
-            raise ValueError('Invalid hoy input: {}'.format(e))
+        return self.store.coupledValues(self._index, hoys, sid, stateid)
 
     def coupledValueById(self, hoy, sourceId=None, stateId=None):
         """Get total and direct values for an hoy."""
-        # find the id for source and state
-        sid = sourceId or 0
-        # find the state id
-        stateid = stateId or 0
-
-        try:
-            return self._values[sid][stateid][hoy]
-        except Exception as e:
-            raise ValueError('Invalid input: {}'.format(e))
+        return self.coupledValuesById((hoy,), sourceId, stateId)[0]
 
     def coupledValuesById(self, hoys, sourceId=None, stateId=None):
         """Get total and direct values for several hours of year by source id.
@@ -407,10 +284,7 @@ class AnalysisPoint(object):
         """
         sid = sourceId or 0
         stateid = stateId or 0
-        try:
-            return tuple(self._values[sid][stateid][hoy] for hoy in hoys)
-        except Exception as e:
-            raise ValueError('Invalid input: {}'.format(e))
+        return self.store.coupledValues(self._index, hoys, sid, stateid)
 
     def combinedValueById(self, hoy, blindsStateIds=None):
         """Get combined value from all sources based on stateId.
@@ -423,9 +297,6 @@ class AnalysisPoint(object):
         Returns:
             total, direct illuminance values.
         """
-        total = 0
-        direct = 0 if self._isDirectLoaded else None
-
         if not blindsStateIds:
             blindsStateIds = [0] * len(self._sources)
 
@@ -433,25 +304,7 @@ class AnalysisPoint(object):
             'There should be a state for each source. #sources[{}] != #states[{}]' \
             .format(len(self._sources), len(blindsStateIds))
 
-        for sid, stateid in enumerate(blindsStateIds):
-
-            if stateid == -1:
-                t = 0
-                d = 0
-            else:
-                try:
-                    t, d = self._values[sid][stateid][hoy]
-                except Exception as e:
-                    raise ValueError('Invalid input: {}'.format(e))
-
-            try:
-                total += t
-                direct += d
-            except TypeError:
-                # direct value is None
-                pass
-
-        return total, direct
+        return next(self.combinedValuesById((hoy,), (blindsStateIds,)))
 
     def combinedValuesById(self, hoys=None, blindsStateIds=None):
         """Get combined value from all sources based on stateId.
@@ -473,27 +326,32 @@ class AnalysisPoint(object):
             'There should be a list of states for each hour. #states[{}] != #hours[{}]' \
             .format(len(blindsStateIds), len(hoys))
 
-        dirValue = 0 if self._isDirectLoaded else None
-        for hoy in hoys:
+        store = self.store
+        data = store.data
+        # keep the start of the row for each source and state
+        rows = {}
+        dirValue = 0 if store.hasDirectValues else None
+        for col, states in izip(store.hoyIds(hoys), blindsStateIds):
             total = 0
             direct = dirValue
 
-            for sid, stateid in enumerate(blindsStateIds[hoy]):
+            for sid, stateid in enumerate(states):
                 if stateid == -1:
-                    t = 0
-                    d = 0
-                else:
-                    try:
-                        t, d = self._values[sid][stateid][hoy]
-                    except Exception as e:
-                        raise ValueError('Invalid input: {}'.format(e))
-
+                    continue
                 try:
-                    total += t
+                    st = rows[(sid, stateid)]
+                except KeyError:
+                    st = rows[(sid, stateid)] = store.rowOffset(
+                        store.slotId(sid, stateid), self._index)
+
+                t = data[st + col * 2]
+                if t != t:
+                    # value is not assigned
+                    continue
+                total += t
+                d = data[st + col * 2 + 1]
+                if direct is not None and d == d:
                     direct += d
-                except TypeError:
-                    # direct value is None
-                    pass
 
             yield total, direct
 
@@ -513,30 +371,7 @@ class AnalysisPoint(object):
             kwargs: Additional inputs for self.logic. kwargs will be passed to self.logic
         """
         hoys = hoys or self.hoys
-
-        if blindsStateIds:
-            # recreate the states in case the inputs are the names of the states
-            # and not the numbers.
-            sources = self.sources
-            combs = [[c.strip() for c in str(cc).split(",")] for cc in blindsStateIds]
-
-            combIds = copy.deepcopy(combs)
-
-            # find state ids for each state
-            try:
-                for c, comb in enumerate(combs):
-                    for count, source in enumerate(sources):
-                        combIds[c][count] = self.blindStateId(source, comb[count])
-            except IndexError:
-                raise ValueError(
-                    'Length of each state should be equal to number of sources: {}'
-                    .format(len(sources))
-                )
-        else:
-            combIds = self.longestStateIds
-
-        print("Blinds combinations:\n{}".format(
-              '\n'.join(str(ids) for ids in combIds)))
+        combIds = self.store.stateCombinationIds(blindsStateIds)
 
         # collect the results for each combination
         results = range(len(combIds))
@@ -550,20 +385,20 @@ class AnalysisPoint(object):
         dirValues = [None] * hoursCount
         success = [0] * hoursCount
 
-        for h in hoys:
+        for i, h in enumerate(hoys):
             for state in range(len(combIds)):
-                ill, ill_dir = results[state][h]
+                ill, ill_dir = results[state][i]
                 if not self.logic(ill, ill_dir, h, args, kwargs):
-                    blindsIndex[h] = state
-                    illValues[h] = ill
-                    dirValues[h] = ill_dir
+                    blindsIndex[i] = state
+                    illValues[i] = ill
+                    dirValues[i] = ill_dir
                     if state > 0:
-                        success[h] = 1
+                        success[i] = 1
                     break
             else:
-                success[h] = -1
-                illValues[h] = ill
-                dirValues[h] = ill_dir
+                success[i] = -1
+                illValues[i] = ill
+                dirValues[i] = ill_dir
 
         blindsState = tuple(combIds[ids] for ids in blindsIndex)
         return blindsState, blindsIndex, illValues, dirValues, success
@@ -700,8 +535,8 @@ class AnalysisPoint(object):
         """Annual Solar Exposure (ASE).
 
         Calculate number of hours that this point is exposed to more than 1000lux
-        of direct sunlight. The point meets the traget in the number of hours is
-        less than 250 hours per year.
+        of direct sunlight. The point meets the traget if the number of hours is
+        not more than 250 hours per year.
 
         Args:
             threshhold: Threshhold for daylight autonomy in lux (default: 1000).
@@ -729,20 +564,19 @@ class AnalysisPoint(object):
             if h not in schedule:
                 continue
             if v > threshhold:
-                print(v)
                 ASE += 1
                 problematicHours.append(h)
 
-        return ASE > targetHours, ASE, problematicHours
+        return ASE <= targetHours, ASE, problematicHours
 
     def duplicate(self):
-        """Duplicate the analysis point."""
+        """Duplicate the analysis point.
+
+        The new point will have its own copy of the values.
+        """
         ap = AnalysisPoint(self._loc, self._dir)
-        ap._sources = self._sources
-        # This should be good enough as most of the time an analysis point will be
-        # copied with no values assigned.
-        ap._values = list(self._values)
-        ap._isDirectLoaded = bool(self._isDirectLoaded)
+        if self.hasValues:
+            ap._store = self._store.duplicate((self._index,))
         ap.logic = copy.copy(self.logic)
         return ap
 
@@ -0,0 +1,321 @@
+"""A shared cache for outputs of Radiance commands keyed by their inputs.
+
+Recipes reuse octrees, matrices and sky files by their names. A file is reused
+even if the geometry has changed as long as the name is the same. ArtifactCache
+keys the output of a command by a hash of the command line, the content of its
+input files and the version of Radiance. Any change in geometry, materials,
+points, parameters or sky inputs changes the key and the command runs again. Files
+which are written by an earlier command in the same run (e.g. the octree for
+rcontrib) are keyed by the key of that command and not by the file from the last
+run.
+Outputs are kept in a shared folder so they can be reused across projects. Least
+recently used files are removed once the size of the cache is larger than
+maxSize.
+
+Files that are referenced inside the input files or in the options of a command
+(e.g. BSDF files in a material or the modifier list of rcontrib) are keyed by
+their path and not by their content.
+
+Usage:
+
+    from honeybee.radiance.artifactcache import ArtifactCache
+
+    recipe.cache = ArtifactCache(r'c:/ladybug/cache', maxSize=20 * 2 ** 30)
+    commandsFile = recipe.write(_folder_, _name_)
+    recipe.run(commandsFile)
+"""
+from .. import config
+
+from subprocess import Popen, PIPE
+import hashlib
+import os
+import shutil
+
+# default size of the cache in bytes
+MAXSIZE = 10 * 2 ** 30
+
+# version of Radiance for each radbin folder
+_radianceVersions = {}
+
+
+def radianceVersion(radbinPath=None):
+    """Get the version line of Radiance from rtrace -version.
+
+    Returns an empty string if rtrace can't be executed.
+    """
+    radbinPath = radbinPath or config.radbinPath or ''
+    if radbinPath not in _radianceVersions:
+        try:
+            p = Popen([os.path.join(radbinPath, 'rtrace'), '-version'],
+                      stdout=PIPE, stderr=PIPE)
+            version = p.communicate()[0].strip()
+        except OSError:
+            version = ''
+        _radianceVersions[radbinPath] = version
+    return _radianceVersions[radbinPath]
+
+
+class ArtifactCache(object):
+    """A folder of outputs of Radiance commands keyed by their inputs.
+
+    Attributes:
+        folder: Path to cache folder (default: ~/.honeybee/cache).
+        maxSize: Maximum size of the cache in bytes (default: 10 GB).
+        commands: Name of commands which are cached (default: oconv, rfluxmtx,
+            rcontrib and gendaymtx).
+    """
+
+    __slots__ = ('_folder', 'maxSize', 'commands', '_fileHashes')
+
+    def __init__(self, folder=None, maxSize=None, commands=None):
+        """Create an artifact cache."""
+        self._folder = folder or \
+            os.path.join(os.path.expanduser('~'), '.honeybee', 'cache')
+        if not os.path.isdir(self._folder):
+            os.makedirs(self._folder)
+        self.maxSize = maxSize or MAXSIZE
+        self.commands = tuple(
+            c.lower() for c in commands or ('oconv', 'rfluxmtx', 'rcontrib',
+                                            'gendaymtx'))
+        # hash of files by path, size and modified time
+        self._fileHashes = {}
+
+    @property
+    def isArtifactCache(self):
+        """Return True."""
+        return True
+
+    @property
+    def folder(self):
+        """Path to cache folder."""
+        return self._folder
+
+    @property
+    def size(self):
+        """Total size of the files in the cache in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def fileHash(self, filePath):
+        """Get sha1 hash of the content of a file."""
+        stat = os.stat(filePath)
+        fileKey = (os.path.abspath(filePath), stat.st_size, stat.st_mtime)
+        if fileKey not in self._fileHashes:
+            sha = hashlib.sha1()
+            with open(filePath, 'rb') as inf:
+                for chunk in iter(lambda: inf.read(2 ** 20), ''):
+                    sha.update(chunk)
+            self._fileHashes[fileKey] = sha.hexdigest()
+        return self._fileHashes[fileKey]
+
+    def commandEntry(self, command, workingDir, outputKeys=None):
+        """Get the key and full path to output file for a Radiance command.
+
+        Relative paths in the command are relative to workingDir.
+
+        Args:
+            command: A Radiance command.
+            workingDir: Folder which the command is executed from.
+            outputKeys: An optional dictionary of outputFiles to the key of the
+                command which writes the file earlier in the same run. These files
+                are keyed by the key of the command and not by their current
+                content which can be from an earlier run.
+
+        Returns:
+            A tuple of (key, outputFile). None if the command is not cached, has
+            no output file or any of the input files can't be keyed.
+        """
+        if command.__class__.__name__.lower() not in self.commands:
+            return None
+        try:
+            output = command.outputFile
+        except AttributeError:
+            return None
+        output = getattr(output, 'normpath', output)
+        if not output or '%' in str(output):
+            return None
+
+        key = self.commandKey(command, workingDir, outputKeys)
+        if key is None:
+            return None
+        return key, os.path.join(workingDir, str(output))
+
+    def commandKey(self, command, workingDir, outputKeys=None):
+        """Get a key for the output of a Radiance command.
+
+        Unlike commandEntry the key is calculated for any command so it can be
+        used for the inputs of the commands after it (see outputFiles).
+
+        Args:
+            command: A Radiance command.
+            workingDir: Folder which the command is executed from.
+            outputKeys: An optional dictionary of outputFiles to the key of the
+                command which writes the file earlier in the same run. A key can be
+                None if the output of the command can't be keyed.
+
+        Returns:
+            A key for the command. None if any of the input files can't be keyed.
+        """
+        radString = command.toRadString()
+        if config.radbinPath:
+            radString = radString.replace(config.radbinPath, '')
+        inputs = command.inputFiles or ()
+        if isinstance(inputs, basestring) or hasattr(inputs, 'normpath'):
+            inputs = (inputs,)
+        inputs = set(str(getattr(f, 'normpath', f)) for f in inputs if f)
+        inputs.discard('-')
+        inputs.discard('None')
+        outputKeys = outputKeys or {}
+
+        # replace the path to input files with the hash of their content or the key
+        # of the command which writes them. Longer paths are replaced first in case
+        # a path is a part of another path.
+        for f in sorted(inputs, key=len, reverse=True):
+            filePath = self._normpath(f, workingDir)
+            if filePath in outputKeys:
+                fileHash = outputKeys[filePath]
+            else:
+                filePath = self._fullpath(f, workingDir)
+                fileHash = self.fileHash(filePath) if filePath else None
+            if fileHash is None:
+                return None
+            radString = radString.replace(f, fileHash)
+        for output in self.outputFiles(command):
+            radString = radString.replace(output, '<output>')
+
+        key = hashlib.sha1(radianceVersion())
+        key.update(command.__class__.__name__)
+        key.update(radString)
+        return key.hexdigest()
+
+    def outputFiles(self, command, workingDir=None):
+        """Get output files of a command.
+
+        Returns:
+            Paths to output files as they are in the command. If workingDir is
+            provided the paths are normalized full paths to be used in outputKeys.
+        """
+        try:
+            output = command.outputFile
+        except AttributeError:
+            return []
+        output = getattr(output, 'normpath', output)
+        if not output or str(output) == 'None':
+            return []
+        if workingDir is None:
+            return [str(output)]
+        return [self._normpath(str(output), workingDir)]
+
+    @staticmethod
+    def _normpath(path, workingDir):
+        """Normalize a path to be compared with other paths."""
+        path = path.strip().strip('"').replace('\\', '/')
+        return os.path.normcase(os.path.normpath(os.path.join(workingDir, path)))
+
+    @staticmethod
+    def _fullpath(path, workingDir):
+        """Get full path to an existing file or None."""
+        path = os.path.join(workingDir, path.strip('"'))
+        if os.path.isfile(path):
+            return path
+        # try with the separator of this os
+        path = path.replace('\\', os.sep).replace('/', os.sep)
+        return path if os.path.isfile(path) else None
+
+    def get(self, key, targetFile):
+        """Copy the file for a key to targetFile.
+
+        Returns:
+            True if the key is in the cache.
+        """
+        entry = self._entry(key, targetFile)
+        if not os.path.isfile(entry):
+            return False
+        folder = os.path.dirname(targetFile)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        shutil.copyfile(entry, targetFile)
+        # mark the file as recently used
+        os.utime(entry, None)
+        return True
+
+    def put(self, key, sourceFile, evict=True):
+        """Copy a file to the cache for a key.
+
+        Args:
+            key: Key for the file (e.g. from commandEntry).
+            sourceFile: Path to the file.
+            evict: Remove the least recently used files if the cache is larger
+                than maxSize (default: True).
+        """
+        entry = self._entry(key, sourceFile)
+        folder = os.path.dirname(entry)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        # copy to a temporary file first so other processes never read a
+        # partial file
+        tempFile = '{}.{}.tmp'.format(entry, os.getpid())
+        shutil.copyfile(sourceFile, tempFile)
+        if os.path.isfile(entry):
+            os.remove(entry)
+        os.rename(tempFile, entry)
+        if evict:
+            self.evict()
+        return entry
+
+    def evict(self):
+        """Remove the least recently used files until the cache fits in maxSize.
+
+        Returns:
+            Number of removed files.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        count = 0
+        for _, size, path in entries:
+            if total <= self.maxSize:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # file is in use or is already removed by another process
+                continue
+            total -= size
+            count += 1
+        return count
+
+    def clear(self):
+        """Remove all the files in the cache."""
+        for _, _, path in self._entries():
+            os.remove(path)
+
+    def _entry(self, key, filePath):
+        """Path to the cached file for a key with the extension of filePath."""
+        ext = os.path.splitext(filePath.replace('\\', '/'))[1]
+        return os.path.join(self._folder, key[:2], key + ext)
+
+    def _entries(self):
+        """Get (last used time, size, path) for files in the cache."""
+        for root, _, files in os.walk(self._folder):
+            for f in files:
+                if f.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, f)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def __contains__(self, key):
+        """Check if a key is in the cache."""
+        folder = os.path.join(self._folder, key[:2])
+        return os.path.isdir(folder) and \
+            any(f.split('.')[0] == key for f in os.listdir(folder))
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Artifact cache representation."""
+        return 'ArtifactCache::{}'.format(self._folder)
@@ -6,7 +6,6 @@ import os
 import subprocess
 
 
-# TODO: Implement piping as on option
 class RadianceCommand(object):
     """Base class for commands."""
 
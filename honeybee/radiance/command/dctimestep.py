@@ -110,7 +110,8 @@ class Dctimestep(RadianceCommand):
     def inputFiles(self):
         dcInput = self.daylightCoeffSpec.toRadString()
         if dcInput:
-            return self.skyVectorFile.toRadString(),
+            return dcInput, self.skyVectorFile.toRadString()
         else:
-            return (self.tmatrixFile.toRadString(), self.dmatrixFile.toRadString(),
-                    self.skyVectorFile.toRadString())
+            vmatrix = self.vmatrixSpec.toRadString().replace('-vmatrix', '').strip()
+            return (vmatrix, self.tmatrixFile.toRadString(),
+                    self.dmatrixFile.toRadString(), self.skyVectorFile.toRadString())
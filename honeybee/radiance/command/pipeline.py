@@ -0,0 +1,191 @@
+"""Chain Radiance commands with pipes.
+
+The output of each command in a pipeline is the input of the next command and
+intermediate results are never written to the disk (e.g. dctimestep | rmtxop
+instead of writing the RGB results to a temporary file). The output of the last
+command can be written to a file or parsed directly from the pipe.
+
+Usage:
+
+    from honeybee.radiance.command.pipeline import Pipeline
+    from honeybee.radiance.recipe.radrecutil import matrixCalculation, \\
+        convertMatrixResults
+
+    dct = matrixCalculation(None, dMatrix='daylight.dc', skyMatrix='sky.smx')
+    mtx = convertMatrixResults('illuminance.ill', ('-',))
+    pipe = Pipeline((dct, mtx))
+    # dctimestep daylight.dc sky.smx | rmtxop -fa -c 47.4 119.9 11.6 - > ...
+    print pipe.toRadString()
+
+    # read the results without writing them to a file
+    mtx.outputFile = None
+    for row in pipe.rows(r'c:/ladybug/annual/gridbased_daylightcoeff'):
+        print max(row)
+"""
+from ..postprocess.matrixparser import streamRows
+from ..runmanager import radianceEnvironment
+
+from subprocess import Popen, PIPE
+
+
+class Pipeline(object):
+    """A chain of Radiance commands connected with pipes.
+
+    Commands after the first command should read their input from stdin (e.g.
+    '-' as the matrix file for rmtxop or rfluxmtx without viewRaysFile) and only
+    the last command can have an output file.
+
+    Attributes:
+        commands: A list of Radiance commands.
+    """
+
+    __slots__ = ('_commands',)
+
+    def __init__(self, commands):
+        """Create a pipeline from a list of commands."""
+        self.commands = commands
+
+    @property
+    def isPipeline(self):
+        """Return True."""
+        return True
+
+    @property
+    def commands(self):
+        """Get and set the list of commands."""
+        return self._commands
+
+    @commands.setter
+    def commands(self, commands):
+        commands = tuple(commands)
+        assert len(commands) != 0, ValueError('A pipeline needs a command.')
+        for command in commands:
+            assert hasattr(command, 'toRadString'), \
+                TypeError('{} is not a Radiance command.'.format(command))
+        self._commands = commands
+
+    @property
+    def inputFiles(self):
+        """Input files of all the commands."""
+        files = []
+        for command in self._commands:
+            inputs = command.inputFiles or ()
+            if isinstance(inputs, basestring) or hasattr(inputs, 'normpath'):
+                inputs = (inputs,)
+            for f in inputs:
+                f = _path(f)
+                if f and f not in ('-', 'None') and f not in files:
+                    files.append(f)
+        return files
+
+    @property
+    def outputFile(self):
+        """Output file of the last command."""
+        return self._commands[-1].outputFile
+
+    def toRadString(self, relativePath=False):
+        """Return the commands joined with pipes."""
+        for command in self._commands[:-1]:
+            output = _path(getattr(command, 'outputFile', None))
+            if output:
+                raise ValueError(
+                    '{} in the middle of a pipeline should write to stdout and not '
+                    'to {}.'.format(command.__class__.__name__, output))
+        return ' | '.join(command.toRadString(relativePath).strip()
+                          for command in self._commands)
+
+    def popen(self, workingDir=None, stdout=None, stderr=None, env=None, **kwargs):
+        """Start each command of the pipeline in its own process.
+
+        The stdout of each process is connected to the stdin of the next process.
+        Unlike running toRadString in a shell, the exit code of every command is
+        available and a failed command in the middle of the pipeline is not hidden
+        by the exit code of the last command.
+
+        Args:
+            workingDir: Folder to run the commands in (default: current folder).
+            stdout: stdout of the last command (default: None).
+            stderr: stderr of all the commands (default: None).
+            env: Environment variables for the commands (default: None).
+            kwargs: Other arguments for subprocess.Popen.
+
+        Returns:
+            A list of Popen objects in the order of the commands.
+        """
+        # make sure only the last command writes to a file
+        self.toRadString()
+        processes = []
+        stdin = None
+        lastIndex = len(self._commands) - 1
+        for count, command in enumerate(self._commands):
+            process = Popen(command.toRadString().strip(), shell=True, cwd=workingDir,
+                            env=env, stdin=stdin,
+                            stdout=stdout if count == lastIndex else PIPE,
+                            stderr=stderr, **kwargs)
+            if stdin is not None:
+                # only the next command should hold the pipe. Otherwise the command
+                # doesn't stop if the next command fails.
+                stdin.close()
+            stdin = process.stdout
+            processes.append(process)
+        return processes
+
+    def rows(self, workingDir=None, weights=None, chunkSize=None):
+        """Run the pipeline and iterate through rows of the output.
+
+        Rows are parsed while the commands are running and the output of the last
+        command is not written to a file. A RuntimeError is raised after the last
+        row if any of the commands has failed.
+
+        Args:
+            workingDir: Folder to run the commands in (default: current folder).
+            weights: Optional weights to combine every len(weights) values into one
+                value. If the output has 3 components and weights are not provided
+                values are converted to illuminance (default: None).
+            chunkSize: Size of each block in bytes (default: CHUNKSIZE).
+
+        Returns:
+            A generator of rows as array('f').
+        """
+        output = _path(getattr(self._commands[-1], 'outputFile', None))
+        if output:
+            raise ValueError(
+                'The last command writes to {}. Remove the output file to read the '
+                'results from the pipeline.'.format(output))
+
+        processes = self.popen(workingDir, stdout=PIPE, env=radianceEnvironment())
+        finished = False
+        try:
+            for row in streamRows(processes[-1].stdout, weights, chunkSize):
+                yield row
+            finished = True
+        finally:
+            # closing the pipe stops the commands if the rows are not fully read
+            processes[-1].stdout.close()
+            returnCodes = [process.wait() for process in processes]
+
+        if finished:
+            self._checkReturnCodes(returnCodes)
+
+    def _checkReturnCodes(self, returnCodes):
+        """Raise a RuntimeError for the first command with a non-zero exit code."""
+        for command, returnCode in zip(self._commands, returnCodes):
+            if returnCode != 0:
+                raise RuntimeError(
+                    '{} failed with exit code {} in the pipeline:\n{}'.format(
+                        command.__class__.__name__, returnCode, self.toRadString()))
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Class representation."""
+        return self.toRadString()
+
+
+def _path(value):
+    """Convert a RadiancePath or a string to a string."""
+    if hasattr(value, 'toRadString'):
+        value = value.toRadString()
+    return str(value) if value else ''
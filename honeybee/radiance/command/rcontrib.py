@@ -1,7 +1,7 @@
 # coding=utf-8
 """RADIANCE rcontrib command."""
 from _commandbase import RadianceCommand
-from ..datatype import RadiancePath
+from ..datatype import RadiancePath, RadianceValue
 from ..parameters.rcontrib import RcontribParameters
 
 import os
@@ -45,6 +45,7 @@ class Rcontrib(RadianceCommand):
     outputFile = RadiancePath("dc", "results file", extension=".dc")
     octreeFile = RadiancePath("oct", "octree file", extension=".oct")
     pointsFile = RadiancePath("points", "test point file", extension=".pts")
+    outputDataFormat = RadianceValue('f', 'output data format', isJoined=True)
 
     def __init__(self, outputName="untitled", octreeFile=None, pointsFile=None,
                  rcontribParameters=None):
@@ -81,8 +82,10 @@ class Rcontrib(RadianceCommand):
 
     def toRadString(self, relativePath=False):
         """Return full command as a string."""
-        radString = "%s %s %s < %s > %s" % (
+        outputDataFormat = self.outputDataFormat.toRadString()
+        radString = "%s %s%s %s < %s > %s" % (
             self.normspace(os.path.join(self.radbinPath, "rcontrib")),
+            outputDataFormat + ' ' if outputDataFormat else '',
             self.rcontribParameters.toRadString(),
             self.normspace(self.octreeFile.toRadString()),
             self.normspace(self.pointsFile.toRadString()),
@@ -295,7 +295,18 @@ class Rfluxmtx(RadianceCommand):
 
     @property
     def inputFiles(self):
-        return [self.receiverFile] + self.radFiles
+        inputs = [self.receiverFile] + self.radFiles
+        # sender, points and octree are optional
+        for f in (self.sender, self.pointsFile, self.octreeFile.toRadString(),
+                  self.viewRaysFile.toRadString()):
+            if f and str(f) != '-':
+                inputs.append(str(f))
+        return inputs
+
+    @property
+    def outputFile(self):
+        """Output matrix file or output filename format if it is set."""
+        return self.outputMatrix.toRadString() or self.outputFilenameFormat
 
 
 class RfluxmtxControlParameters(object):
@@ -170,12 +170,16 @@ class Rmtxop(RadianceCommand):
             if compoundMatrices:
                 matrixFiles = "+ %s"%matrixFiles
 
-        radString = "%s %s %s %s > %s" % (
+        # write to stdout if there is no output file (e.g. in a pipeline)
+        outputFile = self.normspace(self.outputFile.toRadString())
+        outputFile = "> %s" % outputFile if outputFile else ''
+
+        radString = "%s %s %s %s %s" % (
             self.normspace(os.path.join(self.radbinPath, 'rmtxop')),
             self.rmtxopParameters.toRadString(),
             compoundMatrices,
             matrixFiles,
-            self.normspace(self.outputFile.toRadString())
+            outputFile
         )
 
         return radString
@@ -184,7 +188,10 @@ class Rmtxop(RadianceCommand):
     def inputFiles(self):
         """Input files.
 
-        For this command are actually None as the files are
-        specified as inputs using the matrices input
+        Matrix files and files of rmtxopMatrices.
         """
-        return self.matrixFiles
+        files = list(self.matrixFiles or ())
+        for matrix in self.rmtxopMatrices or ():
+            if matrix.matrixFile.normpath:
+                files.append(matrix.matrixFile.normpath)
+        return files or None
@@ -0,0 +1,237 @@
+"""Vectorized annual daylight metrics for all the sensors of an analysis grid.
+
+Metrics are calculated from a sensors x hours matrix of illuminance values in a
+few numpy reductions instead of looping through sensors and hours in python.
+This module requires numpy.
+
+Usage:
+
+    from honeybee.radiance.postprocess import annualmetrics as am
+
+    total, direct = am.combinedValues(analysisGrid.store)
+    occupancy = am.occupancyMask(analysisGrid.hoys, occSchedule)
+    DA, CDA, UDI, UDI_l, UDI_m = am.annualMetrics(total, occupancy)
+"""
+from __future__ import division
+import numpy as np
+
+# default number of values in each block of sensors for memory-mapped inputs
+CHUNKSIZE = 2 ** 24
+
+
+def occupancyMask(hoys, occSchedule=None):
+    """Get a boolean mask for hours which are in the occupancy schedule.
+
+    Args:
+        hoys: List of hours of the year for the columns of results.
+        occSchedule: An annual occupancy schedule or a collection of occupied hours.
+            If None or empty all the hours will be considered occupied
+            (default: None).
+    """
+    if not occSchedule:
+        return np.ones(len(hoys), dtype=bool)
+    return np.fromiter((h in occSchedule for h in hoys), dtype=bool, count=len(hoys))
+
+
+def combinedValues(store, blindsStateIds=None):
+    """Get total and direct values for all the sensors from a ResultStore.
+
+    Args:
+        store: A ResultStore with values.
+        blindsStateIds: List of state ids for all the sources for each hour. If you
+            want a source to be removed set the state to -1 (default: state 0 for
+            all the sources).
+
+    Returns:
+        total, direct as sensors x hours float32 arrays. direct will be None if
+        direct values are not loaded. Values which are not assigned are set to 0.
+    """
+    values = store.asArray()
+    slotCount, pointCount, hourCount, _ = values.shape
+    total = np.zeros((pointCount, hourCount), dtype=np.float32)
+    direct = np.zeros((pointCount, hourCount), dtype=np.float32) \
+        if store.hasDirectValues else None
+
+    def add(slot, hours=slice(None)):
+        block = np.nan_to_num(values[slot][:, hours])
+        total[:, hours] += block[..., 0]
+        if direct is not None:
+            direct[:, hours] += block[..., 1]
+
+    sourceCount = len(store.sources)
+    if blindsStateIds is None:
+        for sid in xrange(sourceCount):
+            add(store.slotId(sid, 0))
+        return total, direct
+
+    states = np.asarray(blindsStateIds, dtype=int).reshape(-1, sourceCount)
+    assert len(states) == hourCount, \
+        'There should be a list of states for each hour. #states[{}] != #hours[{}]' \
+        .format(len(states), hourCount)
+
+    for sid in xrange(sourceCount):
+        for stateid in np.unique(states[:, sid]):
+            if stateid == -1:
+                continue
+            hours = states[:, sid] == stateid
+            if hours.all():
+                add(store.slotId(sid, stateid))
+            else:
+                add(store.slotId(sid, stateid), hours)
+
+    return total, direct
+
+
+def chunks(values, chunkSize=None):
+    """Iterate through blocks of sensors in a sensors x hours array.
+
+    Memory-mapped inputs are only read from disk one block at a time.
+
+    Args:
+        values: A sensors x hours array.
+        chunkSize: Number of sensors in each block (default: about 64 MB of values
+            for each block).
+
+    Returns:
+        A generator of (index of first sensor, block of values).
+    """
+    hourCount = max(values.shape[1], 1)
+    chunkSize = chunkSize or max(1, CHUNKSIZE // hourCount)
+    for st in xrange(0, len(values), chunkSize):
+        yield st, np.asarray(values[st:st + chunkSize])
+
+
+def annualMetrics(values, occupancy=None, DAThreshhold=300, UDIMinMax=(100, 2000),
+                  chunkSize=None):
+    """Calculate annual metrics for all the sensors.
+
+    Daylight autonomy, continious daylight autonomy and useful daylight illuminance.
+
+    Args:
+        values: A sensors x hours array of total illuminance values. It can be a
+            memory-mapped array.
+        occupancy: A boolean mask for occupied hours (default: all the hours).
+        DAThreshhold: Threshhold for daylight autonomy in lux (default: 300).
+        UDIMinMax: A tuple of min, max value for useful daylight illuminance
+            (default: (100, 2000)).
+        chunkSize: Number of sensors to be calculated at once (default: None).
+
+    Returns:
+        Daylight autonomy, Continious daylight autonomy, Useful daylight illuminance,
+        Less than UDI, More than UDI as arrays with a value for each sensor.
+    """
+    occupancy = _occupancy(values, occupancy)
+    hourCount = np.count_nonzero(occupancy)
+    if hourCount == 0:
+        raise ValueError('There is 0 hours available in the schedule.')
+
+    udiMin, udiMax = UDIMinMax
+    res = tuple(np.empty(len(values)) for i in range(4))
+    da, cda, udiL, udiM = res
+    for st, v in chunks(values, chunkSize):
+        v = v[:, occupancy]
+        end = st + len(v)
+        da[st:end] = np.count_nonzero(v >= DAThreshhold, axis=1)
+        cda[st:end] = np.minimum(v / DAThreshhold, 1).sum(axis=1)
+        udiL[st:end] = np.count_nonzero(v < udiMin, axis=1)
+        udiM[st:end] = np.count_nonzero(v > udiMax, axis=1)
+
+    for r in res:
+        r /= hourCount
+
+    return da, cda, 1 - udiL - udiM, udiL, udiM
+
+
+def spatialDaylightAutonomy(values, occupancy=None, DAThreshhold=300, targetArea=55,
+                            chunkSize=None):
+    """Calculate Spatial Daylight Autonomy (sDA) for a grid.
+
+    An hour passes if more than targetArea percent of the sensors are above
+    DAThreshhold.
+
+    Args:
+        values: A sensors x hours array of total illuminance values. It can be a
+            memory-mapped array.
+        occupancy: A boolean mask for occupied hours (default: all the hours).
+        DAThreshhold: Threshhold for daylight autonomy in lux (default: 300).
+        targetArea: Minimum target area percentage for this grid (default: 55).
+        chunkSize: Number of sensors to be calculated at once (default: None).
+
+    Returns:
+        Fraction of occupied hours that pass, A boolean array for pass / fail for
+        each hour. Unoccupied hours are set to False.
+    """
+    occupancy = _occupancy(values, occupancy)
+    occHourCount = np.count_nonzero(occupancy)
+    if occHourCount == 0:
+        raise ValueError('There is 0 hours available in the schedule.')
+
+    count = np.zeros(values.shape[1], dtype=int)
+    for st, v in chunks(values, chunkSize):
+        count += np.count_nonzero(v > DAThreshhold, axis=0)
+
+    # minimum number of points to meet the targetArea
+    target = np.ceil(targetArea * len(values) / 100)
+    passed = (count >= target) & occupancy
+
+    return np.count_nonzero(passed) / occHourCount, passed
+
+
+def annualSolarExposure(directValues, occupancy=None, threshhold=1000,
+                        targetHours=250, targetArea=10, chunkSize=None):
+    """Annual Solar Exposure (ASE) for all the sensors.
+
+    As per IES-LM-83-12 ASE is the percent of sensors that are found to be exposed
+    to more than 1000lux of direct sunlight for more than 250hrs per year.
+
+    Args:
+        directValues: A sensors x hours array of direct illuminance values. It can
+            be a memory-mapped array.
+        occupancy: A boolean mask for occupied hours (default: all the hours).
+        threshhold: Threshhold for direct illuminance in lux (default: 1000).
+        targetHours: Maximum number of hours for each sensor (default: 250).
+        targetArea: Maximum area percentage for this grid (default: 10).
+        chunkSize: Number of sensors to be calculated at once (default: None).
+
+    Returns:
+        Success as a Boolean, Percentage area, A boolean array for failed sensors,
+        Number of exposed hours for each sensor.
+    """
+    occupancy = _occupancy(directValues, occupancy)
+    hours = np.empty(len(directValues), dtype=int)
+    for st, v in chunks(directValues, chunkSize):
+        hours[st:st + len(v)] = np.count_nonzero(
+            (v > threshhold) & occupancy, axis=1)
+
+    failed = hours > targetHours
+    percentage = 100 * np.count_nonzero(failed) / len(failed)
+
+    return percentage < targetArea, percentage, failed, hours
+
+
+def exposedHours(directValues, sensorIds, occupancy=None, threshhold=1000):
+    """Get exposed hours for a number of sensors.
+
+    Args:
+        directValues: A sensors x hours array of direct illuminance values.
+        sensorIds: Index of sensors.
+        occupancy: A boolean mask for occupied hours (default: all the hours).
+        threshhold: Threshhold for direct illuminance in lux (default: 1000).
+
+    Returns:
+        A boolean array of exposed hours for each sensor in sensorIds.
+    """
+    occupancy = _occupancy(directValues, occupancy)
+    return (np.asarray(directValues[np.asarray(sensorIds, dtype=int)]) >
+            threshhold) & occupancy
+
+
+def _occupancy(values, occupancy):
+    """Return a boolean occupancy mask for columns of values."""
+    if occupancy is None:
+        return np.ones(values.shape[1], dtype=bool)
+    occupancy = np.asarray(occupancy, dtype=bool)
+    assert len(occupancy) == values.shape[1], \
+        'Length of occupancy [{}] must be equal to number of hours [{}].' \
+        .format(len(occupancy), values.shape[1])
+    return occupancy
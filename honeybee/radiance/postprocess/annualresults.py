@@ -1,4 +1,5 @@
 """Post process results for Honeybee annual analysis."""
+from .matrixparser import matrixRows, readHeader, matrixInfo
 
 
 class LoadAnnualsResults(object):
@@ -51,20 +52,11 @@ class LoadAnnualsResults(object):
             for resultFile in self.resultFiles:
                 self.__results.append(self.readAnalysisResult(resultFile))
 
-    @staticmethod
-    def __parseline(line):
-        return line.split()
-
     def readAnalysisResult(self, resultFile):
-        """Read results of sunlight hours analysis."""
+        """Read annual results for each point."""
         try:
-            with open(resultFile, 'rb') as inf:
-                for c, line in enumerate(inf):
-                    if c < 7:
-                        # pass the header
-                        continue
-                    yield self.__parseline(line)
-                    # print "{} Hours >> {}".format(sum(results), results)
+            for row in matrixRows(resultFile):
+                yield list(row)
         except Exception as e:
             print "Failed to load the results from {}: {}".format(resultFile, e)
 
@@ -118,17 +110,21 @@ def getDaylightAutonomy(f, startPoint=0, endPoint=None):
 
 
 def getSizes(f):
-    """Get size of header, line , and each result value."""
-    with open(f) as inf:
-        for l in range(3):
-            line = inf.readline()
-        NUMBEROFPOINTS = int(line.split('=')[-1])
-        for l in range(4):
-            inf.readline()
+    """Get size of header, line , and each result value.
+
+    The results should be an ASCII matrix with the same width for all the values.
+    Use matrixparser.memmapMatrix to read binary results.
+    """
+    with open(f, 'rb') as inf:
+        header = readHeader(inf)
+        NUMBEROFPOINTS, NUMBEROFHOURS, _, fmt = matrixInfo(header)
+        if fmt != 'ascii':
+            raise ValueError('{} is not an ASCII matrix: {}'.format(f, fmt))
         HEADERSIZE = inf.tell()
         inf.readline()
         LINESIZE = inf.tell() - HEADERSIZE
-        return NUMBEROFPOINTS, HEADERSIZE, LINESIZE, int(LINESIZE / 8760)
+        return NUMBEROFPOINTS, HEADERSIZE, LINESIZE, \
+            int(LINESIZE / (NUMBEROFHOURS or 8760))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,313 @@
+"""Memory-mapped binary results for annual analysis.
+
+Annual results from rmtxop are ASCII files with a row for each sensor. Converting
+them once to a binary file makes it possible to read the results for a point, an
+hour or a range of points without loading the whole file to memory. The binary
+file is a valid Radiance float matrix (NCOMP=1) with extra HOYS lines in the
+header so it can also be used as an input for Radiance matrix commands. Hours are
+written as ranges of continuous hours (e.g. HOYS=0-8759) in short lines.
+
+This module requires numpy.
+
+Usage:
+
+    from honeybee.radiance.postprocess.binaryresults import BinaryResults
+    from honeybee.radiance.postprocess import annualmetrics as am
+
+    res = BinaryResults.fromIllFile(r"c:/ladybug/annual/results/illuminance.ill")
+    print res.pointValues(10)
+    DA, CDA, UDI, UDI_l, UDI_m = am.annualMetrics(res.array)
+"""
+from __future__ import division
+import numpy as np
+
+from .matrixparser import readHeader, readRows, readMatrixHeader, matrixInfo, \
+    memmapMatrix, writeMatrix, writeHeader, ILLUMINANCEWEIGHTS
+
+from itertools import chain
+import os
+
+# maximum number of characters in the values of HOYS lines. Radiance reads header
+# lines to a fixed size buffer.
+HEADERLINESIZE = 200
+
+
+def writeBinaryResults(filePath, values, hoys=None):
+    """Write a points x hours array to a binary results file.
+
+    Args:
+        filePath: Full path to the binary file.
+        values: A points x hours array or an iterator of rows for each point.
+        hoys: List of hours of the year for the columns (default: 0..hours-1).
+
+    Returns:
+        Path to the binary file.
+    """
+    rows = iter(values)
+    try:
+        first = np.asarray(next(rows), dtype=np.float32)
+    except StopIteration:
+        raise ValueError('There is no values to write to {}.'.format(filePath))
+
+    hourCount = first.size
+    hoys = tuple(hoys) if hoys is not None else tuple(xrange(hourCount))
+    assert len(hoys) == hourCount, \
+        "Number of hours [{}] doesn't match length of the results [{}]." \
+        .format(len(hoys), hourCount)
+
+    return writeMatrix(filePath, chain((first,), rows), 1, 'f', _headerInfo(hoys))
+
+
+def writeBinaryBlocks(filePath, blocks, pointCount, hoys):
+    """Write blocks of values to a binary results file as they are calculated.
+
+    The file is created with its full size and each block is written to its place
+    in the file. Blocks can be written in any order and only one block is in
+    memory at a time.
+
+    Args:
+        filePath: Full path to the binary file.
+        blocks: An iterator of (index of the first point, points x hours array)
+            or (index of the first point, index of the first hour, array) for
+            tiles of points and hours (e.g. output of matrixmultiply.multiplyTiles).
+        pointCount: Number of points.
+        hoys: List of hours of the year for the columns.
+
+    Returns:
+        Path to the binary file.
+    """
+    hoys = tuple(hoys)
+    if not pointCount or not hoys:
+        raise ValueError('There is no values to write to {}.'.format(filePath))
+
+    header = writeHeader(pointCount, len(hoys), 1, 'f', _headerInfo(hoys))
+    offset = len(header)
+    rowBytes = len(hoys) * 4
+    with open(filePath, 'wb') as outf:
+        outf.write(header)
+        outf.truncate(offset + pointCount * rowBytes)
+        for block in blocks:
+            st, hst, block = block if len(block) == 3 else (block[0], 0, block[1])
+            block = np.ascontiguousarray(block, dtype=np.float32)
+            assert st + len(block) <= pointCount and \
+                hst + block.shape[1] <= len(hoys), \
+                ValueError('Block at ({}, {}) is out of the results.'.format(st, hst))
+            if block.shape[1] == len(hoys):
+                # full rows are continuous in the file
+                outf.seek(offset + st * rowBytes)
+                block.tofile(outf)
+                continue
+            for count, row in enumerate(block):
+                outf.seek(offset + (st + count) * rowBytes + hst * 4)
+                row.tofile(outf)
+    return filePath
+
+
+def _headerInfo(hoys):
+    """Header lines for a binary results file.
+
+    Hours are written as ranges of continuous hours. Ranges are split to lines of
+    HOYS, HOYS2, HOYS3, ... to keep the lines shorter than HEADERLINESIZE.
+    """
+    ranges = []
+    for h in hoys:
+        h = int(h)
+        if ranges and ranges[-1][1] == h - 1:
+            ranges[-1][1] = h
+        else:
+            ranges.append([h, h])
+    tokens = [str(st) if st == end else '{}-{}'.format(st, end)
+              for st, end in ranges]
+
+    lines = []
+    line = []
+    for token in tokens:
+        if line and len(' '.join(line + [token])) > HEADERLINESIZE:
+            lines.append(line)
+            line = []
+        line.append(token)
+    lines.append(line)
+
+    return ('Annual results converted by Honeybee',) + tuple(
+        'HOYS{}={}'.format(count + 1 if count else '', ' '.join(line))
+        for count, line in enumerate(lines))
+
+
+def _readHoys(header):
+    """Get hours of the year from HOYS lines of a header or None if missing."""
+    if 'HOYS' not in header:
+        return None
+    hoys = []
+    key, count = 'HOYS', 1
+    while key in header:
+        for token in header[key].split():
+            if '-' in token:
+                st, end = token.split('-')
+                hoys.extend(xrange(int(st), int(end) + 1))
+            else:
+                hoys.append(int(token))
+        count += 1
+        key = 'HOYS{}'.format(count)
+    return tuple(hoys)
+
+
+def convertIllToBinary(illFile, binaryFile=None, hoys=None):
+    """Convert an annual results file to a binary results file.
+
+    The file is converted in blocks and is never fully loaded to memory. RGB values
+    (NCOMP=3) will be converted to illuminance.
+
+    Args:
+        illFile: Full path to a matrix with a row for each point (e.g. the output
+            of rmtxop). The matrix can be in ASCII, float or double format.
+        binaryFile: Full path to the binary file (default: illFile with .bin
+            extension).
+        hoys: List of hours of the year for the columns (default: 0..NCOLS-1).
+
+    Returns:
+        Path to the binary file.
+    """
+    binaryFile = binaryFile or os.path.splitext(illFile)[0] + '.bin'
+
+    with open(illFile, 'rb') as inf:
+        header = readHeader(inf)
+        ncomp = int(header.get('NCOMP', 1))
+        weights = ILLUMINANCEWEIGHTS if ncomp == 3 else None
+        rows = (np.frombuffer(row, dtype=np.float32)
+                for row in readRows(inf, header, weights))
+        writeBinaryResults(binaryFile, rows, hoys)
+
+    return binaryFile
+
+
+class BinaryResults(object):
+    """Annual results from a memory-mapped binary file.
+
+    Attributes:
+        filePath: Full path to the binary file.
+
+    Values are only read from disk once they are requested. Use array to get the
+    memory-mapped points x hours array which can be passed directly to the
+    functions in annualmetrics.
+    """
+
+    __slots__ = ('_filePath', '_pointCount', '_hoys', '_hoyIds', '_array')
+
+    def __init__(self, filePath):
+        """Load a binary results file."""
+        self._filePath = filePath
+        header, _ = readMatrixHeader(filePath)
+        nrows, ncols, ncomp, fmt = matrixInfo(header)
+        if fmt != 'float' or ncomp != 1 or ncols is None:
+            raise ValueError('{} is not a binary results file.'.format(filePath))
+
+        self._array = memmapMatrix(filePath)
+        self._pointCount = len(self._array)
+
+        self._hoys = self._headerHoys(header, ncols)
+        self._hoyIds = dict((h, c) for c, h in enumerate(self._hoys))
+
+    @classmethod
+    def fromIllFile(cls, illFile, binaryFile=None, hoys=None, reuse=True):
+        """Create binary results from an ASCII annual results file.
+
+        Args:
+            illFile: Full path to an ASCII results file.
+            binaryFile: Full path to the binary file (default: illFile with .bin
+                extension).
+            hoys: List of hours of the year for the columns (default: 0..NCOLS-1).
+            reuse: Reuse the binary file if it is newer than the ASCII file and has
+                the same hours (default: True).
+        """
+        binaryFile = binaryFile or os.path.splitext(illFile)[0] + '.bin'
+        if not (reuse and os.path.isfile(binaryFile) and
+                os.path.getmtime(binaryFile) >= os.path.getmtime(illFile) and
+                cls._hasHoys(binaryFile, hoys)):
+            convertIllToBinary(illFile, binaryFile, hoys)
+        return cls(binaryFile)
+
+    @staticmethod
+    def _headerHoys(header, ncols):
+        """Get hours of the year from the header of a binary results file."""
+        hoys = _readHoys(header)
+        return hoys if hoys is not None else tuple(xrange(ncols))
+
+    @classmethod
+    def _hasHoys(cls, binaryFile, hoys=None):
+        """Check if a binary results file has the hours of the year in hoys.
+
+        If hoys is None the file should have the default hours (0..NCOLS-1).
+        """
+        header, _ = readMatrixHeader(binaryFile)
+        ncols = matrixInfo(header)[1]
+        if ncols is None:
+            return False
+        fileHoys = cls._headerHoys(header, ncols)
+        if hoys is None:
+            return fileHoys == tuple(xrange(ncols))
+        return fileHoys == tuple(int(h) for h in hoys)
+
+    @property
+    def filePath(self):
+        """Full path to the binary file."""
+        return self._filePath
+
+    @property
+    def pointCount(self):
+        """Number of points."""
+        return self._pointCount
+
+    @property
+    def hoys(self):
+        """Hours of the year for the columns."""
+        return self._hoys
+
+    @property
+    def array(self):
+        """Memory-mapped points x hours array."""
+        return self._array
+
+    def pointValues(self, pointId):
+        """Get annual values for a point."""
+        return np.array(self._array[pointId])
+
+    def hourlyValues(self, hoy, startPoint=0, endPoint=None):
+        """Get values for an hour of the year for several points."""
+        try:
+            col = self._hoyIds[hoy]
+        except KeyError:
+            raise ValueError('Invalid hoy input: {}'.format(hoy))
+        return np.array(self._array[startPoint:endPoint, col])
+
+    def values(self, startPoint=0, endPoint=None, hoys=None):
+        """Get values for a range of points.
+
+        Args:
+            startPoint: Index of the first point (default: 0).
+            endPoint: Index of the last point (default: last point).
+            hoys: An optional list of hours of the year (default: all the hours).
+        """
+        values = self._array[startPoint:endPoint]
+        if hoys is None:
+            return np.array(values)
+        try:
+            return values[:, [self._hoyIds[h] for h in hoys]]
+        except KeyError as e:
+            raise ValueError('Invalid hoy input: {}'.format(e))
+
+    def __len__(self):
+        """Number of points."""
+        return self._pointCount
+
+    def __getitem__(self, index):
+        """Get annual values for a point."""
+        return self._array[index]
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Binary results representation."""
+        return 'BinaryResults::{}::#{}::#{}hours'.format(
+            os.path.split(self._filePath)[-1], self._pointCount, len(self._hoys))
@@ -0,0 +1,124 @@
+"""Vectorized dynamic blinds control for all the sensors of an analysis grid.
+
+Values for each blind combination are collected as combinations x sensors x hours
+arrays and the control logic is evaluated for all of them at once. A combination
+is selected for a sensor and an hour if the logic is not met. If the logic is met
+the blinds will be moved to the next combination. If the logic is met for all
+the combinations the last one is selected. This module requires numpy.
+
+Usage:
+
+    from honeybee.radiance.postprocess import blindcontrol as bc
+
+    combIds = analysisGrid.store.stateCombinationIds()
+    total, direct = bc.combinationValues(analysisGrid.store, combIds)
+    index, ill, dirIll, success = bc.blindsState(
+        total, direct, bc.illuminanceThreshold(2000))
+"""
+from __future__ import division
+import numpy as np
+
+
+def illuminanceThreshold(maxIlluminance=2000):
+    """Control logic which is met once total illuminance is above maxIlluminance."""
+    def logic(total, direct):
+        return total > maxIlluminance
+    return logic
+
+
+def directThreshold(maxDirect=1000):
+    """Control logic which is met once direct illuminance is above maxDirect."""
+    def logic(total, direct):
+        if direct is None:
+            raise ValueError('Direct values are not loaded for direct threshold.')
+        return direct > maxDirect
+    return logic
+
+
+def combinationValues(store, combIds, hoys=None):
+    """Get total and direct values for several blind combinations.
+
+    Args:
+        store: A ResultStore with values.
+        combIds: List of state ids for blind combinations. Each combination has a
+            state id for each source. Use -1 to remove a source.
+        hoys: List of hours of the year (default: all the hours in store).
+
+    Returns:
+        total, direct as combinations x sensors x hours float32 arrays. direct will
+        be None if direct values are not loaded.
+    """
+    values = store.asArray()
+    _, pointCount, hourCount, _ = values.shape
+    if hoys is not None:
+        # only the requested hours are read from the store
+        hours = np.asarray(store.hoyIds(hoys), dtype=int)
+        hourCount = len(hours)
+    else:
+        hours = slice(None)
+
+    sourceCount = len(store.sources)
+    shape = (len(combIds), pointCount, hourCount)
+    totals = np.zeros(shape, dtype=np.float32)
+    directs = np.zeros(shape, dtype=np.float32) if store.hasDirectValues else None
+    for count, comb in enumerate(combIds):
+        assert len(comb) == sourceCount, \
+            'There should be a state for each source. #states[{}] != #sources[{}]' \
+            .format(len(comb), sourceCount)
+        for sid, stateid in enumerate(comb):
+            if stateid == -1:
+                continue
+            block = np.nan_to_num(values[store.slotId(sid, stateid)][:, hours])
+            totals[count] += block[..., 0]
+            if directs is not None:
+                directs[count] += block[..., 1]
+
+    return totals, directs
+
+
+def blindsState(total, direct=None, logic=None, shared=False, targetArea=100):
+    """Calculate blinds state for all the sensors and hours based on a logic.
+
+    Args:
+        total: A combinations x sensors x hours array of total values.
+        direct: A combinations x sensors x hours array of direct values (default:
+            None).
+        logic: A function which takes total and direct arrays and returns a
+            boolean array of the same shape. True means the logic is met and the
+            blinds should be moved to the next combination. The function is
+            evaluated once for all the combinations (default: total > 2000).
+        shared: Set to True to use a single combination for all the sensors in
+            each hour. A combination is selected for an hour once the logic is not
+            met for targetArea percent of the sensors (default: False).
+        targetArea: Minimum percentage of sensors which should not meet the logic
+            for shared control (default: 100).
+
+    Returns:
+        Index of selected combination, total values, direct values, success as
+        sensors x hours arrays. success is 0 for the first combination, 1 if blinds
+        are moved to another combination and -1 if the logic is met for all the
+        combinations. direct will be None if direct values are not provided.
+    """
+    total = np.asarray(total)
+    assert total.ndim == 3, \
+        'Values should be a combinations x sensors x hours array not {}.' \
+        .format(total.shape)
+    logic = logic or illuminanceThreshold()
+    combCount, sensorCount, hourCount = total.shape
+
+    accepted = ~np.asarray(logic(total, direct), dtype=bool)
+    if shared:
+        target = np.ceil(targetArea * sensorCount / 100)
+        acceptedHours = np.count_nonzero(accepted, axis=1) >= target
+        accepted = np.broadcast_to(acceptedHours[:, np.newaxis, :], total.shape)
+
+    found = accepted.any(axis=0)
+    index = np.where(found, accepted.argmax(axis=0), combCount - 1)
+    success = np.where(found, (index > 0).astype(np.int8), -1).astype(np.int8)
+
+    sensors = np.arange(sensorCount)[:, np.newaxis]
+    hours = np.arange(hourCount)[np.newaxis, :]
+    ill = total[index, sensors, hours]
+    dirIll = None if direct is None else np.asarray(direct)[index, sensors, hours]
+
+    return index, ill, dirIll, success
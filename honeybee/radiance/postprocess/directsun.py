@@ -0,0 +1,227 @@
+"""Sparse sun matrices and direct sunlight calculation without dense products.
+
+Each sun in a sun matrix has a value for one hour only and the rest of the
+matrix is zeros. SparseSunMatrix only keeps (sun, hour, rgb) for the non-zero
+values and direct sunlight for each sensor is calculated by weighting the
+contribution of each sun and gathering the suns into their hours:
+
+    illuminance[s, h] = sum(dc[s, i, c] * w[c] * sun[i, c] for i in suns of h)
+
+Memory and calculation time depend on the number of suns and not on the number
+of suns x hours.
+
+This module requires numpy.
+
+Usage:
+
+    from honeybee.radiance.postprocess import directsun
+
+    suns = sunMatrix.sparseMatrix()
+    blocks = directsun.multiplyBlocks('results/matrix/sun.dc', suns)
+    hoys = [sunMatrix.hoys[h] for h in suns.hours]
+    mm.assignBlocks(analysisGrids, blocks, hoys, isDirect=True)
+"""
+import numpy as np
+
+from .matrixparser import readMatrix, readMatrixHeader, writeHeader, \
+    ILLUMINANCEWEIGHTS
+from .matrixmultiply import MAXBLOCKSIZE
+
+
+class SparseSunMatrix(object):
+    """A sun matrix that only keeps the non-zero values.
+
+    Attributes:
+        sunIds: Index of the sun (row) for each value.
+        hourIds: Index of the hour (column) for each value.
+        values: A values x components array.
+        sunCount: Number of suns (rows) in the full matrix.
+        hourCount: Number of hours (columns) in the full matrix.
+    """
+
+    __slots__ = ('_sunIds', '_hourIds', '_values', '_sunCount', '_hourCount')
+
+    def __init__(self, sunIds, hourIds, values, sunCount=None, hourCount=None):
+        """Create a sparse sun matrix."""
+        self._sunIds = np.asarray(sunIds, dtype=int)
+        self._hourIds = np.asarray(hourIds, dtype=int)
+        values = np.asarray(values, dtype=np.float32)
+        self._values = values[:, None] if values.ndim == 1 else values
+        assert len(self._sunIds) == len(self._hourIds) == len(self._values), \
+            ValueError('Length of sunIds, hourIds and values should be the same.')
+        self._sunCount = sunCount if sunCount is not None else \
+            (int(self._sunIds.max()) + 1 if len(self._sunIds) else 0)
+        self._hourCount = hourCount if hourCount is not None else \
+            (int(self._hourIds.max()) + 1 if len(self._hourIds) else 0)
+
+    @classmethod
+    def fromMatrix(cls, matrix, chunkSize=None):
+        """Create a sparse sun matrix from a dense sun matrix.
+
+        Args:
+            matrix: A suns x hours x components array or path to a sun matrix.
+                Binary matrix files are memory-mapped and are read in blocks of
+                suns.
+            chunkSize: Number of suns in each block (default: about 4 million
+                values in each block).
+        """
+        mtx = readMatrix(matrix) if isinstance(matrix, basestring) \
+            else np.asarray(matrix)
+        if mtx.ndim == 2:
+            mtx = mtx[:, :, None]
+        sunCount, hourCount, ncomp = mtx.shape
+        chunkSize = chunkSize or max(1, MAXBLOCKSIZE // max(1, hourCount * ncomp))
+        sunIds, hourIds, values = [], [], []
+        for st in xrange(0, sunCount, chunkSize):
+            block = np.asarray(mtx[st:st + chunkSize])
+            rows, cols = block.any(axis=2).nonzero()
+            sunIds.append(rows + st)
+            hourIds.append(cols)
+            values.append(block[rows, cols])
+        if not sunIds:
+            return cls((), (), np.zeros((0, ncomp)), sunCount, hourCount)
+        return cls(np.concatenate(sunIds), np.concatenate(hourIds),
+                   np.concatenate(values), sunCount, hourCount)
+
+    @classmethod
+    def fromFile(cls, filePath):
+        """Load a sparse sun matrix from a file that is written by write method."""
+        header, offset = readMatrixHeader(filePath)
+        assert header.get('FORMAT') == 'sparse', \
+            ValueError('{} is not a sparse matrix.'.format(filePath))
+        ncomp = int(header['NCOMP'])
+        with open(filePath, 'rb') as inf:
+            inf.seek(offset)
+            data = np.loadtxt(inf, ndmin=2).reshape(-1, 2 + ncomp)
+        return cls(data[:, 0], data[:, 1], data[:, 2:], int(header['NROWS']),
+                   int(header['NCOLS']))
+
+    @property
+    def sunIds(self):
+        """Index of the sun (row) for each value."""
+        return self._sunIds
+
+    @property
+    def hourIds(self):
+        """Index of the hour (column) for each value."""
+        return self._hourIds
+
+    @property
+    def values(self):
+        """A values x components array."""
+        return self._values
+
+    @property
+    def sunCount(self):
+        """Number of suns (rows)."""
+        return self._sunCount
+
+    @property
+    def hourCount(self):
+        """Number of hours (columns)."""
+        return self._hourCount
+
+    @property
+    def ncomp(self):
+        """Number of components for each value."""
+        return self._values.shape[1]
+
+    @property
+    def hours(self):
+        """Sorted index of hours with at least one sun."""
+        return np.unique(self._hourIds)
+
+    def toDense(self):
+        """Get the full suns x hours x components array."""
+        mtx = np.zeros((self._sunCount, self._hourCount, self.ncomp),
+                       dtype=np.float32)
+        mtx[self._sunIds, self._hourIds] = self._values
+        return mtx
+
+    def write(self, filePath):
+        """Write the matrix as lines of sun, hour and values.
+
+        The file has a Radiance header with FORMAT=sparse and can be loaded using
+        fromFile. Radiance commands can't read this format. Use toDense and
+        matrixparser.writeMatrix to write a matrix for dctimestep.
+        """
+        header = writeHeader(self._sunCount, self._hourCount, self.ncomp, 'a',
+                             ('Sparse sun matrix created by Honeybee',))
+        with open(filePath, 'wb') as outf:
+            outf.write(header.replace('FORMAT=ascii', 'FORMAT=sparse'))
+            valueFormat = ' '.join(('%.6e',) * self.ncomp)
+            for s, h, v in zip(self._sunIds, self._hourIds, self._values):
+                outf.write('%d %d %s\n' % (s, h, valueFormat % tuple(v)))
+        return filePath
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Sparse sun matrix representation."""
+        return 'SparseSunMatrix::{}x{}::#{}values'.format(
+            self._sunCount, self._hourCount, len(self._values))
+
+
+def multiplyBlocks(dcMatrix, sunMatrix, weights=ILLUMINANCEWEIGHTS, chunkSize=None):
+    """Calculate direct sunlight in blocks of sensors from a sparse sun matrix.
+
+    Args:
+        dcMatrix: Path to a daylight coefficient matrix for suns or a sensors x
+            suns x components array.
+        sunMatrix: A SparseSunMatrix.
+        weights: Weights for each component (default: ILLUMINANCEWEIGHTS). Use
+            None to add the components together.
+        chunkSize: Number of sensors in each block (default: about 4 million
+            values in each block).
+
+    Yields:
+        Index of the first sensor and a sensors x hours float32 array for each
+        block. Columns are the hours in sunMatrix.hours.
+    """
+    dc = readMatrix(dcMatrix) if isinstance(dcMatrix, basestring) \
+        else np.asarray(dcMatrix)
+    if dc.ndim == 2:
+        dc = dc[:, :, None]
+    sensorCount, sunCount, ncomp = dc.shape
+    assert sunCount == sunMatrix.sunCount, \
+        "Number of suns [{}] doesn't match the daylight coefficients [{}]." \
+        .format(sunMatrix.sunCount, sunCount)
+    assert ncomp == sunMatrix.ncomp, \
+        "Number of components [{}] doesn't match the daylight coefficients [{}]." \
+        .format(sunMatrix.ncomp, ncomp)
+    w = np.asarray(weights or (1,) * ncomp, dtype=np.float32)
+    assert len(w) == ncomp, \
+        "Number of weights [{}] doesn't match number of components [{}]." \
+        .format(len(w), ncomp)
+
+    # sort values by hour so suns of each hour can be added together
+    order = np.argsort(sunMatrix.hourIds, kind='mergesort')
+    sunIds = sunMatrix.sunIds[order]
+    hourIds = sunMatrix.hourIds[order]
+    weighted = (sunMatrix.values[order] * w).astype(np.float32)
+    starts = np.concatenate(((0,), (np.diff(hourIds) != 0).nonzero()[0] + 1)) \
+        if len(hourIds) else hourIds
+    oneSunPerHour = len(starts) == len(hourIds)
+    allSuns = np.array_equal(sunIds, np.arange(sunCount))
+
+    chunkSize = chunkSize or max(1, MAXBLOCKSIZE // max(1, len(sunIds) * ncomp))
+    for st in xrange(0, sensorCount, chunkSize):
+        block = dc[st:st + chunkSize].astype(np.float32, copy=False)
+        if not allSuns:
+            block = block[:, sunIds]
+        contribution = (block * weighted).sum(axis=2)
+        if not oneSunPerHour:
+            contribution = np.add.reduceat(contribution, starts, axis=1)
+        yield st, contribution
+
+
+def multiply(dcMatrix, sunMatrix, weights=ILLUMINANCEWEIGHTS):
+    """Calculate direct sunlight from a sparse sun matrix.
+
+    Returns:
+        A sensors x hours float32 array. Columns are the hours in sunMatrix.hours.
+    """
+    return np.concatenate(
+        [block for _, block in multiplyBlocks(dcMatrix, sunMatrix, weights)])
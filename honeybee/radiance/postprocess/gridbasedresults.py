@@ -1,4 +1,5 @@
 """Post process results for a Radiance Grid-based daylight analysis."""
+from .matrixparser import matrixRows
 
 
 # TODO: Implement loading the results in parallel for large files
@@ -119,33 +120,37 @@ class LoadGridBasedDLAnalysisResults(object):
     @staticmethod
     def readDLResult(resultFile):
         """Read results of a radiance daylight analysis."""
+        weights = (179 * .265, 179 * .67, 179 * .065)
         try:
-            with open(resultFile, "r") as resFile:
-                for line in resFile:
-                    r, g, b = tuple(float(v) for v in line.split('	')[:3])
-                    yield 179 * (.265 * r + .67 * g + .065 * b)
+            for row in matrixRows(resultFile, weights):
+                yield row[0]
         except Exception as e:
-            "Failed to load the results from {}: {}".format(resultFile, e)
+            raise ValueError(
+                "Failed to load the results from {}: {}".format(resultFile, e))
 
     @staticmethod
-    def readRadiationResult(self, resultFile):
-        """Read results of a radiance radiation analysis."""
+    def readRadiationResult(resultFile):
+        """Read results of a radiance radiation analysis.
+
+        The first value of each row is the radiation value. Rows can have one value
+        (e.g. the output of rcalc) or three values.
+        """
         try:
-            with open(resultFile, "r") as resFile:
-                for line in resFile:
-                    yield float(line.split('	')[0])
+            # a weight of 1 keeps all the values in the row and stops converting RGB
+            # values to illuminance
+            for row in matrixRows(resultFile, (1,)):
+                yield row[0]
         except Exception as e:
-            "Failed to load the results from {}: {}".format(resultFile, e)
+            raise ValueError(
+                "Failed to load the results from {}: {}".format(resultFile, e))
 
     @staticmethod
-    def readDFResult(self, resultFile):
+    def readDFResult(resultFile):
         """Read results of a daylight factor or vertical sky component analysis."""
+        weights = (17.9 * .265, 17.9 * .67, 17.9 * .065)
         try:
-            with open(resultFile, "r") as resFile:
-                for line in resFile:
-                    r, g, b = tuple(float(v) for v in line.split('	')[:3])
-                    res = 17900 * (.265 * r + .67 * g + .065 * b) / 1000
-                    res = 100 if res > 100 else res
-                    yield res
+            for row in matrixRows(resultFile, weights):
+                yield min(row[0], 100)
         except Exception as e:
-            "Failed to load the results from {}: {}".format(resultFile, e)
+            raise ValueError(
+                "Failed to load the results from {}: {}".format(resultFile, e))
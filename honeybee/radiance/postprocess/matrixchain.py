@@ -0,0 +1,397 @@
+"""Multiply chains of Radiance matrices with cached partial products.
+
+A chain like V.T.D.S (view, transmission, daylight and sky matrices) is
+multiplied in the cheapest order for the shape of the matrices. Products that
+don't include the first matrix of the chain (e.g. D.S and T.D.S) don't depend on
+the number of sensors and are cached so they are only calculated once. The first
+matrix is multiplied in blocks of sensors and the RGB components of the last
+product are weighted and added together in a single matrix product.
+
+This module requires numpy.
+
+Usage:
+
+    from honeybee.radiance.postprocess.matrixchain import ThreePhaseEngine
+
+    engine = ThreePhaseEngine('skies/sky.smx')
+    engine.addWindowGroup('south', 'matrix/south.vmx', 'matrix/south.dmx')
+    engine.addState('south', 'clear', 'matrix/south..clear.tmx')
+    engine.addState('south', 'diffuse', 'matrix/south..diffuse.tmx')
+    illuminance = engine.illuminance('south', 'diffuse')
+"""
+import numpy as np
+
+from .matrixparser import readMatrix, ILLUMINANCEWEIGHTS
+from .matrixmultiply import MAXBLOCKSIZE, blockSize
+
+
+class MatrixChain(object):
+    """Multiply chains of matrices with cached products.
+
+    Matrices are added with a key and chains are a tuple of keys. Matrices are
+    rows x columns x components arrays or full paths to matrix files.
+
+    Attributes:
+        weights: Weights for each component of the final values
+            (default: ILLUMINANCEWEIGHTS). Use None to add the components together.
+    """
+
+    __slots__ = ('_matrices', '_cache', '_weights')
+
+    def __init__(self, weights=ILLUMINANCEWEIGHTS):
+        """Create an empty matrix chain."""
+        self._matrices = {}
+        self._cache = {}
+        self._weights = weights
+
+    @property
+    def keys(self):
+        """Keys of the matrices."""
+        return tuple(self._matrices)
+
+    @property
+    def cachedProducts(self):
+        """Chains of keys for cached products."""
+        return tuple(k for k in self._cache if len(k) > 1)
+
+    def add(self, key, matrix):
+        """Add or replace a matrix.
+
+        Cached products which include the key will be removed.
+
+        Args:
+            key: A hashable key for the matrix.
+            matrix: A rows x columns x components array or path to a matrix file.
+                Binary matrix files are memory-mapped.
+        """
+        mtx = readMatrix(matrix) if isinstance(matrix, basestring) \
+            else np.asarray(matrix)
+        if mtx.ndim == 2:
+            mtx = mtx[:, :, None]
+        assert mtx.ndim == 3, \
+            ValueError('A matrix should have 2 or 3 dimensions not {}.'.format(mtx.ndim))
+        self.remove(key)
+        self._matrices[key] = mtx
+
+    def remove(self, key):
+        """Remove a matrix and the cached products which include it."""
+        self._matrices.pop(key, None)
+        for chain in tuple(self._cache):
+            if key in chain:
+                del self._cache[chain]
+
+    def shape(self, key):
+        """Number of rows, columns and components of a matrix."""
+        return self._matrices[key].shape
+
+    def _chainOrder(self, chain, memo):
+        """Cost and split index of the cheapest order for a chain.
+
+        Cost is the number of multiplications for each component. Cached products
+        cost nothing.
+        """
+        if len(chain) == 1 or chain in self._cache:
+            return 0, None
+        try:
+            return memo[chain]
+        except KeyError:
+            pass
+
+        rows = self._matrices[chain[0]].shape[0]
+        cols = self._matrices[chain[-1]].shape[1]
+        best = None
+        for i in xrange(1, len(chain)):
+            cost = self._chainOrder(chain[:i], memo)[0] + \
+                self._chainOrder(chain[i:], memo)[0] + \
+                rows * self._matrices[chain[i - 1]].shape[1] * cols
+            if best is None or cost < best[0]:
+                best = cost, i
+        memo[chain] = best
+        return best
+
+    def product(self, chain):
+        """Get the product of a chain of matrices for each component.
+
+        Products are cached. Use it for products that don't depend on the number
+        of sensors.
+
+        Returns:
+            A components x rows x columns array.
+        """
+        chain = tuple(chain)
+        try:
+            return self._cache[chain]
+        except KeyError:
+            pass
+
+        if len(chain) == 1:
+            mtx = self._matrices[chain[0]]
+            res = np.ascontiguousarray(mtx.transpose(2, 0, 1), dtype=np.float32)
+        else:
+            self._checkChain(chain)
+            _, i = self._chainOrder(chain, {})
+            left, right = self.product(chain[:i]), self.product(chain[i:])
+            res = np.stack([np.dot(l, r) for l, r in zip(left, right)])
+        self._cache[chain] = res
+        return res
+
+    def order(self, chain):
+        """Get the order of multiplications for a chain as nested tuples.
+
+        The first matrix is always multiplied last in blocks of sensors.
+        """
+        chain = tuple(chain)
+        memo = {}
+
+        def _order(c):
+            if len(c) == 1:
+                return c[0]
+            if c in self._cache:
+                return c
+            i = self._chainOrder(c, memo)[1]
+            return _order(c[:i]), _order(c[i:])
+
+        i = self._splitIndex(chain)
+        left = chain[0] if i == 1 else (chain[0], _order(chain[1:i]))
+        return left, _order(chain[i:])
+
+    def _splitIndex(self, chain):
+        """Find the cheapest split of a chain to (first matrix...) . (rest).
+
+        The left side is calculated for each block of sensors and the right side
+        is sensor independent and is cached.
+        """
+        self._checkChain(chain)
+        memo = {}
+        n = self._matrices[chain[0]].shape[0]
+        cols = self._matrices[chain[-1]].shape[1]
+        best = None
+        for i in xrange(1, len(chain)):
+            inner = self._matrices[chain[i - 1]].shape[1]
+            cost = self._chainOrder(chain[i:], memo)[0] + n * inner * cols
+            if i > 1:
+                cost += self._chainOrder(chain[1:i], memo)[0] + \
+                    n * self._matrices[chain[0]].shape[1] * inner
+            if best is None or cost < best[0]:
+                best = cost, i
+        return best[1]
+
+    def _checkChain(self, chain):
+        """Check if the matrices in a chain can be multiplied."""
+        for a, b in zip(chain[:-1], chain[1:]):
+            sa, sb = self._matrices[a].shape, self._matrices[b].shape
+            assert sa[1] == sb[0] and sa[2] == sb[2], \
+                ValueError("Matrices {} {} and {} {} can't be multiplied.".format(
+                    a, sa, b, sb))
+
+    def multiplyBlocks(self, chain, chunkSize=None):
+        """Multiply a chain of matrices in blocks of rows of the first matrix.
+
+        Args:
+            chain: A tuple of keys for at least 2 matrices.
+            chunkSize: Number of rows in each block (default: about 4 million
+                values in each block).
+
+        Yields:
+            Index of the first row and a rows x columns float32 array with weighted
+            sum of components for each block.
+        """
+        chain = tuple(chain)
+        assert len(chain) > 1, ValueError('A chain needs at least 2 matrices.')
+        i = self._splitIndex(chain)
+        cols = self.product(chain[i:]).shape[2]
+        chunkSize = chunkSize or max(1, MAXBLOCKSIZE // max(1, cols))
+        return self._multiplyBlocks(chain, i, 0, cols, chunkSize)
+
+    def multiplyTiles(self, chain, memoryLimit=None):
+        """Multiply a chain of matrices in tiles of rows and columns.
+
+        Columns of the sensor independent product are split to tiles which take
+        at most half of the memory budget and the rows of the first matrix are
+        multiplied against each tile in blocks that fit in the rest of the
+        budget. Cached products are kept in memory and are not part of the budget.
+
+        Args:
+            chain: A tuple of keys for at least 2 matrices.
+            memoryLimit: Memory budget in bytes (default: MEMORYLIMIT).
+
+        Yields:
+            Index of the first row, index of the first column and a rows x columns
+            float32 array with weighted sum of components for each tile.
+        """
+        chain = tuple(chain)
+        assert len(chain) > 1, ValueError('A chain needs at least 2 matrices.')
+        i = self._splitIndex(chain)
+        ncomp, inner, cols = self.product(chain[i:]).shape
+        # each row needs a row of the first matrix, a row of the left product
+        # and a row of results
+        rowSize = ncomp * (self._matrices[chain[0]].shape[1] + inner)
+        colChunk = max(1, min(cols, blockSize(ncomp * inner,
+                                              memoryLimit=memoryLimit) // 2))
+        for cst in xrange(0, cols, colChunk):
+            cend = min(cols, cst + colChunk)
+            chunkSize = blockSize(rowSize + cend - cst, ncomp * inner * (cend - cst),
+                                  memoryLimit)
+            for st, block in self._multiplyBlocks(chain, i, cst, cend, chunkSize):
+                yield st, cst, block
+
+    def _multiplyBlocks(self, chain, i, cst, cend, chunkSize):
+        """Multiply blocks of rows by columns cst:cend of the product of chain[i:]."""
+        right = self.product(chain[i:])[:, :, cst:cend]
+        ncomp, inner, cols = right.shape
+        w = np.asarray(self._weights or (1,) * ncomp, dtype=np.float32)
+        assert len(w) == ncomp, \
+            "Number of weights [{}] doesn't match number of components [{}]." \
+            .format(len(w), ncomp)
+        # stack weighted components to multiply all the components at once
+        right = (right * w[:, None, None]).reshape(ncomp * inner, cols)
+        middle = self.product(chain[1:i]) if i > 1 else None
+
+        first = self._matrices[chain[0]]
+        for st in xrange(0, len(first), chunkSize):
+            block = first[st:st + chunkSize].astype(np.float32, copy=False)
+            if middle is None:
+                left = block.transpose(0, 2, 1)
+            else:
+                left = np.stack([np.dot(block[:, :, c], m)
+                                 for c, m in enumerate(middle)], axis=1)
+            yield st, np.dot(left.reshape(len(block), -1), right)
+
+    def multiply(self, chain):
+        """Multiply a chain of matrices.
+
+        Returns:
+            A rows x columns float32 array with weighted sum of components.
+        """
+        return np.concatenate([block for _, block in self.multiplyBlocks(chain)])
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Matrix chain representation."""
+        return 'MatrixChain::#{}matrices::#{}cached'.format(
+            len(self._matrices), len(self.cachedProducts))
+
+
+class ThreePhaseEngine(object):
+    """Calculate three-phase results for window groups and states in process.
+
+    Daylight matrix times sky (D.S) is calculated once for each window group and
+    transmission times D.S (T.D.S) once for each state, if they are part of the
+    cheapest order of multiplication. Adding a new state only needs the products
+    for the new transmission matrix.
+
+    Attributes:
+        skyMatrix: A patches x hours x components array or path to a sky matrix.
+        weights: Weights for each component (default: ILLUMINANCEWEIGHTS).
+    """
+
+    __slots__ = ('_chain', '_states')
+
+    def __init__(self, skyMatrix, weights=ILLUMINANCEWEIGHTS):
+        """Create a three-phase engine."""
+        self._chain = MatrixChain(weights)
+        self._chain.add('sky', skyMatrix)
+        self._states = {}
+
+    @property
+    def chain(self):
+        """MatrixChain of this engine."""
+        return self._chain
+
+    @property
+    def windowGroups(self):
+        """Name of window groups."""
+        return tuple(self._states)
+
+    @property
+    def hourCount(self):
+        """Number of hours in sky matrix."""
+        return self._chain.shape('sky')[1]
+
+    def states(self, windowGroup):
+        """Name of states for a window group."""
+        return tuple(self._states[windowGroup])
+
+    def addWindowGroup(self, windowGroup, viewMatrix, daylightMatrix):
+        """Add a window group.
+
+        Args:
+            windowGroup: Name of the window group.
+            viewMatrix: View matrix (sensors x window patches).
+            daylightMatrix: Daylight matrix (window patches x sky patches).
+        """
+        self._chain.add(('V', windowGroup), viewMatrix)
+        self._chain.add(('D', windowGroup), daylightMatrix)
+        self._states.setdefault(windowGroup, [])
+
+    def addState(self, windowGroup, state, transmissionMatrix):
+        """Add or replace a state for a window group.
+
+        Args:
+            windowGroup: Name of the window group.
+            state: Name of the state.
+            transmissionMatrix: Transmission matrix (window patches x window
+                patches) e.g. the output of rmtxop for a BSDF xml file.
+        """
+        assert windowGroup in self._states, \
+            ValueError('Unknown window group: {}'.format(windowGroup))
+        self._chain.add(('T', windowGroup, state), transmissionMatrix)
+        if state not in self._states[windowGroup]:
+            self._states[windowGroup].append(state)
+
+    def matrices(self, windowGroup, state):
+        """Keys of the V.T.D.S chain for a state."""
+        return (('V', windowGroup), ('T', windowGroup, state), ('D', windowGroup),
+                'sky')
+
+    def illuminanceBlocks(self, windowGroup, state, chunkSize=None):
+        """Calculate illuminance for a state in blocks of sensors.
+
+        Yields:
+            Index of the first sensor and a sensors x hours array for each block.
+        """
+        return self._chain.multiplyBlocks(self._stateChain(windowGroup, state),
+                                          chunkSize)
+
+    def illuminanceTiles(self, windowGroup, state, memoryLimit=None):
+        """Calculate illuminance for a state in tiles of sensors and hours.
+
+        Use it with binaryresults.writeBinaryBlocks for grids that don't fit in
+        memory.
+
+        Yields:
+            Index of the first sensor, index of the first hour and a sensors x
+            hours array for each tile.
+        """
+        return self._chain.multiplyTiles(self._stateChain(windowGroup, state),
+                                         memoryLimit)
+
+    def _stateChain(self, windowGroup, state):
+        """Check the state and cache the shared products of the window group."""
+        assert state in self._states.get(windowGroup, ()), \
+            ValueError('Unknown state {} for {}.'.format(state, windowGroup))
+        if len(self._states[windowGroup]) > 1:
+            # D.S is shared between all the states of the window group
+            self._chain.product((('D', windowGroup), 'sky'))
+        return self.matrices(windowGroup, state)
+
+    def illuminance(self, windowGroup, state):
+        """Calculate illuminance for a state.
+
+        Returns:
+            A sensors x hours array.
+        """
+        return np.concatenate(
+            [block for _, block in self.illuminanceBlocks(windowGroup, state)])
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Three-phase engine representation."""
+        return 'ThreePhaseEngine::#{}windowgroups::#{}states'.format(
+            len(self._states), sum(len(s) for s in self._states.itervalues()))
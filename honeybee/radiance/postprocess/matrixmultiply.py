@@ -0,0 +1,218 @@
+"""Multiply daylight coefficient matrices by sky matrices in this process.
+
+This is a replacement for running dctimestep and rmtxop -c 47.4 119.9 11.6. The
+RGB weights are applied to the sky matrix once and the three components are
+stacked so each block of sensors is calculated with a single matrix product:
+
+    illuminance[s, h] = sum(dc[s, k, c] * w[c] * sky[k, h, c] for k, c)
+
+Sensors are multiplied in blocks so the peak memory doesn't depend on the number
+of sensors and no intermediate files are written. Binary daylight coefficient
+matrices are memory-mapped and only one block of sensors is read at a time.
+
+For grids that don't fit in memory multiplyTiles splits the calculation to
+tiles of sensors and hours under a memory budget. The tiles can be written to a
+binary results file as they are calculated using binaryresults.writeBinaryBlocks.
+
+This module requires numpy.
+
+Usage:
+
+    from honeybee.radiance.postprocess import matrixmultiply as mm
+
+    blocks = mm.multiplyBlocks('results/matrix/room.dc', 'skies/sky.smx')
+    mm.assignBlocks(analysisGrids, blocks, skyMatrix.hoys)
+
+    # campus-scale grids
+    from honeybee.radiance.postprocess.binaryresults import writeBinaryBlocks
+    tiles = mm.multiplyTiles('results/matrix/campus.dc', 'skies/sky.smx',
+                             memoryLimit=2 ** 29)
+    writeBinaryBlocks('results/campus.bin', tiles, sensorCount, skyMatrix.hoys)
+"""
+import numpy as np
+
+from .matrixparser import readMatrix, ILLUMINANCEWEIGHTS
+
+# maximum number of values in each output block (16 MB for float32 values)
+MAXBLOCKSIZE = 2 ** 22
+
+# default memory budget for multiplyTiles in bytes (256 MB)
+MEMORYLIMIT = 2 ** 28
+
+
+def blockSize(rowSize, fixedSize=0, memoryLimit=None):
+    """Number of rows of float32 values that fit in a memory budget.
+
+    Args:
+        rowSize: Number of values in memory for each row (e.g. a row of daylight
+            coefficients and a row of results for each sensor).
+        fixedSize: Number of values in memory for all the rows (e.g. a tile of
+            the sky matrix).
+        memoryLimit: Memory budget in bytes (default: MEMORYLIMIT).
+
+    Returns:
+        Number of rows. At least one row is returned even if it doesn't fit.
+    """
+    budget = (memoryLimit or MEMORYLIMIT) // 4 - fixedSize
+    return max(1, budget // max(1, rowSize))
+
+
+def weightedSky(skyMatrix, weights=ILLUMINANCEWEIGHTS):
+    """Stack weighted components of a sky matrix for multiplication.
+
+    Args:
+        skyMatrix: Path to a sky matrix or a patches x hours x components array.
+        weights: Weights for each component (default: ILLUMINANCEWEIGHTS).
+
+    Returns:
+        A (patches * components) x hours float32 array. Row k * components + c is
+        the component c of patch k.
+    """
+    sky = readMatrix(skyMatrix) if isinstance(skyMatrix, basestring) \
+        else np.asarray(skyMatrix)
+    if sky.ndim == 2:
+        sky = sky[:, :, None]
+    patchCount, hourCount, ncomp = sky.shape
+    w = np.asarray(weights or (1,) * ncomp, dtype=np.float32)
+    assert len(w) == ncomp, \
+        "Number of weights [{}] doesn't match number of components [{}]." \
+        .format(len(w), ncomp)
+    return (sky.transpose(0, 2, 1) * w[None, :, None]) \
+        .astype(np.float32).reshape(patchCount * ncomp, hourCount)
+
+
+def multiplyBlocks(dcMatrix, skyMatrix, weights=ILLUMINANCEWEIGHTS, chunkSize=None):
+    """Multiply a daylight coefficient matrix by a sky matrix in blocks of sensors.
+
+    Args:
+        dcMatrix: Path to a daylight coefficient matrix or a sensors x patches x
+            components array.
+        skyMatrix: Path to a sky matrix, a patches x hours x components array or
+            the output of weightedSky.
+        weights: Weights for each component (default: ILLUMINANCEWEIGHTS). Use
+            None to add the components together. Weights are ignored if skyMatrix
+            is the output of weightedSky.
+        chunkSize: Number of sensors in each block (default: about 4 million
+            values in each block).
+
+    Yields:
+        Index of the first sensor and a sensors x hours float32 array for each
+        block.
+    """
+    dc = readMatrix(dcMatrix) if isinstance(dcMatrix, basestring) \
+        else np.asarray(dcMatrix)
+    if dc.ndim == 2:
+        dc = dc[:, :, None]
+    sensorCount, patchCount, ncomp = dc.shape
+
+    sky = np.asarray(skyMatrix)
+    if isinstance(skyMatrix, basestring) or sky.ndim != 2 or \
+            sky.shape[0] != patchCount * ncomp:
+        sky = weightedSky(skyMatrix, weights)
+    assert sky.shape[0] == patchCount * ncomp, \
+        "Number of sky patches [{}] doesn't match the daylight coefficients [{}]." \
+        .format(sky.shape[0] // ncomp, patchCount)
+
+    chunkSize = chunkSize or max(1, MAXBLOCKSIZE // max(1, sky.shape[1]))
+    for st in xrange(0, sensorCount, chunkSize):
+        block = dc[st:st + chunkSize].reshape(-1, patchCount * ncomp)
+        yield st, np.dot(block.astype(np.float32, copy=False), sky)
+
+
+def multiplyTiles(dcMatrix, skyMatrix, weights=ILLUMINANCEWEIGHTS, memoryLimit=None):
+    """Multiply a daylight coefficient matrix by a sky matrix in tiles.
+
+    The weighted sky is split to tiles of hours which take at most half of the
+    memory budget and the sensors are multiplied against each tile in blocks that
+    fit in the rest of the budget. Memory-mapped matrices are read from disk one
+    tile at a time so the peak memory doesn't depend on the size of the
+    matrices. The budget covers the tile of the sky, the block of daylight
+    coefficients and the results.
+
+    Args:
+        dcMatrix: Path to a daylight coefficient matrix or a sensors x patches x
+            components array.
+        skyMatrix: Path to a sky matrix or a patches x hours x components array.
+        weights: Weights for each component (default: ILLUMINANCEWEIGHTS). Use
+            None to add the components together.
+        memoryLimit: Memory budget in bytes (default: MEMORYLIMIT).
+
+    Yields:
+        Index of the first sensor, index of the first hour and a sensors x hours
+        float32 array for each tile.
+    """
+    dc = readMatrix(dcMatrix) if isinstance(dcMatrix, basestring) \
+        else np.asarray(dcMatrix)
+    if dc.ndim == 2:
+        dc = dc[:, :, None]
+    sensorCount, patchCount, ncomp = dc.shape
+
+    sky = readMatrix(skyMatrix) if isinstance(skyMatrix, basestring) \
+        else np.asarray(skyMatrix)
+    if sky.ndim == 2:
+        sky = sky[:, :, None]
+    assert sky.shape[0] == patchCount, \
+        "Number of sky patches [{}] doesn't match the daylight coefficients [{}]." \
+        .format(sky.shape[0], patchCount)
+
+    rowSize = patchCount * ncomp
+    hourCount = sky.shape[1]
+    hourChunk = max(1, min(hourCount,
+                           blockSize(rowSize, memoryLimit=memoryLimit) // 2))
+    for hst in xrange(0, hourCount, hourChunk):
+        tile = weightedSky(sky[:, hst:hst + hourChunk], weights)
+        # each sensor needs a row of daylight coefficients and a row of results
+        chunkSize = blockSize(rowSize + tile.shape[1], tile.size, memoryLimit)
+        for st, block in multiplyBlocks(dc, tile, chunkSize=chunkSize):
+            yield st, hst, block
+
+
+def multiply(dcMatrix, skyMatrix, weights=ILLUMINANCEWEIGHTS):
+    """Multiply a daylight coefficient matrix by a sky matrix.
+
+    Returns:
+        A sensors x hours float32 array.
+    """
+    return np.concatenate(
+        [block for _, block in multiplyBlocks(dcMatrix, skyMatrix, weights)])
+
+
+def assignBlocks(analysisGrids, blocks, hoys, source=None, state=None,
+                 isDirect=False):
+    """Set values of analysis grids from blocks of sensors.
+
+    Sensors are assigned to analysis grids in order. Blocks can be split between
+    two or more grids.
+
+    Args:
+        analysisGrids: List of analysis grids.
+        blocks: An iterator of (index of the first sensor, sensors x hours array)
+            (e.g. output of multiplyBlocks).
+        hoys: List of hours of the year for the columns.
+        source: Name of the source of light (default: None).
+        state: State of the source if any (default: None).
+        isDirect: Set to True if the values are direct contribution of sunlight.
+
+    Returns:
+        Analysis grids.
+    """
+    hoys = tuple(hoys)
+    # start and end index of each grid
+    ranges = []
+    st = 0
+    for ag in analysisGrids:
+        ranges.append((ag, st, st + len(ag)))
+        st += len(ag)
+
+    for bst, block in blocks:
+        assert block.shape[1] == len(hoys), \
+            "Number of hours [{}] doesn't match length of the results [{}]." \
+            .format(len(hoys), block.shape[1])
+        bend = bst + len(block)
+        for ag, gst, gend in ranges:
+            st, end = max(bst, gst), min(bend, gend)
+            if st < end:
+                ag.setValues(hoys, block[st - bst:end - bst], source, state,
+                             isDirect, startPoint=st - gst)
+
+    return analysisGrids
@@ -0,0 +1,791 @@
+"""Read and write Radiance matrices and annual results.
+
+Matrices can be in ASCII, float, double or RGBE (32-bit_rle_rgbe) format. The
+format, size and byte order of a matrix are read from its header.
+
+The body of an ASCII matrix is read in large blocks and each block is converted to
+numbers at once instead of splitting every line and converting the values one by
+one. If numpy is available blocks are parsed by numpy otherwise by the standard
+library. Binary matrices (FORMAT=float or FORMAT=double) are read directly from
+the bytes of each block or can be memory-mapped with numpy. Rows are returned as
+array('f').
+
+Usage:
+
+    from honeybee.radiance.postprocess.matrixparser import matrixRows, writeMatrix
+
+    for row in matrixRows(r"c:/ladybug/annual/results/illuminance.ill"):
+        print max(row)
+
+    # convert a matrix to binary float
+    writeMatrix(r"c:/ladybug/annual/results/illuminance.mtx",
+                matrixRows(r"c:/ladybug/annual/results/illuminance.ill"), fmt='f')
+"""
+from array import array
+from itertools import izip, chain, count
+import math
+import os
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    # IronPython
+    np = None
+
+# size of each block of text in bytes
+CHUNKSIZE = 2 ** 23
+
+# weights to convert RGB irradiance values to illuminance
+ILLUMINANCEWEIGHTS = (47.4, 119.9, 11.6)
+
+# array typecodes for binary formats in Radiance headers
+BINARYFORMATS = {'float': 'f', 'double': 'd'}
+
+# format of RGBE matrices and pictures in Radiance headers
+RGBEFORMAT = '32-bit_rle_rgbe'
+
+# Radiance formats for the format letters in -f options (e.g. rmtxop -ff)
+FORMATS = {'a': 'ascii', 'f': 'float', 'd': 'double', 'c': RGBEFORMAT}
+
+
+def readHeader(inf):
+    """Read a Radiance header from an open file.
+
+    The file will be positioned at the start of the data after reading the header.
+
+    Returns:
+        A dictionary of header variables. Keys are in upper case and values are
+        strings.
+    """
+    header = {}
+    # use readline instead of iterating the file to keep the position of the file
+    for count, line in enumerate(iter(inf.readline, '')):
+        line = line.strip()
+        if not line:
+            break
+        if count == 0 and not line.startswith('#?'):
+            raise ValueError('Invalid Radiance header: {}'.format(line))
+        if '=' in line:
+            key, value = line.split('=', 1)
+            header[key.strip().upper()] = value.strip()
+    return header
+
+
+def hasHeader(inf):
+    """Check if an open file starts with a Radiance header.
+
+    The position of the file will not change.
+    """
+    pos = inf.tell()
+    start = inf.read(2)
+    inf.seek(pos)
+    return start == '#?'
+
+
+def readMatrixHeader(filePath):
+    """Read the header of a matrix file.
+
+    Returns:
+        A dictionary of header variables and the position of the start of the data
+        in the file. The dictionary is empty for files without a header.
+    """
+    with open(filePath, 'rb') as inf:
+        header = readHeader(inf) if hasHeader(inf) else {}
+        return header, inf.tell()
+
+
+def matrixInfo(header):
+    """Get size and format of a matrix from its header.
+
+    Returns:
+        Number of rows, number of columns, number of components and format. Number
+        of rows and columns are None if they are not in the header.
+    """
+    fmt = header.get('FORMAT', 'ascii')
+    nrows = int(header['NROWS']) if 'NROWS' in header else None
+    ncols = int(header['NCOLS']) if 'NCOLS' in header else None
+    ncomp = int(header.get('NCOMP', 3 if fmt == RGBEFORMAT else 1))
+    return nrows, ncols, ncomp, fmt
+
+
+def isByteSwapped(header):
+    """Check if byte order of a binary matrix is different from this machine.
+
+    Byte order is read from BigEndian=0/1 in Radiance headers. BYTEORDER is only
+    checked for headers without BigEndian.
+    """
+    if 'BIGENDIAN' in header:
+        isBig = header['BIGENDIAN'].strip() not in ('0', '')
+    elif 'BYTEORDER' in header:
+        isBig = header['BYTEORDER'].lower() == 'bigendian'
+    else:
+        return False
+    return isBig != (sys.byteorder == 'big')
+
+
+def writeHeader(nrows, ncols, ncomp=1, fmt='a', info=None):
+    """Get a Radiance matrix header as a string.
+
+    Header of binary matrices is padded so the data starts at a multiple of 8
+    bytes.
+
+    Args:
+        nrows: Number of rows.
+        ncols: Number of columns.
+        ncomp: Number of components for each value (default: 1).
+        fmt: Format of the matrix. a for ASCII, f for float, d for double and c
+            for RGBE (default: a).
+        info: Optional list of lines to be added to the header (e.g. the command
+            which created the matrix).
+    """
+    try:
+        fmtName = FORMATS[fmt]
+    except KeyError:
+        raise ValueError(
+            'Matrix format should be a, f, d or c not {}.'.format(fmt))
+
+    lines = ['#?RADIANCE'] + list(info or ()) + \
+        ['NROWS={}'.format(nrows), 'NCOLS={}'.format(ncols),
+         'NCOMP={}'.format(ncomp), 'FORMAT={}'.format(fmtName)]
+    if fmtName in BINARYFORMATS:
+        lines.append('BigEndian={}'.format(int(sys.byteorder == 'big')))
+    header = '\n'.join(lines)
+    if fmtName in BINARYFORMATS:
+        header += ' ' * (-(len(header) + 2) % 8)
+    return header + '\n\n'
+
+
+def readResolution(inf):
+    """Read the resolution line of a Radiance picture from an open file.
+
+    Only the standard orientation (-Y rows +X columns) is supported.
+
+    Returns:
+        Number of rows and columns.
+    """
+    line = inf.readline().split()
+    if len(line) != 4 or line[0] != '-Y' or line[2] != '+X':
+        raise ValueError(
+            'Unsupported picture resolution: {}'.format(' '.join(line)))
+    return int(line[1]), int(line[3])
+
+
+def parseValues(text, weights=None):
+    """Convert a block of ASCII values to an array('f').
+
+    Args:
+        text: A string of values separated by white space.
+        weights: Optional weights to combine every len(weights) values into one
+            value (e.g. ILLUMINANCEWEIGHTS to convert RGB values to illuminance).
+    """
+    if np is not None:
+        values = np.fromstring(text, dtype=np.float64, sep=' ')
+        # numpy stops at the first value which is not a number and ignores the
+        # characters after the last number
+        if len(values) != _countValues(text):
+            raise ValueError('Failed to convert value {} in block to a number: {}'
+                             .format(len(values) + 1, text[:100].strip()))
+        if len(values):
+            float(text.rstrip().rsplit(None, 1)[-1])
+        if weights:
+            values = values.reshape(-1, len(weights)).dot(weights)
+        return array('f', values.astype(np.float32).tostring())
+
+    values = array('f', map(float, text.split()))
+    return weightValues(values, weights) if weights else values
+
+
+def _countValues(text):
+    """Count values separated by white space in a block of text with numpy."""
+    if not text:
+        return 0
+    chars = np.frombuffer(text, dtype=np.uint8)
+    isSpace = (chars == 32) | ((chars >= 9) & (chars <= 13))
+    # values start after a white space or at the start of the text
+    return int(not isSpace[0]) + np.count_nonzero(isSpace[:-1] & ~isSpace[1:])
+
+
+def weightValues(values, weights):
+    """Combine every len(weights) values in an array('f') into one value.
+
+    Args:
+        values: An array('f') of values.
+        weights: Weights for each component (e.g. ILLUMINANCEWEIGHTS).
+    """
+    if np is not None:
+        values = np.frombuffer(values, dtype=np.float32).astype(np.float64)
+        values = values.reshape(-1, len(weights)).dot(weights)
+        return array('f', values.astype(np.float32).tostring())
+
+    if len(weights) == 3:
+        wr, wg, wb = weights
+        it = iter(values)
+        return array('f', (r * wr + g * wg + b * wb for r, g, b in izip(it, it, it)))
+    ncomp = len(weights)
+    return array('f', (sum(v * w for v, w in izip(values[i:i + ncomp], weights))
+                       for i in xrange(0, len(values), ncomp)))
+
+
+def iterRows(inf, rowSize=None, weights=None, chunkSize=None):
+    """Iterate through rows of an ASCII matrix from an open file.
+
+    The file should be positioned at the start of the data.
+
+    Args:
+        inf: An open file.
+        rowSize: Number of values in each row before applying the weights (e.g.
+            NCOLS * NCOMP). If None number of values in the first line will be
+            used.
+        weights: Optional weights to combine every len(weights) values into one
+            value (e.g. ILLUMINANCEWEIGHTS to convert RGB values to illuminance).
+        chunkSize: Size of each block of text in bytes (default: CHUNKSIZE).
+
+    Returns:
+        A generator of rows as array('f').
+    """
+    chunkSize = chunkSize or CHUNKSIZE
+    ncomp = len(weights) if weights else 1
+    remainder = ''
+    pending = array('f')
+    while True:
+        block = inf.read(chunkSize)
+        if block:
+            # only parse full lines and keep the rest for the next block
+            block = remainder + block
+            cut = block.rfind('\n') + 1
+            remainder = block[cut:]
+            block = block[:cut]
+            if not block:
+                continue
+        elif remainder:
+            block, remainder = remainder, ''
+        else:
+            break
+
+        if not rowSize:
+            rowSize = len(block.lstrip().split('\n', 1)[0].split())
+            if not rowSize:
+                continue
+
+        if rowSize % ncomp != 0:
+            raise ValueError(
+                'Number of values in each row [{}] is not a multiple of number '
+                'of components [{}].'.format(rowSize, ncomp))
+
+        values = parseValues(block)
+        if pending:
+            pending.extend(values)
+            values = pending
+
+        fullSize = len(values) - len(values) % rowSize
+        pending = values[fullSize:]
+        if weights:
+            values = weightValues(values[:fullSize], weights)
+            fullSize = len(values)
+            size = rowSize // ncomp
+        else:
+            size = rowSize
+
+        for st in xrange(0, fullSize, size):
+            yield values[st:st + size]
+
+    if pending:
+        raise ValueError(
+            'Incomplete row at the end of the matrix: {} values instead of {}.'
+            .format(len(pending), rowSize))
+
+
+def iterBinaryRows(inf, rowSize, typecode='f', swap=False, weights=None,
+                   chunkSize=None):
+    """Iterate through rows of a binary matrix from an open file.
+
+    The file should be positioned at the start of the data.
+
+    Args:
+        inf: An open file.
+        rowSize: Number of values in each row before applying the weights (e.g.
+            NCOLS * NCOMP).
+        typecode: Array typecode for the values. f for float and d for double
+            (default: f).
+        swap: Set to True if the byte order of the file is different from this
+            machine (default: False).
+        weights: Optional weights to combine every len(weights) values into one
+            value (e.g. ILLUMINANCEWEIGHTS to convert RGB values to illuminance).
+        chunkSize: Size of each block in bytes (default: CHUNKSIZE).
+
+    Returns:
+        A generator of rows as array('f').
+    """
+    ncomp = len(weights) if weights else 1
+    if rowSize % ncomp != 0:
+        raise ValueError(
+            'Number of values in each row [{}] is not a multiple of number '
+            'of components [{}].'.format(rowSize, ncomp))
+
+    rowBytes = rowSize * array(typecode).itemsize
+    blockSize = max(1, (chunkSize or CHUNKSIZE) // rowBytes) * rowBytes
+    size = rowSize // ncomp
+    while True:
+        block = inf.read(blockSize)
+        if not block:
+            break
+        if len(block) % rowBytes:
+            raise ValueError(
+                'Incomplete row at the end of the matrix: {} bytes instead of {}.'
+                .format(len(block) % rowBytes, rowBytes))
+
+        if np is not None and typecode != 'f':
+            dtype = np.dtype(typecode)
+            values = np.frombuffer(block, dtype.newbyteorder('S') if swap else dtype)
+            values = array('f', values.astype(np.float32).tostring())
+        else:
+            values = array(typecode)
+            values.fromstring(block)
+            if swap:
+                values.byteswap()
+            if typecode != 'f':
+                values = array('f', values)
+
+        if weights:
+            values = weightValues(values, weights)
+
+        for st in xrange(0, len(values), size):
+            yield values[st:st + size]
+
+
+def iterRGBERows(inf, ncols, nrows=None, weights=None):
+    """Iterate through rows of an RGBE matrix or picture from an open file.
+
+    The file should be positioned at the start of the data. Each row is a scanline
+    in flat or run-length encoded format.
+
+    Args:
+        inf: An open file.
+        ncols: Number of columns.
+        nrows: Number of rows. If None rows are read to the end of the file.
+        weights: Optional weights to combine red, green and blue values into one
+            value (e.g. ILLUMINANCEWEIGHTS).
+
+    Returns:
+        A generator of rows as array('f') with r, g, b values for each column or
+        one value for each column if weights are provided.
+    """
+    for row in (xrange(nrows) if nrows is not None else count()):
+        scan = _readScanline(inf, ncols)
+        if scan is None:
+            if nrows is None:
+                return
+            raise ValueError(
+                'Matrix has {} rows instead of {}.'.format(row, nrows))
+        values = _colrValues(scan)
+        yield weightValues(values, weights) if weights else values
+
+
+def _readScanline(inf, ncols):
+    """Read an RGBE scanline as a bytearray of r, g, b, e for each column."""
+    start = inf.read(4)
+    if not start:
+        return None
+    if len(start) < 4:
+        raise ValueError('Incomplete RGBE scanline at the end of the matrix.')
+
+    head = bytearray(start)
+    if not (8 <= ncols < 0x8000 and head[0] == 2 and head[1] == 2 and
+            not head[2] & 128):
+        # flat scanline
+        scan = bytearray(start + inf.read(4 * ncols - 4))
+        if len(scan) != 4 * ncols:
+            raise ValueError('Incomplete RGBE scanline at the end of the matrix.')
+        return scan
+
+    if (head[2] << 8 | head[3]) != ncols:
+        raise ValueError('Length of RGBE scanline [{}] is not {}.'.format(
+            head[2] << 8 | head[3], ncols))
+
+    # run-length encoded scanline. Each component is encoded separately.
+    scan = bytearray(4 * ncols)
+    for comp in xrange(4):
+        col = 0
+        while col < ncols:
+            code = inf.read(1)
+            if not code:
+                raise ValueError('Incomplete RGBE scanline at the end of the matrix.')
+            code = ord(code)
+            if code > 128:
+                runSize = code - 128
+                data = inf.read(1) * runSize
+            else:
+                runSize = code
+                data = inf.read(runSize)
+            if not runSize or col + runSize > ncols or len(data) != runSize:
+                raise ValueError('Invalid run-length encoding in RGBE scanline.')
+            scan[4 * col + comp:4 * (col + runSize):4] = data
+            col += runSize
+    return scan
+
+
+def _colrValues(scan):
+    """Convert RGBE values in a scanline to an array('f') of r, g, b values."""
+    if np is not None:
+        colrs = np.frombuffer(bytes(scan), dtype=np.uint8).reshape(-1, 4)
+        exponent = colrs[:, 3].astype(int)
+        factor = np.where(exponent == 0, 0, np.ldexp(1.0, exponent - 136))
+        values = (colrs[:, :3] + 0.5) * factor[:, None]
+        return array('f', values.astype(np.float32).tostring())
+
+    values = array('f')
+    for i in xrange(0, len(scan), 4):
+        e = scan[i + 3]
+        if e == 0:
+            values.extend((0, 0, 0))
+        else:
+            f = math.ldexp(1.0, e - 136)
+            values.extend(((scan[i] + 0.5) * f, (scan[i + 1] + 0.5) * f,
+                           (scan[i + 2] + 0.5) * f))
+    return values
+
+
+def readRows(inf, header, weights=None, startRow=0, chunkSize=None):
+    """Iterate through rows of a matrix from an open file based on its header.
+
+    The file should be positioned at the start of the data.
+
+    Args:
+        inf: An open file.
+        header: Header of the matrix as a dictionary (see readHeader). An empty
+            dictionary means an ASCII matrix with a row in each line.
+        weights: Optional weights to combine every len(weights) values into one
+            value (default: None).
+        startRow: Number of rows to skip (default: 0).
+        chunkSize: Size of each block in bytes (default: CHUNKSIZE).
+
+    Returns:
+        A generator of rows as array('f').
+    """
+    nrows, ncols, ncomp, fmt = matrixInfo(header)
+    rowSize = ncols * ncomp if ncols else None
+
+    if fmt == 'ascii':
+        for i in xrange(startRow):
+            inf.readline()
+        return iterRows(inf, rowSize, weights, chunkSize)
+
+    if fmt == RGBEFORMAT:
+        if ncols is None:
+            # a Radiance picture
+            nrows, ncols = readResolution(inf)
+        rows = iterRGBERows(inf, ncols, nrows, weights)
+        for i in xrange(startRow):
+            next(rows, None)
+        return rows
+
+    try:
+        typecode = BINARYFORMATS[fmt]
+    except KeyError:
+        raise ValueError('Unsupported matrix format: {}'.format(fmt))
+    if not rowSize:
+        raise ValueError('NCOLS is missing from the header of the binary matrix.')
+
+    if startRow:
+        inf.seek(startRow * rowSize * array(typecode).itemsize, 1)
+    return iterBinaryRows(inf, rowSize, typecode, isByteSwapped(header), weights,
+                          chunkSize)
+
+
+def matrixRows(filePath, weights=None, startLine=0, chunkSize=None):
+    """Iterate through rows of a matrix file.
+
+    The file can be a Radiance matrix with a header in ASCII, float, double or RGBE
+    format or a plain ASCII file with a row in each line. If the header has NCOMP=3
+    and weights are not provided values will be converted to illuminance using
+    ILLUMINANCEWEIGHTS.
+
+    Args:
+        filePath: Full path to the matrix file.
+        weights: Optional weights to combine every len(weights) values into one
+            value (default: None).
+        startLine: Number of rows to skip after the header (default: 0).
+        chunkSize: Size of each block in bytes (default: CHUNKSIZE).
+
+    Returns:
+        A generator of rows as array('f').
+    """
+    with open(filePath, 'rb') as inf:
+        header = readHeader(inf) if hasHeader(inf) else {}
+        ncomp = int(header.get('NCOMP', 1))
+        if ncomp == 3 and not weights:
+            weights = ILLUMINANCEWEIGHTS
+
+        for row in readRows(inf, header, weights, startLine, chunkSize):
+            yield row
+
+
+def streamRows(inf, weights=None, chunkSize=None):
+    """Iterate through rows of a matrix from a stream (e.g. stdout of a command).
+
+    Unlike matrixRows the stream doesn't need to be seekable. It can be a Radiance
+    matrix with a header or a plain ASCII matrix with a row in each line. If the
+    header has NCOMP=3 and weights are not provided values will be converted to
+    illuminance using ILLUMINANCEWEIGHTS.
+
+    Args:
+        inf: An open file or pipe.
+        weights: Optional weights to combine every len(weights) values into one
+            value (default: None).
+        chunkSize: Size of each block in bytes (default: CHUNKSIZE).
+
+    Returns:
+        A generator of rows as array('f').
+    """
+    start = inf.read(2)
+    inf = _PrefixedStream(start, inf)
+    header = readHeader(inf) if start == '#?' else {}
+    ncomp = int(header.get('NCOMP', 1))
+    if ncomp == 3 and not weights:
+        weights = ILLUMINANCEWEIGHTS
+
+    for row in readRows(inf, header, weights, 0, chunkSize):
+        yield row
+
+
+class _PrefixedStream(object):
+    """A stream with a few bytes that are already read from it."""
+
+    __slots__ = ('_prefix', '_stream')
+
+    def __init__(self, prefix, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def read(self, size=-1):
+        if size < 0:
+            data, self._prefix = self._prefix + self._stream.read(), ''
+            return data
+        data, self._prefix = self._prefix[:size], self._prefix[size:]
+        if len(data) < size:
+            data += self._stream.read(size - len(data))
+        return data
+
+    def readline(self):
+        cut = self._prefix.find('\n') + 1
+        if cut:
+            line, self._prefix = self._prefix[:cut], self._prefix[cut:]
+            return line
+        line, self._prefix = self._prefix, ''
+        return line + self._stream.readline()
+
+
+def memmapMatrix(filePath, mode='r'):
+    """Memory-map the body of a binary matrix file.
+
+    This function requires numpy.
+
+    Args:
+        filePath: Full path to a matrix in float or double format.
+        mode: Mode to open the file. r for read-only and r+ for read and write
+            (default: r).
+
+    Returns:
+        A numpy memmap with the shape of rows x columns for matrices with one
+        component and rows x columns x components for matrices with more
+        components (e.g. RGB values).
+    """
+    if np is None:
+        raise NotImplementedError('Memory-mapped matrices are only available with numpy.')
+
+    header, offset = readMatrixHeader(filePath)
+    nrows, ncols, ncomp, fmt = matrixInfo(header)
+    try:
+        dtype = np.dtype(BINARYFORMATS[fmt])
+    except KeyError:
+        raise ValueError('{} is not a binary matrix: {}'.format(filePath, fmt))
+    if ncols is None:
+        raise ValueError('NCOLS is missing from header of {}.'.format(filePath))
+    if isByteSwapped(header):
+        dtype = dtype.newbyteorder('S')
+    if nrows is None:
+        nrows = (os.path.getsize(filePath) - offset) // (dtype.itemsize * ncols * ncomp)
+
+    shape = (nrows, ncols) if ncomp == 1 else (nrows, ncols, ncomp)
+    return np.memmap(filePath, dtype=dtype, mode=mode, offset=offset, shape=shape)
+
+
+def readMatrix(filePath):
+    """Read a matrix file to a numpy array.
+
+    Binary matrices are memory-mapped. ASCII and RGBE matrices are loaded to
+    memory. This function requires numpy.
+
+    Returns:
+        A rows x columns x components array.
+    """
+    if np is None:
+        raise NotImplementedError('Reading matrices to arrays is only available '
+                                  'with numpy.')
+
+    header, offset = readMatrixHeader(filePath)
+    nrows, ncols, ncomp, fmt = matrixInfo(header)
+    if fmt in BINARYFORMATS:
+        mtx = memmapMatrix(filePath)
+        return mtx.reshape(len(mtx), mtx.shape[1], ncomp)
+
+    with open(filePath, 'rb') as inf:
+        inf.seek(offset)
+        rows = [row.tostring() for row in readRows(inf, header)]
+    if not rows:
+        raise ValueError('There is no values in {}.'.format(filePath))
+
+    # use the first row for matrices without NCOLS (e.g. plain ASCII files)
+    ncols = len(rows[0]) // 4 // ncomp
+    return np.frombuffer(''.join(rows), dtype=np.float32).reshape(-1, ncols, ncomp)
+
+
+def writeMatrix(filePath, rows, ncomp=1, fmt='a', info=None):
+    """Write rows of values to a Radiance matrix file.
+
+    Rows are written one at a time so rows can be a generator (e.g. the output of
+    matrixRows) and the matrix is never fully loaded to memory.
+
+    Args:
+        filePath: Full path to the matrix file.
+        rows: An iterable of rows. Each row is a list of values with ncomp values
+            for each column (e.g. r, g, b, r, g, b, ...).
+        ncomp: Number of components for each value (default: 1).
+        fmt: Format of the matrix. a for ASCII, f for float, d for double and c
+            for RGBE. RGBE matrices should have 3 components (default: a).
+        info: Optional list of lines to be added to the header.
+
+    Returns:
+        Path to the matrix file.
+    """
+    rows = iter(rows)
+    try:
+        first = next(rows)
+    except StopIteration:
+        raise ValueError('There is no values to write to {}.'.format(filePath))
+
+    rowSize = len(first)
+    assert rowSize % ncomp == 0, ValueError(
+        'Number of values in each row [{}] is not a multiple of number of '
+        'components [{}].'.format(rowSize, ncomp))
+    assert fmt != 'c' or ncomp == 3, \
+        ValueError('RGBE matrices should have 3 components not {}.'.format(ncomp))
+    ncols = rowSize // ncomp
+
+    writeRow = _rowWriter(fmt)
+    with open(filePath, 'wb') as outf:
+        # leave the place for number of rows in the header and write it at the end
+        outf.write(writeHeader('0' * 12, ncols, ncomp, fmt, info))
+        rowCount = 0
+        for row in chain((first,), rows):
+            if len(row) != rowSize:
+                raise ValueError(
+                    'Number of values [{}] in row {} is not {}.'.format(
+                        len(row), rowCount, rowSize))
+            writeRow(outf, row)
+            rowCount += 1
+
+        outf.seek(0)
+        outf.write(writeHeader('{:>12d}'.format(rowCount), ncols, ncomp, fmt, info))
+
+    return filePath
+
+
+def stitchMatrices(filePaths, outputFile):
+    """Stack the rows of several matrix files into one matrix file.
+
+    Use it to put together the results of a calculation which is split to several
+    files of sensors. All the files should have the same number of columns,
+    components and format. Files without a header are concatenated.
+
+    Args:
+        filePaths: Full path to matrix files in the order of rows.
+        outputFile: Full path to the stitched matrix file.
+
+    Returns:
+        Path to the stitched matrix file.
+    """
+    assert filePaths, ValueError('There is no matrix file to stitch.')
+    headers = tuple(readMatrixHeader(f) for f in filePaths)
+    if any(h for h, _ in headers):
+        infos = tuple(matrixInfo(h) for h, _ in headers)
+        nrows, ncols, ncomp, fmtName = infos[0]
+        if fmtName == RGBEFORMAT:
+            raise ValueError("RGBE matrices can't be stitched.")
+        for f, (h, _), info in izip(filePaths, headers, infos):
+            if info[0] is None or info[1:] != (ncols, ncomp, fmtName) or \
+                    isByteSwapped(h):
+                raise ValueError(
+                    "Size or format of {} doesn't match {}.".format(f, filePaths[0]))
+        fmt = dict((v, k) for k, v in FORMATS.iteritems())[fmtName]
+        header = writeHeader(sum(info[0] for info in infos), ncols, ncomp, fmt)
+        isText = fmt == 'a'
+    else:
+        header = ''
+        isText = True
+
+    with open(outputFile, 'wb') as outf:
+        outf.write(header)
+        for f, (_, offset) in izip(filePaths, headers):
+            with open(f, 'rb') as inf:
+                inf.seek(offset)
+                last = ''
+                for chunk in iter(lambda: inf.read(CHUNKSIZE), ''):
+                    outf.write(chunk)
+                    last = chunk[-1]
+            if isText and last and last != '\n':
+                # make sure the next file starts from a new line
+                outf.write('\n')
+
+    return outputFile
+
+
+def _rowWriter(fmt):
+    """Get a function to write a row to an open file in a format."""
+    if fmt == 'a':
+        return lambda outf, row: outf.write(
+            '\t'.join('%.7g' % v for v in row) + '\n')
+    elif fmt == 'c':
+        return _writeScanline
+
+    typecode = BINARYFORMATS[FORMATS[fmt]]
+    if np is not None:
+        return lambda outf, row: outf.write(
+            np.asarray(row, dtype=typecode).tostring())
+    return lambda outf, row: array(typecode, row).tofile(outf)
+
+
+def _writeScanline(outf, row):
+    """Write r, g, b values as a run-length encoded RGBE scanline.
+
+    Components are written as literal runs which is valid in the run-length
+    encoded format and prevents mixing up flat scanlines with encoded ones.
+    """
+    scan = bytearray()
+    for i in xrange(0, len(row), 3):
+        scan.extend(_colr(row[i], row[i + 1], row[i + 2]))
+
+    ncols = len(scan) // 4
+    if not 8 <= ncols < 0x8000:
+        outf.write(scan)
+        return
+
+    outf.write(bytearray((2, 2, ncols >> 8, ncols & 255)))
+    for comp in xrange(4):
+        data = scan[comp::4]
+        for st in xrange(0, ncols, 128):
+            chunk = data[st:st + 128]
+            outf.write(chr(len(chunk)))
+            outf.write(chunk)
+
+
+def _colr(r, g, b):
+    """Convert r, g, b values to RGBE bytes."""
+    v = max(r, g, b)
+    if v < 1e-32:
+        return 0, 0, 0, 0
+    mantissa, exponent = math.frexp(v)
+    factor = mantissa * 256 / v
+    return int(max(r, 0) * factor), int(max(g, 0) * factor), \
+        int(max(b, 0) * factor), exponent + 128
@@ -0,0 +1,205 @@
+"""Calculate annual metrics for several analysis grids in parallel.
+
+Sensors of each grid are split into blocks and the blocks are sent to a pool of
+processes. Results are merged back in the same order as the inputs. Binary results
+are passed to the processes by path and each process only reads its own block of
+sensors from the memory-mapped file. Values of analysis grids which are loaded to
+memory are sent to the processes as arrays.
+
+This module requires numpy and multiprocessing.
+
+Usage:
+
+    from honeybee.radiance.postprocess import parallel
+
+    # convert the ASCII results to binary files using all the cores
+    binaryFiles = parallel.convertIllFiles(analysisRecipe.resultsFile, hoys)
+
+    # calculate metrics for all the grids
+    for (DA, CDA, UDI, UDI_l, UDI_m), (sDA, problematicHours) in \\
+            parallel.gridMetrics(binaryFiles, occSchedule=occSchedule):
+        print sDA
+"""
+from __future__ import division
+import numpy as np
+
+from . import annualmetrics as am
+from .binaryresults import BinaryResults
+
+import multiprocessing
+
+# minimum number of sensors in each block
+MINCHUNKSIZE = 256
+
+
+def gridMetrics(sources, occSchedule=None, DAThreshhold=None, UDIMinMax=None,
+                targetArea=None, blindsStateIds=None, processes=None, chunkSize=None):
+    """Calculate annual metrics and sDA for several grids in parallel.
+
+    Args:
+        sources: A list of inputs for each grid. Each input can be an AnalysisGrid
+            with values, a BinaryResults, a path to a binary results file or a
+            tuple of (path to a binary results file, start point, end point) for
+            grids which are written to the same file.
+        occSchedule: An annual occupancy schedule or a collection of occupied hours
+            (default: all the hours).
+        DAThreshhold: Threshhold for daylight autonomy in lux (default: 300).
+        UDIMinMax: A tuple of min, max value for useful daylight illuminance
+            (default: (100, 2000)).
+        targetArea: Minimum target area percentage for sDA (default: 55).
+        blindsStateIds: List of state ids for all the sources for each hour. It is
+            only used for AnalysisGrids (default: state 0 for all the sources).
+        processes: Number of processes (default: number of cpus). Use 1 to
+            calculate the metrics in this process.
+        chunkSize: Number of sensors in each block (default: about 4 blocks for
+            each process).
+
+    Returns:
+        A tuple for each input as ((Daylight autonomy, Continious daylight autonomy,
+        Useful daylight illuminance, Less than UDI, More than UDI), (sDA, Problematic
+        hours)). Metrics for sensors are lists with a value for each sensor.
+    """
+    DAThreshhold = DAThreshhold or 300.0
+    UDIMinMax = UDIMinMax or (100, 2000)
+    targetArea = targetArea or 55
+    processes = processes or multiprocessing.cpu_count()
+
+    grids = tuple(_gridInput(s, blindsStateIds) for s in sources)
+    occupancies = tuple(am.occupancyMask(hoys, occSchedule) for _, _, _, hoys in grids)
+    for occupancy in occupancies:
+        if not occupancy.any():
+            raise ValueError('There is 0 hours available in the schedule.')
+
+    sensorCount = sum(end - st for _, st, end, _ in grids)
+    if not chunkSize:
+        chunkSize = max(MINCHUNKSIZE, -(-sensorCount // (4 * processes)))
+
+    tasks = (
+        (gridId, block, occupancy, DAThreshhold, UDIMinMax)
+        for gridId, ((values, st, end, _), occupancy) in
+        enumerate(zip(grids, occupancies))
+        for block in _blocks(values, st, end, chunkSize)
+    )
+
+    blocks = [[] for g in grids]
+    for gridId, block in _imap(_blockMetrics, tasks, processes):
+        blocks[gridId].append(block)
+
+    return tuple(
+        _mergeBlocks(gridBlocks, end - st, hoys, occupancy, targetArea)
+        for gridBlocks, (_, st, end, hoys), occupancy
+        in zip(blocks, grids, occupancies)
+    )
+
+
+def convertIllFiles(illFiles, hoys=None, reuse=True, processes=None):
+    """Convert ASCII results files to binary results files in parallel.
+
+    Args:
+        illFiles: List of full paths to ASCII results files.
+        hoys: List of hours of the year for the columns (default: 0..NCOLS-1).
+        reuse: Reuse the binary files if they are newer than the ASCII files and
+            have the same hours (default: True).
+        processes: Number of processes (default: number of cpus).
+
+    Returns:
+        Full paths to the binary files in the same order as illFiles.
+    """
+    hoys = tuple(hoys) if hoys is not None else None
+    processes = processes or multiprocessing.cpu_count()
+    tasks = ((illFile, hoys, reuse) for illFile in illFiles)
+    return list(_imap(_convertIllFile, tasks, processes))
+
+
+def _gridInput(source, blindsStateIds):
+    """Get values, start point, end point and hoys for an input."""
+    if hasattr(source, 'isAnalysisGrid'):
+        if not source.hasValues:
+            raise ValueError('No values are assigned to {}.'.format(source.name))
+        total, _ = am.combinedValues(source.store, blindsStateIds)
+        return total, 0, len(total), source.hoys
+
+    if isinstance(source, (tuple, list)):
+        filePath, st, end = source
+    else:
+        filePath, st, end = source, 0, None
+
+    res = source if isinstance(source, BinaryResults) else BinaryResults(filePath)
+    end = len(res) if end is None else min(end, len(res))
+    assert 0 <= st <= end, \
+        'Invalid range of points for {}: {}-{}'.format(res.filePath, st, end)
+    return res.filePath, st, end, res.hoys
+
+
+def _blocks(values, st, end, chunkSize):
+    """Split a grid to blocks of sensors.
+
+    Arrays are sliced here so only the values of each block are sent to the
+    processes. Binary results files are sent as (path, start point, end point).
+    """
+    for bst in xrange(st, end, chunkSize):
+        bend = min(bst + chunkSize, end)
+        if isinstance(values, basestring):
+            yield values, bst, bend
+        else:
+            yield values[bst:bend]
+
+
+def _imap(func, tasks, processes):
+    """Map func to tasks in a pool of processes and yield results in order."""
+    if processes == 1:
+        for task in tasks:
+            yield func(task)
+        return
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        for res in pool.imap(func, tasks):
+            yield res
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def _blockMetrics(task):
+    """Calculate metrics for a block of sensors in a process.
+
+    The block is either an array of values or (path to a binary results file,
+    start point, end point).
+    """
+    gridId, block, occupancy, DAThreshhold, UDIMinMax = task
+    if isinstance(block, tuple):
+        filePath, st, end = block
+        values = np.asarray(BinaryResults(filePath).array[st:end])
+    else:
+        values = np.asarray(block)
+    metrics = am.annualMetrics(values, occupancy, DAThreshhold, UDIMinMax,
+                               chunkSize=len(values))
+    counts = np.count_nonzero(values > DAThreshhold, axis=0)
+    return gridId, (metrics, counts)
+
+
+def _mergeBlocks(blocks, sensorCount, hoys, occupancy, targetArea):
+    """Merge metrics for blocks of sensors of a grid."""
+    if not blocks:
+        return tuple([] for i in xrange(5)), (0, [])
+
+    metrics = tuple(np.concatenate(m).tolist()
+                    for m in zip(*(metrics for metrics, _ in blocks)))
+    counts = sum(counts for _, counts in blocks)
+
+    # minimum number of points to meet the targetArea
+    target = np.ceil(targetArea * sensorCount / 100)
+    passed = (counts >= target) & occupancy
+    sda = np.count_nonzero(passed) / np.count_nonzero(occupancy)
+    problematicHours = [hoys[i] for i in (occupancy & ~passed).nonzero()[0]]
+    return metrics, (sda, problematicHours)
+
+
+def _convertIllFile(task):
+    """Convert an ASCII results file to binary in a process."""
+    illFile, hoys, reuse = task
+    return BinaryResults.fromIllFile(illFile, hoys=hoys, reuse=reuse).filePath
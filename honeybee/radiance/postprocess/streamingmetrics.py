@@ -0,0 +1,203 @@
+"""Calculate annual metrics while reading the results one sensor at a time.
+
+Hourly values are not stored. Only the metrics for each sensor and the number of
+sensors above the threshhold for each hour (for sDA) are kept in memory which
+makes the peak memory independent of the size of the grid. Results are the same
+as AnalysisGrid.annualMetrics, spatialDaylightAutonomy and annualSolarExposure.
+
+Usage:
+
+    from honeybee.radiance.postprocess.matrixparser import matrixRows
+    from honeybee.radiance.postprocess.streamingmetrics import AnnualMetricsStream
+
+    stream = AnnualMetricsStream(hoys, occSchedule)
+    for values in matrixRows(r"c:/ladybug/annual/results/illuminance.ill"):
+        stream.add(values)
+    DA, CDA, UDI, UDI_l, UDI_m = stream.annualMetrics()
+"""
+from __future__ import division
+from itertools import izip
+
+try:
+    import numpy as np
+except ImportError:
+    # IronPython
+    np = None
+
+
+class AnnualMetricsStream(object):
+    """Accumulate annual metrics for sensors one at a time.
+
+    Attributes:
+        hoys: Hours of the year for the values of each sensor in order.
+        occSchedule: An annual occupancy schedule or a collection of occupied hours
+            (default: all the hours).
+        DAThreshhold: Threshhold for daylight autonomy in lux (default: 300).
+        UDIMinMax: A tuple of min, max value for useful daylight illuminance
+            (default: (100, 2000)).
+        ASEThreshhold: Threshhold for direct illuminance in lux (default: 1000).
+    """
+
+    __slots__ = ('_hoys', '_occupied', '_occCount', '_DAThreshhold', '_UDIMinMax',
+                 '_ASEThreshhold', '_metrics', '_sDACounts', '_exposedHours')
+
+    def __init__(self, hoys, occSchedule=None, DAThreshhold=None, UDIMinMax=None,
+                 ASEThreshhold=None):
+        """Create an annual metrics stream."""
+        self._hoys = tuple(hoys)
+        schedule = occSchedule or set(self._hoys)
+        # column index of occupied hours
+        self._occupied = tuple(c for c, h in enumerate(self._hoys) if h in schedule)
+        self._occCount = len(self._occupied)
+        if self._occCount == 0:
+            raise ValueError('There is 0 hours available in the schedule.')
+
+        self._DAThreshhold = DAThreshhold or 300.0
+        self._UDIMinMax = UDIMinMax or (100, 2000)
+        self._ASEThreshhold = ASEThreshhold or 1000
+
+        self._metrics = ([], [], [], [], [])
+        self._sDACounts = [0] * self._occCount
+        self._exposedHours = []
+
+        if np is not None:
+            self._occupied = np.array(self._occupied, dtype=int)
+            self._sDACounts = np.zeros(self._occCount, dtype=int)
+
+    @property
+    def hoys(self):
+        """Hours of the year for the values of each sensor."""
+        return self._hoys
+
+    @property
+    def sensorCount(self):
+        """Number of sensors which are added to this stream."""
+        return len(self._metrics[0])
+
+    def add(self, values, directValues=None):
+        """Add values for the next sensor.
+
+        Args:
+            values: Total illuminance values for all the hours.
+            directValues: Optional direct illuminance values for all the hours to
+                calculate annual solar exposure.
+        """
+        assert len(values) == len(self._hoys), \
+            "Number of values [{}] doesn't match number of hours [{}]." \
+            .format(len(values), len(self._hoys))
+
+        if np is not None:
+            metrics = self._addArray(values)
+        else:
+            metrics = self._addValues(values)
+
+        for c, m in enumerate(metrics):
+            self._metrics[c].append(m)
+
+        if directValues is not None:
+            threshhold = self._ASEThreshhold
+            if np is not None:
+                direct = np.asarray(directValues, dtype=np.float32)[self._occupied]
+                exposed = np.count_nonzero(direct > threshhold)
+            else:
+                exposed = sum(1 for c in self._occupied
+                              if directValues[c] > threshhold)
+            self._exposedHours.append(exposed)
+
+    def _addArray(self, values):
+        """Calculate the metrics for a sensor using numpy."""
+        v = np.asarray(values, dtype=np.float32)[self._occupied]
+        th = self._DAThreshhold
+        udiMin, udiMax = self._UDIMinMax
+        self._sDACounts += v > th
+        da = np.count_nonzero(v >= th)
+        cda = np.minimum(v / th, 1).sum()
+        udiL = np.count_nonzero(v < udiMin)
+        udiM = np.count_nonzero(v > udiMax)
+        count = float(self._occCount)
+        return da / count, float(cda) / count, (count - udiL - udiM) / count, \
+            udiL / count, udiM / count
+
+    def _addValues(self, values):
+        """Calculate the metrics for a sensor in python."""
+        th = self._DAThreshhold
+        udiMin, udiMax = self._UDIMinMax
+        counts = self._sDACounts
+        DA = CDA = UDI = UDI_l = UDI_m = 0
+        for i, c in enumerate(self._occupied):
+            v = values[c]
+            if v > th:
+                counts[i] += 1
+            if v >= th:
+                DA += 1
+                CDA += 1
+            else:
+                CDA += v / th
+
+            if v < udiMin:
+                UDI_l += 1
+            elif v > udiMax:
+                UDI_m += 1
+            else:
+                UDI += 1
+
+        count = self._occCount
+        return DA / count, CDA / count, UDI / count, UDI_l / count, UDI_m / count
+
+    def annualMetrics(self):
+        """Daylight autonomy, continious daylight autonomy and useful daylight illuminance.
+
+        Returns:
+            Daylight autonomy, Continious daylight autonomy, Useful daylight illuminance,
+            Less than UDI, More than UDI as a list with a value for each sensor.
+        """
+        return tuple(list(m) for m in self._metrics)
+
+    def spatialDaylightAutonomy(self, targetArea=None):
+        """Calculate Spatial Daylight Autonomy (sDA).
+
+        Args:
+            targetArea: Minimum target area percentage (default: 55).
+
+        Returns:
+            Fraction of occupied hours that meet the target, Problematic hours
+        """
+        targetArea = targetArea or 55
+        target = targetArea * self.sensorCount / 100
+        problematicHours = [self._hoys[c] for c, count
+                            in izip(self._occupied, self._sDACounts)
+                            if count < target]
+        return 1 - len(problematicHours) / self._occCount, problematicHours
+
+    def annualSolarExposure(self, targetHours=None, targetArea=None):
+        """Annual Solar Exposure (ASE).
+
+        Direct values should be added for all the sensors.
+
+        Args:
+            targetHours: Minimum targe hours for each point (default: 250).
+            targetArea: Minimum target area percentage for this grid (default: 10)
+
+        Returns:
+            Success as a Boolean, Percentage area, Index of problematic points,
+            Number of exposed hours for each point.
+        """
+        if len(self._exposedHours) != self.sensorCount:
+            raise ValueError('Direct values are not added to calculate ASE.')
+
+        targetHours = targetHours or 250
+        targetArea = targetArea or 10
+        problematicPoints = [c for c, h in enumerate(self._exposedHours)
+                             if h > targetHours]
+        percentage = 100 * len(problematicPoints) / self.sensorCount
+        return percentage < targetArea, percentage, problematicPoints, \
+            list(self._exposedHours)
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Annual metrics stream representation."""
+        return 'AnnualMetricsStream::#{}::#{}hours'.format(
+            self.sensorCount, self._occCount)
@@ -1,4 +1,5 @@
 """Post process results for Honeybee sunlighthours analysis."""
+from .matrixparser import matrixRows
 
 
 # TODO: Implement loading the results in parallel for large files
@@ -58,22 +59,17 @@ class LoadSunlighthoursResults(object):
                 self.__results.append(self.readSunlighthourResult(resultFile))
 
     @staticmethod
-    def __parseline(line):
-        _values = line.strip().split("\t")
-        _rgb = [_values[x:x + 3] for x in xrange(0, len(_values), 3)]
-
-        return [1 if sum(map(float, v)) > 0 else 0 for v in _rgb]
+    def __parseline(row):
+        """Count the number of sun positions with a contribution."""
+        return sum(1 for v in row if v > 0)
 
     def readSunlighthourResult(self, resultFile):
         """Read results of sunlight hours analysis."""
         try:
-            with open(resultFile, 'rb', 10) as inf:
-                for c, line in enumerate(inf):
-                    if c < 10:
-                        continue
-                    # here is the results for the test point
-                    results = self.__parseline(line)
-                    yield sum(results) / float(self.timeStep)
-                    # print "{} Hours >> {}".format(sum(results), results)
+            # add the RGB values for each sun together
+            for row in matrixRows(resultFile, (1, 1, 1)):
+                # here is the results for the test point
+                yield self.__parseline(row) / float(self.timeStep)
         except Exception as e:
-            "Failed to load the results from {}: {}".format(resultFile, e)
+            raise ValueError(
+                "Failed to load the results from {}: {}".format(resultFile, e))
@@ -0,0 +1,200 @@
+"""Combine contributions of window groups for many blind schedules.
+
+Results of multi-phase daylight analysis keep the contribution of each window
+group (source) and state separately and the results for a blind schedule are the
+sum of the contribution of the selected state of each window group for each
+hour. Superposition copies the contributions once to a states x hours x sensors
+array with unassigned values set to 0. After that, the results for a schedule
+take one gather-and-sum over that array for each window group. Use it to
+evaluate thousands of candidate schedules (e.g. to find the trade-off between
+sDA and ASE).
+
+This module requires numpy.
+
+Usage:
+
+    from honeybee.radiance.postprocess import annualmetrics as am
+
+    sp = analysisGrid.superposition()
+    occupancy = am.occupancyMask(sp.hoys, occSchedule)
+    for schedule in schedules:
+        # a state for each hour for south and the first state for west
+        total, direct = sp.values({'south': schedule, 'west': 0})
+        sda, _ = am.spatialDaylightAutonomy(total, occupancy)
+        ase = am.annualSolarExposure(direct, occupancy)[1]
+"""
+import numpy as np
+
+
+class Superposition(object):
+    """Contributions of window groups and states of a ResultStore.
+
+    Attributes:
+        store: A ResultStore or a ResultStoreView with values.
+        hoys: An optional list of hours of the year (default: all the hours in
+            the store).
+    """
+
+    __slots__ = ('_sources', '_states', '_hoys', '_stateCounts', '_table', '_total',
+                 '_direct')
+
+    def __init__(self, store, hoys=None):
+        """Collect the contributions of a result store."""
+        if not store.hasValues:
+            raise ValueError('No values are assigned to this store.')
+
+        self._sources = tuple(store.sources)
+        self._hoys = tuple(hoys) if hoys is not None else tuple(store.hoys)
+        hourIds = np.asarray(store.hoyIds(self._hoys), dtype=int)
+
+        self._states = tuple(store.sourceStates(s) for s in self._sources)
+        slots = [[store.slotId(sid, stateid) for stateid in xrange(len(states))]
+                 for sid, states in enumerate(self._states)]
+        self._stateCounts = np.array([len(s) for s in slots], dtype=int)
+        # slot for each source and state. The last column is an empty slot for
+        # sources which are turned off (-1).
+        slotCount = store.slotCount
+        self._table = np.full((len(slots), self._stateCounts.max() + 1), slotCount,
+                              dtype=int)
+        for sid, s in enumerate(slots):
+            self._table[sid, :len(s)] = s
+
+        values = store.asArray()[:, :, hourIds]
+        pointCount = values.shape[1]
+        self._total = np.zeros((slotCount + 1, len(hourIds), pointCount),
+                               dtype=np.float32)
+        self._total[:slotCount] = np.nan_to_num(values[..., 0].transpose(0, 2, 1))
+        if store.hasDirectValues:
+            self._direct = np.zeros_like(self._total)
+            self._direct[:slotCount] = \
+                np.nan_to_num(values[..., 1].transpose(0, 2, 1))
+        else:
+            self._direct = None
+
+    @property
+    def sources(self):
+        """Name of sources (window groups)."""
+        return self._sources
+
+    @property
+    def states(self):
+        """Name of states for each source."""
+        return self._states
+
+    @property
+    def hoys(self):
+        """Hours of the year for the columns of the values."""
+        return self._hoys
+
+    @property
+    def pointCount(self):
+        """Number of points."""
+        return self._total.shape[2]
+
+    @property
+    def hasDirectValues(self):
+        """Check if direct values are available."""
+        return self._direct is not None
+
+    def stateIds(self, schedule=None):
+        """Convert a blind schedule to an hours x sources array of state ids.
+
+        Args:
+            schedule: State of each source for each hour. It can be an hours x
+                sources list of state ids similar to blindsStateIds, a state id for
+                each source for all the hours or a dictionary of source name to a
+                state or a list of states for each hour. States in a dictionary can
+                be names or ids and missing sources are set to state 0. Use -1 to
+                turn a source off (default: state 0 for all the sources).
+
+        Returns:
+            An hours x sources integer array.
+        """
+        hourCount, sourceCount = len(self._hoys), len(self._sources)
+        if schedule is None:
+            return np.zeros((hourCount, sourceCount), dtype=int)
+
+        if isinstance(schedule, dict):
+            states = np.zeros((hourCount, sourceCount), dtype=int)
+            for source, sourceStates in schedule.iteritems():
+                try:
+                    sid = self._sources.index(source)
+                except ValueError:
+                    raise ValueError('Invalid source input: {}'.format(source))
+                states[:, sid] = self._sourceStateIds(sid, sourceStates)
+        else:
+            states = np.asarray(schedule, dtype=int)
+            if states.ndim == 1:
+                states = np.tile(states, (hourCount, 1))
+
+        assert states.shape == (hourCount, sourceCount), \
+            'There should be a state for each source for each hour. ' \
+            '#hours x #sources[{}] != {}'.format((hourCount, sourceCount),
+                                                 states.shape)
+        if states.size and (states.min() < -1 or
+                            (states.max(axis=0) >= self._stateCounts).any()):
+            raise ValueError('Invalid state id in the schedule.')
+        return states
+
+    def _sourceStateIds(self, sid, states):
+        """Convert state names of a source to state ids."""
+        if isinstance(states, np.ndarray) and states.dtype.kind in 'iu':
+            return states
+        if isinstance(states, basestring) or np.isscalar(states):
+            states = (states,)
+        names = self._states[sid]
+        try:
+            return np.asarray([names.index(s) if isinstance(s, basestring) else s
+                               for s in states], dtype=int)
+        except ValueError:
+            raise ValueError('Invalid state input for {}.'.format(self._sources[sid]))
+
+    def values(self, schedule=None, direct=True):
+        """Get total and direct values for a blind schedule.
+
+        Args:
+            schedule: State of each source for each hour (see stateIds).
+            direct: Set to False to skip direct values (default: True).
+
+        Returns:
+            total, direct as sensors x hours float32 arrays. direct is None if
+            direct values are not available or direct is False.
+        """
+        slots = self._table[np.arange(len(self._sources)), self.stateIds(schedule)]
+        total = self._gather(self._total, slots)
+        if not direct or self._direct is None:
+            return total, None
+        return total, self._gather(self._direct, slots)
+
+    def iterValues(self, schedules, direct=True):
+        """Get total and direct values for several blind schedules.
+
+        Yields:
+            total, direct as sensors x hours arrays for each schedule.
+        """
+        for schedule in schedules:
+            yield self.values(schedule, direct)
+
+    def _gather(self, data, slots):
+        """Add values of the slot of each source for each hour."""
+        hours = np.arange(len(self._hoys))
+        res = None
+        for col in slots.T:
+            # use the whole slot if the state doesn't change
+            values = data[col[0]] if (col == col[0]).all() else data[col, hours]
+            if res is None:
+                res = np.array(values)
+            else:
+                res += values
+        if res is None:
+            res = np.zeros(data.shape[1:], dtype=np.float32)
+        return res.T
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Superposition representation."""
+        return 'Superposition::#{}sources::#{}points::#{}hours'.format(
+            len(self._sources), self.pointCount, len(self._hoys))
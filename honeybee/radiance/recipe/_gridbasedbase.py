@@ -25,6 +25,9 @@ class GenericGridBased(AnalysisRecipe):
             classmethod to create the recipe by points and vectors.
         hbObjects: An optional list of Honeybee surfaces or zones (Default: None).
         subFolder: Analysis subfolder for this recipe. (Default: "gridbased")
+        shardCount: Number of files to split the sensors to. Recipes which support
+            sharding calculate each shard by a separate command that can run in
+            parallel (Default: None).
     """
 
     __metaclass__ = ABCMeta
@@ -34,6 +37,9 @@ class GenericGridBased(AnalysisRecipe):
         # keep track of original points for re-structuring them later on
         AnalysisRecipe.__init__(self, hbObjects=hbObjects, subFolder=subFolder)
         self.analysisGrids = analysisGrids
+        self.shardCount = None
+        # stitched file and shard files for each sharded output
+        self._shards = ()
 
     @classmethod
     def fromPointsAndVectors(cls, pointGroups, vectorGroups=None, hbObjects=None,
@@ -69,6 +75,21 @@ class GenericGridBased(AnalysisRecipe):
             assert hasattr(ag, 'isAnalysisGrid'), \
                 '{} is not an AnalysisGrid.'.format(ag)
 
+    @property
+    def shardCount(self):
+        """Number of files to split the sensors to.
+
+        The results of the shards are stitched back to one file in the original
+        order of the sensors before they are loaded. Use it with run(...,
+        cpuCount) to calculate the shards in parallel. None or 1 calculates all
+        the sensors in one command.
+        """
+        return self._shardCount
+
+    @shardCount.setter
+    def shardCount(self, count):
+        self._shardCount = max(1, int(count)) if count else 1
+
     @property
     def points(self):
         """Return nested list of points."""
@@ -144,6 +165,53 @@ class GenericGridBased(AnalysisRecipe):
         return writeToFile(os.path.join(targetDir, fileName),
                            self.toRadStringPoints() + "\n", mkdir)
 
+    def writePointShards(self, targetDir, fileName):
+        """Write points to shardCount files with a balanced number of points.
+
+        Args:
+            targetDir: Path to project directory (e.g. c:/ladybug)
+            fileName: File name as string. Points will be saved as
+                fileName_shard<i>of<n>.pts. If there is only one shard points
+                will be saved as fileName.pts.
+
+        Returns:
+            A list of (path, number of points) for each shard.
+        """
+        lines = self.toRadStringPoints().split('\n')
+        count = min(self.shardCount, len(lines))
+        if count == 1:
+            return [(self.writePointsToFile(targetDir, fileName), len(lines))]
+
+        size, extra = divmod(len(lines), count)
+        shards = []
+        st = 0
+        for i in xrange(count):
+            end = st + size + (i < extra)
+            shardFile = os.path.join(
+                targetDir, self.shardName(fileName, i, count) + '.pts')
+            shards.append(
+                (writeToFile(shardFile, '\n'.join(lines[st:end]) + '\n'), end - st))
+            st = end
+        return shards
+
+    @staticmethod
+    def shardName(name, index, count):
+        """Name of a shard (e.g. room_shard0of4)."""
+        return '{}_shard{}of{}'.format(name, index, count)
+
+    def stitchShards(self):
+        """Stitch the results of shards to one file for each sharded output.
+
+        Files are only stitched if they don't exist or they are older than the
+        shards.
+        """
+        from ..postprocess.matrixparser import stitchMatrices
+        for target, shards in self._shards:
+            if os.path.isfile(target) and os.path.getmtime(target) >= \
+                    max(os.path.getmtime(f) for f in shards):
+                continue
+            stitchMatrices(shards, target)
+
     @abstractmethod
     def results(self):
         """Return results for this analysis."""
@@ -2,10 +2,12 @@
 from ...futil import preparedir, writeToFile, copyFilesToFolder, \
     getRadiancePathLines
 from ..radfile import RadFile
+from ..runmanager import CommandGraph, LocalExecutor
 
 from collections import namedtuple
 import os
 import subprocess
+import time
 
 
 class AnalysisRecipe(object):
@@ -14,6 +16,11 @@ class AnalysisRecipe(object):
     Attributes:
         hbObjects: An optional list of Honeybee surfaces or zones (Default: None).
         subFolder: Sub-folder for this analysis recipe. (e.g. "gridbased")
+        cache: An optional ArtifactCache. Outputs of cached commands are reused
+            from the cache if their inputs are the same and files are not reused
+            by their names (Default: None).
+        runReport: RunReport with time, memory and file sizes of each command from
+            the last run with cpuCount or progress (Default: None).
     """
 
     def __init__(self, hbObjects=None, subFolder=None, scene=None):
@@ -33,6 +40,16 @@ class AnalysisRecipe(object):
 
         self.resultsFile = []
         self.commands = []
+        self._commandGraph = None
+        # key and output file for commands that should be added to the cache
+        self._cacheEntries = []
+        # key of the command which writes each file in the last write
+        self._outputKeys = {}
+        self.cache = None
+        """An optional ArtifactCache to reuse the outputs of commands."""
+        self.runReport = None
+        """RunReport of the last run with cpuCount or progress."""
+
         self.isCalculated = False
         self.isChanged = True
 
@@ -112,6 +129,65 @@ class AnalysisRecipe(object):
         else:
             return dirLine
 
+    @property
+    def commandGraph(self):
+        """Dependency graph of commands from the last write.
+
+        Commands which don't depend on each other can run in parallel. Use run
+        with cpuCount to execute the graph instead of the batch file.
+        """
+        return self._commandGraph
+
+    def _startCommands(self, targetFolder, header=True):
+        """Clear commands and start a new command graph for targetFolder."""
+        self.commands = []
+        self._commandGraph = CommandGraph(targetFolder)
+        self._cacheEntries = []
+        self._outputKeys = {}
+        if header:
+            self.commands.append(self.header(targetFolder))
+
+    def _addCommand(self, command, comment=None):
+        """Add a Radiance command to commands and to the command graph.
+
+        If the output of the command is in the cache the output is copied from the
+        cache and the command is not added. Inputs which are written by earlier
+        commands are keyed by the key of those commands and not by the files from
+        the last run.
+
+        Args:
+            command: A Radiance command.
+            comment: An optional comment line for the batch file (e.g. ':: sky').
+        """
+        if self.cache is not None and self._commandGraph is not None:
+            workingDir = self._commandGraph.workingDir
+            entry = self.cache.commandEntry(command, workingDir, self._outputKeys)
+            key = entry[0] if entry else \
+                self.cache.commandKey(command, workingDir, self._outputKeys)
+            for outputFile in self.cache.outputFiles(command, workingDir):
+                self._outputKeys[outputFile] = key
+            if entry:
+                key, outputFile = entry
+                if self.cache.get(key, outputFile):
+                    self.commands.append(':: {} is copied from cache'.format(
+                        os.path.relpath(outputFile, self._commandGraph.workingDir)))
+                    return
+                self._cacheEntries.append(entry)
+
+        if comment:
+            self.commands.append(comment)
+        self.commands.append(command.toRadString())
+        if self._commandGraph is not None:
+            self._commandGraph.add(command, comment)
+
+    def _canReuse(self, filePath, reuse=True):
+        """Check if an existing file can be reused by its name.
+
+        Files are not reused by their names if there is a cache. The cache reuses
+        the output of a command only if its inputs are the same.
+        """
+        return reuse and self.cache is None and os.path.isfile(filePath)
+
     def prepareSubFolder(self, targetFolder,
                          subFolders=('.tmp', 'objects', 'skies', 'results'),
                          removeContent=True):
@@ -287,22 +363,74 @@ class AnalysisRecipe(object):
         return files(_path, geoFile, matFile, sceneRadFiles, sceneMatFiles,
                      sceneOctFiles)
 
-    # TODO: Write a runmanager class to handle runs
-    def run(self, commandFile, debug=False):
-        """Run the analysis."""
+    def run(self, commandFile, debug=False, cpuCount=None, progress=None):
+        """Run the analysis.
+
+        Args:
+            commandFile: Full path to the batch file from write.
+            debug: Set to True to add a pause to the end of the batch file.
+            cpuCount: Number of cores to run the commands in parallel. If set, the
+                commands in commandGraph are executed by a LocalExecutor and each
+                command writes its output to a log file under logs folder. Time,
+                memory and file sizes of each command are written to
+                logs\\runreport.json (default: None).
+            progress: An optional function which is called after each command with
+                the CommandRecord of the command, number of finished commands and
+                total number of commands. If set, the commands are executed by a
+                LocalExecutor on a single core if cpuCount is not set
+                (default: None).
+        """
         assert os.path.isfile(commandFile), \
             ValueError('Failed to find command file: {}'.format(commandFile))
 
-        if debug:
-            with open(commandFile, "a") as bf:
-                bf.write("\npause\n")
+        startTime = time.time()
+        if (cpuCount or progress) and self._commandGraph is not None:
+            executor = LocalExecutor(cpuCount or 1)
+            try:
+                executor.run(self._commandGraph, progress, os.path.join(
+                    self._commandGraph.workingDir, 'logs', 'runreport.json'))
+            except Exception:
+                # outputs of the failed command can be partial
+                self._cacheEntries = []
+                raise
+            finally:
+                self.runReport = executor.report
+        else:
+            if debug:
+                with open(commandFile, "a") as bf:
+                    bf.write("\npause\n")
 
-        subprocess.call(commandFile)
+            exitCode = subprocess.call(commandFile)
+            if exitCode != 0:
+                print '%s failed with exit code %d. Outputs are not added to ' \
+                    'the cache.' % (commandFile, exitCode)
+                self._cacheEntries = []
 
+        self._cacheOutputs(startTime)
         self.isCalculated = True
         # self.isChanged = False
         return True
 
+    def _cacheOutputs(self, startTime=None):
+        """Add the outputs of the commands from the last write to the cache.
+
+        Call this method only after a successful run. Files which are not written
+        after startTime are left from an earlier run and are not added.
+        """
+        if not self._cacheEntries:
+            return
+        # some file systems keep modification time in whole seconds
+        startTime = int(startTime) if startTime is not None else None
+        for key, outputFile in self._cacheEntries:
+            # empty files are the result of failed commands
+            if not os.path.isfile(outputFile) or not os.path.getsize(outputFile):
+                continue
+            if startTime is not None and os.path.getmtime(outputFile) < startTime:
+                continue
+            self.cache.put(key, outputFile, evict=False)
+        self.cache.evict()
+        self._cacheEntries = []
+
     @property
     def legendParameters(self):
         """Returns suggested legend parameters for this recipe."""
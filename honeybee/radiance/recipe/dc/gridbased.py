@@ -1,11 +1,15 @@
 from ..radrecutil import coeffMatrixCommands, skyReceiver, \
-    matrixCalculation, convertMatrixResults, skymtxToGendaymtx
+    matrixCalculation, convertMatrixResults, skymtxToGendaymtx, checkMatrixFormat
 from .._gridbasedbase import GenericGridBased
+from ...command.pipeline import Pipeline
 from ...parameters.rfluxmtx import RfluxmtxParameters
 from ...sky.skymatrix import SkyMatrix
+from ...postprocess.matrixparser import matrixRows
+from ...postprocess.streamingmetrics import AnnualMetricsStream
 from ....futil import writeToFile
 
 import os
+from itertools import izip, islice
 
 
 # TODO: implement simulationType
@@ -23,6 +27,26 @@ class DaylightCoeffGridBased(GenericGridBased):
             should be an instance of RfluxmtxParameters.
         hbObjects: An optional list of Honeybee surfaces or zones (Default: None).
         subFolder: Analysis subfolder for this recipe. (Default: "daylightcoeff").
+        matrixFormat: Format of the matrices and the results. a for ASCII, f for
+            binary float and d for binary double. Binary matrices are smaller and
+            faster to write and read. Use ASCII to read the matrices in a text
+            editor (Default: a).
+        multiplyInProcess: Set to True to multiply the daylight coefficients by the
+            sky matrix in Python instead of dctimestep and rmtxop. The results are
+            assigned directly to the analysis grids and no results file is
+            written. Requires numpy (Default: False).
+        memoryLimit: Memory budget in bytes for writing binary results with
+            multiplyInProcess. Sensors and hours are multiplied in tiles that fit
+            in the budget and are written to the results file as they are
+            calculated (Default: 256 MB).
+        shardCount: Number of files to split the sensors to. Each shard has its own
+            rfluxmtx command and the results are stitched back together in the
+            original order of sensors. Run the recipe with cpuCount to calculate
+            the shards in parallel (Default: None).
+        pipeResults: Set to True to read the results directly from the output of
+            dctimestep | rmtxop in results instead of writing them to
+            results\\illuminance.ill. The matrix calculations are not added to the
+            batch file and run when the results are loaded (Default: False).
 
 
     Usage:
@@ -60,6 +84,12 @@ class DaylightCoeffGridBased(GenericGridBased):
 
         self.radianceParameters = radianceParameters
         self.reuseDaylightMtx = reuseDaylightMtx
+        self.matrixFormat = 'a'
+        self.multiplyInProcess = False
+        self.memoryLimit = None
+        self.pipeResults = False
+        self._matrixFiles = None
+        self._pipelines = None
 
     @classmethod
     def fromWeatherFilePointsAndVectors(
@@ -129,6 +159,15 @@ class DaylightCoeffGridBased(GenericGridBased):
                 TypeError('Expected RfluxmtxParameters not {}'.format(type(par)))
             self._radianceParameters = par
 
+    @property
+    def matrixFormat(self):
+        """Format of the matrices and the results (a, f or d)."""
+        return self._matrixFormat
+
+    @matrixFormat.setter
+    def matrixFormat(self, fmt):
+        self._matrixFormat = checkMatrixFormat(fmt or 'a')
+
     @property
     def skyType(self):
         """Radiance sky type e.g. r1, r2, r4."""
@@ -156,78 +195,311 @@ class DaylightCoeffGridBased(GenericGridBased):
                 removeSubFoldersContent=False)
 
         # 0.write points
-        pointsFile = self.writePointsToFile(sceneFiles.path, projectName)
+        pointShards = self.writePointShards(sceneFiles.path, projectName)
 
         # 2.write batch file
-        self.commands = []
+        self._startCommands(sceneFiles.path, header)
         self.resultsFile = []
-
-        if header:
-            self.commands.append(self.header(sceneFiles.path))
+        self._shards = ()
+        self._pipelines = None
 
         # 2.1.Create sky matrix.
         skyMtx = 'skies\\{}.smx'.format(self.skyMatrix.name)
         if hasattr(self.skyMatrix, 'isSkyMatrix'):
-            gdm = skymtxToGendaymtx(self.skyMatrix, sceneFiles.path)
+            gdm = skymtxToGendaymtx(self.skyMatrix, sceneFiles.path, self.cache is None)
             if gdm:
-                self.commands.append(':: sky matrix')
-                self.commands.append(gdm.toRadString())
+                self._addCommand(gdm, ':: sky matrix')
         else:
             # sky vector
             raise TypeError('You must use a SkyMatrix to generate the sky.')
 
-        # # 2.2.Generate daylight coefficients using rfluxmtx
+        # # 2.2.Generate daylight coefficients using rfluxmtx. Each shard of points
+        # has its own daylight matrix.
         rfluxFiles = [sceneFiles.matFile, sceneFiles.geoFile] + \
             sceneFiles.sceneMatFiles + sceneFiles.sceneRadFiles + sceneFiles.sceneOctFiles
 
         dMatrix = 'results\\matrix\\{}_{}_{}.dc'.format(
             projectName, self.skyMatrix.skyDensity, self.numOfTotalPoints)
 
-        if not os.path.isfile(os.path.join(sceneFiles.path, dMatrix)) \
-                or not self.reuseDaylightMtx:
+        shardCount = len(pointShards)
+        if shardCount == 1:
+            dMatrices = (dMatrix,)
+        else:
+            dMatrices = tuple(self.shardName(dMatrix[:-3], count, shardCount) + '.dc'
+                              for count in xrange(shardCount))
+
+        receiver = None
+        for count, (dMtx, (pointsFile, pointCount)) in \
+                enumerate(izip(dMatrices, pointShards)):
+            if self._canReuse(os.path.join(sceneFiles.path, dMtx),
+                              self.reuseDaylightMtx):
+                continue
             radFiles = tuple(self.relpath(f, sceneFiles.path) for f in rfluxFiles)
             sender = '-'
-            receiver = skyReceiver(
+            receiver = receiver or skyReceiver(
                 os.path.join(sceneFiles.path, 'skies\\rfluxSky.rad'),
                 self.skyMatrix.skyDensity
             )
             rflux = coeffMatrixCommands(
-                dMatrix, self.relpath(receiver, sceneFiles.path), radFiles, sender,
-                self.relpath(pointsFile, sceneFiles.path), self.numOfTotalPoints, None,
-                self.radianceParameters
+                dMtx, self.relpath(receiver, sceneFiles.path), radFiles, sender,
+                self.relpath(pointsFile, sceneFiles.path), pointCount, None,
+                self.radianceParameters, self.matrixFormat
             )
-            self.commands.append(':: daylight matrix')
-            self.commands.append(rflux.toRadString())
-
-        # # 2.3. matrix calculations
-        dct = matrixCalculation(
-            '.tmp\\illuminance.tmp', dMatrix=dMatrix, skyMatrix=skyMtx
-        )
-
-        self.commands.append(':: final matrix calculations')
-        self.commands.append(dct.toRadString())
-
-        finalmtx = convertMatrixResults('results\\illuminance.ill', (dct.outputFile,))
-        self.commands.append(':: convert RGB values to illuminance')
-        self.commands.append(finalmtx.toRadString())
+            self._addCommand(rflux, ':: daylight matrix' if shardCount == 1
+                             else ':: daylight matrix for shard {}'.format(count))
+
+        # daylight matrix, sky matrix and binary results for multiplyInProcess
+        self._matrixFiles = (os.path.join(sceneFiles.path, dMatrix),
+                             os.path.join(sceneFiles.path, skyMtx),
+                             os.path.join(sceneFiles.path, 'results\\illuminance.bin'))
+
+        if self.multiplyInProcess:
+            # matrices will be multiplied in results. daylight matrices of the
+            # shards are stitched together first.
+            if shardCount > 1:
+                self._shards = ((self._matrixFiles[0],
+                                 tuple(os.path.join(sceneFiles.path, d)
+                                       for d in dMatrices)),)
+            batchFile = os.path.join(sceneFiles.path, 'commands.bat')
+            writeToFile(batchFile, '\n'.join(self.commands))
+            print "Files are written to: %s" % sceneFiles.path
+            return batchFile
+
+        # # 2.3. matrix calculations for each shard. RGB values are piped from
+        # dctimestep to rmtxop to be converted to illuminance.
+        illFiles = []
+        pipelines = []
+        for count, dMtx in enumerate(dMatrices):
+            name = 'illuminance' if shardCount == 1 \
+                else self.shardName('illuminance', count, shardCount)
+            dct = matrixCalculation(None, dMatrix=dMtx, skyMatrix=skyMtx,
+                                    outputFormat=self.matrixFormat)
+            finalmtx = convertMatrixResults(
+                None if self.pipeResults else 'results\\{}.ill'.format(name),
+                ('-',), self.matrixFormat)
+            pipeline = Pipeline((dct, finalmtx))
+            if self.pipeResults:
+                # the pipeline runs in results
+                pipelines.append(pipeline)
+                continue
+
+            self._addCommand(pipeline, ':: final matrix calculations')
+            illFiles.append(os.path.join(sceneFiles.path, str(finalmtx.outputFile)))
+
+        if self.pipeResults:
+            self._pipelines = (sceneFiles.path, tuple(pipelines))
+            batchFile = os.path.join(sceneFiles.path, 'commands.bat')
+            writeToFile(batchFile, '\n'.join(self.commands))
+            print "Files are written to: %s" % sceneFiles.path
+            return batchFile
 
         # # 2.3 write batch file
         batchFile = os.path.join(sceneFiles.path, 'commands.bat')
 
         writeToFile(batchFile, '\n'.join(self.commands))
 
-        self.resultsFile = (os.path.join(sceneFiles.path, str(finalmtx.outputFile)),)
+        self.resultsFile = (os.path.join(sceneFiles.path, 'results\\illuminance.ill'),)
+        if shardCount > 1:
+            self._shards = ((self.resultsFile[0], tuple(illFiles)),)
 
         print "Files are written to: %s" % sceneFiles.path
         return batchFile
 
-    def results(self, flattenResults=True):
-        """Return results for this analysis."""
+    def results(self, flattenResults=True, streaming=False, DAThreshhold=None,
+                UDIMinMax=None, occSchedule=None):
+        """Return results for this analysis.
+
+        Args:
+            flattenResults: Not used for annual analysis.
+            streaming: Set to True to calculate annual metrics while reading the
+                results instead of loading the hourly values to analysis grids. Use
+                it for large grids when only the metrics are needed
+                (default: False).
+            DAThreshhold: Threshhold for daylight autonomy in lux for streaming
+                (default: 300).
+            UDIMinMax: A tuple of min, max value for useful daylight illuminance
+                for streaming (default: (100, 2000)).
+            occSchedule: An annual occupancy schedule for streaming.
+
+        Returns:
+            Analysis grids with values or an AnnualMetricsStream for each analysis
+            grid if streaming is True.
+        """
         assert self.isCalculated, \
             "You haven't run the Recipe yet. Use self.run " + \
             "to run the analysis before loading the results."
 
+        self.stitchShards()
+        if self.multiplyInProcess:
+            return self._multiplyResults(streaming, DAThreshhold, UDIMinMax,
+                                         occSchedule)
+
+        if self.pipeResults:
+            rows = self.pipedRows()
+            if streaming:
+                return self._streamRows(rows, DAThreshhold, UDIMinMax, occSchedule)
+            for ag in self.analysisGrids:
+                ag.setValues(self.skyMatrix.hoys, list(islice(rows, len(ag))))
+            # read to the end to check the number of rows and the pipelines
+            next(rows, None)
+            return self.analysisGrids
+
+        if streaming:
+            return self.streamResults(self.resultsFile, DAThreshhold, UDIMinMax,
+                                      occSchedule)
+
         for r in self.resultsFile:
             # source, state = os.path.split(r)[-1][:-4].split("..")
             self.analysisGrids[0].setValuesFromFile(r, self.skyMatrix.hoys)
         return self.analysisGrids
+
+    def streamResults(self, resultsFiles, DAThreshhold=None, UDIMinMax=None,
+                      occSchedule=None):
+        """Calculate annual metrics for analysis grids one sensor at a time.
+
+        Hourly values are not loaded to analysis grids.
+
+        Args:
+            resultsFiles: List of results files. Values for each sensor will be
+                added together from all the files.
+            DAThreshhold: Threshhold for daylight autonomy in lux (default: 300).
+            UDIMinMax: A tuple of min, max value for useful daylight illuminance
+                (default: (100, 2000)).
+            occSchedule: An annual occupancy schedule.
+
+        Returns:
+            An AnnualMetricsStream for each analysis grid.
+        """
+        rows = izip(*(matrixRows(r) for r in resultsFiles))
+        rows = (values[0] if len(values) == 1 else [sum(v) for v in izip(*values)]
+                for values in rows)
+        return self._streamRows(rows, DAThreshhold, UDIMinMax, occSchedule)
+
+    def pipedRows(self):
+        """Run the matrix calculations and iterate through the results of sensors.
+
+        Values are read from the output of dctimestep | rmtxop for each shard and
+        are not written to a results file. Only available if pipeResults is True.
+        A RuntimeError is raised if any of the commands fails and a ValueError if
+        the number of rows is not the same as the number of sensors.
+
+        Returns:
+            A generator of hourly illuminance values for each sensor as array('f').
+        """
+        assert self._pipelines, \
+            'No pipelines are written. Set pipeResults to True and write the recipe.'
+        workingDir, pipelines = self._pipelines
+        return self._checkedRows(
+            row for pipeline in pipelines for row in pipeline.rows(workingDir))
+
+    def _checkedRows(self, rows):
+        """Iterate through rows and check that there is a row for each sensor."""
+        total = self.numOfTotalPoints
+        count = 0
+        for row in rows:
+            count += 1
+            if count > total:
+                raise ValueError(
+                    'There are more rows in the results than sensors [{}].'.format(
+                        total))
+            yield row
+
+        if count != total:
+            raise ValueError(
+                'Number of rows in the results [{}] is not the same as number of '
+                'sensors [{}].'.format(count, total))
+
+    def _streamRows(self, rows, DAThreshhold=None, UDIMinMax=None, occSchedule=None,
+                    directRows=None):
+        """Add values for each sensor to an AnnualMetricsStream for each grid.
+
+        directRows are optional direct values for each sensor for all the hours to
+        calculate annual solar exposure.
+        """
+        hoys = self.skyMatrix.hoys
+        streams = tuple(AnnualMetricsStream(hoys, occSchedule, DAThreshhold, UDIMinMax)
+                        for ag in self.analysisGrids)
+        sensors = (s for ag, s in izip(self.analysisGrids, streams)
+                   for i in xrange(len(ag)))
+        rows = self._checkedRows(rows)
+        if directRows is None:
+            for stream, values in izip(sensors, rows):
+                stream.add(values)
+        else:
+            directRows = self._checkedRows(directRows)
+            for stream, values, directValues in izip(sensors, rows, directRows):
+                stream.add(values, directValues)
+            next(directRows, None)
+        # read to the end to check the number of rows
+        next(rows, None)
+
+        return streams
+
+    def _multiplyResults(self, streaming=False, DAThreshhold=None, UDIMinMax=None,
+                         occSchedule=None):
+        """Multiply the matrices in this process and assign the results."""
+        from ...postprocess import matrixmultiply as mm
+        dcMatrix, skyMatrix, _ = self._matrixFiles
+        blocks = mm.multiplyBlocks(dcMatrix, skyMatrix)
+        if streaming:
+            rows = (row for _, block in blocks for row in block)
+            return self._streamRows(rows, DAThreshhold, UDIMinMax, occSchedule)
+
+        return mm.assignBlocks(self.analysisGrids, blocks, self.skyMatrix.hoys)
+
+    def binaryResults(self, reuse=True):
+        """Return memory-mapped binary results for this analysis.
+
+        Results files will be converted to binary files next to the ASCII files.
+        If multiplyInProcess is True the matrices are multiplied to
+        results\\illuminance.bin instead. If pipeResults is True the output of
+        the matrix calculations is written to results\\illuminance.bin. The
+        binary results can be passed to the functions in postprocess.annualmetrics
+        without loading the results to memory. This method requires numpy.
+
+        Args:
+            reuse: Reuse the binary files if they are newer than the results
+                (default: True).
+
+        Returns:
+            A list of BinaryResults. One for each results file.
+        """
+        assert self.isCalculated, \
+            "You haven't run the Recipe yet. Use self.run " + \
+            "to run the analysis before loading the results."
+
+        from ...postprocess.binaryresults import BinaryResults
+        self.stitchShards()
+        if self.multiplyInProcess:
+            from ...postprocess import matrixmultiply as mm
+            dcMatrix, skyMatrix, binaryFile = self._matrixFiles
+            tiles = mm.multiplyTiles(dcMatrix, skyMatrix,
+                                     memoryLimit=self.memoryLimit)
+            return [self._writeBlocks(binaryFile, (dcMatrix, skyMatrix), tiles, reuse)]
+
+        if self.pipeResults:
+            workingDir, pipelines = self._pipelines
+            matrixFiles = [os.path.join(workingDir, f)
+                           for pipeline in pipelines for f in pipeline.inputFiles]
+            blocks = ((count, [row]) for count, row in enumerate(self.pipedRows()))
+            return [self._writeBlocks(
+                os.path.join(workingDir, 'results\\illuminance.bin'), matrixFiles,
+                blocks, reuse)]
+
+        return [BinaryResults.fromIllFile(r, hoys=self.skyMatrix.hoys, reuse=reuse)
+                for r in self.resultsFile]
+
+    def _writeBlocks(self, binaryFile, matrixFiles, blocks, reuse=True):
+        """Write blocks or tiles of results to a binary results file.
+
+        The file is reused if it is newer than all the matrix files and has the
+        same hours as the sky matrix.
+        """
+        from ...postprocess.binaryresults import BinaryResults, writeBinaryBlocks
+        if not reuse or not os.path.isfile(binaryFile) or \
+                os.path.getmtime(binaryFile) < \
+                max(os.path.getmtime(f) for f in matrixFiles) or \
+                not BinaryResults._hasHoys(binaryFile, self.skyMatrix.hoys):
+            writeBinaryBlocks(binaryFile, blocks, self.numOfTotalPoints,
+                              self.skyMatrix.hoys)
+        return BinaryResults(binaryFile)
@@ -8,6 +8,7 @@ from ...command.rfluxmtx import Rfluxmtx
 from ...command.gendaymtx import Gendaymtx
 from ...command.dctimestep import Dctimestep
 from ...command.vwrays import Vwrays, VwraysParameters
+from ...command.pipeline import Pipeline
 from ....futil import writeToFile
 import os
 
@@ -139,12 +140,9 @@ class DaylightCoeffImageBased(GenericImageBased):
         viewFiles = self.writeViewsToFile(sceneFiles.path + '\\views')
 
         # 2.write batch file
-        self.commands = []
+        self._startCommands(sceneFiles.path, header)
         self.resultsFile = []
 
-        if header:
-            self.commands.append(self.header(sceneFiles.path))
-
         # 2.1.Create sky matrix.
         if hasattr(self.skyMatrix, 'isSkyMatrix'):
             weaFilepath = 'skies\\{}.wea'.format(self.skyMatrix.name)
@@ -158,7 +156,7 @@ class DaylightCoeffImageBased(GenericImageBased):
                     os.path.join(sceneFiles.path, 'skies'), writeHours=True)
                 gdm = Gendaymtx(outputName=skyMtx, weaFile=weaFilepath)
                 gdm.gendaymtxParameters.skyDensity = self.skyMatrix.skyDensity
-                self.commands.append(gdm.toRadString())
+                self._addCommand(gdm)
         else:
             # sky vector
             skyMtx = 'skies\\{}.vec'.format(self.skyMatrix.name)
@@ -193,9 +191,7 @@ class DaylightCoeffImageBased(GenericImageBased):
             vwrSamp = Vwrays()
             vwrSamp.vwraysParameters = vwrParaSamp
             vwrSamp.viewFile = self.relpath(f, sceneFiles.path)
-            vwrSamp.outputFile = r'views\\{}.rays'.format(view.name)
             vwrSamp.outputDataFormat = 'f'
-            self.commands.append(vwrSamp.toRadString())
 
             # Daylight matrix
             if not self.reuseDaylightMtx:
@@ -218,9 +214,9 @@ class DaylightCoeffImageBased(GenericImageBased):
                 rflux.outputDataFormat = 'fc'
                 rflux.verbose = True
                 rflux.viewInfoFile = vwrDimFile
-                rflux.viewRaysFile = str(vwrSamp.outputFile)
                 rflux.samplingRaysCount = 3  # 9
-                self.commands.append(rflux.toRadString())
+                # rays are piped from vwrays to rfluxmtx
+                self._addCommand(Pipeline((vwrSamp, rflux)))
 
             # Generate resultsFile
             # TODO: This should happen separately for each skyvector
@@ -249,7 +245,7 @@ class DaylightCoeffImageBased(GenericImageBased):
                 self.resultsFile.append(
                     os.path.join(sceneFiles.path, str(dct.outputFile)))
 
-            self.commands.append(dct.toRadString())
+            self._addCommand(dct)
 
         # # 4.3 write batch file
         batchFile = os.path.join(sceneFiles.path, "commands.bat")
@@ -0,0 +1,5 @@
+"""Radiance five-phase recipes.
+
+Five-phase recipes replace the direct sunlight of daylight coefficient recipes
+with accurate sun coefficients.
+"""
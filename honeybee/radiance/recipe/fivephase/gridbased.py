@@ -0,0 +1,490 @@
+from ..radrecutil import coeffMatrixCommands, skyReceiver, \
+    matrixCalculation, convertMatrixResults, skymtxToGendaymtx
+from ..dc.gridbased import DaylightCoeffGridBased
+from ...command.oconv import Oconv
+from ...command.pipeline import Pipeline
+from ...command.rcontrib import Rcontrib
+from ...command.rmtxop import Rmtxop, RmtxopMatrix
+from ...command.xform import Xform
+from ...parameters.rcontrib import RcontribParameters
+from ...parameters.rfluxmtx import RfluxmtxParameters
+from ...parameters.xform import XformParameters
+from ...material.plastic import BlackMaterial
+from ...sky.skymatrix import SkyMatrix
+from ...sky.sunmatrix import SunMatrix
+from ...postprocess.matrixparser import matrixRows
+from ....futil import writeToFile
+
+import hashlib
+import os
+from itertools import izip, tee
+
+
+class FivePhaseGridBased(DaylightCoeffGridBased):
+    """Grid based five-phase (improved daylight coefficient) analysis recipe.
+
+    Direct sunlight from the sky patches of the daylight coefficients is replaced
+    by the contribution of the suns at their exact position:
+
+        total = DC . S - DCd . Sd + DCs . SUN
+
+    DC is the daylight coefficient matrix for the full scene, DCd the direct-only
+    daylight coefficients for the blacked scene, and DCs the sun coefficients. All
+    the surfaces except windows are black in DCd and DCs, including the rad files of
+    the scene. Octrees of the scene keep their materials. S and Sd are total and
+    direct-only sky matrices, and SUN is the sun matrix. The coefficient matrices
+    don't depend on the weather data and are reused for new skies, sky densities
+    and weather files as long as reuseDaylightMtx is True. Sun coefficients are
+    reused if the sun positions are the same.
+
+    Attributes:
+        skyMtx: A radiance SkyMatrix. The analysis will be ran for the hoys of the
+            sky matrix.
+        analysisGrids: A list of Honeybee analysis grids. Daylight metrics will
+            be calculated for each analysisGrid separately.
+        simulationType: 0: Illuminance(lux), 1: Radiation (kWh), 2: Luminance (Candela)
+            (Default: 0)
+        radianceParameters: Radiance parameters for the daylight coefficients.
+            Parameters should be an instance of RfluxmtxParameters.
+        directMtxParameters: Radiance parameters for the direct-only daylight
+            coefficients (Default: -ab 1).
+        sunMtxParameters: Radiance parameters for the sun coefficients. Parameters
+            should be an instance of RcontribParameters
+            (Default: -ab 0 -dc 1 -dt 0 -dj 0).
+        reuseDaylightMtx: Reuse the coefficient matrices if they already exist.
+        hbObjects: An optional list of Honeybee surfaces or zones (Default: None).
+        subFolder: Analysis subfolder for this recipe. (Default: "gridbased_fivephase").
+        matrixFormat: Format of the matrices and the results. a for ASCII, f for
+            binary float and d for binary double (Default: a).
+        multiplyInProcess: Set to True to combine the matrices in Python instead
+            of dctimestep and rmtxop. The sun matrix is written as a sparse matrix
+            and total and direct sunlight values are assigned directly to the
+            analysis grids. Requires numpy (Default: False).
+        memoryLimit: Memory budget in bytes for combining the matrices with
+            multiplyInProcess (Default: 256 MB).
+
+    Usage:
+
+        # initiate analysisRecipe
+        analysisRecipe = FivePhaseGridBased(skyMtx, analysisGrids)
+
+        # add honeybee object
+        analysisRecipe.hbObjects = HBObjs
+
+        # write analysis files to local drive
+        commandsFile = analysisRecipe.write(_folder_, _name_)
+
+        # run the analysis
+        analysisRecipe.run(commandsFile)
+
+        # get the results
+        print analysisRecipe.results()
+    """
+
+    def __init__(self, skyMtx, analysisGrids, simulationType=0,
+                 radianceParameters=None, reuseDaylightMtx=True, hbObjects=None,
+                 subFolder="gridbased_fivephase"):
+        """Create an annual recipe."""
+        DaylightCoeffGridBased.__init__(
+            self, skyMtx, analysisGrids, simulationType, radianceParameters,
+            reuseDaylightMtx, hbObjects, subFolder)
+
+        self.directMtxParameters = None
+        self.sunMtxParameters = None
+        self._sunMatrix = SunMatrix(skyMtx.wea, skyMtx.north, skyMtx.hoys)
+        self._sunMatrixFiles = None
+
+    @property
+    def sunMatrix(self):
+        """Sun matrix for the same weather data, north and hoys as skyMatrix.
+
+        Set useGendaylit on the sun matrix to change how suns are calculated.
+        """
+        sky = self.skyMatrix
+        self._sunMatrix.wea = sky.wea
+        self._sunMatrix.north = sky.north
+        self._sunMatrix.hoys = sky.hoys
+        return self._sunMatrix
+
+    @property
+    def skyMatrixDirect(self):
+        """Direct-only sky matrix for the same weather data and hoys as skyMatrix."""
+        sky = SkyMatrix(self.skyMatrix.wea, self.skyMatrix.skyDensity,
+                        self.skyMatrix.north, self.skyMatrix.hoys, mode=1)
+        sky.useGendaymtx = self.skyMatrix.useGendaymtx
+        return sky
+
+    @property
+    def directMtxParameters(self):
+        """Radiance parameters for direct-only daylight coefficients."""
+        return self._directMtxParameters
+
+    @directMtxParameters.setter
+    def directMtxParameters(self, par):
+        if not par:
+            self._directMtxParameters = RfluxmtxParameters()
+            self._directMtxParameters.irradianceCalc = True
+            self._directMtxParameters.ambientAccuracy = 0.1
+            self._directMtxParameters.ambientDivisions = 4096
+            self._directMtxParameters.ambientBounces = 1
+            self._directMtxParameters.limitWeight = 0.001
+        else:
+            assert hasattr(par, 'isRfluxmtxParameters'), \
+                TypeError('Expected RfluxmtxParameters not {}'.format(type(par)))
+            self._directMtxParameters = par
+
+    @property
+    def sunMtxParameters(self):
+        """Radiance parameters for sun coefficients."""
+        return self._sunMtxParameters
+
+    @sunMtxParameters.setter
+    def sunMtxParameters(self, par):
+        if not par:
+            self._sunMtxParameters = RcontribParameters()
+            self._sunMtxParameters.irradianceCalc = True
+            self._sunMtxParameters.ambientBounces = 0
+            self._sunMtxParameters.directCertainty = 1
+            self._sunMtxParameters.directThreshold = 0
+            self._sunMtxParameters.directJitter = 0
+        else:
+            assert hasattr(par, 'modFile'), \
+                TypeError('Expected RcontribParameters not {}'.format(type(par)))
+            self._sunMtxParameters = par
+
+    def writeBlackedMaterialsToFile(self, targetDir, fileName):
+        """Write materials with black materials for all the surfaces except windows.
+
+        Args:
+            targetDir: Path to project directory (e.g. c:/ladybug)
+            fileName: File name as string. materials will be saved as
+                fileName_black.mat
+
+        Returns:
+            Path to file in case of success.
+        """
+        materials = [BlackMaterial().toRadString()]
+        if self._radFile:
+            materials.append(self._radFile.materials(0, True, blacked=True))
+            materials.append(self._radFile.materials(2, True))
+        return writeToFile(os.path.join(targetDir, fileName + '_black.mat'),
+                           '\n'.join(materials) + '\n')
+
+    @staticmethod
+    def writeBlackedSceneCommand(radFiles, outputFile):
+        """Xform command to replace the modifiers of scene geometries with black.
+
+        Args:
+            radFiles: A list of Radiance files from the scene.
+            outputFile: Path to the blacked geometry file.
+
+        Returns:
+            An Xform command. Black material should be loaded before outputFile.
+        """
+        return Xform(radFiles, XformParameters(modReplace=BlackMaterial().name),
+                     outputFile)
+
+    def write(self, targetFolder, projectName='untitled', header=True):
+        """Write analysis files to target folder.
+
+        Args:
+            targetFolder: Path to parent folder. Files will be created under
+                targetFolder/gridbased. use self.subFolder to change subfolder name.
+            projectName: Name of this project as a string.
+            header: A boolean to include the header lines in commands.bat. header
+                includes PATH and cd toFolder
+        Returns:
+            Full path to command.bat
+        """
+        # 0.prepare target folder
+        # create main folder targetFolder\projectName
+        sceneFiles = super(
+            DaylightCoeffGridBased, self).populateSubFolders(
+                targetFolder, projectName,
+                subFolders=('.tmp', 'objects', 'skies', 'results', 'results\\matrix'),
+                removeSubFoldersContent=False)
+
+        # 0.write points
+        pointsFile = self.writePointsToFile(sceneFiles.path, projectName)
+        pointsFileRel = self.relpath(pointsFile, sceneFiles.path)
+
+        # 1.write batch file
+        self._startCommands(sceneFiles.path, header)
+        self.resultsFile = []
+
+        # 1.1.Create total and direct-only sky matrices.
+        assert hasattr(self.skyMatrix, 'isSkyMatrix'), \
+            TypeError('You must use a SkyMatrix to generate the sky.')
+        skyMatrixDirect = self.skyMatrixDirect
+        skyMtx = 'skies\\{}.smx'.format(self.skyMatrix.name)
+        skyMtxDirect = 'skies\\{}.smx'.format(skyMatrixDirect.name)
+        for sky in (self.skyMatrix, skyMatrixDirect):
+            gdm = skymtxToGendaymtx(sky, sceneFiles.path, self.cache is None)
+            if gdm:
+                self._addCommand(gdm, ':: sky matrix')
+
+        # 1.2.Create suns and sun matrix. Sun matrix is written as a sparse matrix
+        # if it will be multiplied in this process.
+        sunFormat = 's' if self.multiplyInProcess else \
+            ('a' if self.matrixFormat == 'a' else 'f')
+        analemma, sunList, sunMtx = self.sunMatrix.execute(
+            os.path.join(sceneFiles.path, 'skies'), True, sunFormat)
+
+        # 2.1.Generate daylight coefficients using rfluxmtx
+        # scene files are tuples if they are not copied to the project folder
+        rfluxFiles = [sceneFiles.matFile, sceneFiles.geoFile] + \
+            list(sceneFiles.sceneMatFiles) + list(sceneFiles.sceneRadFiles) + \
+            list(sceneFiles.sceneOctFiles)
+        receiver = skyReceiver(
+            os.path.join(sceneFiles.path, 'skies\\rfluxSky.rad'),
+            self.skyMatrix.skyDensity
+        )
+        dMatrix = 'results\\matrix\\{}_{}_{}.dc'.format(
+            projectName, self.skyMatrix.skyDensity, self.numOfTotalPoints)
+
+        if not self._canReuse(os.path.join(sceneFiles.path, dMatrix),
+                              self.reuseDaylightMtx):
+            radFiles = tuple(self.relpath(f, sceneFiles.path) for f in rfluxFiles)
+            rflux = coeffMatrixCommands(
+                dMatrix, self.relpath(receiver, sceneFiles.path), radFiles, '-',
+                pointsFileRel, self.numOfTotalPoints, None,
+                self.radianceParameters, self.matrixFormat
+            )
+            self._addCommand(rflux, ':: daylight matrix')
+
+        # 2.2.Generate direct-only daylight coefficients for the blacked scene.
+        # windows keep their materials.
+        blackMatFile = self.writeBlackedMaterialsToFile(
+            os.path.join(sceneFiles.path, 'objects'), projectName)
+        blackFiles = [blackMatFile, sceneFiles.geoFile]
+        if sceneFiles.sceneRadFiles:
+            # replace the modifiers of the context with black. Materials of the
+            # context are not used by the blacked geometries.
+            blackSceneFile = os.path.join(
+                sceneFiles.path, 'objects', projectName + '_scene_black.rad')
+            blackScene = self.writeBlackedSceneCommand(
+                sceneFiles.sceneRadFiles, blackSceneFile)
+            self._addCommand(blackScene, ':: blacked scene')
+            blackFiles.append(str(blackScene.outputFile))
+        # materials of the octrees can't be replaced. Octrees are kept to block the
+        # sun and the sky and their reflections are not removed from the results.
+        blackFiles += list(sceneFiles.sceneOctFiles)
+
+        dMatrixDirect = 'results\\matrix\\{}_{}_{}_direct.dc'.format(
+            projectName, self.skyMatrix.skyDensity, self.numOfTotalPoints)
+
+        if not self._canReuse(os.path.join(sceneFiles.path, dMatrixDirect),
+                              self.reuseDaylightMtx):
+            radFiles = tuple(self.relpath(f, sceneFiles.path) for f in blackFiles)
+            rflux = coeffMatrixCommands(
+                dMatrixDirect, self.relpath(receiver, sceneFiles.path), radFiles, '-',
+                pointsFileRel, self.numOfTotalPoints, None,
+                self.directMtxParameters, self.matrixFormat
+            )
+            self._addCommand(rflux, ':: direct-only daylight matrix')
+
+        # 2.3.Generate sun coefficients. Sun coefficients only depend on sun
+        # positions and are reused for the same suns.
+        with open(analemma, 'rb') as inf:
+            sunKey = hashlib.md5(inf.read()).hexdigest()[:10]
+        sunDc = 'results\\matrix\\{}_sun_{}_{}.dc'.format(
+            projectName, sunKey, self.numOfTotalPoints)
+
+        if not self._canReuse(os.path.join(sceneFiles.path, sunDc),
+                              self.reuseDaylightMtx):
+            oc = Oconv('.tmp\\{}_suns'.format(projectName))
+            oc.sceneFiles = tuple(self.relpath(f, sceneFiles.path)
+                                  for f in blackFiles + [analemma])
+
+            self.sunMtxParameters.modFile = self.relpath(sunList, sceneFiles.path)
+            rct = Rcontrib(sunDc, rcontribParameters=self.sunMtxParameters)
+            rct.octreeFile = str(oc.outputFile)
+            rct.pointsFile = pointsFileRel
+            if self.matrixFormat != 'a':
+                rct.outputDataFormat = 'a' + self.matrixFormat
+            self._addCommand(oc, ':: sun coefficients')
+            self._addCommand(rct)
+
+        # coefficient matrices, sky matrices and binary results for multiplyInProcess
+        self._matrixFiles = (os.path.join(sceneFiles.path, dMatrix),
+                             os.path.join(sceneFiles.path, skyMtx),
+                             os.path.join(sceneFiles.path, 'results\\illuminance.bin'))
+        self._sunMatrixFiles = (os.path.join(sceneFiles.path, dMatrixDirect),
+                                os.path.join(sceneFiles.path, skyMtxDirect),
+                                os.path.join(sceneFiles.path, sunDc), sunMtx)
+
+        batchFile = os.path.join(sceneFiles.path, 'commands.bat')
+        if self.multiplyInProcess:
+            # matrices will be multiplied in results
+            writeToFile(batchFile, '\n'.join(self.commands))
+            print "Files are written to: %s" % sceneFiles.path
+            return batchFile
+
+        # 3.matrix calculations
+        sunIll = 'results\\{}..sun.ill'.format(projectName)
+        inputs = ((dMatrix, skyMtx, 'total', '.tmp\\total.ill'),
+                  (dMatrixDirect, skyMtxDirect, 'direct', '.tmp\\direct.ill'),
+                  (sunDc, self.relpath(sunMtx, sceneFiles.path), 'sun', sunIll))
+        for count, (dcMatrix, sky, name, output) in enumerate(inputs):
+            dct = matrixCalculation(None, dMatrix=dcMatrix, skyMatrix=sky,
+                                    outputFormat=self.matrixFormat)
+            finalmtx = convertMatrixResults(output, ('-',), self.matrixFormat)
+            self._addCommand(Pipeline((dct, finalmtx)),
+                             ':: 3.{} {} illuminance'.format(count, name))
+
+        # 4.combine the results. total - direct + sun
+        directMatrix = RmtxopMatrix(scalarFactors=[-1], matrixFile='.tmp\\direct.ill')
+        finalmtx = Rmtxop(matrixFiles=(sunIll,),
+                          rmtxopMatrices=(RmtxopMatrix(matrixFile='.tmp\\total.ill'),
+                                          directMatrix),
+                          outputFile='results\\{}..total.ill'.format(projectName))
+        finalmtx.rmtxopParameters.outputFormat = self.matrixFormat
+        self._addCommand(finalmtx, ':: 4. total - direct + sun')
+
+        writeToFile(batchFile, '\n'.join(self.commands))
+
+        self.resultsFile = (os.path.join(sceneFiles.path, str(finalmtx.outputFile)),
+                            os.path.join(sceneFiles.path, sunIll))
+
+        print "Files are written to: %s" % sceneFiles.path
+        return batchFile
+
+    def results(self, flattenResults=True, streaming=False, DAThreshhold=None,
+                UDIMinMax=None, occSchedule=None):
+        """Return results for this analysis.
+
+        Total values include direct sunlight and direct values are the sunlight
+        from sun coefficients.
+
+        Args:
+            flattenResults: Not used for annual analysis.
+            streaming: Set to True to calculate annual metrics while reading the
+                results instead of loading the hourly values to analysis grids.
+                Direct values are used for annual solar exposure (default: False).
+            DAThreshhold: Threshhold for daylight autonomy in lux for streaming
+                (default: 300).
+            UDIMinMax: A tuple of min, max value for useful daylight illuminance
+                for streaming (default: (100, 2000)).
+            occSchedule: An annual occupancy schedule for streaming.
+
+        Returns:
+            Analysis grids with values or an AnnualMetricsStream for each analysis
+            grid if streaming is True.
+        """
+        assert self.isCalculated, \
+            "You haven't run the Recipe yet. Use self.run " + \
+            "to run the analysis before loading the results."
+
+        if self.multiplyInProcess:
+            return self._multiplyResults(streaming, DAThreshhold, UDIMinMax,
+                                         occSchedule)
+
+        total, direct = self.resultsFile
+        if streaming:
+            return self._streamRows(matrixRows(total), DAThreshhold, UDIMinMax,
+                                    occSchedule, matrixRows(direct))
+
+        self.analysisGrids[0].setValuesFromFile(total, self.skyMatrix.hoys)
+        self.analysisGrids[0].setValuesFromFile(direct, self.skyMatrix.hoys,
+                                                isDirect=True)
+        return self.analysisGrids
+
+    def illuminanceBlocks(self, chunkSize=None):
+        """Combine the matrices in blocks of sensors in this process.
+
+        This method requires numpy.
+
+        Args:
+            chunkSize: Number of sensors in each block (default: number of sensors
+                that fit in memoryLimit).
+
+        Yields:
+            Index of the first sensor, a sensors x hours array of total values and a
+            sensors x sun hours array of direct sunlight. Sun hours are the index of
+            hours in hoys with at least one sun (SparseSunMatrix.hours).
+        """
+        from ...postprocess import matrixmultiply as mm
+        from ...postprocess import directsun
+        from ...postprocess.matrixparser import readMatrixHeader, matrixInfo
+
+        dcMatrix, skyMatrix, _ = self._matrixFiles
+        dcDirect, skyDirect, sunDc, sunMtx = self._sunMatrixFiles
+        suns = directsun.SparseSunMatrix.fromFile(sunMtx)
+        sunHours = suns.hours
+        # use the same blocks of sensors for all the matrices
+        if not chunkSize:
+            _, patchCount, ncomp, _ = matrixInfo(readMatrixHeader(dcMatrix)[0])
+            hourCount = len(self.skyMatrix.hoys)
+            valueCount = len(suns.values)
+            # two weighted skies and weighted sun values are in memory for all the
+            # blocks. Each sensor needs rows of coefficients and results.
+            rowSize = 2 * ((patchCount or 1) * ncomp + hourCount) + \
+                (suns.sunCount + valueCount) * ncomp + valueCount + len(sunHours)
+            fixedSize = 2 * (patchCount or 1) * ncomp * hourCount + valueCount * ncomp
+            chunkSize = mm.blockSize(rowSize, fixedSize, self.memoryLimit)
+        blocks = izip(mm.multiplyBlocks(dcMatrix, skyMatrix, chunkSize=chunkSize),
+                      mm.multiplyBlocks(dcDirect, skyDirect, chunkSize=chunkSize),
+                      directsun.multiplyBlocks(sunDc, suns, chunkSize=chunkSize))
+        for (st, total), (_, direct), (_, sun) in blocks:
+            total -= direct
+            total[:, sunHours] += sun
+            yield st, total, sun
+
+    def _multiplyResults(self, streaming=False, DAThreshhold=None, UDIMinMax=None,
+                         occSchedule=None):
+        """Combine the matrices in this process and assign the results."""
+        from ...postprocess.directsun import SparseSunMatrix
+        from ...postprocess.matrixmultiply import assignBlocks
+        blocks = self.illuminanceBlocks()
+        hoys = self.skyMatrix.hoys
+        sunHours = SparseSunMatrix.fromFile(self._sunMatrixFiles[-1]).hours
+        if streaming:
+            # both generators read the same blocks one sensor at a time
+            totalBlocks, sunBlocks = tee(blocks)
+            rows = (row for _, total, _ in totalBlocks for row in total)
+            directRows = self._hourlyRows(
+                (row for _, _, sun in sunBlocks for row in sun), sunHours, len(hoys))
+            return self._streamRows(rows, DAThreshhold, UDIMinMax, occSchedule,
+                                    directRows)
+
+        sunHoys = [hoys[h] for h in sunHours]
+        for st, total, sun in blocks:
+            assignBlocks(self.analysisGrids, ((st, total),), hoys)
+            assignBlocks(self.analysisGrids, ((st, sun),), sunHoys, isDirect=True)
+        return self.analysisGrids
+
+    @staticmethod
+    def _hourlyRows(rows, hours, hourCount):
+        """Add 0 values for the hours without a sun to rows of sun hours."""
+        import numpy as np
+        for row in rows:
+            values = np.zeros(hourCount, dtype=np.float32)
+            values[hours] = row
+            yield values
+
+    def binaryResults(self, reuse=True):
+        """Return memory-mapped binary results for this analysis.
+
+        Results files will be converted to binary files next to the ASCII files.
+        If multiplyInProcess is True the total values are written to
+        results\\illuminance.bin instead. This method requires numpy.
+
+        Args:
+            reuse: Reuse the binary files if they are newer than the results
+                (default: True).
+
+        Returns:
+            A list of BinaryResults.
+        """
+        if not self.multiplyInProcess:
+            return super(FivePhaseGridBased, self).binaryResults(reuse)
+
+        assert self.isCalculated, \
+            "You haven't run the Recipe yet. Use self.run " + \
+            "to run the analysis before loading the results."
+
+        dcMatrix, skyMatrix, binaryFile = self._matrixFiles
+        blocks = ((st, total) for st, total, _ in self.illuminanceBlocks())
+        return [self._writeBlocks(binaryFile,
+                                  (dcMatrix, skyMatrix) + self._sunMatrixFiles,
+                                  blocks, reuse)]
@@ -24,6 +24,10 @@ class GridBased(GenericGridBased):
             (Default: gridbased.LowQuality)
         hbObjects: An optional list of Honeybee surfaces or zones (Default: None).
         subFolder: Analysis subfolder for this recipe. (Default: "gridbased")
+        shardCount: Number of files to split the sensors to. Each shard has its own
+            rtrace command and the results are stitched back together in the
+            original order of sensors. Run the recipe with cpuCount to calculate
+            the shards in parallel (Default: None).
 
     Usage:
         # create the sky
@@ -175,16 +179,13 @@ class GridBased(GenericGridBased):
                 targetFolder, projectName)
 
         # 1.write points
-        pointsFile = self.writePointsToFile(sceneFiles.path, projectName)
+        pointShards = self.writePointShards(sceneFiles.path, projectName)
 
         # 2.write sky file
         skyFile = self.sky.writeToFile(sceneFiles.path + '\\skies')
 
         # 3.write batch file
-        self.commands = []
-
-        if header:
-            self.commands.append(self.header(sceneFiles.path))
+        self._startCommands(sceneFiles.path, header)
 
         # # 4.1.prepare oconv
         octSceneFiles = [skyFile, sceneFiles.matFile, sceneFiles.geoFile] + \
@@ -194,32 +195,41 @@ class GridBased(GenericGridBased):
         oc.sceneFiles = tuple(self.relpath(f, sceneFiles.path)
                               for f in octSceneFiles)
 
-        # # 4.2.prepare rtrace
-        rt = Rtrace('results\\' + projectName,
-                    simulationType=self.simulationType,
-                    radianceParameters=self.radianceParameters)
-        rt.radianceParameters.h = True
-        rt.octreeFile = str(oc.outputFile)
-        rt.pointsFile = self.relpath(pointsFile, sceneFiles.path)
-
-        # # 4.3. add rcalc to convert rgb values to irradiance
-        rc = Rcalc('results\\{}.ill'.format(projectName), str(rt.outputFile))
-
-        if os.name == 'nt':
-            rc.rcalcParameters.expression = '"$1=(0.265*$1+0.67*$2+0.065*$3)*179"'
-        else:
-            rc.rcalcParameters.expression = "'$1=(0.265*$1+0.67*$2+0.065*$3)*179'"
-
-        # # 4.4 write batch file
-        self.commands.append(oc.toRadString())
-        self.commands.append(rt.toRadString())
-        self.commands.append(rc.toRadString())
-
+        self._addCommand(oc)
+
+        # # 4.2.prepare rtrace and rcalc to convert rgb values to irradiance for each
+        # shard of points. Shards are stitched together in results.
+        shardCount = len(pointShards)
+        illFiles = []
+        for count, (pointsFile, _) in enumerate(pointShards):
+            name = projectName if shardCount == 1 \
+                else self.shardName(projectName, count, shardCount)
+            rt = Rtrace('results\\' + name,
+                        simulationType=self.simulationType,
+                        radianceParameters=self.radianceParameters)
+            rt.radianceParameters.h = True
+            rt.octreeFile = str(oc.outputFile)
+            rt.pointsFile = self.relpath(pointsFile, sceneFiles.path)
+
+            rc = Rcalc('results\\{}.ill'.format(name), str(rt.outputFile))
+
+            if os.name == 'nt':
+                rc.rcalcParameters.expression = '"$1=(0.265*$1+0.67*$2+0.065*$3)*179"'
+            else:
+                rc.rcalcParameters.expression = "'$1=(0.265*$1+0.67*$2+0.065*$3)*179'"
+
+            self._addCommand(rt)
+            self._addCommand(rc)
+            illFiles.append(os.path.join(sceneFiles.path, str(rc.outputFile)))
+
+        # # 4.3 write batch file
         batchFile = os.path.join(sceneFiles.path, "commands.bat")
 
         writeToFile(batchFile, "\n".join(self.commands))
 
-        self.resultsFile = os.path.join(sceneFiles.path, str(rc.outputFile))
+        self.resultsFile = os.path.join(sceneFiles.path,
+                                        'results\\{}.ill'.format(projectName))
+        self._shards = ((self.resultsFile, illFiles),) if shardCount > 1 else ()
 
         print "Files are written to: %s" % sceneFiles.path
         return batchFile
@@ -234,6 +244,7 @@ class GridBased(GenericGridBased):
         dt = DateTime(sky.month, sky.day, int(sky.hour),
                       int(60 * (sky.hour - int(sky.hour))))
 
+        self.stitchShards()
         rf = self.resultsFile
         startLine = 0
         for count, analysisGrid in enumerate(self.analysisGrids):
@@ -155,12 +155,9 @@ class ImageBased(GenericImageBased):
         skyFile = self.sky.writeToFile(sceneFiles.path + '\\skies')
 
         # 3.write batch file
-        self.commands = []
+        self._startCommands(sceneFiles.path, header)
         self.resultsFile = []
 
-        if header:
-            self.commands.append(self.header(sceneFiles.path))
-
         # # 4.1.prepare oconv
         octSceneFiles = [skyFile, sceneFiles.matFile, sceneFiles.geoFile] + \
             sceneFiles.sceneMatFiles + sceneFiles.sceneRadFiles + sceneFiles.sceneOctFiles
@@ -169,7 +166,7 @@ class ImageBased(GenericImageBased):
         oc.sceneFiles = tuple(self.relpath(f, sceneFiles.path)
                               for f in octSceneFiles)
 
-        self.commands.append(oc.toRadString())
+        self._addCommand(oc)
 
         # # 4.2.prepare rpict
         # TODO: Add overtrue
@@ -180,7 +177,7 @@ class ImageBased(GenericImageBased):
             rp.octreeFile = str(oc.outputFile)
             rp.viewFile = self.relpath(f, sceneFiles.path)
 
-            self.commands.append(rp.toRadString())
+            self._addCommand(rp)
             self.resultsFile.append(
                 os.path.join(sceneFiles.path, str(rp.outputFile)))
 
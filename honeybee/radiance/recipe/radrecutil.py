@@ -9,7 +9,7 @@ import os
 
 def coeffMatrixCommands(outputName, receiver, radFiles, sender, pointsFile=None,
                         numberOfPoints=None, samplingRaysCount=None,
-                        rfluxmtxParameters=None):
+                        rfluxmtxParameters=None, outputFormat=None):
     """Returns radiance commands to create coefficient matrix.
 
     Args:
@@ -24,6 +24,8 @@ def coeffMatrixCommands(outputName, receiver, radFiles, sender, pointsFile=None,
         samplingRaysCount: Number of sampling rays (Default: 1000).
         rfluxmtxParameters: Radiance parameters for Rfluxmtx command using a
             RfluxmtxParameters instance (Default: None).
+        outputFormat: Format of the matrix. a for ASCII, f for binary float and d
+            for binary double (Default: a).
     """
     sender = sender or '-'
     radFiles = radFiles or ()
@@ -67,6 +69,10 @@ def coeffMatrixCommands(outputName, receiver, radFiles, sender, pointsFile=None,
     # output file address/name
     rfluxmtx.outputMatrix = outputName
 
+    # points are always ASCII. Only change the output format.
+    if outputFormat and outputFormat != 'a':
+        rfluxmtx.outputDataFormat = 'a' + checkMatrixFormat(outputFormat)
+
     return rfluxmtx
 
 
@@ -82,10 +88,16 @@ def skyReceiver(filepath, density):
     return Rfluxmtx.defaultSkyGround(filepath, skyType='r{}'.format(density))
 
 
-def matrixCalculation(output, vMatrix=None, tMatrix=None, dMatrix=None, skyMatrix=None):
+def matrixCalculation(output, vMatrix=None, tMatrix=None, dMatrix=None, skyMatrix=None,
+                      outputFormat=None):
     """Get commands for matrix calculation.
 
-    This method sets up a matrix calculations using Dctimestep.
+    This method sets up a matrix calculations using Dctimestep. Input matrices can
+    be in any format. Dctimestep reads the format from their headers.
+
+    Args:
+        outputFormat: Format of the output. a for ASCII, f for binary float and d
+            for binary double (Default: a).
     """
     dct = Dctimestep()
     dct.tmatrixFile = tMatrix
@@ -93,25 +105,73 @@ def matrixCalculation(output, vMatrix=None, tMatrix=None, dMatrix=None, skyMatri
     dct.dmatrixFile = dMatrix
     dct.skyVectorFile = skyMatrix
     dct.outputFile = output
+    if outputFormat and outputFormat != 'a':
+        dct.dctimestepParameters.outputDataFormat = checkMatrixFormat(outputFormat)
     return dct
 
 
-def convertMatrixResults(output, input):
-    """Convert rgb values in matrix to illuminance values."""
+def convertMatrixResults(output, input, outputFormat='a'):
+    """Convert rgb values in matrix to illuminance values.
+
+    Args:
+        output: Output file.
+        input: List of input matrices.
+        outputFormat: Format of the output. a for ASCII, f for binary float and d
+            for binary double (Default: a).
+    """
     finalmtx = Rmtxop(matrixFiles=input, outputFile=output)
-    finalmtx.rmtxopParameters.outputFormat = 'a'
+    finalmtx.rmtxopParameters.outputFormat = checkMatrixFormat(outputFormat or 'a')
     finalmtx.rmtxopParameters.combineValues = (47.4, 119.9, 11.6)
     finalmtx.rmtxopParameters.transposeMatrix = False
     return finalmtx
 
 
-def skymtxToGendaymtx(skyMatrix, targetFolder):
-    """Return a gendaymtx command based on input skyMatrix."""
+def bsdfToMatrix(output, bsdfFile, outputFormat='a'):
+    """Convert a BSDF xml file to a transmission matrix.
+
+    Args:
+        output: Output file.
+        bsdfFile: Path to BSDF xml file.
+        outputFormat: Format of the output. a for ASCII, f for binary float and d
+            for binary double (Default: a).
+    """
+    tmtx = Rmtxop(matrixFiles=(bsdfFile,), outputFile=output)
+    tmtx.rmtxopParameters.outputFormat = checkMatrixFormat(outputFormat or 'a')
+    tmtx.rmtxopParameters.transposeMatrix = False
+    return tmtx
+
+
+def checkMatrixFormat(matrixFormat):
+    """Check a Radiance matrix format and return it.
+
+    Valid formats are a for ASCII, f for binary float and d for binary double.
+    """
+    assert matrixFormat in ('a', 'f', 'd'), ValueError(
+        'Matrix format should be a, f or d not {}.'.format(matrixFormat))
+    return matrixFormat
+
+
+def skymtxToGendaymtx(skyMatrix, targetFolder, reuse=True):
+    """Return a gendaymtx command based on input skyMatrix.
+
+    If skyMatrix.useGendaymtx is False the sky matrix is written in Python and
+    None is returned.
+
+    Args:
+        skyMatrix: A SkyMatrix.
+        targetFolder: Path to the study folder.
+        reuse: Return None if the sky matrix already exists and the hours match
+            (default: True).
+    """
+    if not skyMatrix.useGendaymtx:
+        skyMatrix.writeMatrix(os.path.join(targetFolder, 'skies'))
+        return
+
     weaFilepath = 'skies\\{}.wea'.format(skyMatrix.name)
     skyMtx = 'skies\\{}.smx'.format(skyMatrix.name)
     hoursFile = os.path.join(targetFolder, 'skies\\{}.hrs'.format(skyMatrix.name))
 
-    if not os.path.isfile(os.path.join(targetFolder, skyMtx)) \
+    if not reuse or not os.path.isfile(os.path.join(targetFolder, skyMtx)) \
             or not os.path.isfile(os.path.join(targetFolder, weaFilepath)) \
             or not skyMatrix.hoursMatch(hoursFile):
         # write wea file to folder
@@ -278,12 +278,9 @@ class SolarAccess(GenericGridBased):
         self._radianceParameters.modFile = self.relpath(sunsList, sceneFiles.path)
 
         # 3.write batch file
-        self.commands = []
+        self._startCommands(sceneFiles.path, header)
         self.resultsFile = []
 
-        if header:
-            self.commands.append(self.header(sceneFiles.path))
-
         # # 4.1.prepare oconv
         octSceneFiles = [sceneFiles.matFile, sceneFiles.geoFile, sunsMat, sunsGeo] + \
             sceneFiles.sceneMatFiles + sceneFiles.sceneRadFiles + \
@@ -300,8 +297,8 @@ class SolarAccess(GenericGridBased):
         rct.pointsFile = self.relpath(pointsFile, sceneFiles.path)
 
         # # 4.3 write batch file
-        self.commands.append(oc.toRadString())
-        self.commands.append(rct.toRadString())
+        self._addCommand(oc)
+        self._addCommand(rct)
         batchFile = os.path.join(sceneFiles.path, "commands.bat")
 
         writeToFile(batchFile, '\n'.join(self.commands))
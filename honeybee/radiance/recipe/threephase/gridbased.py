@@ -1,12 +1,14 @@
 from ..radrecutil import windowGroupToReceiver, coeffMatrixCommands, skyReceiver, \
-    matrixCalculation, convertMatrixResults, skymtxToGendaymtx
+    matrixCalculation, convertMatrixResults, skymtxToGendaymtx, bsdfToMatrix
 from ..dc.gridbased import DaylightCoeffGridBased
+from ...command.pipeline import Pipeline
 from ...parameters.rfluxmtx import RfluxmtxParameters
 from ...material.glow import GlowMaterial
 from ...sky.skymatrix import SkyMatrix
 from ....futil import writeToFile, copyFilesToFolder
 
 import os
+from itertools import izip
 
 
 # TODO(): implement simulationType
@@ -24,6 +26,14 @@ class ThreePhaseGridBased(DaylightCoeffGridBased):
             should be an instance of RfluxmtxParameters.
         hbObjects: An optional list of Honeybee surfaces or zones (Default: None).
         subFolder: Analysis subfolder for this recipe. (Default: "daylightcoeff").
+        matrixFormat: Format of the view, daylight and final matrices. a for ASCII,
+            f for binary float and d for binary double (Default: a).
+        multiplyInProcess: Set to True to multiply the matrices in Python instead
+            of dctimestep and rmtxop. D.S is calculated once for each window group
+            and T.D.S once for each state. Results are assigned directly to the
+            analysis grids. Requires numpy (Default: False).
+        memoryLimit: Memory budget in bytes for writing binary results with
+            multiplyInProcess (Default: 256 MB).
 
     Usage:
 
@@ -59,6 +69,7 @@ class ThreePhaseGridBased(DaylightCoeffGridBased):
         self.daylightMtxParameters = daylightMtxParameters
         self.reuseViewMtx = reuseViewMtx
         self.reuseDaylightMtx = reuseDaylightMtx
+        self._engineMatrices = None
 
     @classmethod
     def fromWeatherFilePointsAndVectors(
@@ -232,19 +243,18 @@ class ThreePhaseGridBased(DaylightCoeffGridBased):
         numberOfPoints = sum(len(ag) for ag in self.analysisGrids)
 
         # 2.write batch file
-        self.commands = []
+        self._startCommands(sceneFiles.path, header)
         self.resultsFile = []
 
-        if header:
-            self.commands.append(self.header(sceneFiles.path))
+        # full path to view, daylight and transmission matrices for multiplyInProcess
+        self._engineMatrices = []
 
         # 3.0.Create sky matrix.
         skyMtx = 'skies\\{}.smx'.format(self.skyMatrix.name)
         if hasattr(self.skyMatrix, 'isSkyMatrix'):
-            gdm = skymtxToGendaymtx(self.skyMatrix, sceneFiles.path)
+            gdm = skymtxToGendaymtx(self.skyMatrix, sceneFiles.path, self.cache is None)
             if gdm:
-                self.commands.append(':: sky matrix')
-                self.commands.append(gdm.toRadString())
+                self._addCommand(gdm, ':: sky matrix')
         else:
             # sky vector
             raise TypeError('You must use a SkyMatrix to generate the sky.')
@@ -283,8 +293,8 @@ class ThreePhaseGridBased(DaylightCoeffGridBased):
 
             # 3.2.Generate view matrix
             vMatrix = 'results\\matrix\\{}.vmx'.format(windowGroup)
-            if not os.path.isfile(os.path.join(sceneFiles.path, vMatrix)) \
-                    or not self.reuseViewMtx:
+            if not self._canReuse(os.path.join(sceneFiles.path, vMatrix),
+                                  self.reuseViewMtx):
                 # prepare input files
                 receiver = windowGroupToReceiver(windowGroupPath, attr['upnormal'])
                 viewMtxFiles = (sceneFiles.matFile, sceneFiles.geoFile)
@@ -293,17 +303,16 @@ class ThreePhaseGridBased(DaylightCoeffGridBased):
                 vmtx = coeffMatrixCommands(
                     vMatrix, self.relpath(receiver, sceneFiles.path), radFiles, '-',
                     self.relpath(pointsFile, sceneFiles.path), numberOfPoints,
-                    None, self.viewMtxParameters)
+                    None, self.viewMtxParameters, self.matrixFormat)
 
-                self.commands.append(':: :: 1. view matrix calculation')
-                self.commands.append(vmtx.toRadString())
+                self._addCommand(vmtx, ':: :: 1. view matrix calculation')
 
             # 3.3 daylight matrix
             dMatrix = 'results\\matrix\\{}_{}_{}.dmx'.format(
                 windowGroup, self.skyMatrix.skyDensity, self.numOfTotalPoints)
 
-            if not os.path.isfile(os.path.join(sceneFiles.path, dMatrix)) \
-                    or not self.reuseDaylightMtx:
+            if not self._canReuse(os.path.join(sceneFiles.path, dMatrix),
+                                  self.reuseDaylightMtx):
 
                 daylightMtxFiles = [sceneFiles.matFile, sceneFiles.geoFile] + \
                     sceneFiles.sceneMatFiles + sceneFiles.sceneRadFiles + \
@@ -328,33 +337,51 @@ class ThreePhaseGridBased(DaylightCoeffGridBased):
 
                 dmtx = coeffMatrixCommands(
                     dMatrix, self.relpath(receiver, sceneFiles.path), radFiles,
-                    sender, None, None, samplingRaysCount, self.daylightMtxParameters)
-
-                self.commands.append(':: :: 2. daylight matrix calculation')
-                self.commands.append(dmtx.toRadString())
+                    sender, None, None, samplingRaysCount, self.daylightMtxParameters,
+                    self.matrixFormat)
+
+                self._addCommand(dmtx, ':: :: 2. daylight matrix calculation')
+
+            if self.multiplyInProcess:
+                states = []
+                for count, state in enumerate(attr['states']):
+                    # 4. transmission matrix for the state
+                    tMatrix = 'results\\matrix\\{}..{}.tmx'.format(
+                        windowGroup, state.name)
+                    tmtx = bsdfToMatrix(
+                        tMatrix, self.relpath(_xmlFiles[count], sceneFiles.path),
+                        self.matrixFormat)
+                    self._addCommand(
+                        tmtx, ':: :: 3.{} transmission matrix for {}'.format(
+                            count, state.name))
+                    binaryFile = 'results\\{}..{}.bin'.format(windowGroup, state.name)
+                    states.append((state.name, os.path.join(sceneFiles.path, tMatrix),
+                                   os.path.join(sceneFiles.path, binaryFile)))
+
+                self._engineMatrices.append(
+                    (windowGroup, os.path.join(sceneFiles.path, vMatrix),
+                     os.path.join(sceneFiles.path, dMatrix), states))
+                continue
 
             for count, state in enumerate(attr['states']):
                 # 4. matrix calculations
                 tMatrix = self.relpath(_xmlFiles[count], sceneFiles.path)
-                output = r'.tmp\\{}..{}.tmp'.format(windowGroup, state.name)
-                dct = matrixCalculation(output, vMatrix, tMatrix, dMatrix, skyMtx)
-
-                self.commands.append(
-                    ':: :: 3.1.{} final matrix calculation for {}'.format(count,
-                                                                          state.name))
-                self.commands.append(dct.toRadString())
+                dct = matrixCalculation(None, vMatrix, tMatrix, dMatrix, skyMtx,
+                                        self.matrixFormat)
 
-                # 5. convert r, g ,b values to illuminance
+                # 5. convert r, g ,b values to illuminance. dctimestep writes to
+                # rmtxop through a pipe.
                 finalOutput = r'results\\{}..{}.ill'.format(windowGroup, state.name)
-                finalmtx = convertMatrixResults(finalOutput, (dct.outputFile,))
-                self.commands.append(
-                    ':: :: 3.2.{} convert RGB values to illuminance for {}'.format(
-                        count, state.name)
-                )
-                self.commands.append(finalmtx.toRadString())
+                finalmtx = convertMatrixResults(finalOutput, ('-',), self.matrixFormat)
+                self._addCommand(
+                    Pipeline((dct, finalmtx)),
+                    ':: :: 3.{} final matrix calculation for {}'.format(
+                        count, state.name))
 
                 self.resultsFile.append(os.path.join(sceneFiles.path, finalOutput))
 
+        self._matrixFiles = (None, os.path.join(sceneFiles.path, skyMtx), None)
+
         # 5. write batch file
         batchFile = os.path.join(sceneFiles.path, "commands.bat")
         writeToFile(batchFile, "\n".join(self.commands))
@@ -363,15 +390,111 @@ class ThreePhaseGridBased(DaylightCoeffGridBased):
         print("Files are written to: %s" % sceneFiles.path)
         return batchFile
 
-    def results(self, flattenResults=True):
-        """Return results for this analysis."""
+    def results(self, flattenResults=True, streaming=False, DAThreshhold=None,
+                UDIMinMax=None, occSchedule=None):
+        """Return results for this analysis.
+
+        Args:
+            flattenResults: Not used for annual analysis.
+            streaming: Set to True to calculate annual metrics while reading the
+                results instead of loading the hourly values to analysis grids. The
+                first state of each window group will be used (default: False).
+            DAThreshhold: Threshhold for daylight autonomy in lux for streaming
+                (default: 300).
+            UDIMinMax: A tuple of min, max value for useful daylight illuminance
+                for streaming (default: (100, 2000)).
+            occSchedule: An annual occupancy schedule for streaming.
+
+        Returns:
+            Analysis grids with values or an AnnualMetricsStream for each analysis
+            grid if streaming is True.
+        """
         assert self.isCalculated, \
             "You haven't run the Recipe yet. Use self.run " + \
             "to run the analysis before loading the results."
 
+        if self.multiplyInProcess:
+            return self._multiplyResults(streaming, DAThreshhold, UDIMinMax,
+                                         occSchedule)
+
+        if streaming:
+            # use the first state of each source similar to the default state
+            # of analysis grids
+            files = {}
+            for r in self.resultsFile:
+                source = os.path.split(r)[-1][:-4].split("..")[0]
+                files.setdefault(source, r)
+            return self.streamResults(
+                [r for r in self.resultsFile if r in files.values()],
+                DAThreshhold, UDIMinMax, occSchedule)
+
         # self.loader.resultFiles = self.resultsFile
         for r in self.resultsFile:
             source, state = os.path.split(r)[-1][:-4].split("..")
             self.analysisGrids[0].setValuesFromFile(r, self.skyMatrix.hoys,
                                                     source, state)
         return self.analysisGrids
+
+    def engine(self):
+        """Get a ThreePhaseEngine for the matrices of this analysis.
+
+        The engine can be used to calculate the results for new states of the
+        window groups without running dctimestep. This method requires numpy.
+        """
+        assert self.isCalculated, \
+            "You haven't run the Recipe yet. Use self.run " + \
+            "to run the analysis before loading the results."
+
+        from ...postprocess.matrixchain import ThreePhaseEngine
+        engine = ThreePhaseEngine(self._matrixFiles[1])
+        for windowGroup, vMatrix, dMatrix, states in self._engineMatrices:
+            engine.addWindowGroup(windowGroup, vMatrix, dMatrix)
+            for state, tMatrix, _ in states:
+                engine.addState(windowGroup, state, tMatrix)
+        return engine
+
+    def _multiplyResults(self, streaming=False, DAThreshhold=None, UDIMinMax=None,
+                         occSchedule=None):
+        """Calculate the results for all the states in this process."""
+        from ...postprocess.matrixmultiply import assignBlocks
+        engine = self.engine()
+        if streaming:
+            # use the first state of each source similar to the default state
+            # of analysis grids
+            blocks = [engine.illuminanceBlocks(wg, engine.states(wg)[0])
+                      for wg in engine.windowGroups]
+            rows = (sum(values) for parts in izip(*blocks)
+                    for values in izip(*(block for _, block in parts)))
+            return self._streamRows(rows, DAThreshhold, UDIMinMax, occSchedule)
+
+        hoys = self.skyMatrix.hoys
+        for wg in engine.windowGroups:
+            for state in engine.states(wg):
+                assignBlocks(self.analysisGrids, engine.illuminanceBlocks(wg, state),
+                             hoys, wg, state)
+        return self.analysisGrids
+
+    def binaryResults(self, reuse=True):
+        """Return memory-mapped binary results for this analysis.
+
+        Results files will be converted to binary files next to the ASCII files.
+        If multiplyInProcess is True the matrices are multiplied to
+        results\\windowGroup..state.bin files instead. This method requires numpy.
+
+        Args:
+            reuse: Reuse the binary files if they are newer than the results
+                (default: True).
+
+        Returns:
+            A list of BinaryResults. One for each state of each window group.
+        """
+        if not self.multiplyInProcess:
+            return super(ThreePhaseGridBased, self).binaryResults(reuse)
+
+        engine = self.engine()
+        skyMatrix = self._matrixFiles[1]
+        memoryLimit = self.memoryLimit
+        return [self._writeBlocks(binaryFile, (vMatrix, tMatrix, dMatrix, skyMatrix),
+                                  engine.illuminanceTiles(wg, state, memoryLimit), reuse)
+                for wg, vMatrix, dMatrix, states in self._engineMatrices
+                for state, tMatrix, binaryFile in states]
@@ -0,0 +1,663 @@
+"""Array-backed storage for analysis results."""
+from __future__ import division
+from array import array
+from itertools import izip
+import types
+
+
+class ResultStore(object):
+    """Contiguous float32 storage for the results of a group of analysis points.
+
+    All the values are kept in a single array.array('f'). Each source (window
+    group) and state pair gets a slot and the block is ordered as
+    slots x points x hours x (total, direct). Adding a new source or state
+    appends a slot to the end of the block and reading the values of one state for
+    all the points is a contiguous slice. Values which are not assigned are stored
+    as NaN and returned as None.
+
+    Duplicates of a store share the same array until one of them is changed
+    (copy-on-write). Stores which share an array keep a count of them and a store
+    only copies the array before a change if another store still uses it.
+
+    Attributes:
+        pointCount: Number of analysis points in this store.
+        hoys: Sorted list of hours of the year.
+        sources: Sorted list of sources.
+    """
+
+    __slots__ = ('_pointCount', '_hoys', '_hoyIds', '_sources', '_slots', '_data',
+                 '_isDirectLoaded', '_refs')
+
+    NAN = float('nan')
+
+    def __init__(self, pointCount):
+        """Create an empty result store for pointCount points."""
+        self._data = array('f')
+        # number of stores which use self._data. The list is shared between them.
+        self._refs = [1]
+        self._pointCount = int(pointCount)
+        self._hoys = ()
+        # map each hoy to its column in the block
+        self._hoyIds = {}
+        # name of sources and their state. It's only meaningful in multi-phase
+        # daylight analysis. In analysis for a single time it will be {None: [None]}
+        self._sources = {}
+        # slot index for each source and state as self._slots[sourceId][stateId]
+        self._slots = []
+        self._isDirectLoaded = False
+
+    @property
+    def pointCount(self):
+        """Number of analysis points."""
+        return self._pointCount
+
+    @property
+    def hoys(self):
+        """Return sorted hours of the year for results if any."""
+        return list(self._hoys)
+
+    @property
+    def hourCount(self):
+        """Number of hours in this store."""
+        return len(self._hoys)
+
+    @property
+    def slotCount(self):
+        """Number of source and state combinations in this store."""
+        return sum(len(s) for s in self._slots)
+
+    @property
+    def data(self):
+        """Raw array of values.
+
+        The array is ordered as slots x points x hours x (total, direct). The array
+        might be shared with duplicates of this store and should not be changed.
+        """
+        return self._data
+
+    def asArray(self):
+        """Get values as a read-only numpy array of shape (slots, points, hours, 2).
+
+        This method requires numpy. The array shares the memory with the store.
+        Adding new sources, states or hours to the store doesn't change the array
+        and they are only available in a new array. Use setBlockValues to change
+        the values.
+        """
+        values = self._array()
+        values.flags.writeable = False
+        return values
+
+    def _array(self):
+        """Get values as a numpy array. Use _detach before changing the values."""
+        import numpy as np
+        return np.frombuffer(self._data, dtype=np.float32).reshape(
+            self.slotCount, self._pointCount, len(self._hoys), 2)
+
+    @property
+    def hasValues(self):
+        """Check if this store has results values."""
+        return len(self._slots) != 0
+
+    @property
+    def hasDirectValues(self):
+        """Check if direct values are loaded in this store."""
+        return self._isDirectLoaded
+
+    @property
+    def sources(self):
+        """Get sorted list fo sources."""
+        srcs = range(len(self._sources))
+        for name, d in self._sources.iteritems():
+            srcs[d['id']] = name
+        return srcs
+
+    @property
+    def states(self):
+        """Get list of states names for each source."""
+        return tuple(s[1]['state'] for s in self._sources.iteritems())
+
+    @property
+    def longestStateIds(self):
+        """Get longest combination between blind states as blindsStateIds."""
+        states = tuple(len(self._sources[s]['state']) - 1 for s in self.sources)
+
+        return tuple(tuple(min(s, i) for s in states)
+                     for i in range(max(states) + 1))
+
+    def sourceId(self, source):
+        """Get source id if available."""
+        try:
+            return self._sources[source]['id']
+        except KeyError:
+            raise ValueError('Invalid source input: {}'.format(source))
+
+    def sourceStates(self, source):
+        """Get list of state names for a source in order of state ids."""
+        try:
+            return tuple(self._sources[source]['state'])
+        except KeyError:
+            raise ValueError('Invalid source input: {}'.format(source))
+
+    def blindStateId(self, source, state):
+        """Get state id if available."""
+        try:
+            return int(state)
+        except (TypeError, ValueError):
+            pass
+
+        try:
+            return self._sources[source]['state'].index(state)
+        except (KeyError, ValueError):
+            raise ValueError('Invalid state input: {}'.format(state))
+
+    def stateCombinationIds(self, combinations=None):
+        """Get state ids for a list of blind combinations.
+
+        Args:
+            combinations: List of combinations. Each combination has a state name or
+                a state id for each source in order of sources. A combination can
+                also be a comma separated string (e.g. "0, clear"). If None the
+                longest combination of states will be returned.
+
+        Returns:
+            A tuple of state ids for each combination.
+        """
+        if not combinations:
+            return self.longestStateIds
+
+        sources = self.sources
+        combs = ((c.strip() for c in cc.split(',')) if isinstance(cc, basestring)
+                 else cc for cc in combinations)
+        combIds = []
+        for comb in combs:
+            comb = tuple(comb)
+            if len(comb) != len(sources):
+                raise ValueError(
+                    'Length of each state should be equal to number of sources: {}'
+                    .format(len(sources))
+                )
+            combIds.append(tuple(self.blindStateId(source, state)
+                                 for source, state in izip(sources, comb)))
+        return tuple(combIds)
+
+    def slotId(self, sourceId, stateId):
+        """Get slot index for a source id and a state id."""
+        try:
+            return self._slots[sourceId][stateId]
+        except (IndexError, TypeError):
+            raise ValueError(
+                'Invalid input: source id [{}] state id [{}].'.format(sourceId, stateId)
+            )
+
+    def rowOffset(self, slot, pointId):
+        """Index of the first value of a point for a slot in the data array."""
+        return (slot * self._pointCount + pointId) * len(self._hoys) * 2
+
+    def hoyIds(self, hoys):
+        """Get column index for a collection of hours."""
+        ids = self._hoyIds
+        try:
+            return tuple(ids[h] for h in hoys)
+        except KeyError as e:
+            raise ValueError('Invalid hoy input: {}'.format(e))
+
+    def createDataStructure(self, source, state):
+        """Create place holders for sources and states if needed.
+
+        Returns:
+            source id and state id as a tuple.
+        """
+        if source not in self._sources:
+            self._sources[source] = {'id': len(self._sources), 'state': []}
+            self._slots.append([])
+
+        sid = self._sources[source]['id']
+        states = self._sources[source]['state']
+        if state not in states:
+            states.append(state)
+            self._slots[sid].append(self.slotCount)
+            # append an empty block for the new slot. The data is copied to a new
+            # array and not extended in place since arrays from asArray still point
+            # to the memory of the current array.
+            self._setData(self._data + array('f', (self.NAN,)) *
+                          (self._pointCount * len(self._hoys) * 2))
+
+        return sid, states.index(state)
+
+    def addHoys(self, hoys):
+        """Add hours to the store.
+
+        Existing values will be moved to the new columns.
+        """
+        newHoys = set(hoys).difference(self._hoyIds)
+        if not newHoys:
+            return
+
+        oldCount = len(self._hoys)
+        oldIds = self._hoyIds
+        self._hoys = tuple(sorted(newHoys.union(self._hoys)))
+        self._hoyIds = dict((h, c) for c, h in enumerate(self._hoys))
+
+        if not self.hasValues:
+            return
+
+        # re-layout the block for the new number of hours. Values are copied
+        # column by column using extended slices.
+        rowCount = self.slotCount * self._pointCount
+        newCount = len(self._hoys)
+        data = array('f', (self.NAN,)) * (rowCount * newCount * 2)
+        for h, c in oldIds.iteritems():
+            nc = self._hoyIds[h]
+            for i in (0, 1):
+                data[nc * 2 + i::newCount * 2] = self._data[c * 2 + i::oldCount * 2]
+        self._setData(data)
+
+    def _detach(self):
+        """Copy the data if it is shared with another store before changing it."""
+        if self._refs[0] > 1:
+            self._setData(array('f', self._data))
+
+    def _setData(self, data):
+        """Replace the data and stop sharing the old data."""
+        self._refs[0] -= 1
+        self._data = data
+        self._refs = [1]
+
+    def setValues(self, pointId, values, hoys, source=None, state=None,
+                  isDirect=False):
+        """Set values for a point for several hours of the year.
+
+        Args:
+            pointId: Index of the point in this store.
+            values: List of Illuminance values as numbers.
+            hoys: List of hours of the year that corresponds to input values.
+            source: Name of the source of light. Only needed in case of multiple
+                sources / window groups (default: None).
+            state: State of the source if any (default: None).
+            isDirect: Set to True if the value is direct contribution of sunlight.
+        """
+        if isinstance(hoys, types.GeneratorType):
+            hoys = tuple(hoys)
+        self.addHoys(hoys)
+        sid, stateid = self.createDataStructure(source, state)
+
+        if isDirect:
+            self._isDirectLoaded = True
+
+        ind = 1 if isDirect else 0
+        self._detach()
+        data = self._data
+        start = self.rowOffset(self._slots[sid][stateid], pointId)
+        if len(hoys) == len(self._hoys) and tuple(hoys) == self._hoys:
+            # values are for all the hours in order
+            values = array('f', values)
+            if len(values) != len(hoys):
+                raise ValueError(
+                    'Length of values [%d] is not equal to length of hoys [%d].'
+                    % (len(values), len(hoys)))
+            data[start + ind:start + len(hoys) * 2:2] = values
+        else:
+            for col, value in izip(self.hoyIds(hoys), values):
+                data[start + col * 2 + ind] = value
+
+    def setBlockValues(self, startPoint, values, hoys, source=None, state=None,
+                       isDirect=False):
+        """Set values for a block of consecutive points for several hours of the year.
+
+        Args:
+            startPoint: Index of the first point in this store.
+            values: A points x hours numpy array or a list of values for each point.
+                numpy arrays are copied to the store at once.
+            hoys: List of hours of the year that corresponds to input values.
+            source: Name of the source of light. Only needed in case of multiple
+                sources / window groups (default: None).
+            state: State of the source if any (default: None).
+            isDirect: Set to True if the value is direct contribution of sunlight.
+        """
+        if not hasattr(values, 'shape'):
+            for count, pointValues in enumerate(values):
+                self.setValues(startPoint + count, pointValues, hoys, source, state,
+                               isDirect)
+            return
+
+        if not 0 <= startPoint <= startPoint + len(values) <= self._pointCount:
+            raise IndexError('Points {}-{} are out of range for {}.'.format(
+                startPoint, startPoint + len(values), self))
+
+        hoys = tuple(hoys)
+        self.addHoys(hoys)
+        sid, stateid = self.createDataStructure(source, state)
+        if isDirect:
+            self._isDirectLoaded = True
+
+        self._detach()
+        block = self._array()[self._slots[sid][stateid],
+                              startPoint:startPoint + len(values)]
+        ind = 1 if isDirect else 0
+        if hoys == self._hoys:
+            block[:, :, ind] = values
+        else:
+            block[:, list(self.hoyIds(hoys)), ind] = values
+
+    def setCoupledValues(self, pointId, values, hoys, source=None, state=None):
+        """Set total and direct values for a point for several hours of the year.
+
+        Args:
+            pointId: Index of the point in this store.
+            values: List of Illuminance values as tuples (total, direct).
+            hoys: List of hours of the year that corresponds to input values.
+            source: Name of the source of light. Only needed in case of multiple
+                sources / window groups (default: None).
+            state: State of the source if any (default: None).
+        """
+        if isinstance(hoys, types.GeneratorType):
+            hoys = tuple(hoys)
+        self.addHoys(hoys)
+        sid, stateid = self.createDataStructure(source, state)
+
+        self._detach()
+        data = self._data
+        start = self.rowOffset(self._slots[sid][stateid], pointId)
+        for col, value in izip(self.hoyIds(hoys), values):
+            try:
+                data[start + col * 2] = value[0]
+                data[start + col * 2 + 1] = value[1]
+            except (TypeError, IndexError):
+                raise ValueError(
+                    "Wrong input: {}. Input values must be of length of 2.".format(value)
+                )
+        self._isDirectLoaded = True
+
+    def copyPoint(self, other, otherId, pointId):
+        """Copy the values of a point from another store.
+
+        Args:
+            other: Source ResultStore.
+            otherId: Index of the point in the other store.
+            pointId: Index of the point in this store.
+        """
+        if not other.hasValues:
+            return
+
+        self.addHoys(other._hoys)
+        cols = self.hoyIds(other._hoys)
+        for source, d in other._sources.iteritems():
+            for stateid, state in enumerate(d['state']):
+                sid, stid = self.createDataStructure(source, state)
+                self._detach()
+                data = self._data
+                src = other.rowOffset(other._slots[d['id']][stateid], otherId)
+                dst = self.rowOffset(self._slots[sid][stid], pointId)
+                for c, col in enumerate(cols):
+                    data[dst + col * 2:dst + col * 2 + 2] = \
+                        other._data[src + c * 2:src + c * 2 + 2]
+
+        if other._isDirectLoaded:
+            self._isDirectLoaded = True
+
+    def values(self, pointId, hoys, sourceId=0, stateId=0, ind=0):
+        """Get values for a point for several hours of year.
+
+        Args:
+            pointId: Index of the point in this store.
+            hoys: A collection of hoys.
+            sourceId: Id of source as an integer (default: 0).
+            stateId: Id of state as an integer (default: 0).
+            ind: 0 for total and 1 for direct values (default: 0).
+        """
+        data = self._data
+        start = self.rowOffset(self.slotId(sourceId, stateId), pointId) + ind
+        return tuple(self._clean(data[start + col * 2]) for col in self.hoyIds(hoys))
+
+    def coupledValues(self, pointId, hoys, sourceId=0, stateId=0):
+        """Get total and direct values for a point for several hours of year."""
+        data = self._data
+        start = self.rowOffset(self.slotId(sourceId, stateId), pointId)
+        cl = self._clean
+        return tuple((cl(data[start + col * 2]), cl(data[start + col * 2 + 1]))
+                     for col in self.hoyIds(hoys))
+
+    def duplicate(self, pointIds=None):
+        """Duplicate the store.
+
+        A duplicate of all the points shares the values with this store until one
+        of the stores is changed.
+
+        Args:
+            pointIds: An optional list of point indices. If provided the new store
+                will only include the values for these points in the same order.
+        """
+        if pointIds is None:
+            pointIds = xrange(self._pointCount)
+        else:
+            pointIds = tuple(pointIds)
+
+        dup = ResultStore(len(pointIds))
+        dup._hoys = self._hoys
+        dup._hoyIds = dict(self._hoyIds)
+        dup._sources = dict(
+            (s, {'id': d['id'], 'state': list(d['state'])})
+            for s, d in self._sources.iteritems())
+        dup._slots = [list(s) for s in self._slots]
+        dup._isDirectLoaded = self._isDirectLoaded
+
+        if len(pointIds) == self._pointCount and \
+                tuple(pointIds) == tuple(xrange(self._pointCount)):
+            # share the data until one of the stores is changed
+            self._refs[0] += 1
+            dup._data = self._data
+            dup._refs = self._refs
+            return dup
+
+        rowLength = len(self._hoys) * 2
+        data = dup._data
+        if pointIds and pointIds == tuple(xrange(pointIds[0], pointIds[-1] + 1)):
+            # a continuous range of points is a single slice in each slot
+            size = rowLength * len(pointIds)
+            for slot in xrange(self.slotCount):
+                st = self.rowOffset(slot, pointIds[0])
+                data.extend(self._data[st:st + size])
+            return dup
+
+        for slot in xrange(self.slotCount):
+            for pid in pointIds:
+                st = self.rowOffset(slot, pid)
+                data.extend(self._data[st:st + rowLength])
+        return dup
+
+    @classmethod
+    def concatenate(cls, stores):
+        """Create a new store by concatenating the points in several stores.
+
+        Stores with values must have the same hoys, sources and states.
+        """
+        stores = tuple(s.duplicate() if isinstance(s, ResultStoreView) else s
+                       for s in stores)
+        withValues = tuple(s for s in stores if s.hasValues)
+        new = cls(sum(s.pointCount for s in stores))
+        if not withValues:
+            return new
+
+        base = withValues[0]
+        for s in withValues[1:]:
+            assert s._hoys == base._hoys, \
+                ValueError('Two analysis grid must have the same hoys.')
+            assert s._sources == base._sources, \
+                ValueError(
+                    'Two analysis grid with values must have the same windowGroups.'
+                )
+
+        new.addHoys(base._hoys)
+        new._sources = dict(
+            (s, {'id': d['id'], 'state': list(d['state'])})
+            for s, d in base._sources.iteritems())
+        new._slots = [list(s) for s in base._slots]
+        new._isDirectLoaded = all(s._isDirectLoaded for s in withValues)
+
+        # source id and state id for each slot of the base store. Slots of other
+        # stores can be in a different order if states are added in a different
+        # order.
+        slotIds = [None] * base.slotCount
+        for sid, slots in enumerate(base._slots):
+            for stateid, slot in enumerate(slots):
+                slotIds[slot] = sid, stateid
+
+        empty = array('f', (cls.NAN,))
+        for sid, stateid in slotIds:
+            for s in stores:
+                size = s.pointCount * len(base._hoys) * 2
+                if s.hasValues:
+                    st = s.slotId(sid, stateid) * size
+                    new._data.extend(s._data[st:st + size])
+                else:
+                    new._data.extend(empty * size)
+        return new
+
+    def view(self, pointIds):
+        """Get a view to a subset of points in this store.
+
+        The view doesn't copy the values. Values which are set through the view are
+        set in this store.
+
+        Args:
+            pointIds: List of point indices for the view.
+        """
+        return ResultStoreView(self, pointIds)
+
+    @staticmethod
+    def _clean(value):
+        """Return None for values that are not assigned."""
+        return None if value != value else value
+
+    def __len__(self):
+        """Number of points in this store."""
+        return self._pointCount
+
+    def __del__(self):
+        """Stop sharing the data with the duplicates of this store."""
+        self._refs[0] -= 1
+
+    def __repr__(self):
+        """Result store representation."""
+        return 'ResultStore::#{}::#{}hours::#{}states'.format(
+            self._pointCount, len(self._hoys), self.slotCount)
+
+
+class ResultStoreView(object):
+    """A view to a subset of points of a ResultStore.
+
+    Point indices are mapped to the indices in the base store and all the other
+    attributes are read from the base store. Values are not copied.
+
+    Attributes:
+        store: Base ResultStore.
+        pointIds: Index of points of this view in the base store.
+    """
+
+    __slots__ = ('_store', '_pointIds')
+
+    def __init__(self, store, pointIds):
+        """Create a view to a subset of points in a store."""
+        if isinstance(store, ResultStoreView):
+            # map to the base store to avoid nested views
+            pointIds = (store._pointIds[i] for i in pointIds)
+            store = store._store
+        self._store = store
+        self._pointIds = array('l', pointIds)
+        if self._pointIds and not \
+                0 <= min(self._pointIds) <= max(self._pointIds) < store.pointCount:
+            raise IndexError('Point index out of range for {}.'.format(store))
+
+    @property
+    def store(self):
+        """Base ResultStore."""
+        return self._store
+
+    @property
+    def pointIds(self):
+        """Index of points of this view in the base store."""
+        return self._pointIds
+
+    @property
+    def pointCount(self):
+        """Number of analysis points."""
+        return len(self._pointIds)
+
+    def asArray(self):
+        """Get values as a numpy array of shape (slots, points, hours, 2).
+
+        This method requires numpy. Values are only copied if the points of the
+        view are not a continuous range of points in the base store. Use
+        setBlockValues to change the values.
+        """
+        ids = self._pointIds
+        if _isContinuous(ids):
+            return self._store.asArray()[:, ids[0]:ids[-1] + 1]
+        return self._store.asArray()[:, ids.tolist()]
+
+    def rowOffset(self, slot, pointId):
+        """Get start index of values of a point for a slot in the base data."""
+        return self._store.rowOffset(slot, self._pointIds[pointId])
+
+    def setValues(self, pointId, values, hoys, source=None, state=None,
+                  isDirect=False):
+        """Set values for a point for several hours of the year."""
+        self._store.setValues(self._pointIds[pointId], values, hoys, source, state,
+                              isDirect)
+
+    def setBlockValues(self, startPoint, values, hoys, source=None, state=None,
+                       isDirect=False):
+        """Set values for a block of consecutive points for several hours of the year."""
+        ids = self._pointIds[startPoint:startPoint + len(values)]
+        if _isContinuous(ids):
+            self._store.setBlockValues(ids[0], values, hoys, source, state, isDirect)
+            return
+        for pointId, pointValues in izip(ids, values):
+            self._store.setValues(pointId, pointValues, hoys, source, state, isDirect)
+
+    def setCoupledValues(self, pointId, values, hoys, source=None, state=None):
+        """Set total and direct values for a point for several hours of the year."""
+        self._store.setCoupledValues(self._pointIds[pointId], values, hoys, source,
+                                     state)
+
+    def copyPoint(self, other, otherId, pointId):
+        """Copy the values of a point from another store."""
+        self._store.copyPoint(other, otherId, self._pointIds[pointId])
+
+    def values(self, pointId, hoys, sourceId=0, stateId=0, ind=0):
+        """Get values for a point for several hours of year."""
+        return self._store.values(self._pointIds[pointId], hoys, sourceId, stateId,
+                                  ind)
+
+    def coupledValues(self, pointId, hoys, sourceId=0, stateId=0):
+        """Get total and direct values for a point for several hours of year."""
+        return self._store.coupledValues(self._pointIds[pointId], hoys, sourceId,
+                                         stateId)
+
+    def duplicate(self, pointIds=None):
+        """Copy the values of the points in this view to a new ResultStore."""
+        if pointIds is None:
+            return self._store.duplicate(self._pointIds)
+        return self._store.duplicate(self._pointIds[i] for i in pointIds)
+
+    def view(self, pointIds):
+        """Get a view to a subset of points in this view."""
+        return ResultStoreView(self, pointIds)
+
+    def __getattr__(self, name):
+        """Read all the other attributes from the base store."""
+        return getattr(self._store, name)
+
+    def __len__(self):
+        """Number of points in this view."""
+        return len(self._pointIds)
+
+    def __repr__(self):
+        """Result store view representation."""
+        return 'ResultStoreView::#{}::{}'.format(len(self._pointIds), self._store)
+
+
+def _isContinuous(ids):
+    """Check if an array of point ids is a continuous range."""
+    return bool(ids) and ids[-1] - ids[0] == len(ids) - 1 and \
+        ids == array(ids.typecode, xrange(ids[0], ids[-1] + 1))
@@ -1,8 +1,31 @@
 """Radiance Analysis workflows."""
+from .. import config
+
 from subprocess import Popen
+import subprocess
+import json
 import time
+import sys
 import os
 
+try:
+    from multiprocessing import cpu_count
+except ImportError:
+    # IronPython
+    def cpu_count():
+        """Number of cores of this computer."""
+        return int(os.environ.get('NUMBER_OF_PROCESSORS', 1))
+
+
+def radianceEnvironment():
+    """Environment with Radiance binaries and libraries in PATH and RAYPATH."""
+    env = dict(os.environ)
+    for key, path in (('PATH', config.radbinPath), ('RAYPATH', config.radlibPath)):
+        if path:
+            env[key] = os.pathsep.join(
+                p for p in (str(path), env.get(key, '')) if p)
+    return env
+
 
 # TODO: (@sariths) Should we add electrical lighting as an input in rad files.
 class AnalysisBase(object):
@@ -20,6 +43,7 @@ class AnalysisBase(object):
         """
         self.__isExecuted = False
         self.__done = False
+        self.__progress = 0
 
     @property
     def isRunning(self):
@@ -36,7 +60,7 @@ class AnalysisBase(object):
     @property
     def progress(self):
         """Return progress value between 0-100."""
-        raise NotImplementedError
+        return self.__progress
 
     def write(self):
         """Write analysis files."""
@@ -97,6 +121,7 @@ class AnalysisBase(object):
                     # wait for half a second
                     time.sleep(waitingTime)
 
+                self.__progress = 100.0 * finished / total
                 if finished == total:
                     self.__done = True
 
@@ -106,3 +131,527 @@ class AnalysisBase(object):
     def __repr__(self):
         """Represent Analysis class."""
         return "honeybee.Analysis.%s" % self.__class__.__name__
+
+
+class CommandNode(object):
+    """A Radiance command in a CommandGraph.
+
+    Attributes:
+        name: Unique name of the node (e.g. 003_rfluxmtx).
+        command: A Radiance command.
+        comment: An optional description of the command.
+        inputs: Normalized path to input files.
+        outputs: Normalized path to output files.
+        dependencies: Name of the nodes which should finish before this node.
+        cpus: Number of cores that the command uses (default: 1).
+    """
+
+    __slots__ = ('name', 'command', 'comment', 'inputs', 'outputs', 'dependencies',
+                 'cpus')
+
+    def __init__(self, name, command, comment=None, inputs=(), outputs=(),
+                 dependencies=(), cpus=1):
+        """Create a command node."""
+        self.name = name
+        self.command = command
+        self.comment = comment
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.dependencies = tuple(dependencies)
+        self.cpus = max(1, int(cpus))
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Command node representation."""
+        return 'CommandNode::{}::#{}dependencies'.format(
+            self.name, len(self.dependencies))
+
+
+class CommandGraph(object):
+    """Dependency graph of Radiance commands.
+
+    Commands are added in the same order as the batch file. A command depends on
+    an earlier command if it reads a file that the earlier command writes or if it
+    writes a file that the earlier command reads or writes. Input and output files
+    are collected from inputFiles and outputFile of each command. Commands without
+    a dependency can run at the same time (e.g. view and daylight matrices of all
+    the window groups).
+
+    Attributes:
+        workingDir: Folder which the commands are executed from. Relative paths
+            are relative to this folder.
+    """
+
+    __slots__ = ('_workingDir', '_nodes', '_writers', '_readers')
+
+    def __init__(self, workingDir=None):
+        """Create an empty command graph."""
+        self._workingDir = workingDir or os.getcwd()
+        self._nodes = []
+        # last node which writes each file and nodes which read it after that
+        self._writers = {}
+        self._readers = {}
+
+    @property
+    def workingDir(self):
+        """Folder which the commands are executed from."""
+        return self._workingDir
+
+    @property
+    def nodes(self):
+        """Command nodes in the order of the batch file."""
+        return tuple(self._nodes)
+
+    def add(self, command, comment=None, cpus=1):
+        """Add a Radiance command to the graph.
+
+        Args:
+            command: A Radiance command.
+            comment: An optional description of the command.
+            cpus: Number of cores that the command uses (default: 1).
+
+        Returns:
+            The CommandNode for this command.
+        """
+        inputs = tuple(self._paths(command.inputFiles))
+        try:
+            outputs = tuple(self._paths(command.outputFile))
+        except AttributeError:
+            outputs = ()
+
+        dependencies = set()
+        for path in inputs:
+            if path in self._writers:
+                dependencies.add(self._writers[path])
+        for path in outputs:
+            if path in self._writers:
+                dependencies.add(self._writers[path])
+            dependencies.update(self._readers.get(path, ()))
+
+        name = '{:03d}_{}'.format(
+            len(self._nodes), command.__class__.__name__.lower())
+        dependencies.discard(name)
+        node = CommandNode(name, command, comment, inputs, outputs,
+                           sorted(dependencies), cpus)
+        self._nodes.append(node)
+
+        for path in inputs:
+            self._readers.setdefault(path, set()).add(name)
+        for path in outputs:
+            self._writers[path] = name
+            self._readers[path] = set()
+        return node
+
+    def layers(self):
+        """Get name of the nodes in groups which can run at the same time.
+
+        Each group only depends on the groups before it.
+        """
+        level = {}
+        for node in self._nodes:
+            level[node.name] = 1 + max([level[d] for d in node.dependencies] or [-1])
+        layers = [[] for i in xrange(max(level.values() or [-1]) + 1)]
+        for node in self._nodes:
+            layers[level[node.name]].append(node.name)
+        return layers
+
+    def _paths(self, files):
+        """Normalize a file or a collection of files to keys for the graph."""
+        if not files:
+            return
+        if isinstance(files, basestring) or hasattr(files, 'normpath'):
+            files = (files,)
+        for f in files:
+            # RadiancePath values are None if they are not set
+            path = getattr(f, 'normpath', f)
+            if not path:
+                continue
+            path = str(path).strip().strip('"').replace('\\', '/')
+            if os.path.isabs(path):
+                path = os.path.relpath(path, self._workingDir)
+            yield os.path.normcase(os.path.normpath(path))
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __len__(self):
+        """Number of commands."""
+        return len(self._nodes)
+
+    def __iter__(self):
+        """Iterate through command nodes."""
+        return iter(self._nodes)
+
+    def __repr__(self):
+        """Command graph representation."""
+        return 'CommandGraph::#{}commands::#{}layers'.format(
+            len(self._nodes), len(self.layers()))
+
+
+class CommandRecord(object):
+    """Time, resources and files of a command in a run of a CommandGraph.
+
+    Attributes:
+        name: Name of the node (e.g. 003_rfluxmtx).
+        command: The command line.
+        comment: Description of the command.
+        startTime: Start time in seconds since the epoch.
+        wallTime: Wall clock time in seconds.
+        cpuTime: User and system CPU time in seconds for the command and its
+            sub-processes. None if it is not available (e.g. on Windows).
+        peakMemory: Peak resident set size in bytes of the largest process of the
+            command. None if it is not available.
+        inputSizes: Size of each input file in bytes. None for missing files.
+        outputSizes: Size of each output file in bytes. None for missing files.
+        exitCode: Exit code of the command. None if the command is terminated.
+        stderr: End of the error output of the command.
+    """
+
+    __slots__ = ('name', 'command', 'comment', 'startTime', 'wallTime', 'cpuTime',
+                 'peakMemory', 'inputSizes', 'outputSizes', 'exitCode', 'stderr')
+
+    def __init__(self, name, command, comment=None, startTime=None):
+        """Create a record for a command."""
+        self.name = name
+        self.command = command
+        self.comment = comment
+        self.startTime = startTime or time.time()
+        self.wallTime = None
+        self.cpuTime = None
+        self.peakMemory = None
+        self.inputSizes = {}
+        self.outputSizes = {}
+        self.exitCode = None
+        self.stderr = ''
+
+    @property
+    def stage(self):
+        """Name of the command without the index (e.g. rfluxmtx)."""
+        return self.name.split('_', 1)[-1]
+
+    def toJson(self):
+        """Convert the record to a dictionary."""
+        return dict((attr, getattr(self, attr)) for attr in self.__slots__)
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Command record representation."""
+        return 'CommandRecord::{}::{:.2f}s::exit code {}'.format(
+            self.name, self.wallTime or 0, self.exitCode)
+
+
+class RunReport(object):
+    """Records of the commands in a run of a CommandGraph.
+
+    Attributes:
+        workingDir: Folder which the commands are executed from.
+        cpuCount: Number of cores of the executor.
+        startTime: Start time of the run in seconds since the epoch.
+        endTime: End time of the run in seconds since the epoch.
+        records: CommandRecords in the order that the commands are finished.
+    """
+
+    __slots__ = ('workingDir', 'cpuCount', 'startTime', 'endTime', 'records')
+
+    def __init__(self, workingDir, cpuCount=1):
+        """Create an empty run report."""
+        self.workingDir = workingDir
+        self.cpuCount = cpuCount
+        self.startTime = time.time()
+        self.endTime = None
+        self.records = []
+
+    @property
+    def wallTime(self):
+        """Wall clock time of the run in seconds."""
+        return (self.endTime or time.time()) - self.startTime
+
+    @property
+    def failed(self):
+        """Records of the commands which have failed."""
+        return [r for r in self.records if r.exitCode != 0]
+
+    def stages(self):
+        """Total time of the commands of each type (e.g. rfluxmtx).
+
+        Returns:
+            A dictionary of stage name to a dictionary of count, wallTime and
+            cpuTime. cpuTime is None if it is not available.
+        """
+        stages = {}
+        for record in self.records:
+            stage = stages.setdefault(
+                record.stage, {'count': 0, 'wallTime': 0, 'cpuTime': None})
+            stage['count'] += 1
+            stage['wallTime'] += record.wallTime or 0
+            if record.cpuTime is not None:
+                stage['cpuTime'] = (stage['cpuTime'] or 0) + record.cpuTime
+        return stages
+
+    def toJson(self):
+        """Convert the report to a dictionary."""
+        return {
+            'workingDir': self.workingDir,
+            'cpuCount': self.cpuCount,
+            'startTime': self.startTime,
+            'endTime': self.endTime,
+            'wallTime': self.wallTime,
+            'stages': self.stages(),
+            'commands': [r.toJson() for r in self.records]
+        }
+
+    def write(self, filePath):
+        """Write the report to a JSON file."""
+        folder = os.path.dirname(filePath)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        with open(filePath, 'wb') as outf:
+            json.dump(self.toJson(), outf, indent=2, sort_keys=True)
+        return filePath
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Run report representation."""
+        return 'RunReport::#{}commands::{:.2f}s'.format(
+            len(self.records), self.wallTime)
+
+
+class LocalExecutor(object):
+    """Run the commands of a CommandGraph in parallel on this computer.
+
+    A command starts once all its dependencies are finished and there are enough
+    free cores in cpuCount. The output and the error output of each command are
+    written to their own log files while it runs. Once a command fails no new
+    command is started, the running commands are terminated and a RuntimeError is
+    raised.
+
+    Wall time, CPU time, peak memory, size of input and output files, exit code and
+    the end of the error output of each command are collected in a RunReport. CPU
+    time and peak memory are only available where os.wait4 is available (e.g. not
+    on Windows).
+
+    Attributes:
+        cpuCount: Number of cores to use (default: number of cores of this
+            computer).
+        logFolder: Folder for log files (default: workingDir/logs).
+        waitingTime: Time in seconds between checking the running commands
+            (default: 0.1).
+        report: RunReport of the last run.
+    """
+
+    __slots__ = ('cpuCount', 'logFolder', 'waitingTime', 'report')
+
+    # number of bytes from the end of the error output in the records
+    STDERRSIZE = 4096
+
+    def __init__(self, cpuCount=None, logFolder=None, waitingTime=0.1):
+        """Create a local executor."""
+        self.cpuCount = max(1, int(cpuCount or cpu_count()))
+        self.logFolder = logFolder
+        self.waitingTime = waitingTime
+        self.report = None
+
+    def logFile(self, graph, node):
+        """Full path to the log file for a node."""
+        return os.path.join(self.logFolder or os.path.join(graph.workingDir, 'logs'),
+                            node.name + '.log')
+
+    def run(self, graph, progress=None, reportFile=None):
+        """Run the commands of a graph.
+
+        Args:
+            graph: A CommandGraph.
+            progress: An optional function which is called after each command
+                with the CommandRecord of the command, number of finished commands
+                and total number of commands (e.g. print to show the progress).
+            reportFile: Optional path to a JSON file. The RunReport is written to
+                this file at the end of the run even if a command fails.
+
+        Returns:
+            Name of the nodes in the order that they are finished.
+        """
+        env = radianceEnvironment()
+        self.report = RunReport(graph.workingDir, self.cpuCount)
+        waiting = list(graph.nodes)
+        done = set()
+        finished = []
+        # name: (node, processes, record, log files)
+        running = {}
+        usedCpus = 0
+
+        try:
+            while waiting or running:
+                # start the commands which are ready in the order of the batch file
+                for node in tuple(waiting):
+                    if not done.issuperset(node.dependencies):
+                        continue
+                    cpus = min(node.cpus, self.cpuCount)
+                    if running and usedCpus + cpus > self.cpuCount:
+                        break
+                    waiting.remove(node)
+                    running[node.name] = self._start(graph, node, env)
+                    usedCpus += cpus
+
+                if not running:
+                    # none of the commands can start. This can't happen for
+                    # graphs that are created by CommandGraph.add.
+                    raise ValueError('Dependencies of {} are not in the graph.'.format(
+                        waiting[0].name))
+
+                changed = False
+                for name, (node, processes, record, logs) in running.items():
+                    exitCode = self._poll(processes, record)
+                    if exitCode is None:
+                        continue
+                    del running[name]
+                    usedCpus -= min(node.cpus, self.cpuCount)
+                    self._finish(graph, node, record, logs, exitCode)
+                    if progress:
+                        progress(record, len(self.report.records), len(graph))
+                    if record.exitCode != 0:
+                        raise RuntimeError(
+                            '{} failed with exit code {}. See {} for details.\n{}'
+                            .format(name, record.exitCode, self.logFile(graph, node),
+                                    record.stderr.strip()))
+                    print 'Finished %s in %.2f seconds' % (name, record.wallTime)
+                    done.add(name)
+                    finished.append(name)
+                    changed = True
+
+                if not changed:
+                    time.sleep(self.waitingTime)
+        finally:
+            for node, processes, record, logs in running.itervalues():
+                for process in processes:
+                    self._terminate(process)
+                for log in logs:
+                    log.close()
+            self.report.endTime = time.time()
+            if reportFile:
+                self.report.write(reportFile)
+
+        return finished
+
+    def _start(self, graph, node, env):
+        """Start the command of a node.
+
+        Each command of a pipeline starts in its own process so a failed command in
+        the middle of the pipeline fails the node.
+        """
+        logFile = self.logFile(graph, node)
+        logFolder = os.path.dirname(logFile)
+        if not os.path.isdir(logFolder):
+            os.makedirs(logFolder)
+        log = open(logFile, 'wb')
+        if node.comment:
+            log.write('%s\n' % node.comment)
+        radString = node.command.toRadString()
+        log.write('%s\n' % radString)
+        log.flush()
+        errorLog = open(os.path.splitext(logFile)[0] + '.err', 'w+b')
+        print 'Running %s' % node.name
+        record = CommandRecord(node.name, radString, node.comment)
+        record.inputSizes = self._fileSizes(graph, node.inputs)
+        # start each command in its own process group to terminate the
+        # sub-processes on failure
+        kwargs = {'preexec_fn': os.setsid} if hasattr(os, 'setsid') else {}
+        if hasattr(node.command, 'isPipeline'):
+            processes = node.command.popen(graph.workingDir, log, errorLog, env,
+                                           **kwargs)
+        else:
+            processes = [Popen(radString, shell=True, cwd=graph.workingDir, env=env,
+                               stdout=log, stderr=errorLog, **kwargs)]
+        return node, processes, record, (log, errorLog)
+
+    def _finish(self, graph, node, record, logs, exitCode):
+        """Close the log files and complete the record of a finished command."""
+        record.wallTime = time.time() - record.startTime
+        record.exitCode = exitCode
+        record.outputSizes = self._fileSizes(graph, node.outputs)
+        log, errorLog = logs
+        log.close()
+        errorLog.seek(0, 2)
+        errorLog.seek(max(0, errorLog.tell() - self.STDERRSIZE))
+        record.stderr = errorLog.read()
+        errorLog.close()
+        self.report.records.append(record)
+
+    @staticmethod
+    def _poll(processes, record):
+        """Check if all the processes of a command are finished.
+
+        CPU time and peak memory of the finished processes are added to the record.
+        They stay None if os.wait4 is not available.
+
+        Returns:
+            None if any of the processes is running. Otherwise the exit code of the
+            first process which has failed or 0.
+        """
+        for process in processes:
+            if process.returncode is not None:
+                continue
+            if not hasattr(os, 'wait4'):
+                process.poll()
+                continue
+
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+            if pid == 0:
+                continue
+            # the process is waited for here and not by Popen
+            process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) \
+                else os.WEXITSTATUS(status)
+            # ru_maxrss is in bytes on Mac and in kilobytes on Linux
+            memory = usage.ru_maxrss if sys.platform == 'darwin' \
+                else usage.ru_maxrss * 1024
+            record.cpuTime = (record.cpuTime or 0) + usage.ru_utime + usage.ru_stime
+            record.peakMemory = max(record.peakMemory or 0, memory)
+
+        codes = [process.returncode for process in processes]
+        if None in codes:
+            return None
+        return next((code for code in codes if code != 0), 0)
+
+    @staticmethod
+    def _fileSizes(graph, paths):
+        """Size of files in bytes by their path in the graph."""
+        sizes = {}
+        for path in paths:
+            fullPath = os.path.join(graph.workingDir, path)
+            sizes[path] = os.path.getsize(fullPath) if os.path.isfile(fullPath) \
+                else None
+        return sizes
+
+    @staticmethod
+    def _terminate(process):
+        """Terminate a running command and its sub-processes."""
+        if process.poll() is not None:
+            return
+        try:
+            if os.name == 'nt':
+                subprocess.call('taskkill /F /T /PID %d' % process.pid, shell=True)
+            elif hasattr(os, 'killpg'):
+                os.killpg(process.pid, 15)
+            else:
+                process.terminate()
+            process.wait()
+        except OSError:
+            # process is already finished
+            pass
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Local executor representation."""
+        return 'LocalExecutor::#{}cpus'.format(self.cpuCount)
@@ -0,0 +1,408 @@
+"""Generate sky matrices with Perez all-weather sky model in Python.
+
+This is a vectorized implementation of gendaymtx for direct normal and diffuse
+horizontal irradiance values. Solar positions are calculated similar to
+Radiance's sun.c and sky patches are Tregenza (density 1) and Reinhart (MF:n)
+subdivisions in the same order as gendaymtx. Values are calculated for all the
+hours at once and no process is started.
+
+This module requires numpy.
+
+Usage:
+
+    from honeybee.radiance.sky import perez
+
+    sky = perez.skyMatrix(latitude, longitude, timezone, dnr, dhr, hoys,
+                          density=4)
+    # sky is a patches x hours x 3 array of radiance values
+"""
+from __future__ import division
+import numpy as np
+
+# luminous efficacy of white light in Radiance (lm/W)
+WHTEFFICACY = 179.0
+# solar constant (W/m2)
+SOLARCONSTANT = 1367.0
+# default colors and ground reflectance in gendaymtx
+SKYCOLOR = (0.960, 1.004, 1.118)
+GROUNDREFLECTANCE = 0.2
+# dew point for precipitable water in gendaymtx (C)
+DEWPOINT = 11.0
+# solid angle of the solar disc in gendaylit (0.533 degrees diameter)
+SUNSOLIDANGLE = 2 * np.pi * (1 - np.cos(np.radians(0.2665)))
+# number of patches that share the direct sunlight
+SUNPATCHCOUNT = 4
+# number of patches in each row of Tregenza sky
+TREGENZAROWS = (30, 30, 24, 24, 18, 12, 6)
+
+# upper limit of sky clearness for each Perez category
+CLEARNESSBINS = (1.065, 1.230, 1.500, 1.950, 2.800, 4.500, 6.200)
+
+# Perez et al. 1990 luminous efficacy coefficients (a, b, c, d) for each category
+DIFFUSEEFFICACY = np.array((
+    (97.24, -0.46, 12.00, -8.91),
+    (107.22, 1.15, 0.59, -3.95),
+    (104.97, 2.96, -5.53, -8.77),
+    (102.39, 5.59, -13.95, -13.90),
+    (100.71, 5.94, -22.75, -23.74),
+    (106.42, 3.83, -36.15, -28.83),
+    (141.88, 1.90, -53.24, -14.03),
+    (152.23, 0.35, -45.27, -7.98)))
+
+DIRECTEFFICACY = np.array((
+    (57.20, -4.55, -2.98, 117.12),
+    (98.99, -3.46, -1.21, 12.38),
+    (109.83, -4.90, -1.71, -8.81),
+    (110.34, -5.84, -1.99, -4.56),
+    (106.36, -3.97, -1.75, -6.16),
+    (107.19, -1.25, -1.51, -26.73),
+    (105.75, 0.77, -1.26, -34.44),
+    (101.18, 1.58, -1.10, -8.29)))
+
+# Perez et al. 1993 all-weather model coefficients for a, b, c, d and e. Each
+# parameter has 4 coefficients for each category.
+PEREZCOEFFICIENTS = np.array((
+    (1.3525, -0.2576, -0.2690, -1.4366, -0.7670, 0.0007, 1.2734, -0.1233,
+     2.8000, 0.6004, 1.2375, 1.0000, 1.8734, 0.6297, 0.9738, 0.2809,
+     0.0356, -0.1246, -0.5718, 0.9938),
+    (-1.2219, -0.7730, 1.4148, 1.1016, -0.2054, 0.0367, -3.9128, 0.9156,
+     6.9750, 0.1774, 6.4477, -0.1239, -1.5798, -0.5081, -1.7812, 0.1080,
+     0.2624, 0.0672, -0.2190, -0.4285),
+    (-1.1000, -0.2515, 0.8952, 0.0156, 0.2782, -0.1812, -4.5000, 1.1766,
+     24.7219, -13.0812, -37.7000, 34.8438, -5.0000, 1.5218, 3.9229, -2.6204,
+     -0.0156, 0.1597, 0.4199, -0.5562),
+    (-0.5484, -0.6654, -0.2672, 0.7117, 0.7234, -0.6219, -5.6812, 2.6297,
+     33.3389, -18.3000, -62.2500, 52.0781, -3.5000, 0.0016, 1.1477, 0.1062,
+     0.4659, -0.3296, -0.0876, -0.0329),
+    (-0.6000, -0.3566, -2.5000, 2.3250, 0.2937, 0.0496, -5.6812, 1.8415,
+     21.0000, -4.7656, -21.5906, 7.2492, -3.5000, -0.1554, 1.4062, 0.3988,
+     0.0032, 0.0766, -0.0656, -0.1294),
+    (-1.0156, -0.3670, 1.0078, 1.4051, 0.2875, -0.5328, -3.8500, 3.3750,
+     14.0000, -0.9999, -7.1406, 7.5469, -3.4000, -0.1078, -1.0750, 1.5702,
+     -0.0672, 0.4016, 0.3017, -0.4844),
+    (-1.0000, 0.0211, 0.5025, -0.5119, -0.3000, 0.1922, 0.7023, -1.6317,
+     19.0000, -5.0000, 1.2438, -1.9094, -4.0000, 0.0250, 0.3844, 0.2656,
+     1.0468, -0.3788, -2.4517, 1.4656),
+    (-1.0500, 0.0289, 0.4260, 0.3590, -0.3250, 0.1156, 0.7781, 0.0025,
+     31.0625, -14.5000, -46.1148, 55.3750, -7.2312, 0.4050, 13.3500, 0.6234,
+     1.5000, -0.6426, 1.8564, 0.5636))).reshape(8, 5, 4)
+
+# maximum number of patches x hours for each block of calculation
+MAXBLOCKSIZE = 2 ** 22
+
+
+def solarPositions(latitude, longitude, timezone, hoys, north=0):
+    """Calculate solar positions using the same equations as Radiance.
+
+    Hours are at the middle of each hour of the year similar to wea files (e.g.
+    hoy 12 is 12:30).
+
+    Args:
+        latitude: Latitude in degrees (north is positive).
+        longitude: Longitude in degrees (east is positive).
+        timezone: Time zone in hours (east is positive).
+        hoys: List of hours of the year.
+        north: An angle in degrees to indicate north direction (default: 0).
+
+    Returns:
+        Day of year, altitude and azimuth for each hour. Angles are in radians.
+        Azimuth is measured from north (+Y) towards east (+X) after rotation.
+    """
+    hoys = np.asarray(hoys, dtype=float)
+    jd = np.floor(hoys / 24) + 1
+    hour = hoys % 24 + 0.5
+    lat = np.radians(latitude)
+
+    # sdec and stadj in Radiance's sun.c
+    sd = 0.4093 * np.sin((2 * np.pi / 368) * (jd - 81))
+    st = hour + 0.170 * np.sin((4 * np.pi / 373) * (jd - 80)) - \
+        0.129 * np.sin((2 * np.pi / 355) * (jd - 8)) + \
+        (longitude - 15 * timezone) / 15.0
+    ha = st * (np.pi / 12)
+
+    altitude = np.arcsin(np.sin(lat) * np.sin(sd) -
+                         np.cos(lat) * np.cos(sd) * np.cos(ha))
+    # azimuth from south towards west
+    azimuth = -np.arctan2(np.cos(sd) * np.sin(ha),
+                          -np.cos(lat) * np.sin(sd) -
+                          np.sin(lat) * np.cos(sd) * np.cos(ha))
+    return jd, altitude, azimuth + np.pi - np.radians(north)
+
+
+def sunVectors(altitude, azimuth):
+    """Get unit vectors towards the sun as an hours x 3 array."""
+    cosAlt = np.cos(altitude)
+    return np.column_stack(
+        (cosAlt * np.sin(azimuth), cosAlt * np.cos(azimuth), np.sin(altitude)))
+
+
+def skyPatches(density=1):
+    """Get sky patches for Tregenza (1) and Reinhart (MF:density) subdivisions.
+
+    The first patch is the ground and the last one is the zenith, similar to
+    gendaymtx.
+
+    Returns:
+        Altitude, azimuth and solid angle of patches as numpy arrays. Angles are
+        in radians and azimuth is measured from north towards east.
+    """
+    density = int(density)
+    assert density > 0, ValueError('Sky density should be larger than 0.')
+    rowCount = len(TREGENZAROWS) * density
+    alpha = (np.pi / 2) / (rowCount + 0.5)
+    altitudes, azimuths, domes = [-np.pi / 2], [0.0], [2 * np.pi]
+    for i in xrange(rowCount):
+        inRow = TREGENZAROWS[i // density] * density
+        dom = 2 * np.pi * (np.sin(alpha * (i + 1)) - np.sin(alpha * i)) / inRow
+        altitudes.extend([alpha * (i + 0.5)] * inRow)
+        azimuths.extend(2 * np.pi * np.arange(inRow) / inRow)
+        domes.extend([dom] * inRow)
+
+    altitudes.append(np.pi / 2)
+    azimuths.append(0.0)
+    domes.append(2 * np.pi * (1 - np.cos(alpha / 2)))
+    return np.array(altitudes), np.array(azimuths), np.array(domes)
+
+
+def patchCount(density=1):
+    """Number of patches for a sky density including the ground."""
+    return sum(TREGENZAROWS) * density ** 2 + 2
+
+
+def skyParameters(jd, altitude, directNormal, diffuseHorizontal):
+    """Calculate Perez sky parameters for each hour.
+
+    Returns:
+        Sun zenith angle (limited between 3 and 90 degrees), diffuse illuminance,
+        direct normal illuminance and Perez parameters a, b, c, d and e as an
+        hours x 5 array.
+    """
+    dnr = np.asarray(directNormal, dtype=float)
+    dhr = np.asarray(diffuseHorizontal, dtype=float)
+
+    zenith = np.where(altitude <= 0, np.pi / 2,
+                      np.where(altitude >= np.radians(87), np.radians(3),
+                               np.pi / 2 - altitude))
+    brightness, clearness = _skyCondition(jd, zenith, dnr, dhr)
+    brightness = np.maximum(brightness, 0.01)
+    clearness = np.clip(np.where(dhr > 0, clearness, 11.9), 1.0, 11.9)
+    index = np.searchsorted(CLEARNESSBINS, clearness, side='right')
+
+    apwc = np.exp(0.07 * DEWPOINT - 0.075)
+    a, b, c, d = DIFFUSEEFFICACY[index].T
+    diffuse = dhr * (a + b * apwc + c * np.cos(zenith) + d * np.log(brightness))
+    a, b, c, d = DIRECTEFFICACY[index].T
+    direct = dnr * np.maximum(
+        a + b * apwc + c * np.exp(5.73 * zenith - 5) + d * brightness, 0)
+
+    # limit sky brightness for Perez parameters
+    brightness = np.where((clearness > 1.065) & (clearness < 2.8),
+                          np.maximum(brightness, 0.2), brightness)
+    x = PEREZCOEFFICIENTS[index]
+    params = x[:, :, 0] + x[:, :, 1] * zenith[:, None] + brightness[:, None] * \
+        (x[:, :, 2] + x[:, :, 3] * zenith[:, None])
+    # parameters c and d for overcast skies
+    first = index == 0
+    if first.any():
+        x, z, br = x[first], zenith[first], brightness[first]
+        params[first, 2] = np.exp((br * (x[:, 2, 0] + x[:, 2, 1] * z)) ** x[:, 2, 2]) - \
+            x[:, 2, 3]
+        params[first, 3] = -np.exp(br * (x[:, 3, 0] + x[:, 3, 1] * z)) + x[:, 3, 2] + \
+            br * x[:, 3, 3]
+
+    return zenith, diffuse, direct, params
+
+
+def sunRadiance(jd, altitude, directNormal, diffuseHorizontal):
+    """Calculate radiance of the solar disc for each hour similar to gendaylit.
+
+    Sky brightness and clearness are limited to the same range as gendaylit
+    and the direct illuminance is spread over a solar disc of SUNSOLIDANGLE.
+
+    Returns:
+        Radiance of the sun for each hour in Radiance units. Radiance is 0 if the
+        sun is below the horizon.
+    """
+    dnr = np.asarray(directNormal, dtype=float)
+    dhr = np.asarray(diffuseHorizontal, dtype=float)
+    isUp = altitude > 0
+    zenith = np.pi / 2 - np.where(isUp, altitude, 0)
+    brightness, clearness = _skyCondition(jd, zenith, dnr, dhr)
+    brightness = np.clip(brightness, 0.01, 0.6)
+    clearness = np.clip(np.where(dhr > 0, clearness, 12.01), 1.0, 12.01)
+    index = np.searchsorted(CLEARNESSBINS, clearness, side='right')
+
+    apwc = np.exp(0.07 * DEWPOINT - 0.075)
+    a, b, c, d = DIRECTEFFICACY[index].T
+    direct = dnr * np.maximum(
+        a + b * apwc + c * np.exp(5.73 * zenith - 5) + d * brightness, 0)
+    return np.where(isUp, direct / (SUNSOLIDANGLE * WHTEFFICACY), 0)
+
+
+def skyMatrix(latitude, longitude, timezone, directNormal, diffuseHorizontal,
+              hoys, density=1, north=0, mode=0):
+    """Calculate a sky matrix similar to gendaymtx.
+
+    Args:
+        latitude: Latitude in degrees (north is positive).
+        longitude: Longitude in degrees (east is positive).
+        timezone: Time zone in hours (east is positive).
+        directNormal: Direct normal irradiance for each hour (W/m2).
+        diffuseHorizontal: Diffuse horizontal irradiance for each hour (W/m2).
+        hoys: List of hours of the year.
+        density: Sky density. 1 for Tregenza and n for Reinhart MF:n (default: 1).
+        north: An angle in degrees to indicate north direction (default: 0).
+        mode: Sky mode 0: total, 1: direct-only, 2: diffuse-only (default: 0).
+
+    Returns:
+        A patches x hours x 3 float32 array of radiance values. The first patch
+        is the ground.
+    """
+    assert mode in (0, 1, 2), ValueError('Invalid sky mode: {}'.format(mode))
+    jd, altitude, azimuth = solarPositions(latitude, longitude, timezone, hoys,
+                                           north)
+    assert len(directNormal) == len(diffuseHorizontal) == len(jd), \
+        ValueError('Number of radiation values and hours should be the same.')
+    zenith, diffuse, direct, params = skyParameters(
+        jd, altitude, directNormal, diffuseHorizontal)
+
+    pAlt, pAzi, pDom = skyPatches(density)
+    sky = np.zeros((len(pAlt), len(jd), 3), dtype=np.float32)
+    skyHours = (diffuse > 0) if mode != 1 else np.zeros(len(jd), dtype=bool)
+    if mode != 1:
+        ground = diffuse + np.where(altitude > 0, direct * np.sin(altitude), 0)
+        sky[0] = (ground * GROUNDREFLECTANCE / np.pi / WHTEFFICACY)[:, None]
+
+    # sky patches
+    patches = pAlt[1:], pAzi[1:]
+    weights = np.sin(pAlt[1:]) * pDom[1:]
+    weights32 = weights.astype(np.float32)
+    skyColor = np.array(SKYCOLOR, dtype=np.float32)
+    hours = skyHours.nonzero()[0]
+    chunkSize = max(1, MAXBLOCKSIZE // len(weights))
+    for st in xrange(0, len(hours), chunkSize):
+        ids = hours[st:st + chunkSize]
+        lum = _relativeLuminance(patches, params[ids], zenith[ids], azimuth[ids])
+        relative = weights32.dot(lum)
+        # use double precision for extreme skies
+        extreme = ~np.isfinite(relative) | (relative > 1e30)
+        if extreme.any():
+            lum64 = _relativeLuminance(patches, params[ids[extreme]],
+                                       zenith[ids[extreme]], azimuth[ids[extreme]],
+                                       float)
+            rel64 = weights.dot(lum64)
+            lum[:, extreme] = lum64 / rel64
+            relative[extreme] = 1
+        # make uniform skies for zero relative illuminance
+        uniform = relative <= 1e-6
+        if uniform.any():
+            lum[:, uniform] = 1
+            relative[uniform] = np.pi
+        lum *= (diffuse[ids] / relative / WHTEFFICACY).astype(np.float32)
+        sky[1:, ids] = lum[:, :, None] * skyColor
+
+    # distribute the direct sunlight between nearest patches
+    if mode != 2:
+        sunHours = (direct >= 1e-4).nonzero()[0]
+        if len(sunHours):
+            nearest, dots = _nearestPatches(altitude[sunHours], azimuth[sunHours],
+                                            density)
+            w = 1 / (1.002 - dots)
+            values = w * direct[sunHours] / (WHTEFFICACY * w.sum(axis=0))
+            values /= pDom[nearest]
+            for i in xrange(SUNPATCHCOUNT):
+                sky[nearest[i], sunHours] += values[i][:, None]
+
+    return sky
+
+
+def _skyCondition(jd, zenith, directNormal, diffuseHorizontal):
+    """Calculate Perez sky brightness and clearness without any limits."""
+    airMass = 1 / (np.cos(zenith) +
+                   0.15 * (93.885 - np.degrees(zenith)) ** -1.253)
+    dayAngle = (jd - 1) * (2 * np.pi / 365)
+    eccentricity = 1.00011 + 0.034221 * np.cos(dayAngle) + \
+        0.00128 * np.sin(dayAngle) + 0.000719 * np.cos(2 * dayAngle) + \
+        0.000077 * np.sin(2 * dayAngle)
+
+    brightness = diffuseHorizontal * airMass / (SOLARCONSTANT * eccentricity)
+    z3 = 1.041 * zenith ** 3
+    with np.errstate(divide='ignore', invalid='ignore'):
+        clearness = ((diffuseHorizontal + directNormal) / diffuseHorizontal + z3) / \
+            (1 + z3)
+    return brightness, clearness
+
+
+def _relativeLuminance(patches, params, zenith, azimuth, dtype=np.float32):
+    """Calculate relative luminance of sky patches for several hours.
+
+    Args:
+        patches: Altitude and azimuth of sky patches.
+        params: Perez parameters a, b, c, d, e as an hours x 5 array.
+        zenith: Sun zenith angle for each hour (limited between 3 and 90 degrees).
+        azimuth: Sun azimuth for each hour.
+        dtype: Type of the values (default: float32).
+
+    Returns:
+        A patches x hours array.
+    """
+    pAlt, pAzi = patches
+    a, b, c, d, e = params.T.astype(dtype)
+    # angle between sky patches and the sun
+    cosGamma = sunVectors(pAlt, pAzi).astype(dtype).dot(
+        sunVectors(np.pi / 2 - zenith, azimuth).T.astype(dtype))
+    np.clip(cosGamma, -1, 1, out=cosGamma)
+    with np.errstate(over='ignore', invalid='ignore'):
+        lum = np.arccos(cosGamma)
+        lum *= d
+        np.exp(lum, out=lum)
+        lum *= c
+        lum += 1
+        cosGamma *= cosGamma
+        cosGamma *= e
+        lum += cosGamma
+        # patches in each row share the same gradation
+        rowAltitudes, rowIds = np.unique(pAlt, return_inverse=True)
+        gradation = 1 + a * np.exp(np.outer(1 / np.sin(rowAltitudes), b))
+        lum *= gradation.astype(dtype)[rowIds]
+    return lum
+
+
+def _nearestPatches(altitude, azimuth, density):
+    """Find the nearest sky patches to sun positions.
+
+    Only the patches in two rows above and below the sun and two patches on each
+    side of the sun in each row are checked.
+
+    Returns:
+        Index of SUNPATCHCOUNT nearest patches and dot product of their direction
+        and the sun direction as two SUNPATCHCOUNT x hours arrays.
+    """
+    rowCount = len(TREGENZAROWS) * density
+    alpha = (np.pi / 2) / (rowCount + 0.5)
+    inRow = np.repeat(TREGENZAROWS, density) * density
+    # index of the first patch in each row. ground is patch 0.
+    rowStart = np.concatenate(((1,), 1 + np.cumsum(inRow)[:-1]))
+    zenithId = 1 + inRow.sum()
+
+    sunRow = np.clip(np.floor(altitude / alpha).astype(int), 0, rowCount - 1)
+    ids = [np.full(len(altitude), zenithId, dtype=int)]
+    valid = [np.ones(len(altitude), dtype=bool)]
+    for dr in xrange(-2, 3):
+        row = sunRow + dr
+        isValid = (row >= 0) & (row < rowCount)
+        row = np.clip(row, 0, rowCount - 1)
+        count = inRow[row]
+        center = np.round(azimuth % (2 * np.pi) / (2 * np.pi) * count).astype(int)
+        for dj in xrange(-2, 3):
+            ids.append(rowStart[row] + (center + dj) % count)
+            valid.append(isValid)
+
+    ids = np.array(ids)
+    pAlt, pAzi, _ = skyPatches(density)
+    dots = (sunVectors(pAlt, pAzi)[ids] * sunVectors(altitude, azimuth)).sum(axis=2)
+    dots[~np.array(valid)] = -3
+    # sort by distance and patch index similar to gendaymtx
+    order = np.lexsort((ids, -dots), axis=0)[:SUNPATCHCOUNT]
+    cols = np.arange(len(altitude))
+    return ids[order, cols], dots[order, cols]
@@ -2,6 +2,10 @@ from ladybug.wea import Wea
 from ._skyBase import RadianceSky
 from ..command.gendaymtx import Gendaymtx
 from ..parameters.gendaymtx import GendaymtxParameters
+from ..postprocess.matrixparser import readMatrixHeader, writeMatrix
+
+from array import array
+import hashlib
 import os
 
 
@@ -16,6 +20,9 @@ class SkyMatrix(RadianceSky):
             (Default: 0).
         hoys: The list of hours for generating the sky matrix (Default: 0..8759).
         mode: Sky mode 0: total, 1: direct-only, 2: diffuse-only (Default: 0).
+        useGendaymtx: Set to False to generate the sky matrix in Python instead of
+            gendaymtx. The matrix is written as a binary file and is reused as long
+            as the cacheKey doesn't change. Requires numpy (Default: True).
     """
 
     def __init__(self, wea, skyDensity=1, north=0, hoys=None, mode=0):
@@ -28,6 +35,7 @@ class SkyMatrix(RadianceSky):
         self.north = north
         self.skyDensity = skyDensity
         self.mode = mode
+        self.useGendaymtx = True
 
     @classmethod
     def fromEpwFile(cls, epwFile, skyDensity=1, north=0, hoys=None, mode=0):
@@ -106,6 +114,67 @@ class SkyMatrix(RadianceSky):
         """Generate Radiance's line for sky with certain illuminance value."""
         return ''
 
+    @property
+    def cacheKey(self):
+        """A hash of location, radiation values, density, north, mode and hoys."""
+        location = self.wea.location
+        dnr, dhr = self.radiationValues()
+        key = hashlib.sha1(repr((
+            float(location.latitude), float(location.longitude),
+            float(location.timezone), int(self.skyDensity), float(self.north),
+            self.mode)))
+        for values in (self.hoys, dnr, dhr):
+            key.update(array('d', values).tostring())
+        return key.hexdigest()
+
+    def radiationValues(self):
+        """Direct normal and diffuse horizontal radiation for hoys as two lists."""
+        wea = self.wea
+        return [float(wea.directNormalRadiation[h]) for h in self.hoys], \
+            [float(wea.diffuseHorizontalRadiation[h]) for h in self.hoys]
+
+    def values(self):
+        """Calculate the sky matrix in Python using Perez all-weather sky model.
+
+        Returns:
+            A patches x hours x 3 numpy array of radiance values. The first patch
+            is the ground.
+        """
+        from . import perez
+        location = self.wea.location
+        dnr, dhr = self.radiationValues()
+        return perez.skyMatrix(location.latitude, location.longitude,
+                               location.timezone, dnr, dhr, self.hoys,
+                               int(self.skyDensity), float(self.north), self.mode)
+
+    def writeMatrix(self, workingDir, reuse=True):
+        """Calculate the sky matrix in Python and write it as a binary matrix.
+
+        The cacheKey is written to the header of the file and the file is reused if
+        the key matches.
+
+        Args:
+            workingDir: Folder to write the matrix.
+            reuse: Reuse the matrix if already existed in the folder.
+
+        Returns:
+            Full path to the sky matrix.
+        """
+        outfilepath = os.path.join(workingDir, '{}.smx'.format(self.name))
+        key = self.cacheKey
+        if reuse and os.path.isfile(outfilepath):
+            try:
+                header, _ = readMatrixHeader(outfilepath)
+            except ValueError:
+                # not a matrix with a header
+                header = {}
+            if header.get('CACHEKEY') == key:
+                return outfilepath
+
+        sky = self.values()
+        return writeMatrix(outfilepath, sky.reshape(len(sky), -1), 3, 'f',
+                           ('Sky matrix created by Honeybee', 'CACHEKEY={}'.format(key)))
+
     def hoursMatch(self, hoursFile):
         """Check if hours in the hours file matches the hours of wea."""
         print 'Checking available sky matrix in folder...'
@@ -150,6 +219,9 @@ class SkyMatrix(RadianceSky):
         weafilepath = os.path.join(workingDir, '{}.wea'.format(self.name))
         hoursfilepath = weafilepath[:-4] + '.hrs'
 
+        if not self.useGendaymtx:
+            return self.writeMatrix(workingDir, reuse)
+
         if reuse and os.path.isfile(outfilepath) and self.hoursMatch(hoursfilepath):
             return outfilepath
         else:
@@ -1,9 +1,12 @@
 from ..command.gendaylit import Gendaylit
+from ..postprocess.matrixparser import writeHeader
 from ._skyBase import RadianceSky
 
 from ladybug.dt import DateTime
 from ladybug.wea import Wea
 
+from array import array
+import hashlib
 from subprocess import PIPE, Popen
 import os
 
@@ -16,6 +19,9 @@ class SunMatrix(RadianceSky):
         north: An angle in degrees between 0-360 to indicate north direction
             (Default: 0).
         hoys: The list of hours for generating the sky matrix (Default: 0..8759)
+        useGendaylit: Set to False to calculate sun positions and radiance values
+            for all the hours in Python instead of running gendaylit for each hour.
+            Requires numpy (Default: True).
 
     Usage:
 
@@ -31,6 +37,7 @@ class SunMatrix(RadianceSky):
         self.wea = wea
         self.north = north
         self.hoys = hoys or range(8760)
+        self.useGendaylit = True
 
     @classmethod
     def fromEpwFile(cls, epwFile, north=0, hoys=None):
@@ -93,6 +100,11 @@ class SunMatrix(RadianceSky):
         """Sun matrix file."""
         return self.name + '.mtx'
 
+    @property
+    def sparsemtxfile(self):
+        """Sparse sun matrix file."""
+        return self.name + '.smtx'
+
     @property
     def main(self):
         """Generate Radiance's line for sky with certain illuminance value."""
@@ -105,36 +117,70 @@ class SunMatrix(RadianceSky):
             return False
 
         with open(hoursFile, 'r') as hrf:
-            line = hrf.read()
+            line = hrf.readline()
         return line == ','.join(str(h) for h in self.hoys) + '\n'
 
-    def execute(self, workingDir, reuse=True):
-        """Generate sun matrix.
-
-        Args:
-            workingDir: Folder to execute and write the output.
-            reuse: Reuse the matrix if already existed in the folder.
+    @property
+    def cacheKey(self):
+        """A hash of location, radiation values, north, hoys and useGendaylit."""
+        location = self.wea.location
+        dnr, dhr = self.radiationValues()
+        key = hashlib.sha1(repr((
+            float(location.latitude), float(location.longitude),
+            float(location.timezone), float(self.north), self.useGendaylit)))
+        for values in (self.hoys, dnr, dhr):
+            key.update(array('d', values).tostring())
+        return key.hexdigest()
+
+    def _keyMatch(self, hoursFile):
+        """Check if the cacheKey in the hours file matches the cacheKey of suns."""
+        with open(hoursFile, 'r') as hrf:
+            lines = hrf.read().split('\n')
+        return len(lines) > 1 and lines[1] == self.cacheKey
 
-        Returns:
-            Full path to analemma, sunlist and sunmatrix.
-        """
-        fp = os.path.join(workingDir, self.analemmafile)
-        lfp = os.path.join(workingDir, self.sunlistfile)
-        mfp = os.path.join(workingDir, self.sunmtxfile)
-        hrf = os.path.join(workingDir, self.name + '.hrs')
+    def radiationValues(self):
+        """Direct normal and diffuse horizontal radiation for hoys as two lists."""
+        wea = self.wea
+        return [float(wea.directNormalRadiation[h]) for h in self.hoys], \
+            [float(wea.diffuseHorizontalRadiation[h]) for h in self.hoys]
 
-        if reuse:
-            if self.hoursMatch(hrf):
-                for f in (fp, lfp, mfp):
-                    if not os.path.isfile(f):
-                        break
-                else:
-                    print('Found the sun matrix!')
-                    return fp, lfp, mfp
+    def values(self):
+        """Calculate sun positions and radiance values in Python.
 
-        with open(hrf, 'wb') as outf:
-            outf.write(','.join(str(h) for h in self.hoys) + '\n')
+        Values are calculated for all the hours at once similar to gendaylit.
 
+        Returns:
+            A tuple of (hoys, sun vectors, radiance) for the hours that the sun is up
+            and has a radiance value larger than 0. Sun vectors and radiance values
+            are numpy arrays.
+        """
+        from . import perez
+        location = self.wea.location
+        dnr, dhr = self.radiationValues()
+        jd, altitude, azimuth = perez.solarPositions(
+            location.latitude, location.longitude, location.timezone, self.hoys,
+            float(self.north))
+        radiance = perez.sunRadiance(jd, altitude, dnr, dhr)
+        ids = radiance.nonzero()[0]
+        return [self.hoys[i] for i in ids], \
+            perez.sunVectors(altitude[ids], azimuth[ids]), radiance[ids]
+
+    def _perezSuns(self):
+        """Calculate Radiance definition of suns in Python."""
+        print('Calculating sun positions and radiation values.')
+        sunUpHours, vectors, radiance = self.values()
+        sunValues = []
+        for count, (vector, value) in enumerate(zip(vectors, radiance)):
+            name = 'solar%d' % (count + 1)
+            value = '%.6e' % value
+            sunValues.append(
+                ['void', 'light', name, '0', '0', '3', value, value, value,
+                 name, 'source', 'sun', '0', '0', '4'] +
+                ['%.6f' % v for v in vector] + ['0.533'])
+        return sunValues, sunUpHours
+
+    def _gendaylitSuns(self):
+        """Run gendaylit for each hour and collect Radiance definition of suns."""
         # written based on scripts/analemma provided by @sariths
         wea = self.wea
         monthDateTime = (DateTime.fromHoy(idx) for idx in self.hoys)
@@ -173,10 +219,9 @@ class SunMatrix(RadianceSky):
                 # clean the output by throwing out comments and brightness functions.
                 sunCurrentValue = []
                 for lines in data[:-6]:
-                    if lines[0] == "#":
-                        continue
                     ls = lines.strip()
-                    if ls:
+                    # newer versions of gendaylit write empty lines between objects
+                    if ls and ls[0] != "#":
                         sunCurrentValue.extend(ls.split())
 
                 # If a sun definition was captured in the last for-loop, store info.
@@ -186,6 +231,73 @@ class SunMatrix(RadianceSky):
                     sunValues.append(sunCurrentValue)
                     sunUpHours.append(timeStamp.intHOY)
 
+        return sunValues, sunUpHours
+
+    def sparseMatrix(self):
+        """Get the sun matrix as a SparseSunMatrix without writing any files.
+
+        Only the radiance of each sun at its own hour is kept. Columns are the
+        index of hours in hoys. Requires numpy.
+        """
+        if self.useGendaylit:
+            sunValues, sunUpHours = self._gendaylitSuns()
+        else:
+            sunValues, sunUpHours = self._perezSuns()
+        return self._sparseMatrix(sunValues, sunUpHours)
+
+    def _sparseMatrix(self, sunValues, sunUpHours):
+        """Create a SparseSunMatrix from Radiance definition of suns."""
+        from ..postprocess.directsun import SparseSunMatrix
+        hoyIds = dict((h, c) for c, h in enumerate(self.hoys))
+        return SparseSunMatrix(
+            xrange(len(sunValues)), [hoyIds[h] for h in sunUpHours],
+            [[float(v) for v in sunValue[6:9]] for sunValue in sunValues],
+            len(sunValues), len(self.hoys))
+
+    def execute(self, workingDir, reuse=True, matrixFormat='a'):
+        """Generate sun matrix.
+
+        Args:
+            workingDir: Folder to execute and write the output.
+            reuse: Reuse the matrix if already existed in the folder.
+            matrixFormat: Format of the sun matrix. a for ASCII, f for binary
+                float and s for a sparse matrix that only includes the values
+                for each sun. Sparse matrices are written to sparsemtxfile and
+                can be loaded using postprocess.directsun.SparseSunMatrix.fromFile.
+                Radiance commands can't read sparse matrices and they require
+                numpy (Default: a).
+
+        Returns:
+            Full path to analemma, sunlist and sunmatrix.
+        """
+        assert matrixFormat in ('a', 'f', 's'), \
+            ValueError(
+                'Sun matrix format should be a, f or s not {}.'.format(matrixFormat))
+
+        fp = os.path.join(workingDir, self.analemmafile)
+        lfp = os.path.join(workingDir, self.sunlistfile)
+        mfp = os.path.join(workingDir, self.sparsemtxfile if matrixFormat == 's'
+                           else self.sunmtxfile)
+        hrf = os.path.join(workingDir, self.name + '.hrs')
+
+        if reuse:
+            if self.hoursMatch(hrf) and self._keyMatch(hrf):
+                for f in (fp, lfp, mfp):
+                    if not os.path.isfile(f):
+                        break
+                else:
+                    print('Found the sun matrix!')
+                    return fp, lfp, mfp
+
+        with open(hrf, 'wb') as outf:
+            outf.write(','.join(str(h) for h in self.hoys) + '\n')
+            outf.write(self.cacheKey + '\n')
+
+        if self.useGendaylit:
+            sunValues, sunUpHours = self._gendaylitSuns()
+        else:
+            sunValues, sunUpHours = self._perezSuns()
+
         numOfSuns = len(sunUpHours)
 
         print('Writing sun positions and radiation values to {}'.format(fp))
@@ -202,29 +314,42 @@ class SunMatrix(RadianceSky):
             )
             sunlist.write('\n')
 
+        if matrixFormat == 's':
+            print('Writing sparse sun matrix to {}'.format(mfp))
+            self._sparseMatrix(sunValues, sunUpHours).write(mfp)
+            return fp, lfp, mfp
+
         # Start creating header for the sun matrix.
-        fileHeader = ['#?RADIANCE']
-        fileHeader += ['Sun matrix created by Honeybee']
-        fileHeader += ['LATLONG= %s %s' % (latitude, -longitude)]
-        fileHeader += ['NROWS=%s' % numOfSuns]
-        fileHeader += ['NCOLS=%s' % len(self.hoys)]
-        fileHeader += ['NCOMP=3']
-        fileHeader += ['FORMAT=ascii']
+        fileHeader = writeHeader(
+            numOfSuns, len(self.hoys), 3, matrixFormat,
+            ('Sun matrix created by Honeybee',
+             'LATLONG= %s %s' % (self.wea.location.latitude,
+                                 self.wea.location.longitude)))
+
+        if matrixFormat == 'f':
+            print('Writing sun matrix to {}'.format(mfp))
+            with open(mfp, 'wb') as sunMtx:
+                sunMtx.write(fileHeader)
+                # write the values for each sun in a row of zeros for all the hours
+                hoyIds = dict((h, c) for c, h in enumerate(self.hoys))
+                zeros = array('f', (0,)) * (3 * len(self.hoys))
+                for idx, sunValue in enumerate(sunValues):
+                    sunRad = zeros[:]
+                    col = 3 * hoyIds[sunUpHours[idx]]
+                    sunRad[col:col + 3] = array('f', map(float, sunValue[6:9]))
+                    sunRad.tofile(sunMtx)
+            return fp, lfp, mfp
 
         print('Writing sun matrix to {}'.format(mfp))
         # Write the matrix to file.
         with open(mfp, 'w') as sunMtx:
-            sunMtx.write('\n'.join(fileHeader) + '\n' + '\n')
+            sunMtx.write(fileHeader)
+            hoyIds = dict((h, c) for c, h in enumerate(self.hoys))
             for idx, sunValue in enumerate(sunValues):
                 sunRadList = ['0 0 0'] * len(self.hoys)
-                sunRadList[sunUpHours[idx]] = ' '.join(sunValue[6:9])
+                sunRadList[hoyIds[sunUpHours[idx]]] = ' '.join(sunValue[6:9])
                 sunMtx.write('\n'.join(sunRadList) + '\n\n')
 
-            # This last one is for the ground.
-            sunRadList = ['0 0 0'] * len(self.hoys)
-            sunMtx.write('\n'.join(sunRadList))
-            sunMtx.write('\n')
-
         return fp, lfp, mfp
 
     def toRadString(self, workingDir, writeHours=False):
@@ -0,0 +1,228 @@
+"""Spatial index for locations of analysis points.
+
+Points are grouped in uniform square bins in XY plane. Region queries only check
+the points in the bins which overlap the region. The index is written in pure
+python so it can be used in IronPython.
+
+Usage:
+
+    index = analysisGrid.spatialIndex()
+    perimeter = index.radius((0, 0, 0.8), 4.5)
+    print perimeter.spatialDaylightAutonomy()
+    sensorId = index.nearest((10, 5, 0.8))
+"""
+from __future__ import division
+from itertools import izip
+import math
+
+
+class SpatialIndex(object):
+    """Spatial index for points of an analysis grid.
+
+    Attributes:
+        analysisGrid: An AnalysisGrid. The index is created for the current location
+            of the points. Create a new index if the points are moved.
+        cellSize: Size of each bin. By default it is set so there are about 4 points
+            in each bin.
+
+    Queries return views to the analysis grid with the points inside the region in
+    the same order as the grid. Use the methods that end with Ids to get the index
+    of the points.
+    """
+
+    __slots__ = ('_grid', '_x', '_y', '_z', '_cellSize', '_bins', '_extents')
+
+    def __init__(self, analysisGrid, cellSize=None):
+        """Create a spatial index for an analysis grid."""
+        self._grid = analysisGrid
+        geo = analysisGrid.geometry
+        self._x = geo[0::6]
+        self._y = geo[1::6]
+        self._z = geo[2::6]
+        self._cellSize = float(cellSize or self._defaultCellSize())
+        assert self._cellSize > 0, \
+            'cellSize must be larger than 0: {}'.format(self._cellSize)
+
+        self._bins = {}
+        cs = self._cellSize
+        for count, (x, y) in enumerate(izip(self._x, self._y)):
+            key = (int(math.floor(x / cs)), int(math.floor(y / cs)))
+            try:
+                self._bins[key].append(count)
+            except KeyError:
+                self._bins[key] = [count]
+
+        # min and max of bin indices as (minI, minJ, maxI, maxJ)
+        if self._bins:
+            ii = tuple(k[0] for k in self._bins)
+            jj = tuple(k[1] for k in self._bins)
+            self._extents = (min(ii), min(jj), max(ii), max(jj))
+        else:
+            self._extents = None
+
+    @property
+    def analysisGrid(self):
+        """Analysis grid for this index."""
+        return self._grid
+
+    @property
+    def cellSize(self):
+        """Size of each bin."""
+        return self._cellSize
+
+    def _defaultCellSize(self):
+        """Calculate a cell size with about 4 points in each cell."""
+        count = len(self._x)
+        if count < 2:
+            return 1.0
+        dx = max(self._x) - min(self._x)
+        dy = max(self._y) - min(self._y)
+        size = max(math.sqrt(4 * dx * dy / count), 4 * max(dx, dy) / count)
+        return size or 1.0
+
+    def _candidates(self, minX, minY, maxX, maxY):
+        """Get index of points in bins which overlap a rectangle."""
+        cs = self._cellSize
+        i0, i1 = int(math.floor(minX / cs)), int(math.floor(maxX / cs))
+        j0, j1 = int(math.floor(minY / cs)), int(math.floor(maxY / cs))
+        bins = self._bins
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(bins):
+            # the region is larger than the grid. check the bins instead.
+            for (i, j), ids in bins.iteritems():
+                if i0 <= i <= i1 and j0 <= j <= j1:
+                    for c in ids:
+                        yield c
+            return
+
+        for i in xrange(i0, i1 + 1):
+            for j in xrange(j0, j1 + 1):
+                for c in bins.get((i, j), ()):
+                    yield c
+
+    def boxIds(self, minPoint, maxPoint):
+        """Get index of points inside a box.
+
+        Args:
+            minPoint: Minimum corner of the box as (x, y, z). If z is not provided
+                only x and y will be checked.
+            maxPoint: Maximum corner of the box as (x, y, z).
+        """
+        minX, minY = minPoint[0], minPoint[1]
+        maxX, maxY = maxPoint[0], maxPoint[1]
+        minZ = minPoint[2] if len(minPoint) > 2 else float('-inf')
+        maxZ = maxPoint[2] if len(maxPoint) > 2 else float('inf')
+        x, y, z = self._x, self._y, self._z
+        return sorted(c for c in self._candidates(minX, minY, maxX, maxY)
+                      if minX <= x[c] <= maxX and minY <= y[c] <= maxY and
+                      minZ <= z[c] <= maxZ)
+
+    def radiusIds(self, center, radius):
+        """Get index of points inside a sphere.
+
+        Args:
+            center: Center of the sphere as (x, y, z). If z is not provided distance
+                will be measured in XY plane (a cylinder).
+            radius: Radius of the sphere.
+        """
+        cx, cy = center[0], center[1]
+        cz = center[2] if len(center) > 2 else None
+        r2 = radius ** 2
+        x, y, z = self._x, self._y, self._z
+        candidates = self._candidates(cx - radius, cy - radius, cx + radius,
+                                      cy + radius)
+        if cz is None:
+            return sorted(c for c in candidates
+                          if (x[c] - cx) ** 2 + (y[c] - cy) ** 2 <= r2)
+        return sorted(c for c in candidates
+                      if (x[c] - cx) ** 2 + (y[c] - cy) ** 2 + (z[c] - cz) ** 2 <= r2)
+
+    def polygonIds(self, polygon):
+        """Get index of points inside a polygon in XY plane.
+
+        Args:
+            polygon: List of polygon vertices as (x, y) or (x, y, z). z values are
+                ignored.
+        """
+        poly = tuple((float(p[0]), float(p[1])) for p in polygon)
+        assert len(poly) > 2, 'A polygon needs at least 3 vertices.'
+        xs = tuple(p[0] for p in poly)
+        ys = tuple(p[1] for p in poly)
+        x, y = self._x, self._y
+        return sorted(c for c in self._candidates(min(xs), min(ys), max(xs), max(ys))
+                      if self._isInside(x[c], y[c], poly))
+
+    @staticmethod
+    def _isInside(x, y, polygon):
+        """Check if a point is inside a polygon using ray casting."""
+        inside = False
+        x0, y0 = polygon[-1]
+        for x1, y1 in polygon:
+            if (y1 > y) != (y0 > y) and x < (x0 - x1) * (y - y1) / (y0 - y1) + x1:
+                inside = not inside
+            x0, y0 = x1, y1
+        return inside
+
+    def nearest(self, point):
+        """Get index of the nearest analysis point to a point.
+
+        Args:
+            point: A point as (x, y, z).
+
+        Returns:
+            Index of the nearest analysis point or None if the grid is empty.
+        """
+        if not self._bins:
+            return None
+        px, py = point[0], point[1]
+        pz = point[2] if len(point) > 2 else None
+        cs = self._cellSize
+        ci, cj = int(math.floor(px / cs)), int(math.floor(py / cs))
+        x, y, z = self._x, self._y, self._z
+        best, bestDist = None, float('inf')
+        minI, minJ, maxI, maxJ = self._extents
+        maxRing = max(abs(minI - ci), abs(maxI - ci), abs(minJ - cj), abs(maxJ - cj))
+        for ring in xrange(maxRing + 1):
+            # points in rings after this ring are at least this far
+            if best is not None and ((ring - 1) * cs) ** 2 > bestDist:
+                break
+            for i, j in self._ring(ci, cj, ring):
+                for c in self._bins.get((i, j), ()):
+                    d = (x[c] - px) ** 2 + (y[c] - py) ** 2
+                    if pz is not None:
+                        d += (z[c] - pz) ** 2
+                    if d < bestDist or (d == bestDist and c < best):
+                        best, bestDist = c, d
+        return best
+
+    @staticmethod
+    def _ring(ci, cj, ring):
+        """Get bins in a square ring around a bin."""
+        if ring == 0:
+            yield ci, cj
+            return
+        for i in xrange(ci - ring, ci + ring + 1):
+            yield i, cj - ring
+            yield i, cj + ring
+        for j in xrange(cj - ring + 1, cj + ring):
+            yield ci - ring, j
+            yield ci + ring, j
+
+    def box(self, minPoint, maxPoint, name=None):
+        """Get a view to the analysis grid for the points inside a box."""
+        return self._grid.view(self.boxIds(minPoint, maxPoint), name)
+
+    def radius(self, center, radius, name=None):
+        """Get a view to the analysis grid for the points inside a sphere."""
+        return self._grid.view(self.radiusIds(center, radius), name)
+
+    def polygon(self, polygon, name=None):
+        """Get a view to the analysis grid for the points inside a polygon."""
+        return self._grid.view(self.polygonIds(polygon), name)
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Spatial index representation."""
+        return 'SpatialIndex::{}::#{}bins'.format(self._grid.name, len(self._bins))
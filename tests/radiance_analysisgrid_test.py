@@ -0,0 +1,87 @@
+import unittest
+import os
+import shutil
+import tempfile
+from honeybee.radiance.analysisgrid import AnalysisGrid
+
+
+class AnalysisGridTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/analysisgrid.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by initiating the class."""
+        self.folder = tempfile.mkdtemp()
+        self.grid = AnalysisGrid.fromPointsAndVectors(
+            ((0, 0, 0), (1, 0, 0), (2, 0, 0)), ((0, 0, 1), (0, 1, 0)))
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        shutil.rmtree(self.folder)
+
+    def test_lazy_points(self):
+        """Analysis points should only be created once they are requested."""
+        self.assertEqual(len(self.grid), 3)
+        self.assertEqual(self.grid._analysisPoints, {})
+        ap = self.grid[-1]
+        self.assertIs(ap, self.grid[2])
+        self.assertEqual(tuple(ap.direction), (0, 1, 0))
+        self.assertEqual(len(self.grid._analysisPoints), 1)
+
+    def test_rad_string(self):
+        """Make sure changes to analysis points are reflected in the grid."""
+        self.grid[1].location = (5, 5, 5)
+        self.assertEqual(self.grid.toRadString().split('\n')[1],
+                         '5.000 5.000 5.000 0.000 1.000 0.000')
+
+    def test_from_file(self):
+        """Points written to file should be loaded back."""
+        filePath = self.grid.writeToFile(os.path.join(self.folder, 'grid.pts'))
+        grid = AnalysisGrid.fromFile(filePath)
+        self.assertEqual(grid.toRadString(), self.grid.toRadString())
+        self.assertEqual(list(grid.points), list(self.grid.points))
+
+    def test_from_file_invalid_line(self):
+        """Lines without 6 values should raise an error with the line number."""
+        filePath = os.path.join(self.folder, 'invalid.pts')
+        with open(filePath, 'wb') as outf:
+            outf.write('0 0 0 0 0 1\n1 1 1\n2 2 2 0 0 1 3 3 3\n')
+        with self.assertRaises(ValueError) as cm:
+            AnalysisGrid.fromFile(filePath)
+        self.assertIn('Line 2', str(cm.exception))
+
+    def test_slice(self):
+        """A slice should be a view to the grid."""
+        self.grid.setValues(range(2), ((1, 2), (3, 4), (5, 6)))
+        view = self.grid[1:]
+        self.assertEqual(len(view), 2)
+        self.assertIs(view[0], self.grid[1])
+        self.assertEqual(view.store.values(1, (0, 1)), (5, 6))
+
+    def test_duplicate(self):
+        """Duplicates should share the values until they are changed."""
+        self.grid.setValues(range(2), ((1, 2), (3, 4), (5, 6)))
+        dup = self.grid.duplicate()
+        self.assertIs(dup.store.data, self.grid.store.data)
+        dup.setValues(range(2), ((0, 0), (0, 0), (0, 0)))
+        self.assertIsNot(dup.store.data, self.grid.store.data)
+        self.assertEqual(self.grid[0].values(range(2)), (1, 2))
+        self.assertEqual(dup[0].values(range(2)), (0, 0))
+
+
+    def test_points_of_another_grid(self):
+        """Points of another grid should be copied and not moved to a new grid."""
+        self.grid.setValues([12], [[1], [2], [3]])
+        grid = AnalysisGrid(self.grid.analysisPoints[:2])
+        self.assertIsNot(grid[0], self.grid[0])
+        self.assertEqual(grid[1].values([12]), (2,))
+        grid.setValues([12], [[999], [999]])
+        self.assertEqual(self.grid.analysisPoints[0].values([12]), (1,))
+        self.assertEqual(grid[0].values([12]), (999,))
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_analysisgrid_test
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+import os
+import shutil
+import tempfile
+from honeybee.radiance.artifactcache import ArtifactCache
+from honeybee.radiance.recipe._recipebase import AnalysisRecipe
+
+
+class Oconv(object):
+    """A command with input files and an output file."""
+
+    def __init__(self, inputFiles, outputFile):
+        self.inputFiles = inputFiles
+        self.outputFile = outputFile
+
+    def toRadString(self, relativePath=False):
+        return '{} {} > {}'.format(self.__class__.__name__.lower(),
+                                   ' '.join(self.inputFiles), self.outputFile)
+
+
+class Rcontrib(Oconv):
+    """A command which reads the output of Oconv."""
+
+    pass
+
+
+class ArtifactCacheTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/artifactcache.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by creating a cache and a scene file."""
+        self.folder = tempfile.mkdtemp()
+        self.cache = ArtifactCache(os.path.join(self.folder, 'cache'), maxSize=10)
+        self.write('room.rad', 'void plastic wall 0 0 5 .5 .5 .5 0 0')
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        shutil.rmtree(self.folder)
+
+    def write(self, name, content):
+        with open(os.path.join(self.folder, name), 'wb') as outf:
+            outf.write(content)
+        return os.path.join(self.folder, name)
+
+    def test_command_key(self):
+        """Key should change with the content of inputs and not with the output."""
+        key, outputFile = self.cache.commandEntry(
+            Oconv(['room.rad'], 'room.oct'), self.folder)
+        self.assertEqual(outputFile, os.path.join(self.folder, 'room.oct'))
+        self.assertEqual(
+            self.cache.commandEntry(Oconv(['room.rad'], 'other.oct'), self.folder)[0],
+            key)
+        # same content with a different name
+        self.write('copy.rad', 'void plastic wall 0 0 5 .5 .5 .5 0 0')
+        self.assertEqual(
+            self.cache.commandEntry(Oconv(['copy.rad'], 'room.oct'), self.folder)[0],
+            key)
+        self.write('room.rad', 'void plastic wall 0 0 5 .6 .5 .5 0 0')
+        self.assertNotEqual(
+            self.cache.commandEntry(Oconv(['room.rad'], 'room.oct'), self.folder)[0],
+            key)
+        # missing inputs
+        self.assertIsNone(
+            self.cache.commandEntry(Oconv(['sky.rad'], 'room.oct'), self.folder))
+
+    def test_get_put_evict(self):
+        """Files should be restored from the cache and the oldest should be removed."""
+        target = os.path.join(self.folder, 'result.oct')
+        self.assertFalse(self.cache.get('a' * 40, target))
+        self.cache.put('a' * 40, self.write('a.oct', '12345'))
+        self.assertTrue(self.cache.get('a' * 40, target))
+        with open(target, 'rb') as inf:
+            self.assertEqual(inf.read(), '12345')
+
+        entry = self.cache.put('b' * 40, self.write('b.oct', '123456'), evict=False)
+        os.utime(entry, (0, 0))
+        self.assertEqual(self.cache.size, 11)
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertNotIn('b' * 40, self.cache)
+        self.assertIn('a' * 40, self.cache)
+
+    def runCommands(self, recipe):
+        """Write the output of each command as its name and its inputs."""
+        for node in recipe.commandGraph:
+            inputs = []
+            for f in node.inputs:
+                with open(os.path.join(self.folder, f), 'rb') as inf:
+                    inputs.append(inf.read())
+            self.write(node.outputs[0], '{}({})'.format(
+                node.command.__class__.__name__, ','.join(inputs)))
+        recipe._cacheOutputs()
+
+    def test_chain(self):
+        """Outputs of earlier commands should not be keyed by files from last run."""
+        recipe = AnalysisRecipe()
+        recipe.cache = self.cache
+        self.cache.maxSize = 2 ** 20
+        for wall in ('wall0', 'wall0', 'wall0', 'wall1', 'wall0', 'wall1'):
+            self.write('room.rad', wall)
+            recipe._startCommands(self.folder, header=False)
+            recipe._addCommand(Oconv(['room.rad'], 'room.oct'))
+            recipe._addCommand(Rcontrib(['room.oct'], 'sun.dc'))
+            self.runCommands(recipe)
+            with open(os.path.join(self.folder, 'sun.dc'), 'rb') as inf:
+                self.assertEqual(inf.read(), 'Rcontrib(Oconv({}))'.format(wall))
+
+        # both outputs are copied from the cache
+        self.assertEqual(len(recipe.commandGraph), 0)
+
+    @unittest.skipIf(os.name == 'nt', 'command file is a shell script.')
+    def test_failed_run(self):
+        """Partial output of a failed command should not be added to the cache."""
+        recipe = AnalysisRecipe()
+        recipe.cache = self.cache
+        recipe._startCommands(self.folder, header=False)
+        recipe._addCommand(Oconv(['room.rad'], 'room.oct'))
+        key = recipe._cacheEntries[0][0]
+        commandFile = self.write(
+            'commands.sh', '#!/bin/sh\necho header > {}\nexit 1\n'.format(
+                os.path.join(self.folder, 'room.oct')))
+        os.chmod(commandFile, 0o755)
+        recipe.run(commandFile)
+        with open(os.path.join(self.folder, 'room.oct'), 'rb') as inf:
+            self.assertEqual(inf.read(), 'header\n')
+        self.assertNotIn(key, self.cache)
+
+    def test_stale_output(self):
+        """Outputs which are not written in the run should not be cached."""
+        recipe = AnalysisRecipe()
+        recipe.cache = self.cache
+        recipe._startCommands(self.folder, header=False)
+        recipe._addCommand(Oconv(['room.rad'], 'room.oct'))
+        key = recipe._cacheEntries[0][0]
+        os.utime(self.write('room.oct', 'old'), (0, 0))
+        recipe._cacheOutputs(startTime=100)
+        self.assertNotIn(key, self.cache)
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_artifactcache_test
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import shutil
+import tempfile
+from honeybee.radiance.command.pipeline import Pipeline
+
+
+class Shell(object):
+    """A command from a line of shell script."""
+
+    def __init__(self, line, inputFiles=(), outputFile=None):
+        self.line = line
+        self.inputFiles = inputFiles
+        self.outputFile = outputFile
+
+    def toRadString(self, relativePath=False):
+        if self.outputFile:
+            return '{} > {}'.format(self.line, self.outputFile)
+        return self.line
+
+
+class PipelineTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/command/pipeline.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by creating a working folder."""
+        self.folder = tempfile.mkdtemp()
+        self.matrix = Shell(
+            r'printf "#?RADIANCE\nNCOMP=3\nFORMAT=ascii\n\n1 1 1 2 2 2\n0 0 1 0 1 0\n"')
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        shutil.rmtree(self.folder)
+
+    def test_rad_string(self):
+        """Commands should be joined with pipes and only the last one has an output."""
+        pipeline = Pipeline((self.matrix, Shell('cat', ('-',), 'out.mtx')))
+        self.assertEqual(pipeline.toRadString(),
+                         self.matrix.line + ' | cat > out.mtx')
+        self.assertEqual(pipeline.outputFile, 'out.mtx')
+        self.assertEqual(pipeline.inputFiles, [])
+
+        pipeline = Pipeline((Shell('cat', ('a.mtx',), 'b.mtx'), Shell('cat')))
+        self.assertEqual(pipeline.inputFiles, ['a.mtx'])
+        with self.assertRaises(ValueError):
+            pipeline.toRadString()
+
+    def test_rows(self):
+        """Rows should be parsed from the output of the last command."""
+        pipeline = Pipeline((self.matrix, Shell('cat')))
+        rows = [list(row) for row in pipeline.rows(self.folder, weights=(1, 2, 3))]
+        self.assertEqual(rows, [[6, 12], [3, 2]])
+
+        pipeline = Pipeline((self.matrix, Shell('cat && exit 2')))
+        with self.assertRaises(RuntimeError):
+            list(pipeline.rows(self.folder))
+
+    def test_failed_first_command(self):
+        """A failed command should raise even if the last command succeeds."""
+        pipeline = Pipeline((Shell('false'), Shell('cat')))
+        with self.assertRaises(RuntimeError):
+            list(pipeline.rows(self.folder))
+
+        pipeline = Pipeline((Shell(self.matrix.line + ' && exit 1'), Shell('cat')))
+        with self.assertRaises(RuntimeError):
+            list(pipeline.rows(self.folder))
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_command_pipeline_test
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import numpy as np
+from honeybee.radiance.analysisgrid import AnalysisGrid
+from honeybee.radiance.postprocess import annualmetrics as am
+
+
+class AnnualMetricsTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/postprocess/annualmetrics.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by initiating the class."""
+        # 2 sensors x 4 hours
+        self.values = np.array([[0, 150, 300, 3000],
+                                [600, 600, 50, 50]], dtype=np.float32)
+        self.occupancy = np.array([True, True, True, False])
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        pass
+
+    def test_annual_metrics(self):
+        """Make sure metrics are calculated for occupied hours."""
+        da, cda, udi, udiL, udiM = am.annualMetrics(self.values, self.occupancy)
+        np.testing.assert_allclose(da, (1 / 3.0, 2 / 3.0))
+        np.testing.assert_allclose(cda, (1.5 / 3.0, (2 + 50 / 300.0) / 3.0))
+        np.testing.assert_allclose(udi, (2 / 3.0, 2 / 3.0))
+        np.testing.assert_allclose(udiL, (1 / 3.0, 1 / 3.0))
+        np.testing.assert_allclose(udiM, (0, 0))
+
+    def test_spatial_daylight_autonomy(self):
+        """sDA should report pass / fail for each hour."""
+        sda, passed = am.spatialDaylightAutonomy(self.values, self.occupancy,
+                                                 targetArea=50)
+        self.assertEqual(passed.tolist(), [True, True, False, False])
+        self.assertAlmostEqual(sda, 2 / 3.0)
+
+    def test_annual_solar_exposure(self):
+        """ASE should fail sensors with more than target hours."""
+        success, percentage, failed, hours = am.annualSolarExposure(
+            self.values, threshhold=500, targetHours=1)
+        self.assertEqual(hours.tolist(), [1, 2])
+        self.assertEqual(failed.tolist(), [False, True])
+        self.assertEqual(percentage, 50)
+        self.assertFalse(success)
+
+    def test_occupancy_mask(self):
+        """An empty schedule should include all the hours."""
+        self.assertEqual(am.occupancyMask(range(3), set([1])).tolist(),
+                         [False, True, False])
+        self.assertEqual(am.occupancyMask(range(3), ()).tolist(), [True] * 3)
+        self.assertEqual(am.occupancyMask(range(3)).tolist(), [True] * 3)
+
+    def test_python_parity(self):
+        """Vectorized metrics should match the python implementation for a grid."""
+        rnd = np.random.RandomState(0)
+        hoys = range(8, 32)
+        grid = AnalysisGrid.fromPointsAndVectors([(i, 0, 0) for i in range(6)])
+        for source, states in (('south', ('open', 'closed')), ('west', ('open',))):
+            for state in states:
+                grid.setValues(hoys, rnd.rand(6, 24) * 700, source, state)
+                grid.setValues(hoys, rnd.rand(6, 24) * 700, source, state,
+                               isDirect=True)
+        blinds = [[int(s), 0] for s in rnd.randint(0, 2, 24)]
+        occupancy = set(hoys[2:20])
+
+        def metrics():
+            return (
+                grid.annualMetrics(300, (100, 1000), blinds, occupancy),
+                grid.spatialDaylightAutonomy(600, blinds, occupancy, 40),
+                grid.annualSolarExposure(1000, None, occupancy, 5, 10)
+            )
+
+        vectorized = metrics()
+        engine = AnalysisGrid.__dict__['_metricsEngine']
+        AnalysisGrid._metricsEngine = staticmethod(lambda: None)
+        try:
+            python = metrics()
+        finally:
+            AnalysisGrid._metricsEngine = engine
+
+        for v, p in zip(vectorized[0], python[0]):
+            np.testing.assert_allclose(v, p, rtol=1e-5)
+        self.assertAlmostEqual(vectorized[1][0], python[1][0])
+        self.assertEqual(vectorized[1][1], python[1][1])
+        success, percentage, points, hours = vectorized[2]
+        self.assertEqual(success, python[2][0])
+        self.assertAlmostEqual(percentage, python[2][1])
+        self.assertEqual(points, python[2][2])
+        self.assertEqual(hours, python[2][3])
+        self.assertTrue(points)
+
+    # test for assertion and exceptions
+    def test_assertions_exceptions(self):
+        """Make sure the module catches an empty schedule."""
+        self.assertRaises(ValueError, am.annualMetrics, self.values,
+                          np.zeros(4, dtype=bool))
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_postprocess_annualmetrics_test
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import os
+import shutil
+import tempfile
+from honeybee.radiance.postprocess import binaryresults
+from honeybee.radiance.postprocess.binaryresults import BinaryResults
+from honeybee.radiance.postprocess import annualmetrics as am
+
+
+class BinaryResultsTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/postprocess/binaryresults.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by writing an ASCII results file."""
+        self.folder = tempfile.mkdtemp()
+        self.illFile = os.path.join(self.folder, 'illuminance.ill')
+        self.hoys = (8, 9, 10, 11)
+        with open(self.illFile, 'wb') as outf:
+            outf.write('#?RADIANCE\nrmtxop\nNROWS=3\nNCOLS=4\nNCOMP=1\n'
+                       'FORMAT=ascii\n\n')
+            for pt in range(3):
+                outf.write('\t'.join(str(pt * 100 + h * 50) for h in self.hoys))
+                outf.write('\n')
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        shutil.rmtree(self.folder)
+
+    def test_from_ill_file(self):
+        """Make sure values are converted correctly."""
+        res = BinaryResults.fromIllFile(self.illFile, hoys=self.hoys)
+        self.assertEqual(len(res), 3)
+        self.assertEqual(res.hoys, self.hoys)
+        self.assertEqual(list(res.pointValues(1)), [500, 550, 600, 650])
+        self.assertEqual(list(res.hourlyValues(10)), [500, 600, 700])
+        # the binary file should be reused
+        self.assertEqual(BinaryResults(res.filePath).hoys, self.hoys)
+
+    def test_reuse_hoys(self):
+        """Binary file should only be reused if it has the same hours."""
+        filePath = BinaryResults.fromIllFile(self.illFile, hoys=self.hoys).filePath
+        os.utime(filePath, (os.path.getmtime(self.illFile) + 10,) * 2)
+        mtime = os.path.getmtime(filePath)
+        res = BinaryResults.fromIllFile(self.illFile, hoys=list(self.hoys))
+        self.assertEqual(os.path.getmtime(filePath), mtime)
+        del res
+
+        hoys = (12, 13, 14, 15)
+        res = BinaryResults.fromIllFile(self.illFile, hoys=hoys)
+        self.assertEqual(res.hoys, hoys)
+        self.assertEqual(list(res.hourlyValues(14)), [500, 600, 700])
+        del res
+        self.assertEqual(BinaryResults.fromIllFile(self.illFile).hoys, (0, 1, 2, 3))
+
+    def test_header_hoys(self):
+        """Hours should be written as ranges in short header lines."""
+        hoys = tuple(range(8760))
+        info = binaryresults._headerInfo(hoys)
+        self.assertEqual(info[1], 'HOYS=0-8759')
+        header = dict(l.split('=', 1) for l in info[1:])
+        self.assertEqual(binaryresults._readHoys(header), hoys)
+
+        # occupied hours of every day
+        hoys = tuple(h for h in range(8760) if 8 <= h % 24 < 18) + (8761,)
+        info = binaryresults._headerInfo(hoys)
+        self.assertTrue(len(info) > 2)
+        self.assertTrue(all(len(l) < 220 for l in info))
+        header = dict(l.split('=', 1) for l in info[1:])
+        self.assertEqual(binaryresults._readHoys(header), hoys)
+
+        # files with a list of hours
+        self.assertEqual(binaryresults._readHoys({'HOYS': '8 9 10'}), (8, 9, 10))
+
+    def test_annual_metrics(self):
+        """Memory-mapped results should work with annual metrics."""
+        res = BinaryResults.fromIllFile(self.illFile, hoys=self.hoys)
+        da = am.annualMetrics(res.array, DAThreshhold=600, chunkSize=2)[0]
+        self.assertEqual(list(da), [0, 0.5, 1])
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_postprocess_binaryresults_test
+    unittest.main()
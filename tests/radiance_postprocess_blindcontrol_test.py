@@ -0,0 +1,54 @@
+import unittest
+from honeybee.radiance.analysisgrid import AnalysisGrid
+from honeybee.radiance.postprocess import blindcontrol as bc
+
+
+class BlindControlTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/postprocess/blindcontrol.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by initiating an analysis grid."""
+        self.hoys = range(3)
+        self.grid = AnalysisGrid.fromPointsAndVectors(((0, 0, 0), (1, 0, 0)))
+        self.grid.setValues(self.hoys, ((3000, 1000, 5000), (1500, 2500, 500)),
+                            'wg', 'open')
+        self.grid.setValues(self.hoys, ((1500, 500, 2500), (750, 1250, 250)),
+                            'wg', 'closed')
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        pass
+
+    def test_blinds_state(self):
+        """Blinds should be closed once the illuminance is above 2000 lux."""
+        combs, index, ill, _, success = self.grid.blindsState()
+        self.assertEqual(combs, ((0,), (1,)))
+        self.assertEqual(index.tolist(), [[1, 0, 1], [0, 1, 0]])
+        self.assertEqual(ill.tolist(), [[1500, 1000, 2500], [1500, 1250, 500]])
+        self.assertEqual(success.tolist(), [[1, 0, -1], [0, 1, 0]])
+
+    def test_combination_values(self):
+        """Values should be combined for the requested hours."""
+        self.grid.setValues(self.hoys, ((10, 20, 30), (40, 50, 60)), 'sky', 'on')
+        total, direct = bc.combinationValues(
+            self.grid.store, ((0, 0), (1, 0), (1, -1)), hoys=(2, 0))
+        self.assertIsNone(direct)
+        self.assertEqual(total.tolist(), [[[5030, 3010], [560, 1540]],
+                                          [[2530, 1510], [310, 790]],
+                                          [[2500, 1500], [250, 750]]])
+
+    def test_shared_blinds_state(self):
+        """Shared control should use the same state for all the sensors."""
+        index = self.grid.blindsState(
+            logic=bc.illuminanceThreshold(2000), shared=True)[1]
+        self.assertEqual(index.tolist(), [[1, 1, 1], [1, 1, 1]])
+        index = self.grid.blindsState(shared=True, targetArea=50)[1]
+        self.assertEqual(index.tolist(), [[0, 0, 0], [0, 0, 0]])
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_postprocess_blindcontrol_test
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from honeybee.radiance.postprocess.matrixparser import writeMatrix
+from honeybee.radiance.postprocess.matrixmultiply import multiply
+from honeybee.radiance.postprocess.directsun import SparseSunMatrix, \
+    multiplyBlocks
+
+
+class DirectSunTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/postprocess/directsun.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case with 6 suns for 5 hours and 4 sensors."""
+        self.folder = tempfile.mkdtemp()
+        rnd = np.random.RandomState(0)
+        # two suns in hour 3 and no sun in hour 1
+        self.suns = SparseSunMatrix((0, 1, 2, 3, 4, 5), (0, 2, 3, 3, 4, 4),
+                                    rnd.rand(6, 3) * 1e6, 6, 5)
+        self.dc = rnd.rand(4, 6, 3)
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        shutil.rmtree(self.folder)
+
+    def test_multiply(self):
+        """Results should match the dense matrix product for hours with sun."""
+        dense = multiply(self.dc, self.suns.toDense())
+        np.testing.assert_array_equal(self.suns.hours, (0, 2, 3, 4))
+        for st, block in multiplyBlocks(self.dc, self.suns, chunkSize=3):
+            np.testing.assert_allclose(
+                block, dense[st:st + len(block), self.suns.hours], rtol=1e-5)
+
+    def test_files(self):
+        """Sparse matrices should be the same after writing and reading."""
+        dense = os.path.join(self.folder, 'sun.mtx')
+        writeMatrix(dense, self.suns.toDense().reshape(6, -1), 3, 'f')
+        sparse = os.path.join(self.folder, 'sun.smtx')
+        self.suns.write(sparse)
+        for suns in (SparseSunMatrix.fromMatrix(dense, chunkSize=4),
+                     SparseSunMatrix.fromFile(sparse)):
+            self.assertEqual((suns.sunCount, suns.hourCount), (6, 5))
+            np.testing.assert_array_equal(suns.hourIds, self.suns.hourIds)
+            np.testing.assert_allclose(suns.values, self.suns.values, rtol=1e-6)
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_postprocess_directsun_test
+    unittest.main()
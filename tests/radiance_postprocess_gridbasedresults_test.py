@@ -0,0 +1,45 @@
+import unittest
+import os
+import shutil
+import tempfile
+from honeybee.radiance.postprocess.gridbasedresults import \
+    LoadGridBasedDLAnalysisResults
+
+
+class GridBasedResultsTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/postprocess/gridbasedresults.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by creating a working folder."""
+        self.folder = tempfile.mkdtemp()
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        shutil.rmtree(self.folder)
+
+    def write(self, name, content):
+        filePath = os.path.join(self.folder, name)
+        with open(filePath, 'wb') as outf:
+            outf.write(content)
+        return filePath
+
+    def test_radiation_one_column(self):
+        """Radiation results with one value in each row should be loaded."""
+        resultFile = self.write('radiation.res', '12.5\n0\n7.25\n')
+        self.assertEqual(
+            list(LoadGridBasedDLAnalysisResults.readRadiationResult(resultFile)),
+            [12.5, 0, 7.25])
+
+    def test_radiation_three_columns(self):
+        """The first value of rows with three values should be loaded."""
+        resultFile = self.write('radiation.res', '12.5\t1\t2\n0\t0\t0\n7.25\t3\t4\n')
+        results = LoadGridBasedDLAnalysisResults(1, [resultFile]).results
+        self.assertEqual(results, [12.5, 0, 7.25])
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_postprocess_gridbasedresults_test
+    unittest.main()
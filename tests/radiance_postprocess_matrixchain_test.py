@@ -0,0 +1,77 @@
+import unittest
+import numpy as np
+from honeybee.radiance.postprocess.matrixparser import ILLUMINANCEWEIGHTS
+from honeybee.radiance.postprocess.matrixchain import MatrixChain, ThreePhaseEngine
+
+
+class MatrixChainTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/postprocess/matrixchain.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by creating random three-phase matrices."""
+        rnd = np.random.RandomState(0)
+        # 7 sensors, 5 window patches, 4 sky patches and 6 hours
+        self.v = rnd.rand(7, 5, 3)
+        self.t = [rnd.rand(5, 5, 3) for i in range(2)]
+        self.d = rnd.rand(5, 4, 3)
+        self.sky = rnd.rand(4, 6, 3)
+        self.engine = ThreePhaseEngine(self.sky)
+        self.engine.addWindowGroup('south', self.v, self.d)
+        self.engine.addState('south', 'clear', self.t[0])
+
+    def expected(self, t):
+        """Calculate V.T.D.S for each component and add them."""
+        return sum(w * self.v[:, :, c].dot(t[:, :, c]).dot(self.d[:, :, c])
+                   .dot(self.sky[:, :, c])
+                   for c, w in enumerate(ILLUMINANCEWEIGHTS))
+
+    def test_illuminance(self):
+        """Illuminance should match the product of the chain."""
+        res = self.engine.illuminance('south', 'clear')
+        self.assertEqual(res.shape, (7, 6))
+        np.testing.assert_allclose(res, self.expected(self.t[0]), rtol=1e-5)
+
+        blocks = list(self.engine.illuminanceBlocks('south', 'clear', chunkSize=3))
+        self.assertEqual([st for st, _ in blocks], [0, 3, 6])
+
+    def test_tiles(self):
+        """Tiles should cover all the sensors and hours under a small budget."""
+        res = np.zeros((7, 6), dtype=np.float32)
+        tiles = list(self.engine.illuminanceTiles('south', 'clear', memoryLimit=256))
+        self.assertGreater(len(tiles), 2)
+        for st, hst, tile in tiles:
+            res[st:st + len(tile), hst:hst + tile.shape[1]] = tile
+        np.testing.assert_allclose(res, self.expected(self.t[0]), rtol=1e-5)
+
+    def test_new_state(self):
+        """A new state should reuse D.S of the window group."""
+        self.engine.addState('south', 'dark', self.t[1])
+        self.engine.illuminance('south', 'clear')
+        chain = self.engine.chain
+        ds = (('D', 'south'), 'sky')
+        self.assertIn(ds, chain.cachedProducts)
+
+        res = self.engine.illuminance('south', 'dark')
+        np.testing.assert_allclose(res, self.expected(self.t[1]), rtol=1e-5)
+        self.assertIn(ds, chain.cachedProducts)
+
+        # replacing a state removes its cached products
+        self.engine.addState('south', 'dark', self.t[0])
+        for p in chain.cachedProducts:
+            self.assertNotIn(('T', 'south', 'dark'), p)
+
+    def test_order(self):
+        """The order should follow the shape of the matrices."""
+        chain = MatrixChain(None)
+        chain.add('a', np.ones((100, 2)))
+        chain.add('b', np.ones((2, 50)))
+        chain.add('c', np.ones((50, 1)))
+        self.assertEqual(chain.order('abc'), ('a', ('b', 'c')))
+        np.testing.assert_allclose(chain.multiply('abc'), np.full((100, 1), 100))
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_postprocess_matrixchain_test
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import os
+import random
+import shutil
+import tempfile
+from honeybee.radiance.analysisgrid import AnalysisGrid
+from honeybee.radiance.postprocess.matrixparser import writeMatrix, \
+    ILLUMINANCEWEIGHTS
+from honeybee.radiance.postprocess import matrixmultiply as mm
+from honeybee.radiance.postprocess.binaryresults import BinaryResults, \
+    writeBinaryBlocks
+
+
+class MatrixMultiplyTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/postprocess/matrixmultiply.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by writing a daylight and a sky matrix."""
+        self.folder = tempfile.mkdtemp()
+        random.seed(0)
+        self.hoys = range(8, 14)
+        # 5 sensors x 4 patches and 4 patches x 6 hours with rgb values
+        self.dc = [[random.random() for i in range(4 * 3)] for s in range(5)]
+        self.sky = [[random.random() for i in range(6 * 3)] for p in range(4)]
+        self.dcFile = os.path.join(self.folder, 'room.dc')
+        self.skyFile = os.path.join(self.folder, 'sky.smx')
+        writeMatrix(self.dcFile, self.dc, 3, 'f')
+        writeMatrix(self.skyFile, self.sky, 3, 'a')
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        shutil.rmtree(self.folder)
+
+    def expected(self, s, h):
+        """Calculate illuminance for a sensor and an hour in python."""
+        return sum(self.dc[s][k * 3 + c] * ILLUMINANCEWEIGHTS[c] *
+                   self.sky[k][h * 3 + c] for k in range(4) for c in range(3))
+
+    def test_multiply(self):
+        """Values should match the weighted sum of rgb products."""
+        res = mm.multiply(self.dcFile, self.skyFile)
+        self.assertEqual(res.shape, (5, 6))
+        for s in range(5):
+            for h in range(6):
+                self.assertAlmostEqual(res[s, h] / self.expected(s, h), 1, 5)
+
+    def test_tiles(self):
+        """Tiles under a small memory budget should be written to their place."""
+        tiles = list(mm.multiplyTiles(self.dcFile, self.skyFile, memoryLimit=200))
+        self.assertTrue(any(hst for _, hst, _ in tiles))
+        binaryFile = os.path.join(self.folder, 'room.bin')
+        writeBinaryBlocks(binaryFile, iter(tiles), 5, self.hoys)
+        res = BinaryResults(binaryFile)
+        self.assertEqual(res.hoys, tuple(self.hoys))
+        for s in range(5):
+            for h in range(6):
+                self.assertAlmostEqual(res[s][h] / self.expected(s, h), 1, 5)
+
+    def test_assign_blocks(self):
+        """Blocks should be split between analysis grids."""
+        grids = [AnalysisGrid.fromPointsAndVectors([(i, 0, 0) for i in range(c)])
+                 for c in (3, 2)]
+        blocks = mm.multiplyBlocks(self.dcFile, self.skyFile, chunkSize=2)
+        mm.assignBlocks(grids, blocks, self.hoys)
+        s = 0
+        for ag in grids:
+            values = ag.store.asArray()[0, :, :, 0]
+            for row in values:
+                for h, v in enumerate(row):
+                    self.assertAlmostEqual(v / self.expected(s, h), 1, 5)
+                s += 1
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_postprocess_matrixmultiply_test
+    unittest.main()
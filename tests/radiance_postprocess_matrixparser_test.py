@@ -0,0 +1,144 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from array import array
+from honeybee.radiance.postprocess import matrixparser
+from honeybee.radiance.postprocess.matrixparser import matrixRows
+from honeybee.radiance.analysisgrid import AnalysisGrid
+
+
+class MatrixParserTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/postprocess/matrixparser.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by writing a RGB matrix."""
+        self.folder = tempfile.mkdtemp()
+        self.filePath = os.path.join(self.folder, 'illuminance.tmp')
+        with open(self.filePath, 'wb') as outf:
+            outf.write('#?RADIANCE\ndctimestep\nNROWS=3\nNCOLS=2\nNCOMP=3\n'
+                       'FORMAT=ascii\n\n')
+            for pt in range(3):
+                outf.write('{0}\t{0}\t{0}\t0.5\t0.5\t0.5\t\n'.format(pt + 1))
+        self.numpy = matrixparser.np
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        matrixparser.np = self.numpy
+        shutil.rmtree(self.folder)
+
+    def test_rows(self):
+        """RGB values should be converted to illuminance."""
+        rows = [list(row) for row in matrixRows(self.filePath, chunkSize=16)]
+        self.assertEqual(len(rows), 3)
+        for pt, row in enumerate(rows):
+            self.assertAlmostEqual(row[0], 178.9 * (pt + 1), 3)
+            self.assertAlmostEqual(row[1], 89.45, 3)
+
+    def test_rows_without_numpy(self):
+        """Parser should work without numpy."""
+        matrixparser.np = None
+        rows = [list(row) for row in matrixRows(self.filePath, (1, 0, 0), 1)]
+        self.assertEqual(rows, [[2, 0.5], [3, 0.5]])
+
+    def test_corrupted_value(self):
+        """Values which are not numbers should raise an error with and without numpy."""
+        self.assertEqual(len(matrixparser.parseValues(' 1 2\t3\n4 \n')), 4)
+        for numpy in (self.numpy, None):
+            matrixparser.np = numpy
+            self.assertRaises(ValueError, matrixparser.parseValues, '1 2 x3 4\n')
+            self.assertRaises(ValueError, matrixparser.parseValues, '1 2 3 4?')
+            self.assertRaises(ValueError, matrixparser.parseValues, '1 2 3x\n')
+
+    def test_binary_rows(self):
+        """Binary matrices should be read in float and double format."""
+        values = array('d', [1, 1, 1, 0.5, 0.5, 0.5, 2, 2, 2, 0, 0, 0])
+        values.byteswap()
+        filePath = os.path.join(self.folder, 'illuminance.dbl')
+        with open(filePath, 'wb') as outf:
+            outf.write('#?RADIANCE\ndctimestep\nNROWS=2\nNCOLS=2\nNCOMP=3\n'
+                       'FORMAT=double\nBigEndian={}\n\n'.format(
+                           int(sys.byteorder == 'little')))
+            values.tofile(outf)
+        rows = [list(row) for row in matrixRows(filePath, (1, 0, 0), chunkSize=40)]
+        self.assertEqual(rows, [[1, 0.5], [2, 0]])
+
+        matrixparser.np = None
+        rows = [list(row) for row in matrixRows(filePath, (0, 0, 1), 1)]
+        self.assertEqual(rows, [[2, 0]])
+
+    def test_byte_order(self):
+        """Byte order should be read from BigEndian in Radiance headers."""
+        big = sys.byteorder == 'big'
+        self.assertFalse(matrixparser.isByteSwapped({}))
+        self.assertEqual(matrixparser.isByteSwapped({'BIGENDIAN': '1'}), not big)
+        self.assertEqual(matrixparser.isByteSwapped({'BIGENDIAN': '0'}), big)
+        self.assertEqual(matrixparser.isByteSwapped({'BYTEORDER': 'BigEndian'}),
+                         not big)
+        header = matrixparser.writeHeader(2, 2, 3, 'f')
+        self.assertIn('BigEndian={}'.format(int(big)),
+                      [line.strip() for line in header.split('\n')])
+        self.assertNotIn('BYTEORDER', header)
+
+    def test_write_matrix(self):
+        """Matrices should be written and read back in all the formats."""
+        rows = [[0.5, 1, 2, 0, 0, 0] * 5, [100, 10, 1, 3, 2, 1] * 5]
+        for fmt in ('a', 'f', 'd', 'c'):
+            filePath = os.path.join(self.folder, 'matrix.%s' % fmt)
+            matrixparser.writeMatrix(filePath, iter(rows), 3, fmt, ('test',))
+            header, _ = matrixparser.readMatrixHeader(filePath)
+            self.assertEqual(matrixparser.matrixInfo(header)[:3], (2, 10, 3))
+            values = [list(row) for row in matrixRows(filePath, (1, 1, 1))]
+            for row, expected in zip(values, rows):
+                for v, c in zip(row, range(0, 30, 3)):
+                    self.assertAlmostEqual(v, sum(expected[c:c + 3]),
+                                           delta=0.02 * v if fmt == 'c' else 1e-5)
+
+        mtx = matrixparser.memmapMatrix(os.path.join(self.folder, 'matrix.d'))
+        self.assertEqual(mtx.shape, (2, 10, 3))
+        self.assertEqual(list(mtx[1, 9]), [3, 2, 1])
+
+    def test_stitch_matrices(self):
+        """Rows of matrices should be stacked with a new header."""
+        rows = [[i, i, i, 0, 0, 0] for i in range(5)]
+        for fmt in ('a', 'f'):
+            shards = [os.path.join(self.folder, 'shard%d.%s' % (i, fmt)) for i in (0, 1)]
+            matrixparser.writeMatrix(shards[0], rows[:3], 3, fmt)
+            matrixparser.writeMatrix(shards[1], rows[3:], 3, fmt)
+            filePath = matrixparser.stitchMatrices(
+                shards, os.path.join(self.folder, 'matrix.%s' % fmt))
+            header, _ = matrixparser.readMatrixHeader(filePath)
+            self.assertEqual(matrixparser.matrixInfo(header)[:3], (5, 2, 3))
+            values = [list(row) for row in matrixRows(filePath, (1, 0, 0))]
+            self.assertEqual(values, [[i, 0] for i in range(5)])
+
+        with self.assertRaises(ValueError):
+            matrixparser.stitchMatrices(
+                (self.filePath, shards[0]), os.path.join(self.folder, 'bad.f'))
+
+    def test_rgbe_runs(self):
+        """Run-length encoded RGBE scanlines should be decoded."""
+        filePath = os.path.join(self.folder, 'matrix.hdr')
+        with open(filePath, 'wb') as outf:
+            outf.write('#?RADIANCE\nFORMAT=32-bit_rle_rgbe\n\n-Y 1 +X 10\n')
+            # red, green and blue are 128 for all the columns and the exponent is
+            # 129 for the first 2 columns and 0 for the rest
+            outf.write('\x02\x02\x00\x0a' + '\x8a\x80' * 3 +
+                       '\x02\x81\x81\x88\x00')
+        rows = [list(row) for row in matrixRows(filePath, (1, 0, 0))]
+        self.assertEqual(rows, [[1.00390625] * 2 + [0] * 8])
+
+    def test_analysis_grid(self):
+        """Values should be loaded to an analysis grid without truncation."""
+        ag = AnalysisGrid.fromPointsAndVectors(((0, 0, 0),) * 3)
+        ag.setValuesFromFile(self.filePath, (10, 11))
+        self.assertAlmostEqual(ag[2].value(11), 89.45, 3)
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_postprocess_matrixparser_test
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import os
+import shutil
+import tempfile
+from honeybee.radiance.analysisgrid import AnalysisGrid
+from honeybee.radiance.postprocess.binaryresults import writeBinaryResults
+from honeybee.radiance.postprocess import parallel
+
+
+class ParallelTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/postprocess/parallel.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by creating two grids with values."""
+        self.folder = tempfile.mkdtemp()
+        self.hoys = range(8, 18)
+        self.grids = []
+        for count in (5, 3):
+            ag = AnalysisGrid.fromPointsAndVectors(
+                [(i, 0, 0) for i in range(count)], name='grid_%d' % count)
+            values = [[(i + 1) * h * count for h in self.hoys] for i in range(count)]
+            ag.setValues(self.hoys, values)
+            self.grids.append(ag)
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        shutil.rmtree(self.folder)
+
+    def test_grid_metrics(self):
+        """Metrics should match the metrics for each grid."""
+        occ = set(range(9, 17))
+        res = parallel.gridMetrics(self.grids, occSchedule=occ, DAThreshhold=200,
+                                   processes=2, chunkSize=2)
+        self.assertEqual(len(res), 2)
+        for ag, (metrics, (sda, hours)) in zip(self.grids, res):
+            expected = ag.annualMetrics(200, occSchedule=occ)
+            for m, e in zip(metrics, expected):
+                self.assertEqual(len(m), len(ag))
+                for v, ev in zip(m, e):
+                    self.assertAlmostEqual(v, ev, 5)
+            esda, ehours = ag.spatialDaylightAutonomy(200, occSchedule=occ)
+            self.assertAlmostEqual(sda, esda)
+            self.assertEqual(hours, ehours)
+
+    def test_binary_ranges(self):
+        """Grids in the same binary file should be calculated by path."""
+        binaryFile = os.path.join(self.folder, 'illuminance.bin')
+        values = self.grids[0].store.asArray()[0, :, :, 0].tolist() + \
+            self.grids[1].store.asArray()[0, :, :, 0].tolist()
+        writeBinaryResults(binaryFile, values, self.hoys)
+        res = parallel.gridMetrics([(binaryFile, 0, 5), (binaryFile, 5, 8)],
+                                   processes=1, chunkSize=2)
+        expected = parallel.gridMetrics(self.grids, processes=1)
+        self.assertEqual(res, expected)
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_postprocess_parallel_test
+    unittest.main()
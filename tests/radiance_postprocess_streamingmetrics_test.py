@@ -0,0 +1,71 @@
+import unittest
+import os
+import random
+import shutil
+import tempfile
+from honeybee.radiance.analysisgrid import AnalysisGrid
+from honeybee.radiance.postprocess.matrixparser import matrixRows
+from honeybee.radiance.postprocess import streamingmetrics
+from honeybee.radiance.postprocess.streamingmetrics import AnnualMetricsStream
+
+
+class AnnualMetricsStreamTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/postprocess/streamingmetrics.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by writing an annual results file."""
+        random.seed(0)
+        self.folder = tempfile.mkdtemp()
+        self.illFile = os.path.join(self.folder, 'illuminance.ill')
+        self.hoys = range(100, 148)
+        self.occSchedule = set(range(108, 140))
+        with open(self.illFile, 'wb') as outf:
+            outf.write('#?RADIANCE\nNROWS=20\nNCOLS=48\nNCOMP=1\nFORMAT=ascii\n\n')
+            for pt in range(20):
+                outf.write('\t'.join('%.2f' % (random.random() * 3000)
+                                     for h in self.hoys))
+                outf.write('\n')
+        self.grid = AnalysisGrid.fromPointsAndVectors([(0, 0, 0)] * 20)
+        self.grid.setValuesFromFile(self.illFile, self.hoys)
+        self.numpy = streamingmetrics.np
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        streamingmetrics.np = self.numpy
+        shutil.rmtree(self.folder)
+
+    def assertMetricsEqual(self, stream):
+        """Compare metrics from stream with the analysis grid."""
+        metrics = self.grid.annualMetrics(occSchedule=self.occSchedule)
+        for values, gridValues in zip(stream.annualMetrics(), metrics):
+            for a, b in zip(values, gridValues):
+                self.assertAlmostEqual(a, b, 5)
+
+        sda, hours = stream.spatialDaylightAutonomy()
+        gsda, ghours = self.grid.spatialDaylightAutonomy(occSchedule=self.occSchedule)
+        self.assertAlmostEqual(sda, gsda)
+        self.assertEqual(sorted(hours), sorted(ghours))
+
+    def test_stream(self):
+        """Streamed metrics should match metrics from analysis grid."""
+        stream = AnnualMetricsStream(self.hoys, self.occSchedule)
+        for values in matrixRows(self.illFile):
+            stream.add(values)
+        self.assertEqual(stream.sensorCount, 20)
+        self.assertMetricsEqual(stream)
+
+    def test_stream_without_numpy(self):
+        """Streamed metrics should match metrics without numpy."""
+        streamingmetrics.np = None
+        stream = AnnualMetricsStream(self.hoys, self.occSchedule)
+        for values in matrixRows(self.illFile):
+            stream.add(values)
+        self.assertMetricsEqual(stream)
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_postprocess_streamingmetrics_test
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+from honeybee.radiance.analysisgrid import AnalysisGrid
+from honeybee.radiance.postprocess.annualmetrics import combinedValues
+
+
+class SuperpositionTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/postprocess/superposition.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by initiating an analysis grid with two sources."""
+        rnd = np.random.RandomState(0)
+        self.hoys = range(8, 18)
+        self.grid = AnalysisGrid.fromPointsAndVectors([(i, 0, 0) for i in range(4)])
+        for source, states in (('south', ('open', 'half', 'closed')),
+                               ('west', ('open', 'closed'))):
+            for state in states:
+                self.grid.setValues(self.hoys, rnd.rand(4, 10) * 1000, source, state)
+                self.grid.setValues(self.hoys, rnd.rand(4, 10) * 100, source, state,
+                                    isDirect=True)
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        pass
+
+    def test_values(self):
+        """Values should match the combined values for each schedule."""
+        sp = self.grid.superposition()
+        self.assertEqual(sp.states, (('open', 'half', 'closed'), ('open', 'closed')))
+        rnd = np.random.RandomState(1)
+        for i in range(5):
+            states = np.column_stack((rnd.randint(-1, 3, 10), rnd.randint(-1, 2, 10)))
+            total, direct = sp.values(states)
+            expTotal, expDirect = combinedValues(self.grid.store, states)
+            np.testing.assert_allclose(total, expTotal, rtol=1e-6)
+            np.testing.assert_allclose(direct, expDirect, rtol=1e-6)
+
+    def test_schedule_by_name(self):
+        """Names, single states and missing sources should be converted to ids."""
+        sp = self.grid.superposition(self.hoys[2:5])
+        states = sp.stateIds({'south': ['open', 'closed', 1], 'west': 'closed'})
+        self.assertEqual(states.tolist(), [[0, 1], [2, 1], [1, 1]])
+        self.assertEqual(sp.stateIds({'west': -1}).tolist(), [[0, -1]] * 3)
+        with self.assertRaises(ValueError):
+            sp.values({'south': 'dark'})
+        with self.assertRaises(ValueError):
+            sp.values((0, 2))
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_postprocess_superposition_test
+    unittest.main()
@@ -0,0 +1,243 @@
+import unittest
+import math
+import os
+import shutil
+import tempfile
+import numpy as np
+from honeybee.hbsurface import HBSurface
+from honeybee.hbfensurface import HBFenSurface
+from honeybee.radiance.analysisgrid import AnalysisGrid
+from honeybee.radiance.artifactcache import ArtifactCache
+from honeybee.radiance.scene import Scene
+from honeybee.radiance.sky.skymatrix import SkyMatrix
+from honeybee.radiance.recipe.fivephase.gridbased import FivePhaseGridBased
+from honeybee.radiance.postprocess.directsun import SparseSunMatrix
+from honeybee.radiance.postprocess.binaryresults import writeBinaryBlocks
+from honeybee.radiance.postprocess.matrixparser import readMatrix, writeMatrix
+
+WEIGHTS = np.array((47.4, 119.9, 11.6))
+
+
+class Location(object):
+    """Location of the weather data."""
+
+    latitude, longitude, timezone, stationId = 37.6, -122.4, -8, '724940'
+
+
+class Weather(object):
+    """Radiation values for a clear day with the sun up from 6 to 18."""
+
+    isWea = True
+    location = Location()
+    directNormalRadiation = [max(0, 800 * math.sin(math.pi * (h % 24 - 6) / 12))
+                             for h in range(8760)]
+    diffuseHorizontalRadiation = [max(0, 100 * math.sin(math.pi * (h % 24 - 6) / 12))
+                                  for h in range(8760)]
+
+
+class FivePhaseTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/recipe/fivephase/gridbased.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case with a wall with a window and two grids."""
+        self.folder = tempfile.mkdtemp()
+        self.hoys = range(4008, 4032)
+        wall = HBSurface('wall', [(0, 0, 0), (4, 0, 0), (4, 0, 3), (0, 0, 3)], 0)
+        wall.addFenestrationSurface(
+            HBFenSurface('glass', [(1, 0, 1), (3, 0, 1), (3, 0, 2), (1, 0, 2)]))
+        self.hbObjects = [wall]
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        shutil.rmtree(self.folder)
+
+    def skyMatrix(self, hoys=None):
+        sky = SkyMatrix(Weather(), 1, 0, hoys or self.hoys)
+        sky.useGendaymtx = False
+        return sky
+
+    def recipe(self, matrixFormat='a', multiplyInProcess=False, folder=None):
+        grids = [AnalysisGrid.fromPointsAndVectors([(i, 1, 1) for i in range(c)])
+                 for c in (3, 2)]
+        recipe = FivePhaseGridBased(self.skyMatrix(), grids)
+        recipe.hbObjects = self.hbObjects
+        recipe.sunMatrix.useGendaylit = False
+        recipe.matrixFormat = matrixFormat
+        recipe.multiplyInProcess = multiplyInProcess
+        folder = folder or self.folder
+        # subfolders are joined with Windows separators in populateSubFolders
+        for subFolder in ('objects', 'skies', 'scene'):
+            path = os.path.join(folder, 'room', 'gridbased_fivephase\\' + subFolder)
+            if not os.path.isdir(path):
+                os.makedirs(path)
+        return recipe
+
+    def writeCoefficients(self, recipe, matrixFormat='a'):
+        """Write random coefficient matrices instead of running rfluxmtx/rcontrib."""
+        dcMatrix = recipe._matrixFiles[0]
+        dcDirect, _, sunDc, sunMtx = recipe._sunMatrixFiles
+        if os.path.splitext(sunMtx)[-1] == '.mtx':
+            sunCount = readMatrix(sunMtx).shape[0]
+        else:
+            sunCount = SparseSunMatrix.fromFile(sunMtx).sunCount
+        rnd = np.random.RandomState(0)
+        for path, count in ((dcMatrix, 146), (dcDirect, 146), (sunDc, sunCount)):
+            values = rnd.rand(5, count * 3).astype(np.float32) * 1e-2
+            writeMatrix(path, values, 3, matrixFormat)
+        # sky matrices are written to the skies folder which is only the same as
+        # the path with Windows separators on Windows
+        for path in (recipe._matrixFiles[1], recipe._sunMatrixFiles[1]):
+            if not os.path.isfile(path):
+                shutil.copy(path.replace('\\', os.sep), path)
+
+    def reference(self, recipe):
+        """Calculate total - direct + sun and sun values with numpy."""
+        dcMatrix, skyMtx, _ = recipe._matrixFiles
+        dcDirect, skyDirect, sunDc, sunMtx = recipe._sunMatrixFiles
+        suns = SparseSunMatrix.fromFile(sunMtx)
+        sun = np.einsum('skc,khc,c->sh', readMatrix(sunDc), suns.toDense(), WEIGHTS)
+        total = np.einsum('skc,khc,c->sh', readMatrix(dcMatrix), readMatrix(skyMtx),
+                          WEIGHTS) - \
+            np.einsum('skc,khc,c->sh', readMatrix(dcDirect), readMatrix(skyDirect),
+                      WEIGHTS) + sun
+        return total, sun, suns.hours
+
+    def test_write_commands(self):
+        """Matrices and results should be calculated in the format of the recipe."""
+        for matrixFormat, flag in (('a', '-fa'), ('f', '-ff')):
+            folder = os.path.join(self.folder, matrixFormat)
+            recipe = self.recipe(matrixFormat, folder=folder)
+            recipe.write(folder, 'room')
+            commands = [c for c in recipe.commands if not c.startswith(':: ')]
+            rflux = [c for c in commands if 'rfluxmtx' in c]
+            self.assertEqual(len(rflux), 2)
+            self.assertIn('objects/room_black.mat', rflux[1])
+            rcontrib, = [c for c in commands if 'rcontrib' in c]
+            self.assertIn('-M skies/', rcontrib)
+            dct = [c for c in commands if 'dctimestep' in c]
+            self.assertEqual(len(dct), 3)
+            for c in dct:
+                self.assertIn(' | ', c)
+                self.assertIn('rmtxop -c 47.4 119.9 11.6 %s' % flag, c)
+                self.assertEqual('-of' in c, matrixFormat == 'f')
+            self.assertIn('-s -1.0', commands[-1])
+            if matrixFormat == 'f':
+                self.assertIn('-faf', rflux[0])
+                self.assertIn('-faf', rcontrib)
+                with open(recipe._sunMatrixFiles[-1], 'rb') as inf:
+                    self.assertIn('FORMAT=float', inf.read(500))
+
+            total, direct = recipe.resultsFile
+            self.assertTrue(total.endswith('room..total.ill'))
+            self.assertTrue(direct.endswith('room..sun.ill'))
+
+    def test_blacked_scene(self):
+        """Scene geometries should be black in direct-only and sun coefficients."""
+        sceneFile = os.path.join(self.folder, 'context.rad')
+        with open(sceneFile, 'wb') as outf:
+            outf.write('void glass context_glass 0 0 3 .8 .8 .8\n'
+                       'context_glass polygon tower 0 0 9 0 9 0 4 9 0 4 9 5\n')
+        recipe = self.recipe()
+        recipe.scene = Scene([sceneFile], copyLocal=False)
+        recipe.write(self.folder, 'room')
+        xform, = [c for c in recipe.commands if 'xform' in c]
+        self.assertIn('-m black', xform)
+        self.assertIn('context.rad', xform)
+        self.assertIn('room_scene_black.rad', xform)
+        rflux = [c for c in recipe.commands if 'rfluxmtx' in c]
+        self.assertIn('context.rad', rflux[0])
+        self.assertNotIn('context.rad', rflux[1])
+        self.assertIn('room_scene_black.rad', rflux[1])
+        oconv, = [c for c in recipe.commands if 'oconv' in c]
+        self.assertNotIn('context.rad', oconv)
+        self.assertIn('room_scene_black.rad', oconv)
+
+    def test_multiply_in_process(self):
+        """Results should be total - direct + sun for total and sun for direct."""
+        recipe = self.recipe('f', True)
+        recipe.write(self.folder, 'room')
+        self.assertFalse([c for c in recipe.commands if 'dctimestep' in c])
+        self.writeCoefficients(recipe, 'f')
+        recipe.isCalculated = True
+        total, sun, sunHours = self.reference(recipe)
+
+        points = [p for ag in recipe.results() for p in ag.analysisPoints]
+        sunHoys = [self.hoys[h] for h in sunHours]
+        for point, values, sunValues in zip(points, total, sun):
+            np.testing.assert_allclose(point.values(self.hoys), values, rtol=1e-4)
+            np.testing.assert_allclose(point.directValues(sunHoys),
+                                       sunValues[sunHours], rtol=1e-4)
+
+        streams = recipe.results(streaming=True)
+        exposedHours = [h for s in streams for h in s.annualSolarExposure()[-1]]
+        self.assertEqual(exposedHours, list((sun > 1000).sum(axis=1)))
+        self.assertTrue(0 < sum(exposedHours) < sun.size)
+
+    def test_streaming_results(self):
+        """Streaming results should include direct values for ASE."""
+        recipe = self.recipe()
+        recipe.write(self.folder, 'room')
+        rnd = np.random.RandomState(0)
+        total = rnd.rand(5, len(self.hoys)) * 2000
+        sun = rnd.rand(5, len(self.hoys)) * 2000
+        for path, values in zip(recipe.resultsFile, (total, sun)):
+            writeMatrix(path, values, 1, 'a')
+        recipe.isCalculated = True
+
+        streams = recipe.results(streaming=True)
+        exposedHours = [h for s in streams for h in s.annualSolarExposure()[-1]]
+        self.assertEqual(exposedHours, list((sun > 1000).sum(axis=1)))
+        self.assertEqual(streams[0].annualMetrics()[0][0], (total[0] >= 300).mean())
+
+    def test_reuse_binary_results(self):
+        """Binary results should not be reused for different hours."""
+        recipe = self.recipe()
+        matrixFile = os.path.join(self.folder, 'room.dc')
+        binaryFile = os.path.join(self.folder, 'illuminance.bin')
+        with open(matrixFile, 'wb') as outf:
+            outf.write('matrix')
+        writeBinaryBlocks(binaryFile, [(0, np.zeros((5, 4)))], 5, range(4))
+        os.utime(matrixFile, (0, 0))
+
+        values = np.ones((5, len(self.hoys)))
+        res = recipe._writeBlocks(binaryFile, (matrixFile,), [(0, values)])
+        self.assertEqual(res.hoys, tuple(self.hoys))
+        np.testing.assert_allclose(res.array, values)
+        del res
+        # the file has the same hours and is reused
+        res = recipe._writeBlocks(binaryFile, (matrixFile,), [(0, values * 2)])
+        np.testing.assert_allclose(res.array, values)
+
+    def test_reuse(self):
+        """Coefficients should be reused by name unless the suns or the cache change."""
+        recipe = self.recipe()
+        recipe.write(self.folder, 'room')
+        self.writeCoefficients(recipe)
+        sunDc = recipe._sunMatrixFiles[2]
+
+        recipe.write(self.folder, 'room')
+        self.assertFalse([c for c in recipe.commands if 'rfluxmtx' in c])
+        self.assertFalse([c for c in recipe.commands if 'rcontrib' in c])
+        self.assertEqual(recipe._sunMatrixFiles[2], sunDc)
+
+        # suns follow the new sky matrix and sun coefficients are not reused
+        hoys = range(4032, 4056)
+        recipe.skyMatrix = self.skyMatrix(hoys)
+        self.assertEqual(recipe.sunMatrix.hoys, hoys)
+        recipe.write(self.folder, 'room')
+        self.assertNotEqual(recipe._sunMatrixFiles[2], sunDc)
+        self.assertFalse([c for c in recipe.commands if 'rfluxmtx' in c])
+        self.assertTrue([c for c in recipe.commands if 'rcontrib' in c])
+
+        # files are only reused by the cache if their inputs are the same
+        recipe.cache = ArtifactCache(os.path.join(self.folder, 'cache'))
+        recipe.write(self.folder, 'room')
+        self.assertEqual(len([c for c in recipe.commands if 'rfluxmtx' in c]), 2)
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_recipe_fivephase_test
+    unittest.main()
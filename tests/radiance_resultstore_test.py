@@ -0,0 +1,126 @@
+import unittest
+from honeybee.radiance.resultstore import ResultStore
+from honeybee.radiance.analysisgrid import AnalysisGrid
+
+
+class ResultStoreTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/resultstore.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by initiating the class."""
+        self.hoys = range(10)
+        self.store = ResultStore(3)
+        for pt in range(3):
+            self.store.setValues(pt, [pt * 10 + h for h in self.hoys], self.hoys)
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        pass
+
+    # test default values
+    def test_default_values(self):
+        """Make sure default values are set correctly."""
+        self.assertEqual(self.store.pointCount, 3)
+        self.assertEqual(self.store.hoys, self.hoys)
+        self.assertEqual(self.store.sources, [None])
+        self.assertFalse(self.store.hasDirectValues)
+        self.assertEqual(len(self.store.data), 3 * 10 * 2)
+
+    def test_values(self):
+        """Make sure values are set and returned for the correct point."""
+        self.assertEqual(self.store.values(1, (2, 3)), (12, 13))
+        self.assertEqual(self.store.coupledValues(2, (0,)), ((20, None),))
+
+    def test_add_state(self):
+        """Adding a new state should not change current values."""
+        self.store.setValues(0, [1] * 10, self.hoys, 'wg', 'on')
+        self.assertEqual(self.store.slotCount, 2)
+        self.assertEqual(self.store.values(0, (5,), 1, 0), (1,))
+        self.assertEqual(self.store.values(2, (5,)), (25,))
+
+    def test_add_hoys(self):
+        """Adding new hours should keep the current values."""
+        self.store.setValues(1, (7,), (100,))
+        self.assertEqual(self.store.hourCount, 11)
+        self.assertEqual(self.store.values(1, (9, 100)), (19, 7))
+        self.assertEqual(self.store.values(2, (100,)), (None,))
+
+    def test_duplicate(self):
+        """Duplicate should copy the values for selected points."""
+        dup = self.store.duplicate((2, 0))
+        self.assertEqual(dup.values(0, (1,)), (21,))
+        self.assertEqual(dup.values(1, (1,)), (1,))
+
+    def test_copy_on_write(self):
+        """Changing a store should not change the duplicates of the store."""
+        values = self.store.asArray()
+        with self.assertRaises(ValueError):
+            values[0, 0, 0, 0] = 100
+        dup = self.store.duplicate()
+        self.assertIs(dup.data, self.store.data)
+        self.store.setBlockValues(0, [[100] * 10], self.hoys)
+        self.assertEqual(dup.values(0, (1,)), (1,))
+        self.assertEqual(self.store.values(0, (1,)), (100,))
+        # values are not changed after the store is changed
+        self.assertEqual(values[0, 0, 1, 0], 1)
+
+    def test_copy_after_detach(self):
+        """Data should not be copied once the other stores stop sharing it."""
+        dup = self.store.duplicate()
+        dup.setValues(0, [100] * 10, self.hoys)
+        data = self.store.data
+        self.store.setValues(0, [200] * 10, self.hoys)
+        self.assertIs(self.store.data, data)
+        self.assertEqual(dup.values(0, (1,)), (100,))
+
+        dup = self.store.duplicate()
+        del dup
+        self.store.setValues(1, [300] * 10, self.hoys)
+        self.assertIs(self.store.data, data)
+
+    def test_array_after_new_states(self):
+        """Arrays should keep their values after adding new states to the store."""
+        store = ResultStore(2000)
+        store.setValues(0, [1] * 8760, range(8760))
+        values = store.asArray()
+        data = store.data
+        for count in range(5):
+            store.setValues(0, [2] * 8760, range(8760), 'source%d' % count, 'on')
+        self.assertIsNot(store.data, data)
+        self.assertEqual(values.shape, (1, 2000, 8760, 2))
+        self.assertEqual(values[0, 0, :, 0].sum(), 8760)
+        self.assertEqual(store.asArray()[5, 0, :, 0].sum(), 2 * 8760)
+
+    def test_concatenate(self):
+        """Values should be concatenated by source and state and not by slot."""
+        first, second = ResultStore(1), ResultStore(2)
+        for store, order in ((first, ('x', 'y', 'z')), (second, ('x', 'z', 'y'))):
+            for state in order:
+                source = 'b' if state == 'y' else 'a'
+                for pt in range(store.pointCount):
+                    store.setValues(pt, ['xyz'.index(state) + 1] * 10, self.hoys,
+                                    source, state)
+        self.assertNotEqual(first._slots, second._slots)
+
+        store = ResultStore.concatenate((first, second))
+        self.assertEqual(store.pointCount, 3)
+        for pt in range(3):
+            self.assertEqual(store.values(pt, (1,), 0, 0), (1,))
+            self.assertEqual(store.values(pt, (1,), 0, 1), (3,))
+            self.assertEqual(store.values(pt, (1,), 1, 0), (2,))
+
+    def test_analysis_grid(self):
+        """Points of an analysis grid should be views to the grid store."""
+        ag = AnalysisGrid.fromPointsAndVectors(((0, 0, 0), (1, 0, 0)))
+        ag.setValues(self.hoys, ([1] * 10, [2] * 10))
+        self.assertIs(ag[1].store, ag.store)
+        self.assertEqual(ag[1].value(4), 2)
+        self.assertEqual(tuple(ag[0].combinedValuesById((4,), ((0,),))),
+                         ((1, None),))
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_resultstore_test
+    unittest.main()
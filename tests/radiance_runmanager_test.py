@@ -0,0 +1,101 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from honeybee.radiance.runmanager import CommandGraph, LocalExecutor
+from honeybee.radiance.command.pipeline import Pipeline
+
+
+class Echo(object):
+    """A command which writes a line to outputFile or to stdout."""
+
+    def __init__(self, outputFile, inputFiles=(), line='done', exitCode=0):
+        self.outputFile = outputFile
+        self.inputFiles = inputFiles
+        self.line = line
+        self.exitCode = exitCode
+
+    def toRadString(self, relativePath=False):
+        output = ' > {}'.format(self.outputFile) if self.outputFile else ''
+        return 'echo {}{} && exit {}'.format(self.line, output, self.exitCode)
+
+
+class RunManagerTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/runmanager.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by creating a working folder."""
+        self.folder = tempfile.mkdtemp()
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        shutil.rmtree(self.folder)
+
+    def test_graph(self):
+        """Commands should only depend on commands that write their files."""
+        graph = CommandGraph(self.folder)
+        graph.add(Echo('a.txt'))
+        graph.add(Echo('b.txt'))
+        graph.add(Echo('c.txt', ('a.txt', os.path.join(self.folder, 'b.txt'))))
+        graph.add(Echo('a.txt', line='again'))
+        self.assertEqual(graph.layers(), [['000_echo', '001_echo'], ['002_echo'],
+                                          ['003_echo']])
+
+        finished = LocalExecutor(2).run(graph)
+        self.assertEqual(finished[2:], ['002_echo', '003_echo'])
+        with open(os.path.join(self.folder, 'a.txt')) as f:
+            self.assertEqual(f.read().strip(), 'again')
+        self.assertTrue(os.path.isfile(os.path.join(self.folder, 'logs',
+                                                    '002_echo.log')))
+
+    def test_failure(self):
+        """The executor should stop on the first failed command."""
+        graph = CommandGraph(self.folder)
+        graph.add(Echo('a.txt', exitCode=3))
+        graph.add(Echo('b.txt', ('a.txt',)))
+        with self.assertRaises(RuntimeError):
+            LocalExecutor(2).run(graph)
+        self.assertFalse(os.path.isfile(os.path.join(self.folder, 'b.txt')))
+
+    def test_pipeline_failure(self):
+        """A failed command in the middle of a pipeline should fail the node."""
+        graph = CommandGraph(self.folder)
+        graph.add(Pipeline((Echo(None, exitCode=3), Echo('a.txt'))))
+        graph.add(Echo('b.txt', ('a.txt',)))
+        executor = LocalExecutor(2)
+        with self.assertRaises(RuntimeError):
+            executor.run(graph)
+        self.assertEqual(executor.report.records[0].exitCode, 3)
+        self.assertFalse(os.path.isfile(os.path.join(self.folder, 'b.txt')))
+
+    def test_report(self):
+        """Each command should have a record in the report and the progress."""
+        graph = CommandGraph(self.folder)
+        graph.add(Echo('a.txt', line='warning >&2; echo done'))
+        graph.add(Echo('b.txt', ('a.txt',)))
+        progress = []
+        reportFile = os.path.join(self.folder, 'logs', 'runreport.json')
+        executor = LocalExecutor(2)
+        executor.run(graph, lambda *args: progress.append(args[1:]), reportFile)
+        self.assertEqual(progress, [(1, 2), (2, 2)])
+
+        first, second = executor.report.records
+        self.assertEqual(first.stderr.strip(), 'warning')
+        self.assertEqual(first.outputSizes, {'a.txt': 5})
+        self.assertEqual(second.inputSizes, {'a.txt': 5})
+        self.assertEqual(second.exitCode, 0)
+        self.assertGreaterEqual(second.wallTime, 0)
+        with open(reportFile) as inf:
+            report = json.load(inf)
+        self.assertEqual(report['stages'].keys(), ['echo'])
+        self.assertEqual(report['stages']['echo']['count'], 2)
+        self.assertEqual(len(report['commands']), 2)
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_runmanager_test
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import datetime
+import os
+import numpy as np
+from honeybee.radiance.sky import perez
+from honeybee.radiance.postprocess.matrixparser import readMatrix
+
+ASSETS = os.path.join(os.path.dirname(__file__), 'assets', 'sky')
+
+
+def readWea(filePath):
+    """Read location, hoys and radiation values from a wea file."""
+    with open(filePath, 'rb') as inf:
+        header = dict(inf.readline().split(None, 1) for _ in xrange(6))
+        hoys, dnr, dhr = [], [], []
+        for line in inf:
+            month, day, hour, directNormal, diffuseHorizontal = line.split()
+            dayOfYear = datetime.date(2017, int(month), int(day)).timetuple().tm_yday
+            hoys.append((dayOfYear - 1) * 24 + int(float(hour)))
+            dnr.append(float(directNormal))
+            dhr.append(float(diffuseHorizontal))
+    # wea files use west positive longitude and meridian
+    return float(header['latitude']), -float(header['longitude']), \
+        -float(header['time_zone']) / 15, hoys, dnr, dhr
+
+
+class PerezTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/sky/perez.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case with radiation values for 3 days in summer."""
+        self.hoys = range(4000, 4072)
+        _, altitude, _ = perez.solarPositions(42.37, -71.03, -5, self.hoys)
+        sinAlt = np.sin(np.maximum(altitude, 0))
+        self.dnr = 850 * sinAlt ** 0.3 * (altitude > 0)
+        self.dhr = 120 * sinAlt + 5 * (altitude > -0.1)
+
+    def sky(self, density=1, mode=0):
+        return perez.skyMatrix(42.37, -71.03, -5, self.dnr, self.dhr, self.hoys,
+                               density, 30, mode)
+
+    def test_patches(self):
+        """Number of patches and solid angles should match Reinhart subdivisions."""
+        for density, count in ((1, 146), (2, 578), (4, 2306)):
+            altitude, azimuth, dom = perez.skyPatches(density)
+            self.assertEqual(len(altitude), count)
+            self.assertEqual(perez.patchCount(density), count)
+            self.assertAlmostEqual(dom[1:].sum(), 2 * np.pi)
+
+    def test_illuminance(self):
+        """Sky and sun patches should add up to diffuse and direct illuminance."""
+        jd, altitude, _ = perez.solarPositions(42.37, -71.03, -5, self.hoys)
+        _, diffuse, direct, _ = perez.skyParameters(jd, altitude, self.dnr,
+                                                    self.dhr)
+        for density in (1, 2):
+            alt, _, dom = perez.skyPatches(density)
+            sky = self.sky(density, 2)
+            horizontal = (sky[1:, :, 1] * (np.sin(alt) * dom)[1:, None]).sum(axis=0)
+            np.testing.assert_allclose(
+                horizontal * perez.WHTEFFICACY / perez.SKYCOLOR[1], diffuse,
+                rtol=1e-4, atol=1e-3)
+
+            sun = self.sky(density, 1)
+            self.assertFalse(sun[0].any())
+            np.testing.assert_allclose(
+                (sun[1:, :, 0] * dom[1:, None]).sum(axis=0) * perez.WHTEFFICACY,
+                np.where(direct >= 1e-4, direct, 0), rtol=1e-4, atol=1e-3)
+
+            total = self.sky(density)
+            np.testing.assert_allclose(total[1:], sky[1:] + sun[1:], rtol=1e-5)
+
+    def test_sun_radiance(self):
+        """Sun radiance should only be calculated when the sun is up."""
+        jd, altitude, _ = perez.solarPositions(42.37, -71.03, -5, self.hoys)
+        radiance = perez.sunRadiance(jd, altitude, self.dnr, self.dhr)
+        self.assertFalse(radiance[altitude <= 0].any())
+        self.assertTrue((radiance[altitude > 0.05] > 0).all())
+        # luminous efficacy of direct sunlight should be between 50 and 120 lm/W
+        efficacy = radiance * perez.SUNSOLIDANGLE * perez.WHTEFFICACY / self.dnr
+        efficacy = efficacy[altitude > 0.05]
+        self.assertTrue(((efficacy > 50) & (efficacy < 120)).all())
+
+    def test_gendaymtx(self):
+        """Sky matrices should match gendaymtx for MF:1 and MF:4."""
+        latitude, longitude, timezone, hoys, dnr, dhr = \
+            readWea(os.path.join(ASSETS, 'gendaymtx.wea'))
+        for density in (1, 4):
+            for mode in (0, 1):
+                reference = readMatrix(os.path.join(
+                    ASSETS, 'gendaymtx_m{}_mode{}.mtx'.format(density, mode)))
+                sky = perez.skyMatrix(latitude, longitude, timezone, dnr, dhr, hoys,
+                                      density, 0, mode)
+                self.assertEqual(sky.shape, reference.shape)
+                np.testing.assert_allclose(sky, reference, rtol=0.01,
+                                           atol=0.005 * reference.max())
+                # hours with no direct radiation have no sun
+                if mode == 1:
+                    self.assertFalse(sky[:, np.array(dnr) == 0].any())
+
+    def test_nearest_patches(self):
+        """Nearest patches to the sun should match checking all the patches."""
+        _, altitude, azimuth = perez.solarPositions(-33.9, 18.6, 2, range(0, 8760, 7))
+        for density in (1, 4):
+            ids, _ = perez._nearestPatches(altitude, azimuth, density)
+            alt, azi, _ = perez.skyPatches(density)
+            dots = perez.sunVectors(alt[1:], azi[1:]).dot(
+                perez.sunVectors(altitude, azimuth).T)
+            nearest = np.sort(np.argsort(-dots, axis=0)[:4], axis=0) + 1
+            np.testing.assert_array_equal(np.sort(ids, axis=0), nearest)
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_sky_perez_test
+    unittest.main()
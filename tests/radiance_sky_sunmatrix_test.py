@@ -0,0 +1,109 @@
+import unittest
+import datetime
+import os
+import shutil
+import tempfile
+import numpy as np
+from honeybee.radiance.sky.sunmatrix import SunMatrix
+from honeybee.radiance.postprocess.matrixparser import readMatrix, readMatrixHeader, \
+    matrixInfo
+
+ASSETS = os.path.join(os.path.dirname(__file__), 'assets', 'sky')
+
+
+class Location(object):
+    """Location of the weather data."""
+
+    stationId = 'boston'
+
+    def __init__(self, latitude, longitude, timezone):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.timezone = timezone
+
+
+class Weather(object):
+    """Location and radiation values from a wea file."""
+
+    isWea = True
+
+    def __init__(self, filePath):
+        self.directNormalRadiation = [0] * 8760
+        self.diffuseHorizontalRadiation = [0] * 8760
+        self.hoys = []
+        with open(filePath, 'rb') as inf:
+            header = dict(inf.readline().split(None, 1) for _ in xrange(6))
+            for line in inf:
+                month, day, hour, directNormal, diffuseHorizontal = line.split()
+                dayOfYear = datetime.date(2017, int(month), int(day)).timetuple().tm_yday
+                hoy = (dayOfYear - 1) * 24 + int(float(hour))
+                self.directNormalRadiation[hoy] = float(directNormal)
+                self.diffuseHorizontalRadiation[hoy] = float(diffuseHorizontal)
+                self.hoys.append(hoy)
+        # wea files use west positive longitude and meridian
+        self.location = Location(float(header['latitude']), -float(header['longitude']),
+                                 -float(header['time_zone']) / 15)
+
+
+class SunMatrixTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/sky/sunmatrix.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by creating a working folder."""
+        self.folder = tempfile.mkdtemp()
+        self.wea = Weather(os.path.join(ASSETS, 'gendaylit.wea'))
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        shutil.rmtree(self.folder)
+
+    def test_perez_suns(self):
+        """Suns calculated in Python should match the analemma from gendaylit."""
+        sunMatrix = SunMatrix(self.wea, 0, self.wea.hoys)
+        sunMatrix.useGendaylit = False
+        analemma, _, _ = sunMatrix.execute(self.folder, reuse=False)
+        with open(analemma, 'rb') as inf:
+            suns = [line.split() for line in inf if line.strip()]
+        with open(os.path.join(ASSETS, 'gendaylit.ann'), 'rb') as inf:
+            reference = [line.split() for line in inf if line.strip()]
+
+        self.assertEqual(len(suns), len(reference))
+        for sun, ref in zip(suns, reference):
+            # names, types and number of arguments
+            self.assertEqual(sun[:6] + sun[9:15] + sun[18:],
+                             ref[:6] + ref[9:15] + ref[18:])
+            np.testing.assert_allclose(np.array(sun[6:9], float),
+                                       np.array(ref[6:9], float), rtol=0.02)
+            np.testing.assert_allclose(np.array(sun[15:18], float),
+                                       np.array(ref[15:18], float), atol=0.01)
+
+        # hours without direct radiation don't have a sun
+        hours = sunMatrix.sparseMatrix().hours
+        self.assertEqual([self.wea.hoys[h] for h in hours],
+                         [h for h in self.wea.hoys if self.wea.directNormalRadiation[h]])
+
+    def test_matrix_rows(self):
+        """Sun matrix should have a row for each sun in the list of suns."""
+        sunMatrix = SunMatrix(self.wea, 0, self.wea.hoys)
+        sunMatrix.useGendaylit = False
+        suns = sunMatrix.sparseMatrix()
+        for matrixFormat in ('a', 'f'):
+            folder = os.path.join(self.folder, matrixFormat)
+            os.mkdir(folder)
+            _, sunList, sunMtx = sunMatrix.execute(folder, False, matrixFormat)
+            with open(sunList, 'rb') as inf:
+                sunCount = len([line for line in inf if line.strip()])
+            nrows, ncols, ncomp, _ = matrixInfo(readMatrixHeader(sunMtx)[0])
+            values = readMatrix(sunMtx)
+            self.assertEqual(sunCount, suns.sunCount)
+            self.assertEqual((nrows, ncols, ncomp), (sunCount, len(self.wea.hoys), 3))
+            self.assertEqual(values.shape, (nrows, ncols, ncomp))
+            np.testing.assert_allclose(values, suns.toDense(), rtol=1e-5)
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_sky_sunmatrix_test
+    unittest.main()
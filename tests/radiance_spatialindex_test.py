@@ -0,0 +1,55 @@
+import unittest
+from honeybee.radiance.analysisgrid import AnalysisGrid
+
+
+class SpatialIndexTestCase(unittest.TestCase):
+    """Test for (honeybee/radiance/spatialindex.py)."""
+
+    # preparing to test
+    def setUp(self):
+        """Set up the test case by creating a 10 x 5 grid."""
+        points = tuple((x + 0.5, y + 0.5, 0.8) for y in range(5) for x in range(10))
+        self.grid = AnalysisGrid.fromPointsAndVectors(points)
+        self.grid.setValues(range(4), [[x * 100] * 4 for x in range(10)] * 5)
+        self.index = self.grid.spatialIndex()
+
+    # ending the test
+    def tearDown(self):
+        """Cleaning up after the test."""
+        pass
+
+    def test_box(self):
+        """Make sure box query returns the points inside the box."""
+        self.assertEqual(self.index.boxIds((0, 0), (2, 1)), [0, 1])
+        self.assertEqual(self.index.boxIds((0, 0, 0), (2, 1, 0.5)), [])
+
+    def test_radius(self):
+        """Make sure radius query returns the points inside the sphere."""
+        self.assertEqual(self.index.radiusIds((5, 3, 0.8), 0.75),
+                         [24, 25, 34, 35])
+
+    def test_polygon(self):
+        """Make sure polygon query returns the points inside the polygon."""
+        self.assertEqual(self.index.polygonIds(((0, 0), (3, 0), (0, 3))),
+                         [0, 1, 10])
+
+    def test_nearest(self):
+        """Make sure nearest point is found."""
+        self.assertEqual(self.index.nearest((9.9, 4.9, 0.8)), 49)
+        self.assertEqual(self.index.nearest((-20, 0, 0)), 0)
+
+    def test_view(self):
+        """Metrics should be calculated for the points in the view."""
+        view = self.index.box((7, 0), (10, 5))
+        self.assertEqual(len(view), 15)
+        self.assertIs(view[0], self.grid[7])
+        sda, _ = view.spatialDaylightAutonomy()
+        self.assertEqual(sda, 1)
+        view.setValues(range(4), [[0] * 4] * 15)
+        self.assertEqual(self.grid[7].value(0), 0)
+
+
+if __name__ == '__main__':
+    # You can run the test module from the root folder by using
+    # python -m unittest -v tests.radiance_spatialindex_test
+    unittest.main()